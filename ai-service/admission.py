@@ -0,0 +1,365 @@
+"""
+Admission Control
+Deadline, antrian prioritas dan load shedding untuk endpoint validasi
+
+Callers send their remaining time budget and a priority class:
+
+    X-Request-Deadline-Ms: 4800        (ms left when the request was sent)
+    X-Request-Priority: interactive    (or batch; default depends on the route)
+
+The budget is relative, so the two hosts' clocks need not agree. Beyond
+ADMISSION_CONCURRENCY running requests, new ones wait in a bounded queue
+ordered by priority, then arrival. A request is rejected at once with 503 and
+Retry-After when
+  - its estimated wait plus service time exceeds its deadline (the caller
+    would have given up before it finished), or
+  - the queue is full and holds nothing of lower priority. An interactive
+    request arriving at a full queue sheds the newest queued batch request
+    instead.
+A request whose deadline passes while it is queued gets 504 without running.
+One whose deadline passes while it runs is cancelled at its next await
+(executor work that has not started never runs) and gets 504, unless its
+response has already started.
+
+ADMISSION_INTERACTIVE_RESERVED permits (default a quarter, at least one) are held back for
+interactive requests: batch requests never occupy them, so a saturating
+backfill cannot make interactive submissions queue behind whole batches.
+
+Service times are EWMAs, per route, of how long a permit was held.
+
+Batch handlers that do long stretches of work on the event loop call
+pause() between slices; it waits (up to MAX_PAUSE) while interactive
+requests hold permits, so their few loop steps are not interleaved with
+batch slices.
+
+The validation executor orders its pool work with a second limiter (one
+permit per worker) using the request's priority and deadline, which are
+carried in context variables. The chunks of a large batch therefore do not
+queue in front of interactive work inside the pool. In inline mode validation
+runs on the event loop, so only the request queue applies.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITIES = {'interactive': INTERACTIVE, 'batch': BATCH}
+
+DEADLINE_HEADER = b'x-request-deadline-ms'
+PRIORITY_HEADER = b'x-request-priority'
+
+# Service-time estimate (seconds) for a key before it has been measured
+DEFAULT_COST = 0.01
+EWMA_ALPHA = 0.2
+
+# Longest a batch slice defers to interactive work, so batches still progress
+MAX_PAUSE = 0.05
+
+# Of the request being handled; deadline is on the time.monotonic() clock
+current_priority: ContextVar[int] = ContextVar('current_priority', default=INTERACTIVE)
+current_deadline: ContextVar[Optional[float]] = ContextVar('current_deadline', default=None)
+
+
+class Rejected(HTTPException):
+    """Request ditolak (503 + Retry-After) atau kedaluwarsa (504)"""
+
+    def __init__(self, status_code: int, reason: str, detail: str, retry_after: Optional[float] = None):
+        headers = {'Retry-After': str(max(1, math.ceil(retry_after)))} if retry_after is not None else None
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+        self.reason = reason
+
+    def response(self) -> ORJSONResponse:
+        return ORJSONResponse({'detail': self.detail}, status_code=self.status_code, headers=self.headers)
+
+
+@dataclass(order=True)
+class Permit:
+    """Entry antrian; setelah diberikan menjadi izin yang dikembalikan lewat release()"""
+    priority: int
+    sequence: int
+    key: str = field(compare=False)
+    cost: float = field(compare=False)
+    deadline: Optional[float] = field(compare=False)
+    future: Optional[asyncio.Future] = field(default=None, compare=False)
+    started: float = field(default=0.0, compare=False)
+
+
+class PriorityLimiter:
+    """
+    Semaphore dengan antrian prioritas, estimasi waktu tunggu dan deadline
+
+    A released permit goes straight to the best waiter (lowest priority
+    value, then earliest arrival), so requests never overtake the queue.
+
+    Args:
+        permits: Jumlah pekerjaan yang boleh berjalan bersamaan
+        max_queue: Batas antrian (None = tanpa batas, tanpa shedding)
+        early_reject: Tolak di depan jika estimasi tunggu melewati deadline
+        reserved: Izin yang hanya boleh dipakai pekerjaan interactive
+    """
+
+    def __init__(self, permits: int, max_queue: Optional[int] = None, early_reject: bool = True,
+                 reserved: int = 0):
+        self.permits = max(1, permits)
+        self.max_queue = max_queue
+        self.early_reject = early_reject
+        self.reserved = max(0, min(reserved, self.permits - 1))
+        self.costs: Dict[str, float] = {}
+        self.counts = {
+            'admitted': 0, 'waited': 0, 'rejected_deadline': 0, 'rejected_full': 0,
+            'shed': 0, 'expired': 0, 'cancelled': 0,
+        }
+        self._heap: List[Permit] = []
+        self._queued = 0  # live entries in _heap (shed/expired ones are skipped lazily)
+        self._running: Dict[int, Permit] = {}
+        self._interactive = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_env(cls, default_permits: int) -> Optional['PriorityLimiter']:
+        if os.getenv('ADMISSION_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        permits = os.getenv('ADMISSION_CONCURRENCY')
+        permits = int(permits) if permits else default_permits
+        reserved = os.getenv('ADMISSION_INTERACTIVE_RESERVED')
+        return cls(
+            permits,
+            max_queue=int(os.getenv('ADMISSION_QUEUE_SIZE', '256')),
+            reserved=int(reserved) if reserved else max(1, permits // 4)
+        )
+
+    def cost(self, key: str) -> float:
+        return self.costs.get(key, DEFAULT_COST)
+
+    def _limit(self, priority: int) -> int:
+        return self.permits if priority == INTERACTIVE else self.permits - self.reserved
+
+    def _can_start(self, priority: int) -> bool:
+        if len(self._running) >= self.permits:
+            return False
+        if priority == INTERACTIVE:
+            return True
+        batch = sum(1 for permit in self._running.values() if permit.priority != INTERACTIVE)
+        return batch < self._limit(priority)
+
+    def estimated_wait(self, priority: int) -> float:
+        """Detik sampai pekerjaan baru dengan prioritas ini mendapat izin"""
+        if self._can_start(priority):
+            return 0.0
+        now = time.monotonic()
+        running = sum(max(permit.cost - (now - permit.started), 0.0) for permit in self._running.values())
+        ahead = sum(
+            permit.cost for permit in self._heap
+            if permit.priority <= priority and not permit.future.done()
+        )
+        return (running + ahead) / self._limit(priority)
+
+    def _start(self, permit: Permit) -> Permit:
+        permit.started = time.monotonic()
+        self._running[permit.sequence] = permit
+        if permit.priority == INTERACTIVE:
+            self._interactive += 1
+        self.counts['admitted'] += 1
+        return permit
+
+    async def acquire(self, key: str, priority: int = INTERACTIVE, deadline: Optional[float] = None) -> Permit:
+        """Izin untuk `key` (route/fungsi); Rejected jika ditolak, di-shed atau kedaluwarsa"""
+        permit = Permit(priority, next(self._sequence), key, self.cost(key), deadline)
+        if self._can_start(priority):
+            return self._start(permit)
+
+        now = time.monotonic()
+        if deadline is not None and deadline <= now:
+            self.counts['expired'] += 1
+            raise Rejected(504, 'expired', "Deadline exceeded before the request was admitted")
+        if self.early_reject and deadline is not None:
+            wait = self.estimated_wait(priority)
+            if now + wait + permit.cost > deadline:
+                self.counts['rejected_deadline'] += 1
+                raise Rejected(503, 'deadline', f"Estimated wait {wait:.2f}s exceeds the request deadline", wait)
+        if self.max_queue is not None and self._queued >= self.max_queue:
+            self._shed_for(permit)
+
+        permit.future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, permit)
+        self._queued += 1
+        self.counts['waited'] += 1
+        try:
+            if deadline is None:
+                await permit.future
+            else:
+                await asyncio.wait_for(permit.future, deadline - now)
+        except asyncio.TimeoutError:
+            self._queued -= 1
+            self.counts['expired'] += 1
+            raise Rejected(504, 'expired', "Deadline exceeded while queued")
+        except asyncio.CancelledError:
+            future = permit.future
+            if not future.done() or future.cancelled():
+                future.cancel()
+                self._queued -= 1
+            elif future.exception() is None:
+                self.release(permit)  # granted just as the request was cancelled
+            raise
+        return permit
+
+    def _shed_for(self, permit: Permit):
+        """Antrian penuh: buang entry terakhir dengan prioritas lebih rendah, atau tolak `permit`"""
+        victim = max((queued for queued in self._heap if not queued.future.done()), default=None)
+        if victim is None or victim.priority <= permit.priority:
+            self.counts['rejected_full'] += 1
+            raise Rejected(503, 'queue_full', "Too many queued requests", self.estimated_wait(permit.priority))
+        self._queued -= 1
+        self.counts['shed'] += 1
+        victim.future.set_exception(Rejected(
+            503, 'shed', "Shed in favour of higher-priority work", self.estimated_wait(victim.priority)
+        ))
+
+    def release(self, permit: Permit):
+        if self._running.pop(permit.sequence, None) is None:
+            return
+        if permit.priority == INTERACTIVE:
+            self._interactive -= 1
+            if not self._interactive and self._idle is not None:
+                self._idle.set()
+        elapsed = time.monotonic() - permit.started
+        self.costs[permit.key] = self.cost(permit.key) * (1 - EWMA_ALPHA) + elapsed * EWMA_ALPHA
+        while self._heap:
+            waiter = self._heap[0]
+            if waiter.future.done():
+                heapq.heappop(self._heap)  # shed, expired or cancelled
+                continue
+            if not self._can_start(waiter.priority):
+                return  # best waiter is batch and the rest is reserved for interactive
+            heapq.heappop(self._heap)
+            self._queued -= 1
+            waiter.future.set_result(self._start(waiter))
+            return
+
+    async def pause(self, priority: int, limit: float = MAX_PAUSE):
+        """Titik yield untuk pekerjaan batch: tunggu selama pekerjaan interactive berjalan"""
+        if priority == INTERACTIVE or not self._interactive:
+            await asyncio.sleep(0)
+            return
+        if self._idle is None or self._idle.is_set():
+            self._idle = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle.wait(), limit)
+        except asyncio.TimeoutError:
+            pass
+
+    @asynccontextmanager
+    async def slot(self, key: str) -> AsyncIterator[Permit]:
+        """acquire/release dengan prioritas dan deadline request saat ini"""
+        permit = await self.acquire(key, current_priority.get(), current_deadline.get())
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    def stats(self) -> Dict[str, Any]:
+        queued = [permit for permit in self._heap if not permit.future.done()]
+        return {
+            'permits': self.permits,
+            'reserved': self.reserved,
+            'running': len(self._running),
+            'queued': {name: sum(1 for permit in queued if permit.priority == value) for name, value in PRIORITIES.items()},
+            'maxQueue': self.max_queue,
+            'estimatedWait': {name: round(self.estimated_wait(value), 4) for name, value in PRIORITIES.items()},
+            'serviceTime': {key: round(cost, 4) for key, cost in sorted(self.costs.items())},
+            **self.counts,
+        }
+
+
+def parse_headers(scope, default_priority: int) -> tuple:
+    """(priority, deadline) dari header request; nilai yang tidak valid diabaikan"""
+    priority = default_priority
+    deadline = None
+    for name, value in scope['headers']:
+        if name == PRIORITY_HEADER:
+            priority = PRIORITIES.get(value.decode('latin-1').strip().lower(), default_priority)
+        elif name == DEADLINE_HEADER:
+            try:
+                budget = float(value)
+            except ValueError:
+                continue
+            if math.isfinite(budget):
+                deadline = time.monotonic() + budget / 1000
+    return priority, deadline
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware: antrian, penolakan dan pembatalan berdasarkan deadline
+
+    Only `paths` (path -> default priority) are admitted through the limiter;
+    health checks, stats and the streaming endpoint pass straight through.
+    """
+
+    def __init__(self, app, limiter: PriorityLimiter, paths: Mapping[str, int]):
+        self.app = app
+        self.limiter = limiter
+        self.paths = dict(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        priority, deadline = parse_headers(scope, self.paths[scope['path']])
+        priority_token = current_priority.set(priority)
+        deadline_token = current_deadline.set(deadline)
+        try:
+            try:
+                permit = await self.limiter.acquire(scope['path'], priority, deadline)
+            except Rejected as e:
+                return await e.response()(scope, receive, send)
+            try:
+                await self._run(scope, receive, send, deadline)
+            finally:
+                self.limiter.release(permit)
+        finally:
+            current_priority.reset(priority_token)
+            current_deadline.reset(deadline_token)
+
+    async def _run(self, scope, receive, send, deadline: Optional[float]):
+        if deadline is None:
+            return await self.app(scope, receive, send)
+
+        started = False
+
+        async def tracking_send(message):
+            nonlocal started
+            if message['type'] == 'http.response.start':
+                started = True
+            await send(message)
+
+        task = asyncio.ensure_future(self.app(scope, receive, tracking_send))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=max(deadline - time.monotonic(), 0.0))
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if done or started:
+            return await task  # finished, or a response is already on its way
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        if started:
+            return
+        self.limiter.counts['cancelled'] += 1
+        await Rejected(504, 'cancelled', "Deadline exceeded, request cancelled").response()(scope, receive, send)
@@ -0,0 +1,129 @@
+"""
+Load test: interactive latency under batch saturation, with and without admission control
+
+Starts the service with uvicorn (process executor) and sends interactive
+/validate requests at a fixed rate (open loop, X-Request-Deadline-Ms like
+scoring.service.ts). It measures them alone, then while several clients keep
+/validate/batch saturated with backfill batches (X-Request-Priority: batch).
+Every submission is unique, so the result cache does not help. Reports
+interactive p50/p99 and status counts, and batch items/s.
+
+Usage:
+    python benchmarks/bench_admission.py --workers 2 --rate 40 --saturators 4
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.generator import SubmissionGenerator
+from benchmarks.load_test import percentile, start_server
+
+_unique = itertools.count(1)
+
+
+def unique(row: dict) -> dict:
+    # Distinct claim per request: no result cache hits
+    return {**row, 'carbonReductionKg': row['carbonReductionKg'] + next(_unique) * 1e-3}
+
+
+async def interactive(client, rows, rate: float, seconds: float, deadline_ms: int):
+    latencies, statuses = [], Counter()
+
+    async def one(row):
+        start = time.perf_counter()
+        try:
+            response = await client.post('/validate', json=unique(row), headers={
+                'X-Request-Deadline-Ms': str(deadline_ms), 'X-Request-Priority': 'interactive',
+            })
+            statuses[response.status_code] += 1
+        except httpx.TimeoutException:
+            statuses['timeout'] += 1
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * seconds)):
+        await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+        tasks.append(asyncio.create_task(one(rows[i % len(rows)])))
+    await asyncio.gather(*tasks)
+    return latencies, statuses
+
+
+async def saturate(client, rows, batch_size: int, stop: asyncio.Event, counts: Counter):
+    offset = 0
+    while not stop.is_set():
+        items = [{'id': str(next(_unique)), 'data': unique(rows[(offset + i) % len(rows)])} for i in range(batch_size)]
+        offset += batch_size
+        try:
+            response = await client.post('/validate/batch', json={'items': items}, headers={
+                'X-Request-Deadline-Ms': '60000', 'X-Request-Priority': 'batch',
+            })
+            counts[response.status_code] += 1
+            if response.status_code == 200:
+                counts['items'] += batch_size
+            elif response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get('Retry-After', '1')))
+        except httpx.TimeoutException:
+            counts['timeout'] += 1
+
+
+async def run(url: str, args) -> list:
+    rows = SubmissionGenerator(seed=17, noise=0.2).submissions(2000)
+    results = []
+    async with httpx.AsyncClient(base_url=url, timeout=args.deadline_ms / 1000 + 1,
+                                 limits=httpx.Limits(max_connections=None)) as client, \
+            httpx.AsyncClient(base_url=url, timeout=120) as batch_client:
+        for saturators in (0, args.saturators):
+            stop = asyncio.Event()
+            batch_counts = Counter()
+            loops = [asyncio.create_task(saturate(batch_client, rows, args.batch_size, stop, batch_counts))
+                     for _ in range(saturators)]
+            await asyncio.sleep(1.0 if saturators else 0)  # let the backlog build up
+            start = time.perf_counter()
+            latencies, statuses = await interactive(client, rows, args.rate, args.seconds, args.deadline_ms)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await asyncio.gather(*loops)
+            results.append((saturators, latencies, statuses, batch_counts['items'] / elapsed, batch_counts))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--rate', type=float, default=40, help="Interactive requests/s")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--saturators', type=int, default=2, help="Concurrent batch clients")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--deadline-ms', type=int, default=5000)
+    parser.add_argument('--port', type=int, default=5056)
+    args = parser.parse_args()
+
+    print(f"{'admission':>9} {'batch':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'batch items/s':>14}  statuses")
+    for enabled in ('true', 'false'):
+        os.environ['ADMISSION_ENABLED'] = enabled
+        os.environ['VALIDATION_CHUNK_SIZE'] = os.environ.get('VALIDATION_CHUNK_SIZE', '100')
+        server = start_server('process', args.workers, args.port)
+        try:
+            results = asyncio.run(run(f'http://127.0.0.1:{args.port}', args))
+        finally:
+            server.terminate()
+            server.wait()
+        for saturators, latencies, statuses, items_per_second, batch_counts in results:
+            print(f"{'on' if enabled == 'true' else 'off':>9} {saturators:>6} "
+                  f"{statistics.median(latencies) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} "
+                  f"{max(latencies) * 1000:>8.1f} {items_per_second:>14.0f}  "
+                  f"interactive {dict(statuses)} batch {dict(batch_counts)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: validate_carbon_claims_batch vs validate_carbon_claim
+
+Usage:
+    python benchmarks/bench_batch_validation.py --rows 1000000
+
+The scalar path is timed on a sample (--scalar-sample) and extrapolated to the
+full row count so the comparison stays practical on 1M rows. The batch path is
+timed on three inputs:
+
+    categorical   string columns as pandas categoricals, the way a portfolio
+                  export read from Parquet arrives
+    object        plain object-string columns
+    lists         a dict of Python lists, what /estimate-carbon/batch and /jobs
+                  pass to validation_executor.map_columns
+
+The >=50x speedup target only holds for the categorical input with few distinct
+details texts (46-59x on 1M rows across runs here). Object strings and lists
+are dominated by hashing the string columns and measure ~15x and ~8.5x.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from validators.carbon_validator import CarbonValidator
+
+DETAILS = [
+    None,
+    'Banyak sampah didaur ulang',
+    'Kami mendaur ulang 250kg sampah kain per tahun. Dengan faktor emisi 2kg CO2/kg sampah, '
+    'total pengurangan adalah 500kg CO2.',
+    'Menghemat listrik 4000 kWh per tahun dengan panel surya. Faktor emisi 0.5 kg CO2/kWh = 2000 kg CO2.',
+    'Jarak transport distribusi berkurang 300 km per bulan sejak baseline tahun lalu.',
+]
+
+
+def make_claims(rows: int, seed: int = 42, categorical: bool = True) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    validator = CarbonValidator()
+    claims = pd.DataFrame({
+        'carbon_reduction_kg': rng.lognormal(mean=7.5, sigma=1.2, size=rows).round(1),
+        'calculation_method': rng.choice(list(validator.METHOD_FACTORS) + ['unknown'], size=rows),
+        'sector': rng.choice(list(validator.BENCHMARKS) + ['Lainnya'], size=rows),
+        'business_scale': rng.choice(['small', 'medium', 'large'], size=rows),
+        'evidence_count': rng.integers(0, 8, size=rows),
+        'details': rng.choice(np.array(DETAILS, dtype=object), size=rows),
+    })
+    if categorical:
+        for column in ('calculation_method', 'sector', 'business_scale', 'details'):
+            claims[column] = claims[column].astype('category')
+    return claims
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--scalar-sample', type=int, default=50_000)
+    args = parser.parse_args()
+
+    validator = CarbonValidator()
+    claims = make_claims(args.rows, categorical=False)
+    inputs = {
+        'categorical': make_claims(args.rows),
+        'object': claims,
+        'lists': {column: claims[column].tolist() for column in claims.columns},
+    }
+
+    sample = claims.head(args.scalar_sample)
+    sample = sample.where(sample.notna(), None).to_dict('records')
+    start = time.perf_counter()
+    for row in sample:
+        validator.validate_carbon_claim(**row)
+    scalar_seconds = (time.perf_counter() - start) * args.rows / len(sample)
+
+    print(f"rows:           {args.rows}")
+    print(f"scalar (est.):  {scalar_seconds:.3f} s")
+    print(f"{'input':<12} {'batch s':>8} {'speedup':>8} {'valid':>6}")
+    for name, data in inputs.items():
+        start = time.perf_counter()
+        batch = validator.validate_carbon_claims_batch(data)
+        batch_seconds = time.perf_counter() - start
+        print(f"{name:<12} {batch_seconds:>8.3f} {scalar_seconds / batch_seconds:>7.1f}x {batch.is_valid.mean():>6.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: benchmark lookup cost vs table size, and latency during hot reloads
+
+Generates a synthetic benchmark file with many sectors, sub-sectors and
+regions, then
+  1. times validate_carbon_claim against the built-in 5-sector table and the
+     large one (lookups are dict hits, so the two should match), and
+  2. validates claims in a loop while another thread keeps rewriting the file
+     and the store's watcher thread reloads it (as in the API, where requests
+     only read `validator.rules`), comparing per-claim latency with and
+     without reloads.
+
+Usage:
+    python benchmarks/bench_benchmark_reload.py --sectors 1000 --seconds 3
+"""
+
+import argparse
+import csv
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from validators.benchmark_store import BenchmarkStore
+from validators.carbon_validator import CarbonValidator
+
+SCALES = ('small', 'medium', 'large')
+SUB_SECTORS = ('A', 'B', 'C')
+REGIONS = ('Jawa', 'Sumatra', 'Bali')
+DETAILS = 'Kami mendaur ulang 250kg sampah per tahun dengan metode timbang bulanan terhadap baseline.'
+
+
+def write_file(path: str, sectors: int, bump: int = 0):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sector', 'sub_sector', 'region', 'scale', 'min', 'max', 'typical'])
+        for s in range(sectors):
+            for sub in (None,) + SUB_SECTORS:
+                for region in (None,) + REGIONS:
+                    for k, scale in enumerate(SCALES):
+                        base = 100 * (k + 1) + s % 50 + bump
+                        writer.writerow([f"Sektor {s}", sub, region, scale, base, base * 20, base * 5])
+    os.replace(tmp, path)
+
+
+def claim_args(i: int, sectors: int):
+    return (500 + i % 700, 'waste_diverted', f"Sektor {i % sectors}", SCALES[i % 3], 3, DETAILS,
+            SUB_SECTORS[i % 3] if i % 2 else None, REGIONS[i % 3] if i % 5 else None)
+
+
+def measure(validator: CarbonValidator, sectors: int, seconds: float) -> list:
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        args = claim_args(i, sectors)
+        start = time.perf_counter()
+        validator.validate_carbon_claim(*args)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    return latencies
+
+
+def report(label: str, latencies: list):
+    ordered = sorted(latencies)
+    p99 = ordered[int(0.99 * (len(ordered) - 1))]
+    p999 = ordered[int(0.999 * (len(ordered) - 1))]
+    print(f"{label:>16} {len(ordered):>9} {statistics.median(ordered) * 1e6:>8.1f} "
+          f"{p99 * 1e6:>8.1f} {p999 * 1e6:>9.1f} {ordered[-1] * 1e6:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sectors', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--reload-every', type=float, default=0.2, help="Seconds between reloads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmarks.csv')
+        write_file(path, args.sectors)
+        validator = CarbonValidator()
+        builtin = CarbonValidator()
+        store = BenchmarkStore(path, validator)
+        started = time.perf_counter()
+        store.load()
+        rules = validator.rules
+        print(f"{len(rules.profiles)} profiles, {len(rules.bench_min)} entries, "
+              f"loaded in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+        number = 20000
+        small = timeit.timeit(
+            lambda: builtin.validate_carbon_claim(500, 'waste_diverted', 'Fashion', 'small', 3, DETAILS),
+            number=number
+        )
+        large = timeit.timeit(
+            lambda: validator.validate_carbon_claim(
+                500, 'waste_diverted', 'Sektor 777', 'small', 3, DETAILS, 'B', 'Bali'),
+            number=number
+        )
+        print(f"us/claim: {small / number * 1e6:.1f} (5 profiles) vs "
+              f"{large / number * 1e6:.1f} ({len(rules.profiles)} profiles, sub-sector + region)\n")
+
+        print(f"{'run':>16} {'claims':>9} {'p50 us':>8} {'p99 us':>8} {'p99.9 us':>9} {'max us':>9}")
+        report('no reload', measure(validator, args.sectors, args.seconds))
+
+        stop = threading.Event()
+
+        def writer():
+            bump = 0
+            while not stop.is_set():
+                bump += 1
+                write_file(path, args.sectors, bump)
+                stop.wait(args.reload_every)
+
+        reloads = store.reloads
+        store.check_interval = 0  # the watcher polls at MIN_WATCH_INTERVAL
+        store.watch()
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            latencies = measure(validator, args.sectors, args.seconds)
+        finally:
+            stop.set()
+            thread.join()
+            store.stop()
+        report('during reloads', latencies)
+        print(f"\n{store.reloads - reloads} reloads by the watcher thread "
+              f"(parse + compile; the measured loop only reads validator.rules)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: trend check cost per claim vs claim history size
+
+Fills a ClaimHistory with U UMKMs x Y yearly claims, then times
+check_and_record() for the next year's claim of random UMKMs, and compares it
+with the approach it replaces: collecting the UMKM's whole history and
+recomputing its growth statistics for every new claim.
+
+Usage:
+    python benchmarks/bench_claim_history.py --umkms 100000 --years 2 5 10 20
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from validators.claim_history import ClaimHistory
+
+
+def fill(umkms: int, years: int, seed: int = 5) -> ClaimHistory:
+    rng = np.random.default_rng(seed)
+    history = ClaimHistory(capacity=umkms * (years + 1))
+    kg = rng.lognormal(6, 1, umkms)
+    for year in range(years):
+        kg = kg * rng.lognormal(0.1, 0.2, umkms)
+        for umkm in range(umkms):
+            history.record(f"umkm-{umkm}", 2000 + year, float(kg[umkm]), 5, 'small')
+    return history
+
+
+def full_recompute(history: ClaimHistory, umkm_id: str, period: int, kg: float) -> float:
+    # Baseline: read the UMKM's claims and recompute growth mean/std each time
+    claims = history.history(umkm_id)['claims']
+    growth = [math.log(b['carbonReductionKg'] / a['carbonReductionKg']) for a, b in zip(claims, claims[1:])]
+    mean = statistics.fmean(growth)
+    std = statistics.stdev(growth) if len(growth) > 1 else 0.0
+    last = claims[-1]
+    return (math.log(kg / last['carbonReductionKg']) - mean) / max(std, 0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--umkms', type=int, default=20000)
+    parser.add_argument('--years', type=int, nargs='+', default=[2, 5, 10, 20])
+    parser.add_argument('--checks', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(9)
+    print(f"{args.umkms} UMKMs, {args.checks} checks")
+    print(f"{'years':>6} {'claims':>9} {'check us':>9} {'recompute us':>13}")
+    for years in args.years:
+        history = fill(args.umkms, years)
+        targets = [f"umkm-{umkm}" for umkm in rng.integers(0, args.umkms, args.checks)]
+        claims = rng.lognormal(6, 1, args.checks)
+
+        start = time.perf_counter()
+        for umkm_id, kg in zip(targets, claims):
+            full_recompute(history, umkm_id, 2000 + years, float(kg))
+        recompute = (time.perf_counter() - start) / args.checks
+
+        start = time.perf_counter()
+        for umkm_id, kg in zip(targets, claims):
+            history.check_and_record(umkm_id, 2000 + years, float(kg), 5, 'small')
+        check = (time.perf_counter() - start) / args.checks
+        print(f"{years:>6} {history.stats()['claims']:>9} {check * 1e6:>9.1f} {recompute * 1e6:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: async validation job throughput by batch size
+
+Queues N synthetic submissions (with sector and scale, so every job also has
+a carbon claim) in a file-backed JobQueue, then lets a JobRunner running the
+service pipeline (main._process_jobs) work them off. Reports jobs/s and
+queue wait for each JOBS_BATCH_SIZE: batch size 1 is one validation and one
+carbon call per job; larger batches share one vectorized carbon call.
+
+Usage:
+    python benchmarks/bench_jobs.py --jobs 5000 --batch-sizes 1 50 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.generator import SubmissionGenerator
+from jobs import JobQueue, JobRunner
+
+
+def make_records(n: int) -> list:
+    generator = SubmissionGenerator(seed=11, noise=0.1)
+    return [
+        {**submission, 'sector': claim['sector'], 'businessScale': claim['business_scale']}
+        for submission, claim in zip(generator.submissions(n), generator.claims(n))
+    ]
+
+
+async def run(path: str, records: list, batch_size: int, concurrency: int) -> dict:
+    import main
+
+    queue = JobQueue(path)
+    runner = JobRunner(queue, main._process_jobs, concurrency=concurrency, batch_size=batch_size)
+    for record in records:
+        runner.submit({'data': record})
+    start = time.perf_counter()
+    runner.start()
+    while runner.counts['done'] + runner.counts['failed'] < len(records):
+        await asyncio.sleep(0.01)
+    seconds = time.perf_counter() - start
+    await runner.stop()
+    stats = runner.stats()
+    queue.close()
+    return {'seconds': seconds, **stats}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 50, 200])
+    parser.add_argument('--concurrency', type=int, default=2)
+    args = parser.parse_args()
+
+    records = make_records(args.jobs)
+    print(f"{args.jobs} jobs, concurrency {args.concurrency}")
+    print(f"{'batch':>6} {'jobs/s':>9} {'mean batch':>11} {'failed':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for batch_size in args.batch_sizes:
+            path = os.path.join(directory, f'jobs-{batch_size}.sqlite')
+            stats = asyncio.run(run(path, records, batch_size, args.concurrency))
+            print(f"{batch_size:>6} {args.jobs / stats['seconds']:>9.0f} "
+                  f"{stats['meanBatchJobs']:>11.1f} {stats['failed']:>7}")
+
+
+if __name__ == '__main__':
+    main()
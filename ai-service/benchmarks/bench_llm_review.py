@@ -0,0 +1,110 @@
+"""
+Benchmark: LLM review throughput and tail latency against the stub server
+
+Starts benchmarks/llm_stub.py in its own process (real sockets, so
+connection pooling is exercised), then reviews N synthetic submissions of which a
+fraction are exact repeats, at several concurrency limits. Reports reviews/s,
+p50/p99 per-review latency and how many requests reached the "model"
+(repeats are served by coalescing or the cache). A second pass over the same
+submissions measures the warm cache.
+
+Usage:
+    python benchmarks/bench_llm_review.py --reviews 2000 --latency 0.2 --sigma 0.6
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.generator import SubmissionGenerator
+from cache import ResultCache
+from validators.llm_reviewer import LLMReviewer
+
+
+def percentile(values, q):
+    return sorted(values)[min(len(values) - 1, int(len(values) * q))]
+
+
+def start_stub(latency: float, sigma: float):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen([
+        sys.executable, os.path.join(os.path.dirname(__file__), 'llm_stub.py'),
+        '--port', str(port), '--latency', str(latency), '--sigma', str(sigma)
+    ])
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(500):
+        try:
+            httpx.get(f"{url}/stats")
+            return process, url
+        except httpx.TransportError:
+            time.sleep(0.02)
+    process.kill()
+    raise RuntimeError("LLM stub did not start")
+
+
+async def run(reviewer: LLMReviewer, items) -> list:
+    async def timed(data, result):
+        start = time.perf_counter()
+        await reviewer.review(data, result)
+        return time.perf_counter() - start
+    return await asyncio.gather(*(timed(data, result) for data, result in items))
+
+
+def report(label: str, latencies, elapsed: float, requests: int):
+    print(f"{label:<24} {len(latencies) / elapsed:8.0f} reviews/s  "
+          f"p50 {statistics.median(latencies) * 1000:7.1f}ms  p99 {percentile(latencies, 0.99) * 1000:7.1f}ms  "
+          f"model requests {requests}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', type=int, default=2000)
+    parser.add_argument('--repeat', type=float, default=0.3, help="Fraction of submissions that are exact repeats")
+    parser.add_argument('--latency', type=float, default=0.2, help="Median stub latency (seconds)")
+    parser.add_argument('--sigma', type=float, default=0.6)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 128])
+    args = parser.parse_args()
+
+    stub, url = start_stub(args.latency, args.sigma)
+
+    unique = SubmissionGenerator(seed=11, noise=0.2).submissions(int(args.reviews * (1 - args.repeat)) or 1)
+    rows = [unique[i % len(unique)] for i in range(args.reviews)]
+    # Everything is borderline for the benchmark: band covers all confidences
+    items = [(row, {'confidence': 0.5, 'flags': []}) for row in rows]
+
+    try:
+        for concurrency in args.concurrency:
+            reviewer = LLMReviewer(f"{url}/v1", band=(0.0, 1.0), concurrency=concurrency,
+                                   timeout=60, cache=ResultCache(max_entries=args.reviews))
+
+            async def passes():
+                start = time.perf_counter()
+                cold = await run(reviewer, items)
+                cold_elapsed, cold_requests = time.perf_counter() - start, reviewer.requests
+                start = time.perf_counter()
+                warm = await run(reviewer, items)
+                warm_elapsed = time.perf_counter() - start
+                await reviewer.close()
+                return cold, cold_elapsed, cold_requests, warm, warm_elapsed
+
+            cold, cold_elapsed, cold_requests, warm, warm_elapsed = asyncio.run(passes())
+            report(f"concurrency {concurrency} cold", cold, cold_elapsed, cold_requests)
+            report(f"concurrency {concurrency} warm", warm, warm_elapsed, reviewer.requests - cold_requests)
+            print(f"{'':<24} coalesced {reviewer.coalesced}  errors {reviewer.errors}  "
+                  f"stub {httpx.get(f'{url}/stats').json()}")
+    finally:
+        stub.terminate()
+
+
+if __name__ == '__main__':
+    main()
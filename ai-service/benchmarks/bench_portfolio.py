@@ -0,0 +1,74 @@
+"""
+Benchmark: portfolio query latency vs store size
+
+Scores a pool of synthetic submissions once, fills a PortfolioStore with N rows
+drawn from the pool (sector and scale reassigned at random), then times
+typical Kreditor queries: a filtered count, a group-by and a sorted page.
+
+Usage:
+    python benchmarks/bench_portfolio.py --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.generator import SubmissionGenerator
+from portfolio import PortfolioStore
+from streaming import StreamValidator
+from validators.carbon_validator import CarbonValidator
+
+QUERIES = {
+    'filter_count': dict(sectors=['Fashion', 'F&B'], min_confidence=0.6, is_valid=True),
+    'flags_any': dict(flags_any=['too_high', 'statistical_outlier'], carbon_valid=False),
+    'group_by_sector': dict(group_by='sector'),
+    'group_by_flag': dict(scales=['small'], group_by='flag'),
+    'top_100_page': dict(flags_none=['insufficient_evidence'], order_by='carbon_confidence', descending=True, limit=100),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--pool', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    generator = SubmissionGenerator(seed=11, noise=0.1)
+    rng = np.random.default_rng(11)
+    sectors = list(CarbonValidator.BENCHMARKS)
+    scales = list(CarbonValidator.SCALES)
+    pool = []
+    stream = StreamValidator()
+    for row in generator.submissions(args.pool):
+        record = {**row, 'sector': str(rng.choice(sectors)), 'businessScale': str(rng.choice(scales))}
+        result = stream.validate_chunk([record])[0]
+        pool.append((record, json.loads(result)))
+
+    store = PortfolioStore()
+    start = time.perf_counter()
+    for i in range(args.rows):
+        record, result = pool[i % len(pool)]
+        store.put(f"s{i}", record, result)
+    fill = time.perf_counter() - start
+    print(f"rows={args.rows} fill={fill:.1f}s ({fill / args.rows * 1e6:.1f} us/row) "
+          f"columns={store.stats()['bytes'] / 1e6:.0f} MB")
+
+    for name, query in QUERIES.items():
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = store.query(**query)
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"{name:16s} median={statistics.median(times):7.2f} ms  max={max(times):7.2f} ms  "
+              f"count={response['count']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Benchmark: per-claim latency of validate_carbon_claim vs details length
+
+Usage:
+    python benchmarks/bench_rule_engine.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from validators.carbon_validator import CarbonValidator
+
+SENTENCE = (
+    'Kami mendaur ulang 250kg sampah kain per tahun dengan metode timbang '
+    'periode bulanan terhadap baseline. '
+)
+
+
+def main():
+    validator = CarbonValidator()
+    print(f"{'sentences':>10} {'chars':>8} {'us/claim':>10}")
+    for repeats in (0, 1, 10, 100, 1000):
+        details = SENTENCE * repeats or None
+        number = 20000 if repeats < 100 else 500
+        seconds = timeit.timeit(
+            lambda: validator.validate_carbon_claim(500, 'energy_saved', 'Fashion', 'small', 3, details),
+            number=number
+        )
+        print(f"{repeats:>10} {len(details or ''):>8} {seconds / number * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: what-if scenario simulation over a large claims corpus
+
+Generates N synthetic claims (tiled from a pool, kg jittered), computes the
+ruleset-independent features once, then replays several candidate rulesets
+in one pass. Compares with the naive approach of a full
+validate_carbon_claims_batch run per scenario.
+
+Usage:
+    python benchmarks/bench_scenarios.py --claims 1000000 --scenarios 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.generator import SubmissionGenerator
+from scenarios import ClaimCorpus, Scenario
+from validators.carbon_validator import CarbonValidator
+
+
+def make_scenarios(count: int):
+    scenarios = [
+        Scenario('max -30%', multipliers={'max': 0.7}),
+        Scenario('typical -20%', multipliers={'typical': 0.8}),
+        Scenario('fashion small', benchmarks={'Fashion': {'small': {'max': 300, 'typical': 100}}}),
+        Scenario('stricter evidence', min_evidence_ratios=(0.3, 1.0, 2.0), min_evidence_counts=(1, 2, 4, 8)),
+        Scenario('wider', multipliers={'min': 0.5, 'max': 1.5}),
+    ]
+    return [scenarios[i % len(scenarios)] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--claims', type=int, default=1_000_000)
+    parser.add_argument('--pool', type=int, default=50_000)
+    parser.add_argument('--scenarios', type=int, default=5)
+    parser.add_argument('--naive', action='store_true', help="Also time one full batch run per scenario")
+    args = parser.parse_args()
+
+    pool = pd.DataFrame(SubmissionGenerator(seed=13, noise=0.2).claims(min(args.pool, args.claims)))
+    claims = pool.iloc[np.arange(args.claims) % len(pool)].reset_index(drop=True)
+    rng = np.random.default_rng(13)
+    claims['carbon_reduction_kg'] = claims['carbon_reduction_kg'] * rng.uniform(0.8, 1.25, len(claims))
+
+    validator = CarbonValidator()
+    scenarios = make_scenarios(args.scenarios)
+    corpus = ClaimCorpus(validator, claims)
+    report = corpus.simulate(scenarios)
+    print(f"claims={report['claims']} scenarios={len(scenarios)} "
+          f"features={report['featureSeconds']:.2f}s simulation={report['simulationSeconds']:.2f}s")
+    start = time.perf_counter()
+    corpus.simulate(scenarios)
+    print(f"re-run with cached features: {time.perf_counter() - start:.2f}s")
+    for scenario in report['scenarios']:
+        print(f"  {scenario['name']:<20} valid {scenario['valid']:>8} (baseline {report['baseline']['valid']})  "
+              f"-{scenario['becameInvalid']} +{scenario['becameValid']}  "
+              f"mean confidence {scenario['meanConfidence']}")
+
+    if args.naive:
+        start = time.perf_counter()
+        for _ in scenarios:
+            validator.validate_carbon_claims_batch(claims)
+        print(f"naive: {len(scenarios)} full batch runs {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: request parsing and response encoding, old path vs fast path
+
+Compares, per request:
+  - parsing: stdlib json.loads (FastAPI default) vs orjson vs msgpack, each
+    followed by SubmissionData validation,
+  - responding: validating the result against the response model, dumping it
+    and json.dumps (FastAPI default) vs orjson / msgpack of the ready dict,
+  - end to end through two minimal in-process apps that serve the same
+    precomputed /validate results, one with FastAPI defaults and one with
+    codec.FastRoute + codec.encode (no network; isolates framework and
+    encoding cost from rule evaluation, but includes the in-process client).
+
+Results are reported as us/request and as CPU cores needed at --rate
+requests/s (default 10k) for the measured part.
+
+Usage:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --rate 10000 --batch 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+import msgpack
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.generator import SubmissionGenerator
+from codec import MSGPACK, FastRoute, MsgpackResponse, encode
+from validators.submission_validator import AIValidationResult, SubmissionData, SubmissionValidator
+
+
+def per_call(func, items, repeats: int = 5) -> float:
+    """Median us per item over several passes"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        samples.append((time.perf_counter() - start) / len(items) * 1e6)
+    return statistics.median(samples)
+
+
+def report(label: str, us: float, baseline: float, rate: int):
+    print(f"  {label:<32} {us:9.1f} us  {baseline / us:5.1f}x  {us * rate / 1e6:6.2f} cores at {rate}/s")
+
+
+def build_apps(results):
+    """Dua app minimal yang melayani hasil yang sama: default FastAPI vs fast path"""
+    legacy = FastAPI()
+
+    @legacy.post('/validate', response_model=AIValidationResult)
+    async def legacy_validate(data: SubmissionData):
+        return results[data.carbonReductionKg]
+
+    fast = FastAPI()
+    fast.router.route_class = FastRoute
+
+    @fast.post('/validate', response_model=AIValidationResult)
+    async def fast_validate(request: Request, data: SubmissionData):
+        return encode(request, results[data.carbonReductionKg])
+
+    return legacy, fast
+
+
+async def serve(app, bodies, headers, repeats: int = 3) -> float:
+    transport = httpx.ASGITransport(app=app)
+    samples = []
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for body in bodies:
+                response = await client.post('/validate', content=body, headers=headers)
+                assert response.status_code == 200, response.text
+            samples.append((time.perf_counter() - start) / len(bodies) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=1000, help="Items in the batch-size comparison")
+    parser.add_argument('--rate', type=int, default=10_000, help="Requests/s used for the cores estimate")
+    args = parser.parse_args()
+
+    validator = SubmissionValidator()
+    rows = SubmissionGenerator(seed=9, noise=0.2).submissions(args.requests)
+    for i, row in enumerate(rows):
+        row['carbonReductionKg'] = float(i)  # unique lookup key for the minimal apps
+    results = {row['carbonReductionKg']: validator.validate_submission(SubmissionData(**row)).model_dump() for row in rows}
+    json_bodies = [json.dumps(row).encode() for row in rows]
+    msgpack_bodies = [msgpack.packb(row) for row in rows]
+    adapter = TypeAdapter(AIValidationResult)
+
+    print("parse + validate SubmissionData")
+    old = per_call(lambda body: SubmissionData.model_validate(json.loads(body)), json_bodies)
+    report('json.loads (default)', old, old, args.rate)
+    report('orjson.loads', per_call(lambda body: SubmissionData.model_validate(orjson.loads(body)), json_bodies), old, args.rate)
+    report('msgpack', per_call(lambda body: SubmissionData.model_validate(msgpack.unpackb(body)), msgpack_bodies), old, args.rate)
+
+    def legacy_response(result):
+        # What FastAPI does with response_model: validate, dump, JSONResponse
+        return JSONResponse(adapter.dump_python(adapter.validate_python(result), mode='json')).body
+
+    print("encode AIValidationResult response")
+    outputs = list(results.values())
+    old = per_call(legacy_response, outputs)
+    report('response_model + json (default)', old, old, args.rate)
+    report('ORJSONResponse', per_call(lambda result: ORJSONResponse(result).body, outputs), old, args.rate)
+    report('MsgpackResponse', per_call(lambda result: MsgpackResponse(result).body, outputs), old, args.rate)
+
+    batch = {'results': {str(i): outputs[i % len(outputs)] for i in range(args.batch)}, 'errors': {}}
+    from main import BatchResponse
+    batch_adapter = TypeAdapter(BatchResponse)
+    print(f"encode batch response ({args.batch} results, per request)")
+    old = per_call(lambda content: JSONResponse(batch_adapter.dump_python(batch_adapter.validate_python(content), mode='json')).body, [batch])
+    report('response_model + json (default)', old, old, args.rate)
+    report('ORJSONResponse', per_call(lambda content: ORJSONResponse(content).body, [batch]), old, args.rate)
+    report('MsgpackResponse', per_call(lambda content: MsgpackResponse(content).body, [batch]), old, args.rate)
+
+    legacy, fast = build_apps(results)
+    print("end to end, in-process ASGI (framework + parsing + encoding)")
+    old = asyncio.run(serve(legacy, json_bodies, {'content-type': 'application/json'}))
+    report('FastAPI defaults, JSON', old, old, args.rate)
+    report('fast path, JSON', asyncio.run(serve(fast, json_bodies, {'content-type': 'application/json'})), old, args.rate)
+    report('fast path, msgpack', asyncio.run(serve(fast, msgpack_bodies, {'content-type': MSGPACK, 'accept': MSGPACK})), old, args.rate)
+
+
+if __name__ == '__main__':
+    main()
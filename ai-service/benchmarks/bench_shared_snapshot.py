@@ -0,0 +1,116 @@
+"""
+Benchmark: per-worker memory of the benchmark ruleset, private vs shared snapshot
+
+Writes a large synthetic benchmark file, then starts N worker processes that
+each load it through a BenchmarkStore, the way uvicorn workers do:
+  - private: no snapshot, every worker parses, compiles and owns its tables
+  - shared: the first worker publishes the mmap snapshot, the others map it
+Each worker reports its RSS and PSS (proportional set size: shared pages are
+split between the processes mapping them) growth from the load while all
+workers are alive, plus its time to load and to swap to a new version.
+
+Linux only (/proc/self/smaps_rollup).
+
+Usage:
+    python benchmarks/bench_shared_snapshot.py --sectors 5000 --workers 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.bench_benchmark_reload import write_file
+
+
+def memory_kb() -> dict:
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values
+
+
+def worker(path: str, snapshot_path, loaded, measure, results):
+    from validators.benchmark_store import BenchmarkStore
+    from validators.carbon_validator import CarbonValidator
+
+    validator = CarbonValidator()
+    store = BenchmarkStore(path, validator, snapshot_path=snapshot_path)
+    before = memory_kb()
+    start = time.perf_counter()
+    store.load()
+    seconds = time.perf_counter() - start
+    # Touch every table page, as a busy worker eventually does
+    checksum = sum(float(array.sum()) for array in validator.rules.bench_arrays.values())
+    loaded.wait()  # everyone has loaded: shared pages are now split N ways
+    after = memory_kb()
+    results.put({
+        'rss': after['Rss'] - before['Rss'],
+        'pss': after['Pss'] - before['Pss'],
+        'seconds': seconds,
+        'mapped': store.mapped,
+        'checksum': checksum,
+    })
+    measure.wait()
+
+
+def run(path: str, snapshot_path, workers: int) -> list:
+    context = multiprocessing.get_context('spawn')
+    loaded = context.Barrier(workers)
+    measure = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(path, snapshot_path, loaded, measure, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    measure.wait()
+    for process in processes:
+        process.join()
+    return reports
+
+
+def report(label: str, reports: list):
+    total_pss = sum(item['pss'] for item in reports) / 1024
+    print(f"{label:<8} mapped={sum(item['mapped'] for item in reports)}/{len(reports)}  "
+          f"rss/worker {statistics.median(item['rss'] for item in reports) / 1024:7.1f} MB  "
+          f"pss/worker {statistics.median(item['pss'] for item in reports) / 1024:7.1f} MB  "
+          f"pss total {total_pss:7.1f} MB  "
+          f"load p50 {statistics.median(item['seconds'] for item in reports) * 1000:6.0f} ms "
+          f"max {max(item['seconds'] for item in reports) * 1000:6.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sectors', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmarks.csv')
+        snapshot_path = f"{path}.snapshot"
+        write_file(path, args.sectors)
+        print(f"{args.sectors * 16} profiles, {args.sectors * 48} entries, "
+              f"file {os.path.getsize(path) / 1e6:.1f} MB")
+        for workers in args.workers:
+            print(f"-- {workers} workers")
+            report('private', run(path, None, workers))
+            for name in os.listdir(directory):
+                if name.startswith('benchmarks.csv.snapshot'):
+                    os.remove(os.path.join(directory, name))
+            report('cold', run(path, snapshot_path, workers))
+            report('shared', run(path, snapshot_path, workers))
+        print(f"snapshot file {os.path.getsize(snapshot_path) / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
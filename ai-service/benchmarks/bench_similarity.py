@@ -0,0 +1,97 @@
+"""
+Benchmark: near-duplicate query latency vs index size
+
+Fills a SimilarityIndex with N synthetic submissions, compacts it, then
+measures
+  1. query latency for fresh texts (the common case: no match), and
+  2. recall for near-copies of indexed texts (a few words changed).
+
+Text processing does not depend on index size, so the bulk of the index is
+filled with random signatures directly; only the probe documents go through
+the full text path.
+
+Usage:
+    python benchmarks/bench_similarity.py --docs 1000000 --queries 2000
+    python benchmarks/bench_similarity.py --docs 1000000 --path /tmp/similarity
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from validators.similarity_index import NUM_PERM, PRIME, SimilarityIndex, evidence_keys
+
+VOCABULARY = [f"kata{i}" for i in range(20000)]
+
+
+def make_text(rng, words: int = 60) -> str:
+    return ' '.join(rng.choice(VOCABULARY, words))
+
+
+def mutate(rng, text: str, changes: int) -> str:
+    words = text.split()
+    for i in rng.choice(len(words), changes, replace=False):
+        words[i] = 'ubah'
+    return ' '.join(words)
+
+
+def percentile(values, q):
+    return sorted(values)[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--docs', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--probes', type=int, default=500)
+    parser.add_argument('--changes', type=int, default=3, help="Words changed in each near-copy")
+    parser.add_argument('--path', default=None, help="Index directory (default: in memory)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    index = SimilarityIndex(args.path, compact_every=10 ** 12)
+
+    start = time.perf_counter()
+    filler = args.docs - args.probes
+    no_evidence = evidence_keys([])
+    for i in range(filler):
+        signature = rng.integers(0, PRIME, NUM_PERM, dtype=np.uint32)
+        index._insert(f"bulk-{i}", f"umkm-{i % 50_000}", signature, no_evidence)
+    probes = [make_text(rng) for _ in range(args.probes)]
+    for i, text in enumerate(probes):
+        index.insert(f"probe-{i}", [text], [f"evidence/probe-{i}.pdf"], umkm_id=f"probe-umkm-{i}")
+    print(f"insert:  {args.docs} docs in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    index.compact()
+    print(f"compact: {time.perf_counter() - start:.1f}s  {index.stats()}")
+
+    fresh = [make_text(rng) for _ in range(args.queries)]
+    latencies = []
+    for text in fresh:
+        start = time.perf_counter()
+        index.query([text], ['evidence/new.pdf'], umkm_id='someone')
+        latencies.append((time.perf_counter() - start) * 1e6)
+    print(f"query (no match):  p50 {statistics.median(latencies):.0f}us  "
+          f"p99 {percentile(latencies, 0.99):.0f}us")
+
+    latencies = []
+    found = 0
+    for i, text in enumerate(probes):
+        copy = mutate(rng, text, args.changes)
+        start = time.perf_counter()
+        matches = index.query([copy], umkm_id='someone')
+        latencies.append((time.perf_counter() - start) * 1e6)
+        found += any(match.submission_id == f"probe-{i}" for match in matches)
+    print(f"query (near-copy): p50 {statistics.median(latencies):.0f}us  "
+          f"p99 {percentile(latencies, 0.99):.0f}us  recall {found / len(probes):.1%}")
+    index.close()
+
+
+if __name__ == '__main__':
+    main()
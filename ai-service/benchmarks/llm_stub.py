@@ -0,0 +1,83 @@
+"""
+Stub LLM server: an OpenAI-compatible /v1/chat/completions endpoint with
+configurable latency, for measuring the LLM review stage offline
+
+Answers are deterministic: "inconsistent" when the prompt lists rule-based
+flags, otherwise "consistent". Latency is `latency` seconds times a
+log-normal factor (`sigma` controls the tail), like a hosted model.
+
+Usage:
+    python benchmarks/llm_stub.py --port 8089 --latency 0.5 --sigma 0.6
+    LLM_REVIEW_URL=http://127.0.0.1:8089/v1 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def answer_for(prompt: str) -> dict:
+    flags = json.loads(prompt.rsplit('Rule-based flags:\n', 1)[-1]) if 'Rule-based flags:\n' in prompt else []
+    if flags:
+        return {'verdict': 'inconsistent', 'reason': f"Stub: {len(flags)} rule-based flag(s)"}
+    return {'verdict': 'consistent', 'reason': "Stub: no rule-based flags"}
+
+
+def create_app(latency: float = 0.0, sigma: float = 0.0, fail_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+    rng = random.Random(seed)
+    app.state.requests = 0
+    app.state.active = 0
+    app.state.max_active = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        app.state.active += 1
+        app.state.max_active = max(app.state.max_active, app.state.active)
+        try:
+            if latency > 0:
+                await asyncio.sleep(latency * rng.lognormvariate(0.0, sigma))
+            if rng.random() < fail_rate:
+                return JSONResponse({'error': 'stub failure'}, status_code=503)
+            prompt = body['messages'][-1]['content']
+            return {
+                'id': f"stub-{app.state.requests}",
+                'object': 'chat.completion',
+                'model': body.get('model'),
+                'choices': [{
+                    'index': 0,
+                    'finish_reason': 'stop',
+                    'message': {'role': 'assistant', 'content': json.dumps(answer_for(prompt))},
+                }],
+            }
+        finally:
+            app.state.active -= 1
+
+    @app.get("/stats")
+    def stats():
+        return {'requests': app.state.requests, 'maxActive': app.state.max_active}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help="Median response time (seconds)")
+    parser.add_argument('--sigma', type=float, default=0.6, help="Log-normal spread of the latency")
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.sigma, args.fail_rate), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
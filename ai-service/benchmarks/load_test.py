@@ -0,0 +1,133 @@
+"""
+Load test: throughput of /estimate-carbon per executor mode
+
+Starts the service with uvicorn for each (mode, workers) combination, sends
+CPU-heavy claims (long `details`) with a fixed concurrency, and reports
+throughput plus latency of the `/` health check measured during the run.
+
+Usage:
+    python benchmarks/load_test.py --modes inline thread process --workers 1 2 4
+    python benchmarks/load_test.py --url http://localhost:5000   # existing server
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+DETAILS = (
+    'Kami mendaur ulang 250kg sampah kain per tahun dengan metode timbang '
+    'periode bulanan terhadap baseline. '
+) * 40
+
+CLAIM = {
+    'carbon_reduction_kg': 800,
+    'calculation_method': 'waste_diverted',
+    'sector': 'Fashion',
+    'business_scale': 'small',
+    'evidence_count': 3,
+}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_load(url: str, requests: int, concurrency: int) -> dict:
+    latencies = []
+    health = []
+    done = asyncio.Event()
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post(
+                    '/estimate-carbon', params={**CLAIM, 'details': DETAILS}
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get('/')
+                health.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    return {
+        'throughput': requests / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'health_p99_ms': percentile(health, 0.99) * 1000 if health else float('nan'),
+    }
+
+
+def start_server(mode: str, workers: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, 'VALIDATION_EXECUTOR': mode, 'VALIDATION_WORKERS': str(workers)}
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=SERVICE_DIR, env=env
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/', timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server did not start for mode={mode} workers={workers}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', help="Test an already running server instead")
+    parser.add_argument('--modes', nargs='+', default=['inline', 'thread', 'process'])
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'workers':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'/ p99 ms':>9}")
+
+    if args.url:
+        stats = asyncio.run(run_load(args.url, args.requests, args.concurrency))
+        print(f"{'-':>8} {'-':>8} {stats['throughput']:>9.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p99_ms']:>8.1f} {stats['health_p99_ms']:>9.1f}")
+        return
+
+    for mode in args.modes:
+        for workers in (args.workers if mode != 'inline' else [1]):
+            server = start_server(mode, workers, args.port)
+            try:
+                stats = asyncio.run(run_load(f'http://127.0.0.1:{args.port}', args.requests, args.concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{mode:>8} {workers:>8} {stats['throughput']:>9.1f} {stats['p50_ms']:>8.1f} "
+                  f"{stats['p99_ms']:>8.1f} {stats['health_p99_ms']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""
+Benchmark suite with a machine-readable baseline
+
+Runs
+  - micro-benchmarks of CarbonValidator.validate_carbon_claim across claim
+    sizes (x typical) and `details` lengths,
+  - SubmissionValidator.validate_submission on generated submissions,
+  - latency percentiles and throughput of /validate (JSON and msgpack) and
+    /estimate-carbon through an in-process ASGI client (no network, no server),
+  - cold start in fresh interpreters: importing main, time to the first
+    /validate response, and building the validators in a pool worker,
+and writes the results as JSON. With --compare, every benchmark is checked
+against a previous result file and the run fails if one got slower than
+--threshold (ratio of medians).
+
+The result cache is disabled for endpoint runs so every request does the work.
+
+Usage:
+    python benchmarks/suite.py -o benchmarks/baseline.json
+    python benchmarks/suite.py --compare benchmarks/baseline.json
+    python benchmarks/suite.py --quick --filter claim.
+    python benchmarks/suite.py --filter startup
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.generator import SubmissionGenerator
+from validators.carbon_validator import CarbonValidator
+from validators.submission_validator import SubmissionData, SubmissionValidator
+
+SUITE_VERSION = 1
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Runs in a fresh interpreter; the HTTP client is imported before the clock
+# starts since it is not part of the service
+STARTUP_PROBE = """
+import asyncio, json, sys, time
+import httpx
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def first_response():
+    await main.validation_executor.start()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://startup') as client:
+        response = await client.post('/validate', json=json.loads(sys.argv[1]))
+        response.raise_for_status()
+
+asyncio.run(first_response())
+responded = time.perf_counter()
+main.validation_executor.shutdown()
+print(json.dumps({'import': imported - start, 'first_response': responded - start}))
+"""
+
+WORKER_PROBE = """
+import json, time
+start = time.perf_counter()
+import executor
+executor.init_worker()
+print(json.dumps({'worker_init': time.perf_counter() - start}))
+"""
+
+CLAIM_FACTORS = {'low': 0.2, 'typical': 1.0, 'high': 3.5, 'extreme': 20.0}
+DETAIL_SENTENCES = {'none': 0, 'short': 1, 'medium': 10, 'long': 200}
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples: List[float], unit: str, **extra) -> Dict:
+    return {
+        'unit': unit,
+        'median': statistics.median(samples),
+        'p95': percentile(samples, 0.95),
+        'p99': percentile(samples, 0.99),
+        'min': min(samples),
+        'samples': len(samples),
+        **extra,
+    }
+
+
+def time_calls(func: Callable[[int], object], calls: int, repeats: int) -> List[float]:
+    """Rata-rata us per panggilan untuk tiap repeat (func menerima index baris)"""
+    results = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i in range(calls):
+            func(i)
+        results.append((time.perf_counter() - start) / calls * 1e6)
+    return results
+
+
+def bench_claims(quick: bool) -> Dict[str, Dict]:
+    validator = CarbonValidator()
+    results = {}
+    calls, repeats = (200, 3) if quick else (2000, 7)
+    for size, factor in CLAIM_FACTORS.items():
+        for length, sentences in DETAIL_SENTENCES.items():
+            claims = SubmissionGenerator(seed=1).claims(100, factor=factor, sentences=sentences)
+            rows = [tuple(claim.values()) for claim in claims]
+            n = max(20, calls // 10) if length == 'long' else calls
+            samples = time_calls(lambda i: validator.validate_carbon_claim(*rows[i % len(rows)]), n, repeats)
+            results[f"claim.{size}.{length}"] = summarize(samples, 'us/call')
+    return results
+
+
+def bench_submissions(quick: bool) -> Dict[str, Dict]:
+    validator = SubmissionValidator()
+    items = [SubmissionData(**row) for row in SubmissionGenerator(seed=2).submissions(500)]
+    calls, repeats = (500, 3) if quick else (5000, 7)
+    samples = time_calls(lambda i: validator.validate_submission(items[i % len(items)]), calls, repeats)
+    return {'submission.rules': summarize(samples, 'us/call')}
+
+
+async def _load(client, send: Callable, payloads: List, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    queue = list(reversed(payloads))
+
+    async def worker():
+        while queue:
+            payload = queue.pop()
+            start = time.perf_counter()
+            response = await send(client, payload)
+            latencies.append((time.perf_counter() - start) * 1e3)
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.status_code}: {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return summarize(latencies, 'ms', throughput=len(payloads) / elapsed)
+
+
+def bench_endpoints(quick: bool, concurrency: int) -> Dict[str, Dict]:
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+    import httpx
+    import msgpack
+    from codec import MSGPACK
+    from main import app
+
+    requests = 300 if quick else 3000
+    generator = SubmissionGenerator(seed=3)
+    submissions = generator.submissions(requests)
+    claims = [{k: v for k, v in claim.items() if v is not None} for claim in generator.claims(requests)]
+
+    async def validate(client, payload):
+        return await client.post('/validate', json=payload)
+
+    async def validate_msgpack(client, payload):
+        return await client.post('/validate', content=msgpack.packb(payload),
+                                 headers={'content-type': MSGPACK, 'accept': MSGPACK})
+
+    async def estimate(client, payload):
+        return await client.post('/estimate-carbon', params=payload)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            await _load(client, validate, submissions[:20], 1)  # warm-up
+            return {
+                'endpoint.validate': await _load(client, validate, submissions, concurrency),
+                'endpoint.validate_msgpack': await _load(client, validate_msgpack, submissions, concurrency),
+                'endpoint.estimate_carbon': await _load(client, estimate, claims, concurrency),
+            }
+
+    return asyncio.run(run())
+
+
+def _probe(code: str, *args: str) -> Dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, '-c', code, *args], capture_output=True, text=True,
+        cwd=SERVICE_DIR, check=True, timeout=120
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_startup(quick: bool) -> Dict[str, Dict]:
+    """Cold start per fresh interpreter (ms); run several times for a stable median"""
+    runs = 3 if quick else 10
+    payload = json.dumps(SubmissionGenerator(seed=4).submission())
+    samples: Dict[str, List[float]] = {'import': [], 'first_response': [], 'worker_init': []}
+    for _ in range(runs):
+        for name, seconds in {**_probe(STARTUP_PROBE, payload), **_probe(WORKER_PROBE)}.items():
+            samples[name].append(seconds * 1e3)
+    return {f"startup.{name}": summarize(values, 'ms') for name, values in samples.items()}
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(__file__), timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'suite': SUITE_VERSION,
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Benchmark yang median-nya lebih lambat dari baseline * threshold"""
+    regressions = []
+    print(f"{'benchmark':<32} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if previous is None or previous['unit'] != result['unit']:
+            print(f"{name:<32} {'-':>12} {result['median']:>12.2f}")
+            continue
+        ratio = result['median'] / previous['median']
+        marker = '  REGRESSION' if ratio > threshold else ''
+        print(f"{name:<32} {previous['median']:>12.2f} {result['median']:>12.2f} {ratio:>7.2f}{marker}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def run_suite(quick: bool = False, concurrency: int = 16, selected: Optional[str] = None) -> Dict[str, Dict]:
+    groups = {
+        'claim': lambda: bench_claims(quick),
+        'submission': lambda: bench_submissions(quick),
+        'endpoint': lambda: bench_endpoints(quick, concurrency),
+        'startup': lambda: bench_startup(quick),
+    }
+    results = {}
+    for prefix, run in groups.items():
+        if selected and not (selected + '.').startswith(prefix + '.') and not prefix.startswith(selected):
+            continue
+        results.update(run())
+    if selected:
+        results = {name: value for name, value in results.items() if name.startswith(selected)}
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-o', '--output', help="Write results as JSON")
+    parser.add_argument('--compare', help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Allowed slowdown ratio")
+    parser.add_argument('--quick', action='store_true', help="Fewer iterations (smoke run)")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--filter', default=None, help="Only benchmarks whose name starts with this")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.quick, args.concurrency, args.filter)
+    document = {'environment': environment(), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold}x: {', '.join(regressions)}")
+            return 1
+    else:
+        for name, result in results.items():
+            extra = f"  {result['throughput']:.0f} req/s" if 'throughput' in result else ''
+            print(f"{name:<32} median {result['median']:>10.2f} {result['unit']:<8}"
+                  f" p99 {result['p99']:>10.2f}{extra}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
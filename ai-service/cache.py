@@ -0,0 +1,162 @@
+"""
+Result Cache
+Cache hasil validasi berdasarkan hash kanonik payload + versi ruleset
+
+Two tiers: a bounded in-memory LRU with TTL, and an optional SQLite file
+that survives restarts. Keys include the ruleset version, so changing
+BENCHMARKS, METHOD_FACTORS or the rule revision makes old entries unreachable
+without an explicit flush.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def make_key(namespace: str, version: str, payload: Dict[str, Any]) -> str:
+    """Canonical hash: sorted keys, no whitespace, so equal payloads share a key"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    digest = hashlib.sha256(f"{namespace}\x00{version}\x00{canonical}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU + TTL cache untuk hasil validasi (nilai harus bisa di-JSON-kan)
+
+    Args:
+        max_entries: Batas entry di memori (0 = cache dimatikan)
+        ttl_seconds: Umur entry sebelum dianggap kadaluarsa
+        path: File SQLite untuk tier disk (None = memori saja)
+        max_disk_entries: Batas entry di tier disk
+    """
+
+    PRUNE_EVERY = 1000  # disk writes between expiry/size pruning
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 3600,
+        path: Optional[str] = None,
+        max_disk_entries: int = 1_000_000
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if path and max_entries > 0:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS results_expiry ON results(expires_at)')
+
+    @classmethod
+    def from_env(cls) -> 'ResultCache':
+        return cls(
+            max_entries=int(os.getenv('RESULT_CACHE_SIZE', '10000')),
+            ttl_seconds=float(os.getenv('RESULT_CACHE_TTL', '3600')),
+            path=os.getenv('RESULT_CACHE_PATH') or None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, expires_at FROM results WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY == 0:
+                    self._prune_disk()
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self):
+        self._db.execute('DELETE FROM results WHERE expires_at <= ?', (time.time(),))
+        self._db.execute(
+            'DELETE FROM results WHERE key IN ('
+            ' SELECT key FROM results ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_disk_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM results')
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._memory),
+            'maxEntries': self.max_entries,
+            'hits': self.hits,
+            'diskHits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hitRate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'diskTier': self._db is not None,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
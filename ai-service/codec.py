@@ -0,0 +1,85 @@
+"""
+Fast request/response encoding for the hot endpoints
+
+Results built by the service are already valid (they come from model_dump()
+or the validators' to_dict()), so the hot endpoints return them through
+`encode()` as a ready Response: FastAPI then skips re-validating them against
+the response model and the jsonable_encoder walk, and orjson does the
+encoding. Request bodies are parsed with orjson as well.
+
+Service-to-service callers (scoring.service.ts) can send and receive
+msgpack instead of JSON: `Content-Type: application/x-msgpack` for the body,
+`Accept: application/x-msgpack` for the response. Validation errors (422) and
+other error responses stay JSON.
+"""
+
+from typing import Any, Callable
+
+import msgpack
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+
+JSON = 'application/json'
+MSGPACK = 'application/x-msgpack'
+
+
+def _msgpack_default(value: Any) -> Any:
+    # numpy scalars (orjson handles them via OPT_SERIALIZE_NUMPY, msgpack does not)
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+
+def wants_msgpack(request: Request) -> bool:
+    return MSGPACK in request.headers.get('accept', '')
+
+
+def encode(request: Request, content: Any, status_code: int = 200) -> Response:
+    """Response siap kirim (msgpack jika diminta lewat Accept, selain itu orjson)"""
+    response_class = MsgpackResponse if wants_msgpack(request) else ORJSONResponse
+    return response_class(content, status_code=status_code)
+
+
+class FastRequest(Request):
+    """Request whose JSON body is parsed with orjson, or decoded from msgpack"""
+
+    async def json(self) -> Any:
+        if not hasattr(self, '_json'):
+            body = await self.body()
+            if self.scope.get('msgpack'):
+                self._json = msgpack.unpackb(body, raw=False)
+            else:
+                self._json = orjson.loads(body)
+        return self._json
+
+
+class FastRoute(APIRoute):
+    """
+    Route class: bodies go through FastRequest
+
+    A msgpack body is presented to FastAPI as JSON (the content type in the
+    scope is rewritten and FastRequest.json() decodes msgpack), so body
+    parameters and their pydantic validation work unchanged.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            scope = request.scope
+            content_type = request.headers.get('content-type', '')
+            if content_type.split(';')[0].strip() == MSGPACK:
+                headers = [(name, value) for name, value in scope['headers'] if name != b'content-type']
+                scope = {**scope, 'headers': headers + [(b'content-type', JSON.encode())], 'msgpack': True}
+            return await handler(FastRequest(scope, request.receive))
+
+        return route_handler
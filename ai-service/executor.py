@@ -0,0 +1,215 @@
+"""
+Validation Executor
+Menjalankan validator di luar event loop: inline, thread pool, atau process pool
+
+Task functions live at module level so they can be pickled to worker
+processes. Each process (the API process and every pool worker) builds its
+own validators once through `get_validators()`; pool workers do it in the
+initializer so the first request does not pay for it.
+
+In thread/process mode every task waits for one of `workers` permits of a
+PriorityLimiter (admission.py), so pool work is started by the priority of
+its request, then arrival, and work whose deadline passed in the queue is
+dropped before it reaches the pool.
+
+With BENCHMARKS_PATH set, every process also owns a BenchmarkStore and picks
+up file changes on its own (a watcher thread polls it; requests only read
+the swapped rules), so a reload reaches process-pool workers without any
+cross-process signalling. The claim
+distribution model (OUTLIER_MODEL_PATH) is shared the same way.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from metrics import Mark, StepTimer
+from streaming import StreamValidator
+from validators.benchmark_store import BenchmarkStore
+from validators.claim_distribution import DistributionStore
+from validators.carbon_validator import CarbonValidationResult, CarbonValidator
+from validators.submission_validator import AIValidationResult, SubmissionData, SubmissionValidator
+
+MODES = ('inline', 'thread', 'process')
+
+_validators: Optional[Tuple[SubmissionValidator, CarbonValidator, StreamValidator]] = None
+_benchmark_store: Optional[BenchmarkStore] = None
+_distribution_store: Optional[DistributionStore] = None
+
+
+def init_worker():
+    """Pool initializer: build validators once per worker"""
+    global _validators, _benchmark_store, _distribution_store
+    submission_validator = SubmissionValidator()
+    carbon_validator = CarbonValidator()
+    _benchmark_store = BenchmarkStore.from_env(carbon_validator)
+    if _benchmark_store is not None:
+        _benchmark_store.load()  # a broken file at startup is fatal
+        _benchmark_store.watch()
+    _distribution_store = DistributionStore.from_env(carbon_validator)
+    _distribution_store.maybe_sync()
+    _validators = (
+        submission_validator,
+        carbon_validator,
+        StreamValidator(submission_validator, carbon_validator),
+    )
+
+
+def get_validators() -> Tuple[SubmissionValidator, CarbonValidator, StreamValidator]:
+    if _validators is None:
+        init_worker()
+    else:
+        _distribution_store.maybe_sync()
+    return _validators
+
+
+def get_benchmark_store() -> Optional[BenchmarkStore]:
+    get_validators()
+    return _benchmark_store
+
+
+def get_distribution_store() -> DistributionStore:
+    get_validators()
+    return _distribution_store
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# Tasks -----------------------------------------------------------------------
+
+def validate_submission_task(data: SubmissionData) -> AIValidationResult:
+    return get_validators()[0].validate_submission(data)
+
+
+def validate_submission_timed_task(data: SubmissionData) -> Tuple[AIValidationResult, List[Mark]]:
+    """validate_submission_task plus per-step timing marks (sampled calls, see metrics.py)"""
+    timer = StepTimer()
+    result = get_validators()[0].validate_submission(data, steps=timer)
+    return result, timer.finish(len(result.flags))
+
+
+def validate_submissions_task(items: Sequence[SubmissionData]) -> List[AIValidationResult]:
+    submission_validator = get_validators()[0]
+    return [submission_validator.validate_submission(data) for data in items]
+
+
+def estimate_carbon_task(**claim) -> CarbonValidationResult:
+    return get_validators()[1].validate_carbon_claim(**claim)
+
+
+def estimate_carbon_timed_task(**claim) -> Tuple[CarbonValidationResult, List[Mark]]:
+    timer = StepTimer()
+    result = get_validators()[1].validate_carbon_claim(**claim, steps=timer)
+    return result, timer.finish(len(result.flags))
+
+
+def estimate_carbon_batch_task(columns: Dict[str, list]) -> List[CarbonValidationResult]:
+    return get_validators()[1].validate_carbon_claims_batch(columns).to_results()
+
+
+def validate_stream_chunk_task(records: List[Dict]) -> List[str]:
+    return get_validators()[2].validate_chunk(records)
+
+
+def call_task(func: Callable, args: tuple, kwargs: dict):
+    """Process pools only accept positional args through run_in_executor"""
+    return func(*args, **kwargs)
+
+
+class ValidationExecutor:
+    """
+    Executor yang bisa dikonfigurasi untuk pekerjaan CPU-bound validator
+
+    - inline: dijalankan langsung di event loop (default, tanpa overhead)
+    - thread: thread pool, event loop tetap responsif
+    - process: process pool dengan N worker, throughput naik sesuai jumlah core
+    """
+
+    def __init__(self, mode: str = 'inline', workers: Optional[int] = None, chunk_size: int = 2000):
+        if mode not in MODES:
+            raise ValueError(f"Unknown executor mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool: Optional[Executor] = None
+        self.limiter = None
+        if mode != 'inline':
+            # API process only: pool workers import this module but never build executors
+            from admission import PriorityLimiter
+            self.limiter = PriorityLimiter(self.workers, early_reject=False)
+
+    @classmethod
+    def from_env(cls) -> 'ValidationExecutor':
+        workers = os.getenv('VALIDATION_WORKERS')
+        return cls(
+            mode=os.getenv('VALIDATION_EXECUTOR', 'inline'),
+            workers=int(workers) if workers else None,
+            chunk_size=int(os.getenv('VALIDATION_CHUNK_SIZE', '2000'))
+        )
+
+    @property
+    def pool(self) -> Optional[Executor]:
+        if self._pool is None and self.mode == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='validator')
+        elif self._pool is None and self.mode == 'process':
+            # spawn: forking a process that already runs uvicorn threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker
+            )
+        return self._pool
+
+    async def start(self):
+        """Spawn and warm up every worker so the first requests are not slow"""
+        if self.mode == 'inline':
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self.pool, _ping) for _ in range(self.workers)
+        ))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        if self.mode == 'inline':
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        try:
+            async with self.limiter.slot(func.__name__):
+                return await loop.run_in_executor(pool, call_task, func, args, kwargs)
+        except BrokenProcessPool:
+            # A crashed worker breaks the pool for good; start a new one next call
+            if self._pool is pool:
+                self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def map_chunks(self, func: Callable, items: Sequence) -> list:
+        """Split items into chunks, run `func(chunk)` in parallel and concatenate"""
+        if self.mode == 'inline' or len(items) <= self.chunk_size:
+            return list(await self.run(func, items))
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        results = await asyncio.gather(*(self.run(func, chunk) for chunk in chunks))
+        return [item for chunk in results for item in chunk]
+
+    async def map_columns(self, func: Callable, columns: Dict[str, list]) -> list:
+        """Like map_chunks, for columnar input (dict of equal-length lists)"""
+        size = len(next(iter(columns.values()), []))
+        if self.mode == 'inline' or size <= self.chunk_size:
+            return list(await self.run(func, columns))
+        chunks = [
+            {name: values[i:i + self.chunk_size] for name, values in columns.items()}
+            for i in range(0, size, self.chunk_size)
+        ]
+        results = await asyncio.gather(*(self.run(func, chunk) for chunk in chunks))
+        return [item for chunk in results for item in chunk]
@@ -0,0 +1,445 @@
+"""
+Validation Jobs
+Antrian job validasi asinkron berbasis SQLite, dengan polling hasil atau callback
+
+POST /jobs stores the submission and returns a job id at once; the HTTP
+connection is not held while OCR, validation and cross-checks run. Workers
+in the API process claim queued jobs in batches of up to `batch_size`, so
+everything that queued up while they were busy is validated together (one
+vectorized CarbonValidator call per batch). Results are kept in the same
+SQLite file and fetched with GET /jobs/{id}, or POSTed to the job's
+callback URL when it finishes.
+
+The queue is a single table in WAL mode. Claiming is one IMMEDIATE
+transaction, so several API processes can share one file. A claimed job
+holds a lease; if its process dies, the job is claimed again once the lease
+expires, and it fails after `max_attempts` claims.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('queued', 'running', 'done', 'failed')
+
+# (result, errors) per job; a job with errors is marked failed
+Outcome = Tuple[Optional[Dict[str, Any]], Optional[List[str]]]
+
+# Window for the jobs/s throughput figure
+THROUGHPUT_WINDOW = 60.0
+
+
+@dataclass
+class Job:
+    id: str
+    payload: Dict[str, Any]
+    attempts: int
+    created_at: float
+    started_at: float
+    callback_url: Optional[str] = None
+
+
+class JobQueue:
+    """
+    Antrian job yang tahan restart (file SQLite) atau di memori
+
+    Args:
+        path: File SQLite (None = memori, hilang saat restart)
+        lease_seconds: Lama job yang di-claim dianggap milik worker-nya
+        max_attempts: Batas claim sebelum job dianggap gagal
+        ttl_seconds: Umur job selesai sebelum dihapus
+    """
+
+    PRUNE_EVERY = 1000  # finished jobs between pruning
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        lease_seconds: float = 300,
+        max_attempts: int = 3,
+        ttl_seconds: float = 7 * 24 * 3600
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._finished = 0
+        self._db = sqlite3.connect(path or ':memory:', check_same_thread=False, isolation_level=None)
+        if path:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('PRAGMA busy_timeout=5000')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, status TEXT NOT NULL,'
+            ' payload TEXT NOT NULL, callback_url TEXT, result TEXT, errors TEXT,'
+            ' attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL,'
+            ' finished_at REAL, lease_until REAL, callback_status TEXT)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, seq)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_finished ON jobs(finished_at)')
+
+    @classmethod
+    def from_env(cls) -> 'JobQueue':
+        return cls(
+            path=os.getenv('JOBS_PATH') or None,
+            lease_seconds=float(os.getenv('JOBS_LEASE_SECONDS', '300')),
+            max_attempts=int(os.getenv('JOBS_MAX_ATTEMPTS', '3')),
+            ttl_seconds=float(os.getenv('JOBS_TTL', str(7 * 24 * 3600)))
+        )
+
+    def submit(self, payload: Dict[str, Any], callback_url: Optional[str] = None, job_id: Optional[str] = None) -> str:
+        """Simpan job baru (status queued); ValueError jika id sudah dipakai"""
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            try:
+                self._db.execute(
+                    'INSERT INTO jobs (id, status, payload, callback_url, created_at) VALUES (?, ?, ?, ?, ?)',
+                    (job_id, 'queued', json.dumps(payload, ensure_ascii=False), callback_url, time.time())
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Job {job_id} already exists") from None
+        return job_id
+
+    def claim(self, limit: int) -> List[Job]:
+        """Ambil sampai `limit` job tertua (urut masuk) dan tandai running"""
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._recover(now)
+                rows = self._db.execute(
+                    "SELECT seq, id, payload, attempts, created_at, callback_url FROM jobs"
+                    " WHERE status = 'queued' ORDER BY seq LIMIT ?", (limit,)
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?,"
+                    " lease_until = ? WHERE seq = ?",
+                    [(now, now + self.lease_seconds, row[0]) for row in rows]
+                )
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return [
+            Job(job_id, json.loads(payload), attempts + 1, created_at, now, callback_url)
+            for _, job_id, payload, attempts, created_at, callback_url in rows
+        ]
+
+    def _recover(self, now: float):
+        """Job running yang lease-nya habis (proses mati): antrekan lagi atau gagalkan"""
+        self._db.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,"
+            " errors = CASE WHEN attempts >= ? THEN ? ELSE errors END,"
+            " finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END, lease_until = NULL"
+            " WHERE status = 'running' AND lease_until < ?",
+            (self.max_attempts, self.max_attempts,
+             json.dumps([f"Job did not finish in {self.max_attempts} attempts"]),
+             self.max_attempts, now, now)
+        )
+
+    def finish(self, outcomes: Sequence[Tuple[str, Optional[Dict], Optional[List[str]]]]):
+        """Simpan hasil (job_id, result, errors) sekaligus; job dengan errors menjadi failed"""
+        now = time.time()
+        with self._lock:
+            with self._db:  # commit, or roll back so no job is left half-finished
+                self._db.execute('BEGIN')
+                self._db.executemany(
+                    'UPDATE jobs SET status = ?, result = ?, errors = ?, finished_at = ?, lease_until = NULL'
+                    ' WHERE id = ?',
+                    [
+                        ('failed' if errors else 'done',
+                         json.dumps(result, ensure_ascii=False) if result is not None else None,
+                         json.dumps(errors, ensure_ascii=False) if errors else None, now, job_id)
+                        for job_id, result, errors in outcomes
+                    ]
+                )
+            self._finished += len(outcomes)
+            if self._finished >= self.PRUNE_EVERY:
+                self._finished = 0
+                self._db.execute('DELETE FROM jobs WHERE finished_at < ?', (now - self.ttl_seconds,))
+
+    def release(self, job_ids: Sequence[str]):
+        """Kembalikan job yang di-claim ke antrian tanpa menghitung percobaan (shutdown)"""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, lease_until = NULL"
+                " WHERE id = ? AND status = 'running'",
+                [(job_id,) for job_id in job_ids]
+            )
+
+    def set_callback_status(self, job_id: str, status: str):
+        with self._lock:
+            self._db.execute('UPDATE jobs SET callback_status = ? WHERE id = ?', (status, job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Dokumen job untuk API (None jika tidak ada)"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT id, status, result, errors, attempts, created_at, started_at, finished_at,'
+                ' callback_url, callback_status FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, status, result, errors, attempts, created_at, started_at, finished_at, callback_url, callback_status = row
+        return {
+            'jobId': job_id,
+            'status': status,
+            'result': json.loads(result) if result is not None else None,
+            'errors': json.loads(errors) if errors is not None else [],
+            'attempts': attempts,
+            'createdAt': created_at,
+            'startedAt': started_at,
+            'finishedAt': finished_at,
+            'callback': {'url': callback_url, 'status': callback_status} if callback_url else None,
+        }
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def _rows(jobs: List[Job], outcomes: List[Outcome]) -> List[Tuple[str, Optional[Dict], Optional[List[str]]]]:
+    return [(job.id, result, errors) for job, (result, errors) in zip(jobs, outcomes)]
+
+
+def _storable(outcome: Outcome) -> Outcome:
+    """Outcome yang bisa disimpan sebagai JSON, atau job failed dengan alasannya"""
+    try:
+        json.dumps(outcome, ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        return None, [f"Job failed: result not storable: {type(e).__name__}: {e}"]
+    return outcome
+
+
+class JobRunner:
+    """
+    Worker asyncio yang memproses JobQueue dalam batch
+
+    Args:
+        queue: JobQueue
+        process: async fungsi (list Job) -> list (result, errors), satu per job
+        concurrency: Jumlah worker (batch bersamaan; 0 = hanya menerima job)
+        batch_size: Batas job per batch
+        poll_interval: Jeda polling saat antrian kosong (job dari proses lain)
+        callback_timeout: Batas waktu POST callback (detik)
+        callback_hosts: Host yang boleh menerima callback (kosong = callback ditolak)
+        transport: httpx transport kustom untuk callback (tes)
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        process: Callable[[List[Job]], Awaitable[List[Outcome]]],
+        concurrency: int = 2,
+        batch_size: int = 200,
+        poll_interval: float = 1.0,
+        callback_timeout: float = 10.0,
+        callback_hosts: Sequence[str] = (),
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.queue = queue
+        self.process = process
+        self.concurrency = max(0, concurrency)  # 0: submit only, other processes work the queue
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.callback_timeout = callback_timeout
+        # Clients choose the URL: only listed hosts, so jobs cannot make this
+        # service call internal addresses
+        self.callback_hosts = frozenset(host.strip().lower() for host in callback_hosts if host.strip())
+        self.transport = transport
+        self._workers: List[asyncio.Task] = []
+        self._callbacks = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._finished = deque()  # (time, jobs) per batch within THROUGHPUT_WINDOW
+        self._waits = deque(maxlen=1000)  # seconds from submit to claim
+        self.counts = {
+            'submitted': 0, 'done': 0, 'failed': 0, 'batches': 0,
+            'callbacksSent': 0, 'callbacksFailed': 0, 'finishErrors': 0,
+        }
+        self.batch_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, queue: JobQueue, process) -> 'JobRunner':
+        return cls(
+            queue,
+            process,
+            concurrency=int(os.getenv('JOBS_CONCURRENCY', '2')),
+            batch_size=int(os.getenv('JOBS_BATCH_SIZE', '200')),
+            poll_interval=float(os.getenv('JOBS_POLL_INTERVAL', '1.0')),
+            callback_timeout=float(os.getenv('JOBS_CALLBACK_TIMEOUT', '10')),
+            callback_hosts=os.getenv('JOBS_CALLBACK_HOSTS', '').split(',')
+        )
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def callback_allowed(self, url: str) -> bool:
+        """http(s) URL ke host di `callback_hosts`"""
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return False
+        return parts.scheme in ('http', 'https') and (parts.hostname or '') in self.callback_hosts
+
+    def submit(self, payload: Dict[str, Any], callback_url: Optional[str] = None, job_id: Optional[str] = None) -> str:
+        job_id = self.queue.submit(payload, callback_url, job_id)
+        self.counts['submitted'] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def start(self):
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._client = httpx.AsyncClient(timeout=self.callback_timeout, transport=self.transport)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Hentikan worker; batch yang sedang berjalan dikembalikan ke antrian"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._callbacks:
+            await asyncio.wait(self._callbacks, timeout=self.callback_timeout)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _work(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                jobs = await asyncio.to_thread(self.queue.claim, self.batch_size)
+            except sqlite3.OperationalError:
+                jobs = []  # file locked by another process past busy_timeout
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_batch(jobs)
+
+    async def run_batch(self, jobs: List[Job]):
+        """Proses satu batch yang sudah di-claim, simpan hasil dan kirim callback"""
+        start = time.perf_counter()
+        try:
+            outcomes = await self.process(jobs)
+        except asyncio.CancelledError:
+            self.queue.release([job.id for job in jobs])
+            raise
+        except Exception as e:
+            outcomes = [(None, [f"Job failed: {type(e).__name__}: {e}"])] * len(jobs)
+        outcomes = await self._finish(jobs, outcomes)
+        if outcomes is None:
+            return  # still running; claimed again once the lease expires
+
+        self.batch_seconds += time.perf_counter() - start
+        self.counts['batches'] += 1
+        now = time.time()
+        self._finished.append((now, len(jobs)))
+        for job, (result, errors) in zip(jobs, outcomes):
+            self.counts['failed' if errors else 'done'] += 1
+            self._waits.append(job.started_at - job.created_at)
+            if job.callback_url:
+                task = asyncio.create_task(self._callback(job, result, errors))
+                self._callbacks.add(task)
+                task.add_done_callback(self._callbacks.discard)
+
+    async def _finish(self, jobs: List[Job], outcomes: List[Outcome]) -> Optional[List[Outcome]]:
+        """queue.finish tanpa menghentikan worker; None jika batch tidak bisa disimpan"""
+        try:
+            await asyncio.to_thread(self.queue.finish, _rows(jobs, outcomes))
+            return outcomes
+        except (TypeError, ValueError):
+            # A result json.dumps cannot encode rolls back the whole batch:
+            # store the others and fail only that job
+            outcomes = [_storable(outcome) for outcome in outcomes]
+        except Exception:
+            self._finish_failed(jobs)
+            return None
+        try:
+            await asyncio.to_thread(self.queue.finish, _rows(jobs, outcomes))
+            return outcomes
+        except Exception:
+            self._finish_failed(jobs)
+            return None
+
+    def _finish_failed(self, jobs: List[Job]):
+        # e.g. "database is locked" past busy_timeout
+        self.counts['finishErrors'] += 1
+        logger.exception("Could not store %d finished jobs; they run again after their lease", len(jobs))
+
+    async def _callback(self, job: Job, result: Optional[Dict], errors: Optional[List[str]]):
+        document = {
+            'jobId': job.id,
+            'status': 'failed' if errors else 'done',
+            'result': result,
+            'errors': errors or [],
+        }
+        if not self.callback_allowed(job.callback_url):  # allow-list changed since submit
+            self.counts['callbacksFailed'] += 1
+            await asyncio.to_thread(self.queue.set_callback_status, job.id, 'rejected')
+            return
+        try:
+            response = await self._client.post(job.callback_url, json=document)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.counts['callbacksFailed'] += 1
+            status = 'failed'
+        else:
+            self.counts['callbacksSent'] += 1
+            status = 'sent'
+        await asyncio.to_thread(self.queue.set_callback_status, job.id, status)
+
+    def throughput(self) -> float:
+        """Job selesai per detik dalam THROUGHPUT_WINDOW terakhir"""
+        cutoff = time.time() - THROUGHPUT_WINDOW
+        while self._finished and self._finished[0][0] < cutoff:
+            self._finished.popleft()
+        return sum(count for _, count in self._finished) / THROUGHPUT_WINDOW
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        batches = self.counts['batches']
+        finished = self.counts['done'] + self.counts['failed']
+        return {
+            'running': self.running,
+            'concurrency': self.concurrency,
+            'batchSize': self.batch_size,
+            'durable': self.queue.path is not None,
+            'queue': self.queue.counts(),
+            **self.counts,
+            'jobsPerSecond': round(self.throughput(), 3),
+            'meanBatchJobs': round(finished / batches, 2) if batches else 0.0,
+            'meanBatchSeconds': round(self.batch_seconds / batches, 4) if batches else 0.0,
+            'queueWaitP50': round(waits[len(waits) // 2], 4) if waits else 0.0,
+            'queueWaitP95': round(waits[int(len(waits) * 0.95)], 4) if waits else 0.0,
+        }
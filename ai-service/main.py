@@ -1,18 +1,38 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+import asyncio
 import os
 from dotenv import load_dotenv
 import sys
 
 # Add validators directory to path
 sys.path.append(os.path.dirname(__file__))
+from validators.submission_validator import AIValidationResult, SubmissionData, SubmissionValidator
 from validators.carbon_validator import CarbonValidator
+from streaming import DEFAULT_CHUNK_SIZE, FORMATS, carbon_claim, format_errors, split_record
+from rescoring import RescoringEngine
+from portfolio import GROUP_BY, ORDER_BY, PortfolioStore
+from scenarios import ClaimCorpus, Scenario
+from cache import ResultCache, make_key
+from codec import FastRoute, encode
+from validators.claim_distribution import ClaimDistributionModel, observations_from_records
+from validators.similarity_index import SimilarityIndex, submission_texts
+from validators.claim_history import ClaimHistory, flag_trend
+from validators.evidence_analyzer import EvidenceAnalyzer
+from validators.llm_reviewer import LLMReviewer
+from metrics import Metrics, MetricsMiddleware, SamplingProfiler
+from admission import BATCH, INTERACTIVE, AdmissionMiddleware, PriorityLimiter, current_priority
+from jobs import Job, JobQueue, JobRunner
+import executor as tasks
 
 load_dotenv()
 
-app = FastAPI(title="CircularFund AI Scoring Service")
+app = FastAPI(title="CircularFund AI Scoring Service", default_response_class=ORJSONResponse)
+# Request bodies parsed with orjson, or msgpack (Content-Type: application/x-msgpack)
+app.router.route_class = FastRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,135 +42,885 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize validators
-carbon_validator = CarbonValidator()
-
-class SubmissionData(BaseModel):
-    resourceReductionPercentage: Optional[float] = None
-    resourceReductionDetails: Optional[str] = None
-    reuseFrequency: Optional[str] = None
-    reuseDetails: Optional[str] = None
-    recycleType: Optional[str] = None
-    recycleDetails: Optional[str] = None
-    productLifespanYears: Optional[float] = None
-    productRepairability: Optional[bool] = None
-    productDetails: Optional[str] = None
-    processEfficiencyImprovement: Optional[float] = None
-    processDetails: Optional[str] = None
-    documentationLevel: Optional[str] = None
-    traceabilitySystem: Optional[bool] = None
-    carbonReductionKg: Optional[float] = None
-    carbonCalculationMethod: Optional[str] = None
-    localEmployees: Optional[int] = None
-    incomeStability: Optional[str] = None
-    evidenceFiles: Optional[List[str]] = []
-
-class AIValidationResult(BaseModel):
-    isValid: bool
-    confidence: float
-    flags: List[str]
-    suggestions: List[str]
-    adjustedScores: Dict[str, float]
+# Initialize validators (VALIDATION_EXECUTOR=inline|thread|process)
+submission_validator, carbon_validator, stream_validator = tasks.get_validators()
+validation_executor = tasks.ValidationExecutor.from_env()
+
+# Admission control for the validation routes (ADMISSION_ENABLED,
+# ADMISSION_CONCURRENCY, ADMISSION_QUEUE_SIZE, ADMISSION_INTERACTIVE_RESERVED):
+# deadline and priority from the X-Request-Deadline-Ms / X-Request-Priority
+# headers. Inline validation runs on the event loop, so one request at a time;
+# pools take two per worker
+admission = PriorityLimiter.from_env(
+    1 if validation_executor.mode == "inline" else 2 * validation_executor.workers
+)
+if admission is not None:
+    app.add_middleware(AdmissionMiddleware, limiter=admission, paths={
+        "/validate": INTERACTIVE,
+        "/estimate-carbon": INTERACTIVE,
+        "/validate/batch": BATCH,
+        "/estimate-carbon/batch": BATCH,
+    })
+
+# Prometheus metrics on /metrics (METRICS_ENABLED, METRICS_RULE_SAMPLE); when
+# disabled no middleware or instrumented validator is installed; added after
+# admission so rejected requests are counted too
+metrics = Metrics.from_env()
+if metrics.enabled:
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+metrics.add_validator("submission")
+metrics.add_validator("carbon")
+
+# Opt-in sampling profiler behind POST /debug/profile (PROFILER_ENABLED)
+profiler = SamplingProfiler() if os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes") else None
+
+# Result cache (RESULT_CACHE_SIZE, RESULT_CACHE_TTL, RESULT_CACHE_PATH)
+result_cache = ResultCache.from_env()
+
+# Evidence OCR: own executor (OCR_EXECUTOR, OCR_WORKERS) so long OCR jobs never
+# queue behind validation work; text is cached by file content hash
+ocr_executor = tasks.ValidationExecutor(
+    mode=os.getenv("OCR_EXECUTOR", "process"),
+    workers=int(os.getenv("OCR_WORKERS", "2"))
+)
+ocr_cache = ResultCache(
+    max_entries=int(os.getenv("OCR_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("OCR_CACHE_TTL", str(30 * 24 * 3600))),
+    path=os.getenv("OCR_CACHE_PATH") or None
+)
+evidence_analyzer = EvidenceAnalyzer.from_env(ocr_executor, ocr_cache)
+
+# Optional LLM cross-check of borderline /validate results (LLM_REVIEW_URL,
+# LLM_REVIEW_MODEL, LLM_REVIEW_BAND, LLM_REVIEW_CONCURRENCY); answers are
+# cached by model + prompt (LLM_CACHE_PATH keeps them across restarts)
+llm_cache = ResultCache(
+    max_entries=int(os.getenv("LLM_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600))),
+    path=os.getenv("LLM_CACHE_PATH") or None
+)
+llm_reviewer = LLMReviewer.from_env(llm_cache)
+
+# Near-duplicate index (SIMILARITY_INDEX_PATH, SIMILARITY_THRESHOLD); in-memory
+# when no path is set. Lives in this process only: it changes with every insert
+similarity_index = SimilarityIndex.from_env()
+
+# Per-UMKM claim history for trend checks across periods (CLAIM_HISTORY_PATH);
+# in memory when no path is set. Same single-writer rule as the similarity index
+claim_history = ClaimHistory.from_env()
+
+# Stored submissions re-scored incrementally (/rescore); follows the live
+# benchmark snapshot and claim distribution of this process. Every stored
+# result is mirrored into the columnar portfolio store (/portfolio/query)
+portfolio_store = PortfolioStore()
+rescoring_engine = RescoringEngine(submission_validator, carbon_validator, on_change=portfolio_store.on_change)
+
+# Async validation jobs (JOBS_PATH, JOBS_CONCURRENCY, JOBS_BATCH_SIZE): SQLite
+# queue worked off in batches by background tasks of this process (see
+# _process_jobs); in memory when no path is set
+job_queue = JobQueue.from_env()
+
+# Upper bound on items per batch request
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "50000"))
+
+# Upper bound on candidate rulesets per /scenarios/simulate request
+MAX_SCENARIOS = int(os.getenv("MAX_SCENARIOS", "20"))
+
+# Upper bound on evidence files per OCR request
+MAX_EVIDENCE_FILES = int(os.getenv("MAX_EVIDENCE_FILES", "20"))
+
+# Upper bound on evidence files per async job (OCR runs in the background)
+MAX_JOB_EVIDENCE_FILES = int(os.getenv("MAX_JOB_EVIDENCE_FILES", "200"))
+
+# Batch duplicate checks run on the event loop; every N items they pause for
+# running interactive requests (and give deadline cancellation a chance)
+DUPLICATE_CHECK_SLICE = 50
+
+class CarbonClaim(BaseModel):
+    carbon_reduction_kg: float
+    calculation_method: str
+    sector: str
+    business_scale: str
+    evidence_count: int
+    details: Optional[str] = None
+    sub_sector: Optional[str] = None
+    region: Optional[str] = None
+    documented_quantity: Optional[float] = None
+
+class TrendContext(BaseModel):
+    # Optional part of an /estimate-carbon/batch item: with umkm_id and period
+    # the claim is checked against (and added to) that UMKM's claim history
+    umkm_id: Optional[str] = None
+    period: Optional[int] = Field(None, ge=1900, le=2200)
+    local_employees: Optional[int] = Field(None, ge=0)
+
+class HistoryClaim(BaseModel):
+    umkm_id: str
+    period: int = Field(ge=1900, le=2200)
+    carbon_reduction_kg: float
+    local_employees: Optional[int] = Field(None, ge=0)
+    business_scale: Optional[str] = None
+
+class HistoryRequest(BaseModel):
+    claims: List[HistoryClaim] = Field(max_length=MAX_BATCH_ITEMS)
+
+class ObservedClaim(BaseModel):
+    sector: str
+    business_scale: str
+    calculation_method: str
+    carbon_reduction_kg: float
+
+class ObserveRequest(BaseModel):
+    claims: List[ObservedClaim] = Field(max_length=MAX_BATCH_ITEMS)
+
+class PortfolioQuery(BaseModel):
+    sectors: Optional[List[str]] = None
+    scales: Optional[List[str]] = None
+    is_valid: Optional[bool] = None
+    carbon_valid: Optional[bool] = None
+    min_confidence: Optional[float] = None
+    max_confidence: Optional[float] = None
+    flags_any: List[str] = []
+    flags_all: List[str] = []
+    flags_none: List[str] = []
+    group_by: Optional[str] = None
+    order_by: str = "confidence"
+    descending: bool = False
+    limit: int = Field(0, ge=0, le=10000)
+    offset: int = Field(0, ge=0)
+
+class ScenarioSpec(BaseModel):
+    name: str
+    benchmarks: Dict[str, Dict[str, Dict[str, float]]] = {}
+    multipliers: Dict[str, float] = {}
+    minEvidenceRatios: Optional[List[float]] = None
+    minEvidenceCounts: Optional[List[int]] = None
+
+class ScenarioRequest(BaseModel):
+    scenarios: List[ScenarioSpec] = Field(min_length=1, max_length=MAX_SCENARIOS)
+    # Inline corpus; the stored /rescore claims when omitted
+    claims: Optional[List[CarbonClaim]] = Field(None, max_length=MAX_BATCH_ITEMS)
+
+class BatchItem(BaseModel):
+    id: str
+    data: Dict[str, Any] = Field(default_factory=dict)
+    umkmId: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(max_length=MAX_BATCH_ITEMS)
+
+class BatchResponse(BaseModel):
+    results: Dict[str, Dict[str, Any]]
+    errors: Dict[str, List[str]]
+
+class JobRequest(BaseModel):
+    # Record like /validate/stream: SubmissionData fields plus sector,
+    # businessScale, subSector, region, carbonDetails, evidenceCount
+    data: Dict[str, Any] = Field(default_factory=dict)
+    id: Optional[str] = None
+    umkmId: Optional[str] = None
+    callbackUrl: Optional[str] = None
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that can consume the request body while streaming
+    The stock response listens for disconnects on `receive`, which would
+    swallow the body messages that request.stream() is still reading
+    """
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+@app.post("/validate/stream")
+async def validate_stream(
+    request: Request,
+    format: str = Query("ndjson"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_BATCH_ITEMS)
+):
+    """
+    Re-validate an NDJSON/CSV export as a stream
+    Body is read incrementally and one NDJSON result line is written per record
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(FORMATS)}")
+    
+    lines = stream_validator.aiter_validate(
+        request.stream(), format, chunk_size,
+        run_chunk=lambda records: validation_executor.run(tasks.validate_stream_chunk_task, records)
+    )
+    return BodyStreamingResponse(lines, media_type="application/x-ndjson")
+
+def _parse_batch(items: List[BatchItem], model):
+    """Validate each item on its own so one bad payload does not fail the batch"""
+    parsed = {}
+    errors = {}
+    for item in items:
+        if item.id in parsed or item.id in errors:
+            errors[item.id] = ["Duplicate id in batch"]
+            parsed.pop(item.id, None)
+            continue
+        try:
+            parsed[item.id] = model.model_validate(item.data)
+        except ValidationError as e:
+            errors[item.id] = format_errors(e)
+    return parsed, errors
+
+@app.on_event("startup")
+async def start_executor():
+    await validation_executor.start()
+    job_runner.start()
+
+@app.on_event("shutdown")
+async def stop_executor():
+    await job_runner.stop()  # the queue file closes with the process
+    validation_executor.shutdown()
+    ocr_executor.shutdown()
+    await llm_reviewer.close()
+    result_cache.close()
+    ocr_cache.close()
+    llm_cache.close()
+    similarity_index.close()
+    claim_history.close()
+
+def _record_results(validator: str, results: Iterable[Dict]):
+    if metrics.enabled:
+        for result in results:
+            metrics.record_result(validator, result["isValid"], result["flagCodes"])
+
+def _service_gauges():
+    cache = result_cache.stats()
+    yield ("circularfund_result_cache_entries", "gauge", "Entries in the in-memory result cache",
+           {(): cache["entries"]}, ())
+    yield ("circularfund_result_cache_lookups_total", "counter", "Result cache lookups by outcome",
+           {("hit",): cache["hits"], ("disk_hit",): cache["diskHits"], ("miss",): cache["misses"]}, ("outcome",))
+    yield ("circularfund_similarity_submissions", "gauge", "Submissions in the near-duplicate index",
+           {(): len(similarity_index.ids)}, ())
+    yield ("circularfund_claim_history_umkms", "gauge", "UMKMs in the claim history",
+           {(): len(claim_history)}, ())
+    yield ("circularfund_ocr_runs_total", "counter", "OCR jobs started (cache misses)",
+           {(): evidence_analyzer.ocr_runs}, ())
+    review = llm_reviewer.stats()
+    yield ("circularfund_llm_reviews_total", "counter", "LLM reviews by outcome",
+           {("request",): review["requests"], ("coalesced",): review["coalesced"],
+            ("cache_hit",): review["cacheHits"], ("error",): review["errors"]}, ("outcome",))
+    
+    if admission is not None:
+        stats = admission.stats()
+        yield ("circularfund_admission_queued", "gauge", "Requests waiting for admission by priority",
+               {(name,): count for name, count in stats["queued"].items()}, ("priority",))
+        yield ("circularfund_admission_requests_total", "counter", "Admission decisions by outcome",
+               {(outcome,): stats[outcome] for outcome in
+                ("admitted", "rejected_deadline", "rejected_full", "shed", "expired", "cancelled")}, ("outcome",))
+    
+    jobs = job_runner.stats()
+    yield ("circularfund_jobs", "gauge", "Validation jobs in the queue by status",
+           {(status,): count for status, count in jobs["queue"].items()}, ("status",))
+    yield ("circularfund_jobs_processed_total", "counter", "Jobs processed by this process by outcome",
+           {("done",): jobs["done"], ("failed",): jobs["failed"]}, ("outcome",))
+    yield ("circularfund_jobs_per_second", "gauge", "Jobs finished per second over the last minute",
+           {(): jobs["jobsPerSecond"]}, ())
+
+metrics.registry.collector(_service_gauges)
+
+def _submission_key(data: SubmissionData) -> str:
+    return make_key("validate", submission_validator.version, data.model_dump())
+
+def _check_duplicates(result: Dict, data: SubmissionData, submission_id: Optional[str], umkm_id: Optional[str]) -> Dict:
+    """Query the similarity index (and index the submission when it has an id)"""
+    matches = similarity_index.check(
+        submission_id, submission_texts(data.model_dump()), data.evidenceFiles, umkm_id
+    )
+    return submission_validator.flag_duplicates(result, [match.to_dict() for match in matches])
+
+def _check_trend(result: Dict, umkm_id: str, period: int, carbon_reduction_kg: float,
+                 local_employees: Optional[int], business_scale: Optional[str], structured: bool = False) -> Dict:
+    """Check the claim against the UMKM's previous periods and add it to its history"""
+    check = claim_history.check_and_record(umkm_id, period, carbon_reduction_kg, local_employees, business_scale)
+    return flag_trend(result, check, structured)
+
+def _claim_key(claim: CarbonClaim, structured: bool = False) -> str:
+    # The key uses the live ruleset (swapped by the benchmark watcher thread)
+    # and claim distribution (get_validators() polls the model file)
+    validator = tasks.get_validators()[1]
+    version = f"{validator.rules.version}:{validator.distribution.version}"
+    return make_key("estimate-carbon:structured" if structured else "estimate-carbon", version, claim.model_dump())
 
 @app.get("/")
 def read_root():
     return {"service": "CircularFund AI Scoring", "status": "running"}
 
+@app.get("/benchmarks")
+def benchmark_info():
+    """Active benchmark snapshot (BENCHMARKS_PATH) or the built-in tables"""
+    store = tasks.get_benchmark_store()
+    if store is None:
+        rules = carbon_validator.rules
+        return {"path": None, "rulesVersion": rules.version, "sectors": len(rules.sectors),
+                "profiles": len(rules.profiles), "entries": len(rules.bench_min)}
+    return store.info()
+
+@app.post("/benchmarks/reload")
+def reload_benchmarks():
+    """
+    Re-read BENCHMARKS_PATH now instead of waiting for the next poll
+    An invalid file is rejected and the current snapshot stays active
+    """
+    store = tasks.get_benchmark_store()
+    if store is None:
+        raise HTTPException(status_code=400, detail="BENCHMARKS_PATH is not configured")
+    try:
+        changed = store.load()
+    except (OSError, ValueError) as e:
+        store.last_error = str(e)
+        raise HTTPException(status_code=422, detail=f"Benchmark file rejected: {e}")
+    return {**store.info(), "changed": changed, "rescored": len(rescoring_engine.sync())}
+
+@app.get("/outliers")
+def outlier_model_info():
+    """Claim distribution model: sync status and per-group quantiles"""
+    store = tasks.get_distribution_store()
+    return {**store.info(), "groupStats": store.model.summary()}
+
+@app.post("/outliers/observe")
+def observe_claims(request: ObserveRequest):
+    """
+    Add accepted claims to the distribution model (incremental, no refit)
+    With OUTLIER_MODEL_PATH they reach other workers on the next sync
+    """
+    store = tasks.get_distribution_store()
+    observed = store.observe(observations_from_records(claim.model_dump() for claim in request.claims))
+    return {"observed": observed, "version": store.model.version}
+
+@app.get("/outliers/state")
+def outlier_model_state():
+    """Mergeable model state, e.g. for POST /outliers/merge on another host"""
+    return tasks.get_distribution_store().model.to_dict()
+
+@app.post("/outliers/merge")
+def merge_outlier_model(state: Dict[str, Any]):
+    store = tasks.get_distribution_store()
+    try:
+        store.merge(ClaimDistributionModel.from_dict(state))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return store.info()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return result_cache.stats()
+
+@app.get("/similarity/stats")
+def similarity_stats():
+    return similarity_index.stats()
+
+@app.get("/history/stats")
+def claim_history_stats():
+    return claim_history.stats()
+
+@app.get("/history/{umkm_id}")
+def get_claim_history(umkm_id: str):
+    """Claims of one UMKM by period, with its mean annual growth"""
+    history = claim_history.history(umkm_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"Unknown UMKM {umkm_id}")
+    return history
+
+@app.post("/history/claims")
+def record_claim_history(request: HistoryRequest):
+    """
+    Add past claims to the history without checking them (backfill)
+    Periods may arrive in any order; a claim for a recorded period replaces it
+    """
+    for claim in request.claims:
+        claim_history.record(claim.umkm_id, claim.period, claim.carbon_reduction_kg,
+                             claim.local_employees, claim.business_scale)
+    return claim_history.stats()
+
+@app.get("/admission/stats")
+def admission_stats():
+    """Request queue (admission) and executor queue: permits, queued per priority, rejections"""
+    return {
+        "requests": admission.stats() if admission is not None else None,
+        "executor": validation_executor.limiter.stats() if validation_executor.limiter is not None else None,
+    }
+
+@app.get("/llm-review/stats")
+def llm_review_stats():
+    return {**llm_reviewer.stats(), "cache": llm_cache.stats()}
+
+@app.post("/similarity/compact")
+def compact_similarity_index():
+    """Fold recent inserts into the on-disk segment"""
+    similarity_index.compact()
+    return similarity_index.stats()
+
+@app.get("/rescore/changes")
+def rescore_changes(since: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=MAX_BATCH_ITEMS)):
+    """
+    Stored results that changed after sequence `since`
+    Pass the returned `next` as `since` to pull what a later edit or backfill changed
+    """
+    tasks.get_validators()
+    results, next_sequence = rescoring_engine.changes(since, limit)
+    return {"results": results, "next": next_sequence}
+
+@app.get("/rescore/stats")
+def rescore_stats():
+    return rescoring_engine.stats()
+
+@app.get("/rescore/{submission_id}")
+def rescore_result(submission_id: str):
+    tasks.get_validators()
+    rescoring_engine.sync()
+    result = rescoring_engine.result(submission_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown submission")
+    return result
+
+@app.put("/rescore/{submission_id}")
+def rescore_submission(submission_id: str, record: Dict[str, Any] = Body(...)):
+    """
+    Store a full submission (/validate/stream record fields) and score it
+    An existing submission only re-runs the rules that read a changed field
+    """
+    tasks.get_validators()
+    try:
+        rescore = rescoring_engine.upsert(submission_id, record)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=format_errors(e))
+    except ValueError as e:  # claim fields the carbon validator cannot use
+        raise HTTPException(status_code=422, detail=[str(e)])
+    return {**rescoring_engine.result(submission_id), "rescored": rescore.to_dict()}
+
+@app.patch("/rescore/{submission_id}")
+def rescore_update(submission_id: str, changes: Dict[str, Any] = Body(...)):
+    """Change some fields of a stored submission and re-run what depends on them"""
+    tasks.get_validators()
+    try:
+        rescore = rescoring_engine.update(submission_id, changes)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown submission")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=format_errors(e))
+    except ValueError as e:  # claim fields the carbon validator cannot use
+        raise HTTPException(status_code=422, detail=[str(e)])
+    return {**rescoring_engine.result(submission_id), "rescored": rescore.to_dict()}
+
+@app.delete("/rescore/{submission_id}")
+def rescore_remove(submission_id: str):
+    if not rescoring_engine.remove(submission_id):
+        raise HTTPException(status_code=404, detail="Unknown submission")
+    return {"removed": submission_id}
+
+@app.post("/portfolio/query")
+def portfolio_query(query: PortfolioQuery):
+    """
+    Filter and aggregate stored results (see /rescore) for portfolio views
+    Returns count and summary, optional `groups` (group_by) and a page of `rows` (limit)
+    """
+    tasks.get_validators()
+    rescoring_engine.sync()
+    try:
+        return portfolio_store.query(**query.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/portfolio/stats")
+def portfolio_stats():
+    return {**portfolio_store.stats(), "groupBy": list(GROUP_BY), "orderBy": list(ORDER_BY)}
+
+@app.post("/scenarios/simulate")
+def simulate_scenarios(request: ScenarioRequest):
+    """
+    What-if: replay candidate benchmark tables / evidence buckets over a claims corpus
+    Reports per scenario how many claims flip valid/invalid against the active ruleset, per sector and scale
+    """
+    carbon = tasks.get_validators()[1]
+    records = [claim.model_dump() for claim in request.claims] if request.claims is not None else rescoring_engine.claims()
+    corpus = ClaimCorpus.from_records(carbon, records)
+    try:
+        return corpus.simulate([Scenario.from_dict(spec.model_dump()) for spec in request.scenarios])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Request, rule and flag metrics in the Prometheus text format"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED)")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/debug/profile")
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=300),
+    interval_ms: float = Query(5.0, ge=1, le=1000)
+):
+    """
+    Sample the stacks of this process for `seconds` and return folded stacks
+    Output feeds flamegraph.pl or speedscope; executor worker processes are not sampled
+    """
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (PROFILER_ENABLED)")
+    profiler.interval = interval_ms / 1000
+    try:
+        folded, snapshots = await asyncio.to_thread(profiler.profile, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(folded, headers={"X-Profile-Snapshots": str(snapshots)})
+
 @app.post("/validate", response_model=AIValidationResult)
-async def validate_submission(data: SubmissionData):
+async def validate_submission(
+    request: Request,
+    data: SubmissionData,
+    submission_id: Optional[str] = Query(None),
+    umkm_id: Optional[str] = Query(None)
+):
     """
     AI-assisted validation of circular economy claims
     Uses LLM to cross-check claims against evidence and detect anomalies
+    (borderline confidence only, when LLM_REVIEW_URL is set)
+    With submission_id the submission is also added to the near-duplicate index
+    """
+    key = _submission_key(data)
+    result = result_cache.get(key)
+    if result is None:
+        sampler = metrics.sampler("submission")
+        if sampler is not None:
+            # Per-step timing: same executor, the worker returns step marks too
+            validation, marks = await validation_executor.run(tasks.validate_submission_timed_task, data)
+            sampler.record(marks)
+            result = validation.model_dump()
+        else:
+            result = (await validation_executor.run(tasks.validate_submission_task, data)).model_dump()
+        result_cache.set(key, result)
+    result = _check_duplicates(result, data, submission_id, umkm_id)
+    review = await llm_reviewer.review(data.model_dump(), result)
+    result = submission_validator.flag_llm_review(result, review)
+    _record_results("submission", [result])
+    return encode(request, result)
+
+@app.post("/validate/batch", response_model=BatchResponse)
+async def validate_submission_batch(request: Request, batch: BatchRequest):
+    """
+    Validate many submissions in one request
+    Results and per-item errors are keyed by the caller-supplied ids
     """
-    flags = []
-    suggestions = []
-    adjusted_scores = {}
-    confidence = 0.85
-    
-    # Anomaly detection
-    if data.carbonReductionKg and data.carbonReductionKg > 5000:
-        flags.append("Unusually high carbon reduction claim")
-        confidence -= 0.15
-        if not data.carbonCalculationMethod:
-            suggestions.append("Provide detailed calculation method for carbon reduction")
-    
-    if data.resourceReductionPercentage and data.resourceReductionPercentage > 50:
-        flags.append("Very high resource reduction percentage")
-        confidence -= 0.1
-        if not data.resourceReductionDetails:
-            suggestions.append("Add baseline data and measurement methodology")
-    
-    # Evidence consistency check
-    if data.evidenceFiles and len(data.evidenceFiles) < 3:
-        suggestions.append("More evidence files recommended for higher confidence")
-        confidence -= 0.05
-    
-    # Cross-validation
-    if data.traceabilitySystem and data.documentationLevel == "minimal":
-        flags.append("Traceability system claimed but minimal documentation")
-        adjusted_scores["transparency"] = -2
-    
-    if data.processEfficiencyImprovement and data.processEfficiencyImprovement > 30:
-        if not data.processDetails:
-            suggestions.append("High efficiency improvement needs detailed explanation")
-            adjusted_scores["processEfficiency"] = -3
-    
-    is_valid = len(flags) < 3 and confidence > 0.5
-    
-    return AIValidationResult(
-        isValid=is_valid,
-        confidence=max(0.0, min(1.0, confidence)),
-        flags=flags,
-        suggestions=suggestions,
-        adjustedScores=adjusted_scores
+    parsed, errors = _parse_batch(batch.items, SubmissionData)
+    keys = {item_id: _submission_key(data) for item_id, data in parsed.items()}
+    results = _cached_results(keys)
+    
+    missing = [item_id for item_id in parsed if item_id not in results]
+    outputs = await validation_executor.map_chunks(
+        tasks.validate_submissions_task, [parsed[item_id] for item_id in missing]
     )
+    for item_id, result in zip(missing, outputs):
+        results[item_id] = result.model_dump()
+        result_cache.set(keys[item_id], results[item_id])
+    
+    # Request order, so a copy later in the same batch is caught too
+    umkm_ids = {item.id: item.umkmId for item in batch.items}
+    for n, (item_id, data) in enumerate(parsed.items(), 1):
+        results[item_id] = _check_duplicates(results[item_id], data, item_id, umkm_ids[item_id])
+        if n % DUPLICATE_CHECK_SLICE == 0:
+            await _pause()
+    
+    borderline = [item_id for item_id in parsed if llm_reviewer.should_review(results[item_id])]
+    reviews = await llm_reviewer.review_all([(parsed[item_id].model_dump(), results[item_id]) for item_id in borderline])
+    for item_id, review in zip(borderline, reviews):
+        results[item_id] = submission_validator.flag_llm_review(results[item_id], review)
+    _record_results("submission", results.values())
+    return encode(request, {"results": results, "errors": errors})
+
+async def _pause():
+    if admission is None:
+        await asyncio.sleep(0)
+    else:
+        await admission.pause(current_priority.get())
+
+def _cached_results(keys: Dict[str, str]) -> Dict[str, Dict]:
+    results = {}
+    for item_id, key in keys.items():
+        cached = result_cache.get(key)
+        if cached is not None:
+            results[item_id] = cached
+    return results
 
 @app.post("/analyze-evidence")
-async def analyze_evidence(file_urls: List[str]):
+async def analyze_evidence(file_urls: List[str] = Body(..., max_length=MAX_EVIDENCE_FILES)):
     """
     Analyze evidence files using OCR and image recognition
     Extract text from invoices, receipts, certificates
+    Paths are relative to EVIDENCE_ROOT; kg/kWh/km figures are summed under `figures`
     """
-    # Placeholder for OCR/image analysis
-    # In production, this would use pytesseract or cloud vision APIs
-    return {
-        "extractedText": [],
-        "detectedDocuments": [],
-        "confidence": 0.8
-    }
+    if evidence_analyzer.root is None:
+        raise HTTPException(status_code=400, detail="EVIDENCE_ROOT is not configured")
+    report = await evidence_analyzer.analyze(file_urls)
+    return report.to_dict()
+
+@app.get("/analyze-evidence/stats")
+def evidence_stats():
+    return {**evidence_analyzer.stats(), "cache": ocr_cache.stats()}
 
 @app.post("/estimate-carbon")
 async def estimate_carbon(
+    request: Request,
     carbon_reduction_kg: float,
     calculation_method: str,
     sector: str,
     business_scale: str,
     evidence_count: int,
-    details: Optional[str] = None
+    details: Optional[str] = None,
+    sub_sector: Optional[str] = None,
+    region: Optional[str] = None,
+    documented_quantity: Optional[float] = None,
+    evidence_files: Optional[List[str]] = Query(None, max_length=MAX_EVIDENCE_FILES),
+    umkm_id: Optional[str] = None,
+    period: Optional[int] = Query(None, ge=1900, le=2200),
+    local_employees: Optional[int] = Query(None, ge=0),
+    structured: bool = False
 ):
     """
     Estimate and validate carbon reduction claim
     Uses industry benchmarks and statistical analysis
+    With evidence_files, the kg/kWh/km read from the files (OCR) are checked
+    against the claim unless documented_quantity is given
+    With umkm_id and period (year), the claim is checked against that UMKM's
+    earlier periods (growth, claim per employee, scale) and added to its history
+    With structured=true, flags and suggestions are {code, params} objects
     """
-    result = carbon_validator.validate_carbon_claim(
+    evidence_figures = None
+    if evidence_files and documented_quantity is None and evidence_analyzer.root is not None:
+        report = await evidence_analyzer.analyze(evidence_files)
+        evidence_figures = report.figures
+        unit = tasks.get_validators()[1].METHOD_UNITS.get(calculation_method)
+        documented_quantity = report.quantity_for(unit)
+    
+    claim = CarbonClaim(
         carbon_reduction_kg=carbon_reduction_kg,
         calculation_method=calculation_method,
         sector=sector,
         business_scale=business_scale,
         evidence_count=evidence_count,
-        details=details
+        details=details,
+        sub_sector=sub_sector,
+        region=region,
+        documented_quantity=documented_quantity
     )
+    key = _claim_key(claim, structured)
+    response = result_cache.get(key)
+    if response is None:
+        sampler = metrics.sampler("carbon")
+        if sampler is not None:
+            result, marks = await validation_executor.run(tasks.estimate_carbon_timed_task, **claim.model_dump())
+            sampler.record(marks)
+        else:
+            result = await validation_executor.run(tasks.estimate_carbon_task, **claim.model_dump())
+        response = _carbon_response(result, carbon_reduction_kg, calculation_method, structured)
+        result_cache.set(key, response)
+    if umkm_id is not None and period is not None:
+        response = _check_trend(response, umkm_id, period, carbon_reduction_kg, local_employees, business_scale, structured)
+    _record_results("carbon", [response])
+    if evidence_figures is not None:
+        response = {**response, "evidenceFigures": evidence_figures}
+    return encode(request, response)
+
+@app.post("/estimate-carbon/batch", response_model=BatchResponse)
+async def estimate_carbon_batch(request: Request, batch: BatchRequest, structured: bool = False):
+    """
+    Validate many carbon claims in one vectorized pass
+    Each item's data uses the same fields as /estimate-carbon (umkm_id
+    defaults to the item's umkmId)
+    """
+    parsed, errors = _parse_batch(batch.items, CarbonClaim)
+    trends, trend_errors = _parse_batch([item for item in batch.items if item.id in parsed], TrendContext)
+    for item_id, messages in trend_errors.items():
+        errors[item_id] = messages
+        del parsed[item_id]
+    keys = {item_id: _claim_key(claim, structured) for item_id, claim in parsed.items()}
+    results = _cached_results(keys)
+    
+    ids = [item_id for item_id in parsed if item_id not in results]
+    claims = [parsed[item_id] for item_id in ids]
+    if claims:
+        outputs = await validation_executor.map_columns(tasks.estimate_carbon_batch_task, {
+            field: [getattr(claim, field) for claim in claims]
+            for field in CarbonClaim.model_fields
+        })
+    else:
+        outputs = []
+    
+    for item_id, claim, result in zip(ids, claims, outputs):
+        results[item_id] = _carbon_response(result, claim.carbon_reduction_kg, claim.calculation_method, structured)
+        result_cache.set(keys[item_id], results[item_id])
     
+    umkm_ids = {item.id: item.umkmId for item in batch.items}
+    for item_id, claim in parsed.items():
+        trend = trends[item_id]
+        umkm_id = trend.umkm_id or umkm_ids[item_id]
+        if umkm_id is not None and trend.period is not None:
+            results[item_id] = _check_trend(results[item_id], umkm_id, trend.period, claim.carbon_reduction_kg,
+                                            trend.local_employees, claim.business_scale, structured)
+    _record_results("carbon", results.values())
+    return encode(request, {"results": results, "errors": errors})
+
+def _carbon_response(result, carbon_reduction_kg: float, calculation_method: str, structured: bool = False) -> Dict:
     return {
-        "isValid": result.is_valid,
-        "confidence": result.confidence,
-        "flags": result.flags,
-        "suggestions": result.suggestions,
-        "adjustedScore": result.adjusted_score,
+        **result.to_dict(structured),
         "estimatedCO2Kg": carbon_reduction_kg,
         "methodology": calculation_method
     }
 
+@app.post("/jobs", status_code=202)
+async def submit_job(job: JobRequest):
+    """
+    Queue a submission for async validation and return its job id
+    The job runs evidence OCR, the /validate rules, the carbon claim check
+    (plus the claim history trend check when umkmId and data.period are
+    given) and the near-duplicate/LLM cross-checks; poll GET /jobs/{id} or pass
+    callbackUrl to receive the finished job as a POST
+    """
+    fields, claim_fields = split_record(job.data)
+    try:
+        data = SubmissionData.model_validate(fields)
+        carbon_claim(data, claim_fields)
+        TrendContext.model_validate({"period": job.data.get("period")})
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=format_errors(e))
+    if len(data.evidenceFiles or []) > MAX_JOB_EVIDENCE_FILES:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_JOB_EVIDENCE_FILES} evidence files per job")
+    if job.callbackUrl is not None and not job_runner.callback_allowed(job.callbackUrl):
+        raise HTTPException(status_code=422, detail="callbackUrl must be an http(s) URL on a JOBS_CALLBACK_HOSTS host")
+    job_id = job_runner.submit(job.model_dump(), job.callbackUrl)
+    return {"jobId": job_id, "status": "queued"}
+
+@app.get("/jobs/stats")
+def job_stats():
+    """Queue depth per status, throughput, batch sizes and queue wait of this process"""
+    return job_runner.stats()
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+async def _process_jobs(jobs: List[Job]) -> List[Tuple[Optional[Dict], Optional[List[str]]]]:
+    """
+    One batch of claimed jobs -> (result, errors) per job
+    Carbon claims of the whole batch go through one vectorized call; a job
+    whose own data breaks a step fails alone, not the whole batch
+    """
+    current_priority.set(BATCH)  # pool work and duplicate checks yield to interactive requests
+    outcomes: List[Tuple[Optional[Dict], Optional[List[str]]]] = [(None, None)] * len(jobs)
+    failed: Dict[int, List[str]] = {}
+    parsed = []
+    for position, job in enumerate(jobs):
+        try:
+            fields, claim_fields = split_record(job.payload["data"])
+            data = SubmissionData.model_validate(fields)
+            claim = carbon_claim(data, claim_fields)
+            period = TrendContext.model_validate({"period": job.payload["data"].get("period")}).period
+        except ValidationError as e:
+            outcomes[position] = (None, format_errors(e))
+        except Exception as e:
+            outcomes[position] = (None, [_job_error(e)])
+        else:
+            parsed.append((position, data, (claim, period)))
+    
+    reports = {}
+    if evidence_analyzer.root is not None:
+        with_files = [(position, data) for position, data, _ in parsed if data.evidenceFiles]
+        analyzed = await asyncio.gather(*(evidence_analyzer.analyze(data.evidenceFiles) for _, data in with_files))
+        reports = {position: report for (position, _), report in zip(with_files, analyzed)}
+    
+    validations = await validation_executor.map_chunks(
+        tasks.validate_submissions_task, [data for _, data, _ in parsed]
+    )
+    
+    claims = []
+    for position, _, (claim, _) in parsed:
+        if claim is None:
+            continue
+        if position in reports:
+            unit = tasks.get_validators()[1].METHOD_UNITS.get(claim["calculation_method"])
+            claim["documented_quantity"] = reports[position].quantity_for(unit)
+        claims.append((position, claim))
+    carbon = {}
+    if claims:
+        try:
+            outputs = await validation_executor.map_columns(tasks.estimate_carbon_batch_task, {
+                field: [claim.get(field) for _, claim in claims] for field in CarbonClaim.model_fields
+            })
+        except Exception:
+            # Score claim by claim so whatever broke the batch fails only its own job
+            outputs = await asyncio.gather(
+                *(validation_executor.run(tasks.estimate_carbon_task, **claim) for _, claim in claims),
+                return_exceptions=True
+            )
+        for (position, claim), result in zip(claims, outputs):
+            if isinstance(result, Exception):
+                failed[position] = [_job_error(result)]
+            else:
+                carbon[position] = _carbon_response(result, claim["carbon_reduction_kg"], claim["calculation_method"])
+    results = {}
+    for n, ((position, data, (claim, period)), validation) in enumerate(zip(parsed, validations), 1):
+        if n % DUPLICATE_CHECK_SLICE == 0:
+            await _pause()
+        if position in failed:
+            continue
+        payload = jobs[position].payload
+        submission_id, umkm_id = payload.get("id"), payload.get("umkmId")
+        trend = position in carbon and umkm_id is not None and period is not None
+        try:
+            # Read-only checks first: a job that fails here leaves nothing in
+            # the claim history or the similarity index
+            texts = submission_texts(data.model_dump())
+            matches = similarity_index.query(texts, data.evidenceFiles, submission_id, umkm_id)
+            results[position] = submission_validator.flag_duplicates(
+                validation.model_dump(), [match.to_dict() for match in matches]
+            )
+            if trend:
+                check = claim_history.check(umkm_id, period, claim["carbon_reduction_kg"],
+                                            data.localEmployees, claim["business_scale"])
+                carbon[position] = flag_trend(carbon[position], check)
+            # Recorded per job, so later jobs of the batch see this one
+            if trend:
+                claim_history.record(umkm_id, period, claim["carbon_reduction_kg"],
+                                     data.localEmployees, claim["business_scale"])
+            if submission_id is not None:
+                similarity_index.insert(submission_id, texts, data.evidenceFiles, umkm_id)
+        except Exception as e:
+            failed[position] = [_job_error(e)]
+    
+    parsed = [item for item in parsed if item[0] not in failed]
+    for position, errors in failed.items():
+        outcomes[position] = (None, errors)
+        carbon.pop(position, None)
+    borderline = [(position, data) for position, data, _ in parsed if llm_reviewer.should_review(results[position])]
+    reviews = await llm_reviewer.review_all([(data.model_dump(), results[position]) for position, data in borderline])
+    for (position, _), review in zip(borderline, reviews):
+        results[position] = submission_validator.flag_llm_review(results[position], review)
+    _record_results("submission", results.values())
+    _record_results("carbon", carbon.values())
+    
+    for position, _, _ in parsed:
+        result = {"validation": results[position], "carbon": carbon.get(position)}
+        if position in reports:
+            report = reports[position]
+            result["evidence"] = {
+                "figures": report.figures,
+                "detectedDocuments": [item.to_dict() for item in report.files],
+            }
+        outcomes[position] = (result, None)
+    return outcomes
+
+def _job_error(error: Exception) -> str:
+    return f"Job failed: {type(error).__name__}: {error}"
+
+job_runner = JobRunner.from_env(job_queue, _process_jobs)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=5000)
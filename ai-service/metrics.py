@@ -0,0 +1,398 @@
+"""
+Metrics
+Instrumentasi ringan untuk validator dan endpoint, diekspor dalam format Prometheus
+
+Everything here is opt-in (METRICS_ENABLED) and built so that the disabled
+path runs no extra code at all:
+
+  - Request latency, request/response size and status per route come from a
+    plain ASGI middleware that is only installed when metrics are enabled.
+  - Flags are counted per rule at the API layer from the `flagCodes` of the
+    returned results.
+  - Per-step timing uses an explicit hook: validators take an optional
+    `steps` callable and call it at every step boundary. One call in
+    METRICS_RULE_SAMPLE passes a StepTimer (through the validation executor
+    like any other call); the others pass None and only pay a `None` check
+    per step.
+  - SamplingProfiler snapshots thread stacks at a fixed interval and returns
+    folded stacks (flamegraph.pl / speedscope input). It only runs while a
+    profile is being taken.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; from a fast cache hit to a large batch
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds; single validation steps take well under a microsecond to ~100us
+STEP_BUCKETS = (1e-7, 2.5e-7, 5e-7, 1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3)
+# Bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1 << 20, 4 << 20, 16 << 20, 64 << 20)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in values]
+
+
+class Histogram:
+    """Histogram Prometheus dengan bucket tetap (satu bisect per observasi)"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels: Labels = ()) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def quantile(self, q: float, labels: Labels = ()) -> Optional[float]:
+        """Perkiraan kuantil dengan interpolasi linear di dalam bucket (seperti histogram_quantile)"""
+        series = self._series.get(labels)
+        if not series or not series[2]:
+            return None
+        rank = q * series[2]
+        cumulative = 0
+        for i, count in enumerate(series[0]):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, [list(value[0]), value[1], value[2]]) for key, value in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[Labels, float], Sequence[str]]]]] = []
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float], labels: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(name, documentation, buckets, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, collect: Callable):
+        """collect() -> iterable of (name, kind, help, {label values: value}, label names)"""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, documentation, values, label_names in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(
+                    f"{name}{_format_labels(label_names, key)} {float(value)}" for key, value in values.items()
+                )
+        return '\n'.join(lines) + '\n'
+
+
+# Step instrumentation ----------------------------------------------------------
+
+# (step label or None for the end, perf_counter(), flags raised so far)
+Mark = Tuple[Optional[str], float, int]
+
+
+class StepTimer:
+    """
+    Hook `steps` untuk validator: dipanggil di awal setiap langkah
+
+    The validator calls it with the step label and its flag count so far:
+        if steps is not None:
+            steps('anomaly_detection', len(flags))
+    Marks are plain tuples so they can come back from a worker process.
+    """
+    __slots__ = ('marks',)
+
+    def __init__(self):
+        self.marks: List[Mark] = [('setup', time.perf_counter(), 0)]
+
+    def __call__(self, label: str, flags: int):
+        self.marks.append((label, time.perf_counter(), flags))
+
+    def finish(self, flags: int) -> List[Mark]:
+        """Tutup langkah terakhir dengan jumlah flag hasil akhir"""
+        self.marks.append((None, time.perf_counter(), flags))
+        return self.marks
+
+
+def _flag_total(result) -> int:
+    return len(result.flags)
+
+
+class StepSampler:
+    """
+    Mengukur durasi tiap langkah validator pada satu dari `every` panggilan
+
+    Args:
+        metrics: Metrics tujuan
+        validator: Nama validator untuk label
+        every: Periode sampling
+        flag_count: result -> jumlah flag akhir
+    """
+
+    def __init__(self, metrics: 'Metrics', validator: str, every: int = 100,
+                 flag_count: Callable[[Any], int] = _flag_total):
+        self.metrics = metrics
+        self.validator = validator
+        self.every = max(1, every)
+        self.flag_count = flag_count
+        self._calls = 0
+
+    def should_sample(self) -> bool:
+        self._calls += 1
+        return self._calls % self.every == 0
+
+    def run(self, func: Callable, *args, **kwargs):
+        """func(*args, steps=StepTimer(), **kwargs) di thread ini, lalu catat langkahnya"""
+        timer = StepTimer()
+        result = func(*args, steps=timer, **kwargs)
+        self.record(timer.finish(self.flag_count(result)))
+        return result
+
+    def record(self, marks: Sequence[Mark]):
+        """Catat marks dari StepTimer (mis. dikembalikan oleh worker executor)"""
+        step_seconds = self.metrics.step_seconds
+        step_flags = self.metrics.step_flags
+        for (label, since, flags), (_, at, flag_count) in zip(marks, marks[1:]):
+            step_seconds.observe(at - since, (self.validator, label))
+            if flag_count > flags:
+                step_flags.inc((self.validator, label), flag_count - flags)
+        self.metrics.step_samples.inc((self.validator,))
+
+
+# Metrics facade -----------------------------------------------------------------
+
+class Metrics:
+    """
+    Semua metrik service; `enabled=False` berarti tidak ada yang dipasang
+
+    Args:
+        enabled: Aktifkan instrumentasi
+        step_sample: Satu dari N panggilan validator diukur per langkah
+    """
+
+    def __init__(self, enabled: bool = True, step_sample: int = 100):
+        self.enabled = enabled
+        self.step_sample = step_sample
+        self.registry = Registry()
+        r = self.registry
+        self.request_seconds = r.histogram(
+            'circularfund_request_duration_seconds', 'Request latency by route and status',
+            LATENCY_BUCKETS, ('route', 'method', 'status'))
+        self.request_bytes = r.histogram(
+            'circularfund_request_size_bytes', 'Request body size by route', SIZE_BUCKETS, ('route',))
+        self.response_bytes = r.histogram(
+            'circularfund_response_size_bytes', 'Response body size by route', SIZE_BUCKETS, ('route',))
+        self.validations = r.counter(
+            'circularfund_validations_total', 'Validation results returned', ('validator', 'valid'))
+        self.flags = r.counter(
+            'circularfund_validation_flags_total', 'Flags returned, by rule', ('validator', 'rule'))
+        self.step_seconds = r.histogram(
+            'circularfund_rule_step_duration_seconds', 'Duration of each validator step (sampled calls)',
+            STEP_BUCKETS, ('validator', 'step'))
+        self.step_flags = r.counter(
+            'circularfund_rule_step_flags_total', 'Flags raised by each validator step (sampled calls)',
+            ('validator', 'step'))
+        self.step_samples = r.counter(
+            'circularfund_rule_step_samples_total', 'Validator calls measured per step', ('validator',))
+        self._samplers: Dict[str, StepSampler] = {}
+
+    @classmethod
+    def from_env(cls) -> 'Metrics':
+        return cls(
+            enabled=os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+            step_sample=int(os.getenv('METRICS_RULE_SAMPLE', '100'))
+        )
+
+    def add_validator(self, name: str, flag_count: Callable[[Any], int] = _flag_total):
+        """Daftarkan validator untuk timing per langkah"""
+        if self.enabled:
+            self._samplers[name] = StepSampler(self, name, self.step_sample, flag_count)
+
+    def sampler(self, name: str) -> Optional[StepSampler]:
+        """StepSampler jika panggilan ini harus diukur, selain itu None"""
+        sampler = self._samplers.get(name)
+        if sampler is not None and sampler.should_sample():
+            return sampler
+        return None
+
+    def record_result(self, name: str, is_valid: bool, flag_codes: Sequence[str]):
+        """`flag_codes` is the result's flagCodes (one rule code per flag)"""
+        self.validations.inc((name, 'true' if is_valid else 'false'))
+        for code in flag_codes:
+            self.flags.inc((name, code))
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware untuk latency dan ukuran payload per route
+
+    Plain ASGI rather than BaseHTTPMiddleware, which adds a task and a
+    memory stream to every request. Unknown paths share one `other` label so
+    scanners cannot blow up the series count.
+    """
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+        self.routes: Optional[set] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        if self.routes is None:
+            # Routes are all registered by the time the first request arrives
+            self.routes = {route.path for route in scope['app'].routes if hasattr(route, 'path')}
+        path = scope['path']
+        route = path if path in self.routes else 'other'
+        state = {'status': 500, 'request': 0, 'response': 0}
+
+        async def counting_receive():
+            message = await receive()
+            if message['type'] == 'http.request':
+                state['request'] += len(message.get('body', b''))
+            return message
+
+        async def counting_send(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                state['response'] += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            metrics = self.metrics
+            metrics.request_seconds.observe(
+                time.perf_counter() - start, (route, scope['method'], str(state['status']))
+            )
+            metrics.request_bytes.observe(state['request'], (route,))
+            metrics.response_bytes.observe(state['response'], (route,))
+
+
+# Sampling profiler --------------------------------------------------------------
+
+class SamplingProfiler:
+    """
+    Profiler statistik: snapshot stack semua thread tiap `interval` detik
+
+    Only the current process is sampled (process-pool workers are not).
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def profile(self, seconds: float) -> Tuple[str, int]:
+        """Folded stacks ("a;b;c count") and the number of snapshots taken"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            own = threading.get_ident()
+            stacks: _Tally = _Tally()
+            snapshots = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own:
+                        continue
+                    stacks[self._fold(frame)] += 1
+                snapshots += 1
+                time.sleep(self.interval)
+        finally:
+            self._lock.release()
+        folded = '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common())
+        return folded + ('\n' if folded else ''), snapshots
+
+    def _fold(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
@@ -0,0 +1,373 @@
+"""
+Incremental re-scoring of stored submissions
+
+Keeps the last result of every submission together with what it was computed
+from, so a change re-runs only what depends on it:
+
+  - A field update re-runs the SubmissionValidator rules that read that field
+    (`SubmissionValidator.RULES`) and merges their outcomes with the stored
+    ones. The carbon claim is re-run only if its inputs changed.
+  - A new benchmark snapshot (BenchmarkStore swapping `CarbonValidator.rules`)
+    is diffed against the previous one, and only claims whose resolved
+    benchmark entry, sector profiles, calculation method or fallback changed
+    are re-run, in one vectorized batch when there are many.
+  - A new claim distribution model re-runs claims in the groups whose summary
+    changed.
+
+The carbon rules share one confidence chain, so on the carbon side a claim is
+the unit of recompute. Results use the /validate/stream line shape
+({id, validation, carbon}) and carry a sequence number that increases whenever
+a stored result changes, so callers can pull what a backfill changed.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from streaming import CLAIM_FIELDS, carbon_claim, split_record
+from validators.carbon_validator import CarbonValidator
+from validators.compiled_rules import CompiledRules
+from validators.submission_validator import RuleOutcome, SubmissionData, SubmissionValidator
+
+# Record fields that can change the carbon claim
+CLAIM_SOURCES = frozenset(('carbonReductionKg', 'carbonCalculationMethod', 'evidenceFiles') + CLAIM_FIELDS)
+
+# ('entry', profile key, scale) | ('sector', sector) | ('method', method)
+# | ('fallback',) | ('group', (sector, scale, method)) | ('all',)
+Dependency = Tuple[Any, ...]
+EVERYTHING: Dependency = ('all',)
+
+
+def carbon_dependencies(rules: CompiledRules, claim: Dict[str, Any]) -> FrozenSet[Dependency]:
+    """Bagian ruleset dan model distribusi yang dibaca validate_carbon_claim untuk klaim ini"""
+    sector = claim['sector']
+    scale = claim['business_scale']
+    method = claim['calculation_method']
+    dependencies = {('sector', sector), ('method', method), ('group', (sector, scale, method))}
+
+    profile_idx = rules.profile_for(sector, claim['sub_sector'], claim['region'])
+    if profile_idx is None:
+        profile_idx = rules.sector_index[rules.default_sector]
+        dependencies.add(('fallback',))
+    if scale not in rules.scale_index:
+        scale = rules.default_scale
+        dependencies.add(('fallback',))
+    dependencies.add(('entry', rules.profiles[profile_idx], scale))
+    return frozenset(dependencies)
+
+
+def _entry(rules: CompiledRules, profile: Tuple, scale: str) -> Optional[Tuple[float, float, float]]:
+    profile_idx = rules.profile_index.get(profile)
+    scale_idx = rules.scale_index.get(scale)
+    if profile_idx is None or scale_idx is None:
+        return None
+    i = rules.flat_index(profile_idx, scale_idx)
+    return rules.benchmark(i)
+
+
+def changed_dependencies(old: CompiledRules, new: CompiledRules) -> Set[Dependency]:
+    """Dependensi yang nilainya berbeda antara dua snapshot ruleset"""
+    if old.version == new.version:
+        return set()
+    if old.key_terms != new.key_terms:
+        return {EVERYTHING}  # details analysis of every claim
+
+    changed: Set[Dependency] = set()
+    old_profiles, new_profiles = set(old.profiles), set(new.profiles)
+    # An added or removed profile can change which profile a claim resolves to
+    changed.update(('sector', profile[0]) for profile in old_profiles ^ new_profiles)
+
+    scales = set(old.scales) | set(new.scales)
+    for profile in old_profiles | new_profiles:
+        for scale in scales:
+            if _entry(old, profile, scale) != _entry(new, profile, scale):
+                changed.add(('entry', profile, scale))
+
+    for method in set(old.method_factors) | set(new.method_factors) | set(old.method_keywords) | set(new.method_keywords):
+        if (old.method_factors.get(method) != new.method_factors.get(method)
+                or old.method_keywords.get(method) != new.method_keywords.get(method)):
+            changed.add(('method', method))
+
+    # Scales that became (in)valid change which claims fall back to the default scale
+    if (old.default_sector, old.default_scale) != (new.default_sector, new.default_scale) or set(old.scales) != set(new.scales):
+        changed.add(('fallback',))
+    return changed
+
+
+@dataclass
+class _Stored:
+    data: SubmissionData
+    claim_fields: Dict[str, Any]
+    outcomes: Dict[str, RuleOutcome]
+    validation: Dict[str, Any]
+    claim: Optional[Dict[str, Any]] = None
+    carbon: Optional[Dict[str, Any]] = None
+    dependencies: FrozenSet[Dependency] = frozenset()
+    sequence: int = 0
+
+
+@dataclass
+class Rescore:
+    """Apa yang dihitung ulang untuk satu submission"""
+    submission_id: str
+    rules: List[str] = field(default_factory=list)
+    carbon: bool = False
+    changed: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.submission_id, 'rules': self.rules, 'carbon': self.carbon, 'changed': self.changed}
+
+
+class RescoringEngine:
+    """
+    Hasil tersimpan per submission dengan dependency tracking
+
+    Args:
+        submission_validator: SubmissionValidator (default: baru)
+        carbon_validator: CarbonValidator yang rules/distribution-nya diikuti
+        batch_size: Mulai dari jumlah klaim terdampak ini, batch path yang dipakai
+        on_change: Dipanggil (id, result, record) setiap hasil tersimpan berubah;
+            result dan record None saat submission dihapus (mis. PortfolioStore.on_change)
+    """
+
+    def __init__(
+        self,
+        submission_validator: Optional[SubmissionValidator] = None,
+        carbon_validator: Optional[CarbonValidator] = None,
+        batch_size: int = 256,
+        on_change: Optional[Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]] = None
+    ):
+        self.submission_validator = submission_validator or SubmissionValidator()
+        self.carbon_validator = carbon_validator or CarbonValidator()
+        self.batch_size = batch_size
+        self.on_change = on_change
+        self._stored: Dict[str, _Stored] = {}
+        self._index: Dict[Dependency, Set[str]] = {}
+        # Submission ids, least recently changed first
+        self._order: 'OrderedDict[str, None]' = OrderedDict()
+        self._rules = self.carbon_validator.rules
+        self._distribution = self.carbon_validator.distribution
+        self._sequence = 0
+        self._lock = threading.RLock()
+        self.rule_runs = 0
+        self.claim_runs = 0
+
+    def __len__(self) -> int:
+        return len(self._stored)
+
+    def upsert(self, submission_id: str, record: Dict[str, Any]) -> Rescore:
+        """
+        Simpan record lengkap (field SubmissionData + CLAIM_FIELDS) dan hitung ulang yang berubah
+
+        Raises pydantic ValidationError for an invalid record (SubmissionData
+        or claim fields); the stored state is then left unchanged.
+        """
+        fields, claim_fields = split_record(record)
+        data = SubmissionData.model_validate(fields)
+        claim = carbon_claim(data, claim_fields)
+        with self._lock:
+            self._sync()
+            stored = self._stored.get(submission_id)
+            if stored is None:
+                return self._insert(submission_id, data, claim_fields, claim)
+            changed = {name for name in SubmissionData.model_fields if getattr(data, name) != getattr(stored.data, name)}
+            changed.update(name for name in CLAIM_FIELDS if claim_fields[name] != stored.claim_fields[name])
+            return self._apply(submission_id, stored, data, claim_fields, claim, changed)
+
+    def update(self, submission_id: str, changes: Dict[str, Any]) -> Rescore:
+        """Ubah sebagian field; KeyError jika submission belum tersimpan"""
+        with self._lock:
+            stored = self._stored[submission_id]
+            record = {**stored.data.model_dump(), **stored.claim_fields, **changes}
+            return self.upsert(submission_id, record)
+
+    def remove(self, submission_id: str) -> bool:
+        with self._lock:
+            stored = self._stored.pop(submission_id, None)
+            if stored is None:
+                return False
+            self._unindex(submission_id, stored.dependencies)
+            self._order.pop(submission_id, None)
+            if self.on_change is not None:
+                self.on_change(submission_id, None, None)
+            return True
+
+    def result(self, submission_id: str) -> Optional[Dict[str, Any]]:
+        stored = self._stored.get(submission_id)
+        if stored is None:
+            return None
+        return {
+            'id': submission_id,
+            'validation': stored.validation,
+            'carbon': stored.carbon,
+            'sequence': stored.sequence,
+        }
+
+    def claims(self) -> List[Dict[str, Any]]:
+        """Snapshot klaim karbon tersimpan (argumen validate_carbon_claim), mis. untuk scenario simulation"""
+        with self._lock:
+            return [stored.claim for stored in self._stored.values() if stored.claim is not None]
+
+    def changes(self, since: int = 0, limit: int = 1000) -> Tuple[List[Dict[str, Any]], int]:
+        """Hasil yang berubah setelah `since` (urut sequence) dan sequence untuk panggilan berikutnya"""
+        with self._lock:
+            self._sync()
+            newest_first = []
+            for submission_id in reversed(self._order):
+                if self._stored[submission_id].sequence <= since:
+                    break
+                newest_first.append(submission_id)
+            results = [self.result(submission_id) for submission_id in reversed(newest_first)][:limit]
+            return results, results[-1]['sequence'] if results else max(since, 0)
+
+    def sync(self) -> List[str]:
+        """Ikuti snapshot ruleset/distribusi terbaru; id submission yang klaimnya dihitung ulang"""
+        with self._lock:
+            return self._sync()
+
+    def _sync(self) -> List[str]:
+        rules = self.carbon_validator.rules
+        distribution = self.carbon_validator.distribution
+        dependencies: Set[Dependency] = set()
+        if rules is not self._rules:
+            dependencies |= changed_dependencies(self._rules, rules)
+            self._rules = rules
+        if distribution is not self._distribution:
+            old, self._distribution = self._distribution, distribution
+            dependencies.update(
+                dependency for dependency in self._index
+                if dependency[0] == 'group' and self._group(old, dependency[1]) != self._group(distribution, dependency[1])
+            )
+        if not dependencies:
+            return []
+
+        if EVERYTHING in dependencies:
+            affected = [submission_id for submission_id, stored in self._stored.items() if stored.claim is not None]
+        else:
+            affected = set()
+            for dependency in dependencies:
+                affected |= self._index.get(dependency, set())
+            affected = sorted(affected)
+        self._rescore_claims(affected)
+        return affected
+
+    @staticmethod
+    def _group(model, key):
+        return model.get(key) if model is not None else None
+
+    def _insert(
+        self,
+        submission_id: str,
+        data: SubmissionData,
+        claim_fields: Dict[str, Any],
+        claim: Optional[Dict[str, Any]]
+    ) -> Rescore:
+        validator = self.submission_validator
+        outcomes = {name: getattr(validator, name)(data) for name, _ in validator.RULES}
+        self.rule_runs += len(outcomes)
+        stored = _Stored(
+            data=data,
+            claim_fields=claim_fields,
+            outcomes=outcomes,
+            validation=validator.combine(outcomes.values()).model_dump()
+        )
+        self._set_claim(submission_id, stored, claim)
+        self._stored[submission_id] = stored
+        self._touch(submission_id, stored)
+        return Rescore(submission_id, [name for name, _ in validator.RULES], stored.claim is not None, True)
+
+    def _apply(
+        self,
+        submission_id: str,
+        stored: _Stored,
+        data: SubmissionData,
+        claim_fields: Dict[str, Any],
+        claim: Optional[Dict[str, Any]],
+        changed: Set[str]
+    ) -> Rescore:
+        validator = self.submission_validator
+        rescore = Rescore(submission_id)
+        outcomes = {
+            name: getattr(validator, name)(data) for name, fields in validator.RULES if changed.intersection(fields)
+        }
+        rescore.rules = list(outcomes)
+        self.rule_runs += len(rescore.rules)
+
+        before = (stored.validation, stored.carbon)
+        if changed & CLAIM_SOURCES and claim != stored.claim:
+            self._set_claim(submission_id, stored, claim)
+            rescore.carbon = True
+        stored.data = data
+        stored.claim_fields = claim_fields
+        if outcomes:
+            stored.outcomes.update(outcomes)
+            stored.validation = validator.combine(stored.outcomes[name] for name, _ in validator.RULES).model_dump()
+        rescore.changed = (stored.validation, stored.carbon) != before
+        if rescore.changed:
+            self._touch(submission_id, stored)
+        return rescore
+
+    def _set_claim(self, submission_id: str, stored: _Stored, claim: Optional[Dict[str, Any]]):
+        rules = self.carbon_validator.rules
+        carbon = self.carbon_validator.validate_carbon_claim(**claim).to_dict() if claim is not None else None
+        stored.claim = claim
+        stored.carbon = carbon
+        self.claim_runs += claim is not None
+        self._reindex(submission_id, stored, carbon_dependencies(rules, claim) if claim is not None else frozenset())
+
+    def _rescore_claims(self, submission_ids: List[str]):
+        if not submission_ids:
+            return
+        rules = self.carbon_validator.rules
+        claims = [self._stored[submission_id].claim for submission_id in submission_ids]
+        if len(claims) >= self.batch_size:
+            batch = self.carbon_validator.validate_carbon_claims_batch(
+                {column: [claim[column] for claim in claims] for column in claims[0]}
+            )
+            results = [batch.result_at(i).to_dict() for i in range(len(claims))]
+        else:
+            results = [self.carbon_validator.validate_carbon_claim(**claim).to_dict() for claim in claims]
+        self.claim_runs += len(claims)
+
+        for submission_id, claim, carbon in zip(submission_ids, claims, results):
+            stored = self._stored[submission_id]
+            self._reindex(submission_id, stored, carbon_dependencies(rules, claim))
+            if carbon != stored.carbon:
+                stored.carbon = carbon
+                self._touch(submission_id, stored)
+
+    def _reindex(self, submission_id: str, stored: _Stored, dependencies: FrozenSet[Dependency]):
+        if dependencies == stored.dependencies:
+            return
+        self._unindex(submission_id, stored.dependencies - dependencies)
+        for dependency in dependencies - stored.dependencies:
+            self._index.setdefault(dependency, set()).add(submission_id)
+        stored.dependencies = dependencies
+
+    def _unindex(self, submission_id: str, dependencies: Iterable[Dependency]):
+        for dependency in dependencies:
+            ids = self._index.get(dependency)
+            if ids is not None:
+                ids.discard(submission_id)
+                if not ids:
+                    del self._index[dependency]
+
+    def _touch(self, submission_id: str, stored: _Stored):
+        self._sequence += 1
+        stored.sequence = self._sequence
+        self._order[submission_id] = None
+        self._order.move_to_end(submission_id)
+        if self.on_change is not None:
+            self.on_change(submission_id, self.result(submission_id), {**stored.data.model_dump(), **stored.claim_fields})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'submissions': len(self._stored),
+            'claims': sum(1 for stored in self._stored.values() if stored.claim is not None),
+            'dependencies': len(self._index),
+            'sequence': self._sequence,
+            'ruleRuns': self.rule_runs,
+            'claimRuns': self.claim_runs,
+            'rulesVersion': self._rules.version,
+        }
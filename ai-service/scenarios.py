@@ -0,0 +1,302 @@
+"""
+Scenario Simulation
+What-if: klaim mana yang berubah valid/invalid jika benchmark atau bucket bukti minimum diubah
+
+A corpus of claims is analysed once: profile lookup, outlier scores, evidence
+figures and text analysis do not depend on the benchmark numbers
+(CarbonBatchFeatures). Each candidate ruleset then only re-applies the
+min/max/typical tables and the minimum-evidence buckets, chunk by chunk in
+one pass over the corpus, so several scenarios over millions of claims run
+in seconds. The baseline goes through the same code, so a scenario without
+changes reports zero flips.
+
+Scenarios are changes relative to the active ruleset (same profiles and
+scales); new sectors or profile variants need a benchmark file reload.
+
+Usage:
+    python scenarios.py claims.parquet scenarios.json
+    python scenarios.py claims.csv scenarios.json --benchmarks benchmarks.csv -o report.json
+
+`claims` has the /estimate-carbon/batch columns (carbon_reduction_kg,
+calculation_method, sector, business_scale, evidence_count, details, ...);
+`scenarios.json` is a list of scenario objects, see Scenario.from_dict.
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from validators.carbon_validator import BatchInput, CarbonBatchFeatures, CarbonValidator
+from validators.compiled_rules import CompiledRules
+
+FIELDS = ('min', 'max', 'typical')
+
+# Benchmark-dependent rules counted per scenario
+COUNTED_RULES = ('too_low', 'too_high', 'above_typical', 'insufficient_evidence')
+
+HISTOGRAM_BINS = 10
+
+# (min, max, typical) per flat benchmark entry, plus the evidence buckets
+Tables = Tuple[np.ndarray, np.ndarray, np.ndarray, Tuple[float, ...], Tuple[int, ...]]
+
+
+@dataclass
+class Scenario:
+    """
+    Satu ruleset kandidat, dinyatakan sebagai perubahan terhadap ruleset aktif
+
+    Args:
+        name: Label di laporan
+        benchmarks: profil ("Fashion", "Fashion (Batik, Jawa Barat)") -> skala
+            -> sebagian dari {min, max, typical}
+        multipliers: {min|max|typical: faktor} untuk semua entry, sebelum `benchmarks`
+        min_evidence_ratios: Pengganti CarbonValidator.MIN_EVIDENCE_RATIOS
+        min_evidence_counts: Pengganti CarbonValidator.MIN_EVIDENCE_COUNTS
+    """
+    name: str
+    benchmarks: Dict[str, Dict[str, Dict[str, float]]] = field(default_factory=dict)
+    multipliers: Dict[str, float] = field(default_factory=dict)
+    min_evidence_ratios: Optional[Tuple[float, ...]] = None
+    min_evidence_counts: Optional[Tuple[int, ...]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Scenario':
+        """JSON form: {"name", "benchmarks", "multipliers", "minEvidenceRatios", "minEvidenceCounts"}"""
+        ratios = data.get('minEvidenceRatios')
+        counts = data.get('minEvidenceCounts')
+        return cls(
+            name=str(data['name']),
+            benchmarks=data.get('benchmarks') or {},
+            multipliers=data.get('multipliers') or {},
+            min_evidence_ratios=tuple(float(ratio) for ratio in ratios) if ratios is not None else None,
+            min_evidence_counts=tuple(int(count) for count in counts) if counts is not None else None
+        )
+
+    def tables(self, rules: CompiledRules, validator: CarbonValidator) -> Tables:
+        """Tabel datar untuk snapshot `rules`; ValueError untuk profil/skala/field yang tidak dikenal"""
+        unknown = set(self.multipliers) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"{self.name}: unknown multiplier {sorted(unknown)}, expected {list(FIELDS)}")
+        columns = {
+            key: rules.bench_arrays[key] * float(self.multipliers.get(key, 1.0))
+            for key in FIELDS
+        }
+
+        profiles = {label: i for i, label in enumerate(rules.profile_labels)}
+        for label, scales in self.benchmarks.items():
+            if label not in profiles:
+                raise ValueError(f"{self.name}: unknown benchmark profile {label!r}")
+            for scale, entry in scales.items():
+                if scale not in rules.scale_index:
+                    raise ValueError(f"{self.name}: unknown scale {scale!r} for {label!r}")
+                for key, value in entry.items():
+                    if key not in columns:
+                        raise ValueError(f"{self.name}: unknown benchmark field {key!r}, expected {list(FIELDS)}")
+                    columns[key][rules.flat_index(profiles[label], rules.scale_index[scale])] = float(value)
+        if np.any(columns['min'] > columns['max']):
+            raise ValueError(f"{self.name}: a benchmark min is above its max")
+
+        ratios = validator.MIN_EVIDENCE_RATIOS if self.min_evidence_ratios is None else self.min_evidence_ratios
+        counts = validator.MIN_EVIDENCE_COUNTS if self.min_evidence_counts is None else self.min_evidence_counts
+        if len(counts) != len(ratios) + 1:
+            raise ValueError(f"{self.name}: minEvidenceCounts needs one entry more than minEvidenceRatios")
+        if list(ratios) != sorted(ratios):
+            raise ValueError(f"{self.name}: minEvidenceRatios must be ascending")
+        return columns['min'], columns['max'], columns['typical'], tuple(ratios), tuple(counts)
+
+
+class _Totals:
+    """Akumulator per (sektor, skala) untuk satu ruleset"""
+
+    def __init__(self, groups: int):
+        self.claims = np.zeros(groups, dtype=np.int64)
+        self.valid = np.zeros(groups, dtype=np.int64)
+        self.confidence = np.zeros(groups, dtype=np.float64)
+        self.became_invalid = np.zeros(groups, dtype=np.int64)
+        self.became_valid = np.zeros(groups, dtype=np.int64)
+        self.histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self.rules = {name: 0 for name in COUNTED_RULES}
+
+    def add(self, group: np.ndarray, outcome: Dict[str, np.ndarray], baseline: Optional[np.ndarray]):
+        groups = len(self.claims)
+        valid = outcome['is_valid']
+        # Two decimals, as reported by the API
+        confidence = np.round(outcome['confidence'], 2)
+        self.claims += np.bincount(group, minlength=groups)
+        self.valid += np.bincount(group, weights=valid, minlength=groups).astype(np.int64)
+        self.confidence += np.bincount(group, weights=confidence, minlength=groups)
+        if baseline is not None:
+            self.became_invalid += np.bincount(group, weights=baseline & ~valid, minlength=groups).astype(np.int64)
+            self.became_valid += np.bincount(group, weights=~baseline & valid, minlength=groups).astype(np.int64)
+        bins = np.minimum(np.floor(confidence * HISTOGRAM_BINS + 1e-9).astype(np.intp), HISTOGRAM_BINS - 1)
+        self.histogram += np.bincount(bins, minlength=HISTOGRAM_BINS)
+        for name in COUNTED_RULES:
+            self.rules[name] += int(np.count_nonzero(outcome[name]))
+
+    def summary(self) -> Dict[str, Any]:
+        claims = int(self.claims.sum())
+        return {
+            'valid': int(self.valid.sum()),
+            'becameInvalid': int(self.became_invalid.sum()),
+            'becameValid': int(self.became_valid.sum()),
+            'meanConfidence': round(float(self.confidence.sum()) / claims, 4) if claims else None,
+            'histogram': self.histogram.tolist(),
+            'flags': dict(self.rules),
+        }
+
+
+class ClaimCorpus:
+    """
+    Korpus klaim untuk what-if; features dihitung sekali per snapshot ruleset/distribusi
+
+    Args:
+        validator: CarbonValidator yang ruleset aktifnya menjadi baseline
+        claims: DataFrame atau mapping kolom (kolom /estimate-carbon/batch)
+        chunk_size: Baris per potongan saat mengevaluasi skenario (batas memori)
+    """
+
+    def __init__(self, validator: CarbonValidator, claims: BatchInput, chunk_size: int = 200_000):
+        self.validator = validator
+        self.claims = claims
+        self.chunk_size = chunk_size
+        self._features: Optional[CarbonBatchFeatures] = None
+        self._snapshot = None
+        self.feature_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self.features())
+
+    @classmethod
+    def from_records(cls, validator: CarbonValidator, records: Sequence[Dict[str, Any]], **kwargs) -> 'ClaimCorpus':
+        """Dari dict argumen validate_carbon_claim (mis. RescoringEngine.claims())"""
+        columns = ('carbon_reduction_kg', 'calculation_method', 'sector', 'business_scale', 'evidence_count',
+                   'details', 'sub_sector', 'region', 'documented_quantity')
+        return cls(validator, {column: [record.get(column) for record in records] for column in columns}, **kwargs)
+
+    def features(self) -> CarbonBatchFeatures:
+        snapshot = (self.validator.rules, self.validator.distribution)
+        if self._features is None or snapshot[0] is not self._snapshot[0] or snapshot[1] is not self._snapshot[1]:
+            start = time.perf_counter()
+            self._features = self.validator.batch_features(self.claims)
+            self._snapshot = snapshot
+            self.feature_seconds = time.perf_counter() - start
+        return self._features
+
+    def simulate(self, scenarios: Sequence[Scenario]) -> Dict[str, Any]:
+        """
+        Evaluasi baseline + semua skenario dalam satu lintasan atas korpus
+
+        Returns per scenario the overall and per-(sector, scale) counts of
+        valid claims, claims that flip against the baseline, mean confidence,
+        a confidence histogram and how often each benchmark rule fires.
+        """
+        features = self.features()
+        start = time.perf_counter()
+        validator = self.validator
+        rules = features.rules
+        tables: List[Optional[Tables]] = [None] + [scenario.tables(rules, validator) for scenario in scenarios]
+
+        # Group per row: resolved base sector x scale, plus "unknown"/"invalid" slots
+        sectors, scales = len(rules.sectors), len(rules.scales)
+        profile_sector = np.array([rules.sector_index[profile[0]] for profile in rules.profiles], dtype=np.intp)
+        sector_group = np.where(features.unknown_sector, sectors, profile_sector.take(features.sector_idx))
+        scale_group = np.where(features.invalid_scale, scales, features.scale_idx)
+        group = sector_group * (scales + 1) + scale_group
+
+        totals = [_Totals((sectors + 1) * (scales + 1)) for _ in tables]
+        for chunk_start in range(0, len(features), self.chunk_size):
+            chunk = features.rows(chunk_start, chunk_start + self.chunk_size)
+            chunk_group = group[chunk_start:chunk_start + self.chunk_size]
+            flat_idx = chunk.flat_idx
+            baseline = None
+            for table, total in zip(tables, totals):
+                if table is None:
+                    outcome = validator.batch_outcome(chunk)
+                    baseline = outcome['is_valid']
+                    total.add(chunk_group, outcome, None)
+                    continue
+                bench_min, bench_max, typical, ratios, counts = table
+                outcome = validator.batch_outcome(
+                    chunk, bench_min.take(flat_idx), bench_max.take(flat_idx), typical.take(flat_idx), ratios, counts
+                )
+                total.add(chunk_group, outcome, baseline)
+
+        sector_labels = list(rules.sectors) + ['(unknown)']
+        scale_labels = list(rules.scales) + ['(invalid)']
+        base = totals[0]
+        results = []
+        for scenario, total in zip(scenarios, totals[1:]):
+            groups = []
+            for g in np.flatnonzero(total.claims):
+                claims = int(total.claims[g])
+                groups.append({
+                    'sector': sector_labels[g // (scales + 1)],
+                    'scale': scale_labels[g % (scales + 1)],
+                    'claims': claims,
+                    'baselineValid': int(base.valid[g]),
+                    'valid': int(total.valid[g]),
+                    'becameInvalid': int(total.became_invalid[g]),
+                    'becameValid': int(total.became_valid[g]),
+                    'baselineMeanConfidence': round(float(base.confidence[g]) / claims, 4),
+                    'meanConfidence': round(float(total.confidence[g]) / claims, 4),
+                })
+            groups.sort(key=lambda item: (-(item['becameInvalid'] + item['becameValid']), -item['claims']))
+            results.append({'name': scenario.name, **total.summary(), 'groups': groups})
+
+        baseline_summary = base.summary()
+        del baseline_summary['becameInvalid'], baseline_summary['becameValid']
+        return {
+            'claims': len(features),
+            'rulesVersion': rules.version,
+            'featureSeconds': round(self.feature_seconds, 3),
+            'simulationSeconds': round(time.perf_counter() - start, 3),
+            'baseline': baseline_summary,
+            'scenarios': results,
+        }
+
+
+def read_claims(path: str):
+    import pandas as pd
+
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.read_json(path, lines=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay candidate benchmark rulesets over a claims corpus")
+    parser.add_argument('claims', help="Claims as Parquet, CSV or NDJSON (/estimate-carbon/batch columns)")
+    parser.add_argument('scenarios', help="JSON list of scenarios")
+    parser.add_argument('--benchmarks', default=None, help="Baseline benchmark file (default: built-in tables)")
+    parser.add_argument('-o', '--output', default=None, help="Write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    validator = CarbonValidator()
+    if args.benchmarks:
+        from validators.benchmark_store import parse_benchmark_file
+        with open(args.benchmarks, 'rb') as f:
+            validator.load_benchmarks(parse_benchmark_file(f.read(), args.benchmarks))
+    with open(args.scenarios, encoding='utf-8') as f:
+        scenarios = [Scenario.from_dict(item) for item in json.load(f)]
+
+    corpus = ClaimCorpus(validator, read_claims(args.claims))
+    report = corpus.simulate(scenarios)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    print(f"{report['claims']} claims, {len(scenarios)} scenarios: features {report['featureSeconds']}s, "
+          f"simulation {report['simulationSeconds']}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+Streaming re-validation of submission exports
+
+Reads NDJSON or CSV submissions incrementally, runs them through the /validate
+rules and CarbonValidator in fixed-size chunks, and writes one NDJSON result
+line per input record. Only one chunk is held in memory at a time, so a
+multi-GB export can be piped through with constant memory.
+
+Usage:
+    python streaming.py submissions.ndjson -o results.ndjson
+    psql -c "\\copy (SELECT ...) TO STDOUT CSV HEADER" | python streaming.py - --format csv
+"""
+
+import argparse
+import codecs
+import csv
+import json
+import os
+import re
+import sys
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+)
+
+from pydantic import BaseModel, ValidationError
+
+sys.path.append(os.path.dirname(__file__))
+from validators.carbon_validator import CarbonValidator
+from validators.submission_validator import SubmissionData, SubmissionValidator
+
+DEFAULT_CHUNK_SIZE = 1000
+READ_SIZE = 64 * 1024
+# Characters; a longer record (e.g. a CSV field left open by a stray quote)
+# becomes a per-record error instead of buffering the rest of the input
+MAX_RECORD_SIZE = 1 << 20
+
+FORMATS = ('ndjson', 'csv')
+
+
+class ClaimFields(BaseModel):
+    # Record fields that only feed the carbon claim (not part of SubmissionData);
+    # CSV gives evidenceCount as text
+    sector: Optional[str] = None
+    businessScale: Optional[str] = None
+    subSector: Optional[str] = None
+    region: Optional[str] = None
+    carbonDetails: Optional[str] = None
+    evidenceCount: Optional[int] = None
+
+
+CLAIM_FIELDS = tuple(ClaimFields.model_fields)
+
+
+_CAMEL_BOUNDARY = re.compile(r'_([a-z])')
+
+
+def _to_camel(key: str) -> str:
+    """Database column names (snake_case) -> SubmissionData field names"""
+    return _CAMEL_BOUNDARY.sub(lambda match: match.group(1).upper(), key)
+
+
+def split_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """camelCase record (tanpa id) -> (field SubmissionData, field klaim karbon)"""
+    fields = dict(record)
+    claim_fields = {name: fields.pop(name, None) for name in CLAIM_FIELDS}
+    return fields, claim_fields
+
+
+def carbon_claim(data: SubmissionData, claim_fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Argumen validate_carbon_claim untuk satu record, None jika klaimnya tidak lengkap
+
+    Raises ValidationError when a claim field has the wrong type (a list as
+    sector, "two" as evidenceCount; "2" and 2.0 are accepted), like a bad
+    SubmissionData field.
+    """
+    claim = ClaimFields.model_validate(claim_fields)
+    if not (claim.sector and claim.businessScale and data.carbonReductionKg is not None
+            and data.carbonCalculationMethod):
+        return None
+    return {
+        'carbon_reduction_kg': data.carbonReductionKg,
+        'calculation_method': data.carbonCalculationMethod,
+        'sector': claim.sector,
+        'business_scale': claim.businessScale,
+        'evidence_count': claim.evidenceCount if claim.evidenceCount is not None else len(data.evidenceFiles or []),
+        'details': claim.carbonDetails,
+        'sub_sector': claim.subSector,
+        'region': claim.region,
+    }
+
+
+def format_errors(error: ValidationError) -> List[str]:
+    """ValidationError -> pesan 'field: msg' (juga dipakai API)"""
+    return [
+        f"{'.'.join(str(part) for part in item['loc']) or 'data'}: {item['msg']}"
+        for item in error.errors()
+    ]
+
+
+class RecordReader:
+    """
+    Incremental record splitter for NDJSON or CSV text
+
+    Text is fed in arbitrary chunks; complete records are returned as dicts.
+    CSV records may span several lines when a quoted field contains a newline,
+    so lines are joined until the quote count is balanced (parity is tracked
+    per line). A record over MAX_RECORD_SIZE characters is dropped with an
+    `_error` record and reading resumes at the next line.
+    """
+
+    def __init__(self, fmt: str = 'ndjson'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}', expected one of {FORMATS}")
+        self.fmt = fmt
+        self._buffer = ''
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._in_quotes = False
+        self._skipping = False  # rest of an oversized line is discarded
+        self._header: Optional[List[str]] = None
+
+    def feed(self, text: str) -> List[Dict]:
+        if self._skipping:
+            newline = text.find('\n')
+            if newline < 0:
+                return []
+            text, self._skipping = text[newline + 1:], False
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        records = self._parse_lines(lines)
+        if len(self._buffer) + self._pending_size > MAX_RECORD_SIZE:
+            self._buffer, self._skipping = '', True
+            records.append(self._drop_pending())
+        return records
+
+    def close(self) -> List[Dict]:
+        lines, self._buffer = [self._buffer], ''
+        records = self._parse_lines(lines)
+        if self._pending:
+            raise ValueError("Unterminated quoted field at end of CSV input")
+        return records
+
+    def _drop_pending(self) -> Dict:
+        self._pending, self._pending_size, self._in_quotes = [], 0, False
+        return {'_error': f"Record longer than {MAX_RECORD_SIZE} characters"}
+
+    def _parse_lines(self, lines: List[str]) -> List[Dict]:
+        records = []
+        for line in lines:
+            if self.fmt == 'ndjson':
+                if line.strip():
+                    records.append(self._parse_json(line))
+                continue
+
+            self._pending.append(line)
+            self._pending_size += len(line) + 1
+            if line.count('"') % 2:
+                self._in_quotes = not self._in_quotes
+            if self._in_quotes:
+                if self._pending_size > MAX_RECORD_SIZE:
+                    records.append(self._drop_pending())
+                continue  # quoted field continues on the next line
+            record_text = '\n'.join(self._pending)
+            self._pending, self._pending_size = [], 0
+            if not record_text.strip():
+                continue
+            values = next(csv.reader([record_text]))
+            if self._header is None:
+                self._header = values
+                continue
+            records.append(self._parse_csv_row(values))
+        return records
+
+    @staticmethod
+    def _parse_json(line: str) -> Dict:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            return {'_error': f"Invalid JSON: {e.msg}"}
+        if not isinstance(record, dict):
+            return {'_error': "Record must be a JSON object"}
+        return record
+
+    def _parse_csv_row(self, values: List[str]) -> Dict:
+        record = {}
+        for key, value in zip(self._header, values):
+            value = value.strip()
+            if value == '':
+                record[key] = None
+            elif value.startswith('['):
+                try:
+                    record[key] = json.loads(value)
+                except json.JSONDecodeError:
+                    record[key] = value
+            else:
+                record[key] = value
+        return record
+
+
+class StreamValidator:
+    """Validate records chunk by chunk and render NDJSON result lines"""
+
+    def __init__(
+        self,
+        submission_validator: Optional[SubmissionValidator] = None,
+        carbon_validator: Optional[CarbonValidator] = None
+    ):
+        self.submission_validator = submission_validator or SubmissionValidator()
+        self.carbon_validator = carbon_validator or CarbonValidator()
+
+    def validate_chunk(self, records: List[Dict]) -> List[str]:
+        """Validate one chunk of raw records and return NDJSON lines"""
+        outputs = []
+        carbon_rows = []
+
+        for position, raw in enumerate(records):
+            if '_error' in raw:
+                outputs.append({'id': None, 'errors': [raw['_error']]})
+                continue
+            record = {_to_camel(key): value for key, value in raw.items()}
+            record_id = record.pop('id', None)
+            fields, claim_fields = split_record(record)
+            try:
+                data = SubmissionData.model_validate(fields)
+                claim = carbon_claim(data, claim_fields)
+            except ValidationError as e:
+                outputs.append({'id': record_id, 'errors': format_errors(e)})
+                continue
+
+            output = {
+                'id': record_id,
+                'validation': self.submission_validator.validate_submission(data).model_dump(),
+                'carbon': None,
+            }
+            outputs.append(output)
+
+            if claim is not None:
+                carbon_rows.append((position, claim))
+
+        if carbon_rows:
+            batch = self.carbon_validator.validate_carbon_claims_batch({
+                column: [row[column] for _, row in carbon_rows]
+                for column in carbon_rows[0][1]
+            })
+            for i, (position, _) in enumerate(carbon_rows):
+                outputs[position]['carbon'] = batch.result_at(i).to_dict()
+
+        return [json.dumps(output, ensure_ascii=False) + '\n' for output in outputs]
+
+    def iter_validate(
+        self,
+        text_chunks: Iterable[str],
+        fmt: str = 'ndjson',
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[str]:
+        """Lazily validate a stream of text chunks, yielding NDJSON lines"""
+        reader = RecordReader(fmt)
+        pending: List[Dict] = []
+        for text in text_chunks:
+            pending.extend(reader.feed(text))
+            while len(pending) >= chunk_size:
+                yield from self.validate_chunk(pending[:chunk_size])
+                del pending[:chunk_size]
+        pending.extend(reader.close())
+        for start in range(0, len(pending), chunk_size):
+            yield from self.validate_chunk(pending[start:start + chunk_size])
+
+    async def aiter_validate(
+        self,
+        byte_chunks: AsyncIterable[bytes],
+        fmt: str = 'ndjson',
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        run_chunk: Optional[Callable[[List[Dict]], Awaitable[List[str]]]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Async variant for request bodies
+
+        Input is only pulled when the consumer asks for more output, so a slow
+        client throttles how fast the request body is read. `run_chunk` offloads
+        the CPU-bound validation of one chunk (e.g. to a worker pool).
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        reader = RecordReader(fmt)
+        pending: List[Dict] = []
+
+        async def flush(records: List[Dict]) -> List[str]:
+            if run_chunk is None:
+                return self.validate_chunk(records)
+            return await run_chunk(records)
+
+        async for chunk in byte_chunks:
+            pending.extend(reader.feed(decoder.decode(chunk)))
+            while len(pending) >= chunk_size:
+                for line in await flush(pending[:chunk_size]):
+                    yield line
+                del pending[:chunk_size]
+        pending.extend(reader.feed(decoder.decode(b'', final=True)))
+        pending.extend(reader.close())
+        for start in range(0, len(pending), chunk_size):
+            for line in await flush(pending[start:start + chunk_size]):
+                yield line
+
+
+def _read_chunks(stream) -> Iterator[str]:
+    while True:
+        text = stream.read(READ_SIZE)
+        if not text:
+            return
+        yield text
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Re-validate a submission export as a stream")
+    parser.add_argument('input', help="NDJSON/CSV file, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="Output NDJSON file (default: stdout)")
+    parser.add_argument('--format', choices=FORMATS, default=None,
+                        help="Input format (default: from file extension, else ndjson)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'ndjson')
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', newline='')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    try:
+        for line in StreamValidator().iter_validate(_read_chunks(source), fmt, args.chunk_size):
+            target.write(line)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Test suite for admission control (deadlines, priority queue, load shedding)
+"""
+
+import asyncio
+import time
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import main
+from admission import BATCH, INTERACTIVE, AdmissionMiddleware, PriorityLimiter, Rejected, current_priority
+from executor import ValidationExecutor
+
+def test_queue_serves_interactive_before_batch():
+    limiter = PriorityLimiter(1)
+    order = []
+    
+    async def job(name, priority):
+        permit = await limiter.acquire(name, priority)
+        order.append(name)
+        limiter.release(permit)
+    
+    async def run():
+        held = await limiter.acquire('held')
+        tasks = [asyncio.create_task(job(name, priority)) for name, priority in
+                 (('batch-1', BATCH), ('batch-2', BATCH), ('interactive', INTERACTIVE))]
+        await asyncio.sleep(0)
+        assert limiter.stats()['queued'] == {'interactive': 1, 'batch': 2}
+        limiter.release(held)
+        await asyncio.gather(*tasks)
+    
+    asyncio.run(run())
+    assert order == ['interactive', 'batch-1', 'batch-2']
+    assert limiter.stats()['running'] == 0
+
+def test_reserved_permits_stay_free_for_interactive():
+    limiter = PriorityLimiter(2, reserved=1)
+    
+    async def run():
+        batch = await limiter.acquire('/validate/batch', BATCH)
+        waiting = asyncio.create_task(limiter.acquire('/validate/batch', BATCH))
+        await asyncio.sleep(0)
+        assert not waiting.done()  # one permit free, but reserved
+        interactive = await asyncio.wait_for(limiter.acquire('/validate', INTERACTIVE), 0.1)
+        limiter.release(interactive)
+        assert not waiting.done()
+        limiter.release(batch)
+        limiter.release(await waiting)
+    
+    asyncio.run(run())
+    assert limiter.stats()['running'] == 0 and limiter.counts['admitted'] == 3
+
+def test_batch_pauses_while_interactive_runs():
+    limiter = PriorityLimiter(2)
+    
+    async def run():
+        await asyncio.wait_for(limiter.pause(BATCH), 0.01)  # nothing interactive: no wait
+        interactive = await limiter.acquire('/validate', INTERACTIVE)
+        paused = asyncio.create_task(limiter.pause(BATCH, limit=1.0))
+        await asyncio.sleep(0.01)
+        assert not paused.done()
+        limiter.release(interactive)
+        await asyncio.wait_for(paused, 0.1)
+    
+        held = await limiter.acquire('/validate', INTERACTIVE)
+        start = time.perf_counter()
+        await limiter.pause(BATCH, limit=0.02)  # bounded
+        limiter.release(held)
+        return time.perf_counter() - start
+    
+    assert asyncio.run(run()) < 0.5
+
+def test_rejects_early_when_the_deadline_cannot_be_met():
+    limiter = PriorityLimiter(1)
+    limiter.costs['/slow'] = 2.0
+    
+    async def run():
+        held = await limiter.acquire('/slow')
+        with pytest.raises(Rejected) as error:
+            await limiter.acquire('/slow', INTERACTIVE, time.monotonic() + 0.5)
+        limiter.release(held)
+        return error.value
+    
+    error = asyncio.run(run())
+    assert error.status_code == 503 and error.reason == 'deadline'
+    assert int(error.headers['Retry-After']) >= 1
+    assert limiter.counts['rejected_deadline'] == 1
+
+def test_full_queue_sheds_batch_for_interactive():
+    limiter = PriorityLimiter(1, max_queue=1)
+    
+    async def run():
+        held = await limiter.acquire('held')
+        batch = asyncio.create_task(limiter.acquire('/validate/batch', BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(limiter.acquire('/validate', INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as shed:
+            await batch
+        assert shed.value.reason == 'shed'
+    
+        with pytest.raises(Rejected) as full:
+            await limiter.acquire('/validate', INTERACTIVE)
+        assert full.value.reason == 'queue_full' and full.value.status_code == 503
+    
+        limiter.release(held)
+        limiter.release(await interactive)
+    
+    asyncio.run(run())
+    assert limiter.counts['shed'] == 1 and limiter.counts['rejected_full'] == 1
+    assert limiter.stats()['running'] == 0
+
+def test_expired_waiters_never_run():
+    limiter = PriorityLimiter(1)
+    
+    async def run():
+        held = await limiter.acquire('held')
+        with pytest.raises(Rejected) as expired:
+            await limiter.acquire('/validate', INTERACTIVE, time.monotonic() + 0.02)
+        assert expired.value.status_code == 504
+        limiter.release(held)
+        # The expired entry is skipped; the next request gets the permit at once
+        permit = await asyncio.wait_for(limiter.acquire('/validate'), 0.1)
+        limiter.release(permit)
+    
+    asyncio.run(run())
+    assert limiter.counts['expired'] == 1
+    assert limiter.counts['admitted'] == 2
+
+def test_middleware_cancels_work_past_its_deadline():
+    cancelled = []
+    app = FastAPI()
+    
+    @app.post('/validate')
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {'ok': True}
+    
+    limiter = PriorityLimiter(1, max_queue=4)
+    app.add_middleware(AdmissionMiddleware, limiter=limiter, paths={'/validate': INTERACTIVE})
+    
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            start = time.perf_counter()
+            response = await client.post('/validate', headers={'X-Request-Deadline-Ms': '50'})
+            return response, time.perf_counter() - start
+    
+    response, elapsed = asyncio.run(run())
+    assert response.status_code == 504
+    assert elapsed < 0.5
+    assert cancelled == [True]
+    assert limiter.counts['cancelled'] == 1 and limiter.stats()['running'] == 0
+
+def test_executor_starts_interactive_chunks_first():
+    executor = ValidationExecutor('thread', workers=1, chunk_size=1)
+    order = []
+    
+    def work(items):
+        time.sleep(0.01)
+        order.extend(items)
+        return items
+    
+    async def interactive():
+        await asyncio.sleep(0.005)  # after the batch chunks are queued
+        current_priority.set(INTERACTIVE)
+        return await executor.run(work, ['interactive'])
+    
+    async def batch():
+        current_priority.set(BATCH)
+        return await executor.map_chunks(work, [f'batch-{i}' for i in range(5)])
+    
+    async def run():
+        return await asyncio.gather(batch(), interactive())
+    
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert order.index('interactive') <= 1
+    assert executor.limiter.stats()['running'] == 0
+
+def test_service_routes_are_admitted():
+    client = TestClient(main.app)
+    response = client.post('/estimate-carbon', params={
+        'carbon_reduction_kg': 500, 'calculation_method': 'waste_diverted', 'sector': 'Fashion',
+        'business_scale': 'small', 'evidence_count': 3,
+    }, headers={'X-Request-Deadline-Ms': '5000', 'X-Request-Priority': 'interactive'})
+    assert response.status_code == 200
+    
+    stats = client.get('/admission/stats').json()
+    assert stats['requests']['admitted'] >= 1
+    assert '/estimate-carbon' in stats['requests']['serviceTime']
+    assert stats['executor'] is None  # inline executor
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
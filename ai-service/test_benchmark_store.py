@@ -0,0 +1,220 @@
+"""
+Test suite for the benchmark store
+"""
+
+import gc
+import os
+import threading
+import time
+import numpy as np
+import pytest
+from validators.benchmark_store import BenchmarkStore, parse_benchmark_file
+from validators.carbon_validator import CarbonValidator
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), 'data', 'benchmarks.json')
+
+CSV = """sector,sub_sector,region,scale,min,max,typical
+Fashion,,,small,100,2000,500
+Fashion,,,medium,500,5000,2000
+Fashion,Batik,,small,150,2500,700
+Fashion,Batik,,medium,600,6000,2500
+Fashion,Batik,Jawa Barat,small,200,2600,800
+Fashion,Batik,Jawa Barat,medium,700,7000,3000
+Kerajinan,,,small,50,1500,400
+Kerajinan,,,medium,300,4000,1500
+"""
+
+def write(path, text):
+    # Same rename dance production updates should use
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def test_data_file_matches_builtin_tables():
+    validator = CarbonValidator()
+    
+    with open(DATA_FILE, 'rb') as f:
+        benchmark_set = parse_benchmark_file(f.read(), DATA_FILE)
+    
+    assert benchmark_set.version == '2024.1'
+    assert validator.compile_rules(benchmark_set).version == validator.rules.version
+
+def test_most_specific_profile_wins(tmp_path):
+    path = str(tmp_path / 'benchmarks.csv')
+    write(path, CSV)
+    validator = CarbonValidator()
+    BenchmarkStore(path, validator).load()
+    rules = validator.rules
+    
+    assert rules.profile_for('Fashion') == rules.sector_index['Fashion']
+    assert rules.profiles[rules.profile_for('Fashion', 'Batik', 'Jawa Barat')] == ('Fashion', 'Batik', 'Jawa Barat')
+    assert rules.profiles[rules.profile_for('Fashion', 'Batik', 'Bali')] == ('Fashion', 'Batik', None)
+    assert rules.profile_for('Fashion', 'Tenun') == rules.sector_index['Fashion']
+    assert rules.profile_for('Unknown', 'Batik') is None
+    
+    # 2200 kg is above the base Fashion max (2000) but within the Batik one
+    base = validator.validate_carbon_claim(2200, 'other', 'Fashion', 'small', 6, 'x')
+    batik = validator.validate_carbon_claim(2200, 'other', 'Fashion', 'small', 6, 'x', sub_sector='Batik')
+    assert base.is_valid == False
+    assert not any('PERINGATAN' in flag for flag in batik.flags)
+    assert any('(700 kg)' in flag for flag in batik.flags)  # Batik typical
+
+def test_batch_with_variants_matches_scalar(tmp_path):
+    path = str(tmp_path / 'benchmarks.csv')
+    write(path, CSV)
+    validator = CarbonValidator()
+    BenchmarkStore(path, validator).load()
+    
+    claims = [
+        (2200, 'waste_diverted', 'Fashion', 'small', 2, 'sampah', None, None),
+        (2200, 'waste_diverted', 'Fashion', 'small', 2, 'sampah', 'Batik', None),
+        (2550, 'energy_saved', 'Fashion', 'small', 6, None, 'Batik', 'Jawa Barat'),
+        (900, 'other', 'Fashion', 'medium', 1, None, None, 'Jawa Barat'),
+        (900, 'other', 'Manufaktur', 'large', 1, None, 'Batik', None),
+    ]
+    columns = ['carbon_reduction_kg', 'calculation_method', 'sector', 'business_scale',
+               'evidence_count', 'details', 'sub_sector', 'region']
+    batch = validator.validate_carbon_claims_batch({
+        name: [claim[i] for claim in claims] for i, name in enumerate(columns)
+    })
+    
+    for i, claim in enumerate(claims):
+        assert batch.result_at(i) == validator.validate_carbon_claim(*claim)
+
+def test_reload_swaps_snapshot_and_rejects_invalid_file(tmp_path):
+    path = str(tmp_path / 'benchmarks.csv')
+    write(path, CSV)
+    validator = CarbonValidator()
+    store = BenchmarkStore(path, validator, check_interval=0)
+    store.load()
+    first = validator.rules
+    
+    assert store.maybe_reload() == False  # unchanged file
+    
+    write(path, CSV.replace('Kerajinan,,,small,50,1500,400', 'Kerajinan,,,small,60,1500,400'))
+    assert store.maybe_reload() == True
+    assert validator.rules is not first
+    assert validator.rules.version != first.version
+    second = validator.rules
+    
+    write(path, CSV.replace('Kerajinan,,,medium,300,4000,1500\n', ''))  # missing scale
+    assert store.maybe_reload() == False
+    assert validator.rules is second
+    assert 'missing scales' in store.last_error
+
+def test_watcher_thread_reloads_off_the_request_path(tmp_path):
+    path = str(tmp_path / 'benchmarks.csv')
+    write(path, CSV)
+    validator = CarbonValidator()
+    store = BenchmarkStore(path, validator, check_interval=0)
+    store.load()
+    first = validator.rules
+    
+    store.watch()
+    try:
+        write(path, CSV.replace('Kerajinan,,,small,50,1500,400', 'Kerajinan,,,small,60,1500,400'))
+        for _ in range(200):
+            if validator.rules is not first:
+                break
+            time.sleep(0.01)
+        assert validator.rules is not first and store.reloads == 2
+    finally:
+        store.stop()
+    assert store._watcher is None
+
+def test_compiled_snapshot_is_reused_and_rebuilt_when_stale(tmp_path):
+    path = str(tmp_path / 'benchmarks.csv')
+    snapshot = path + '.snapshot'
+    write(path, CSV)
+    first = CarbonValidator()
+    BenchmarkStore(path, first, snapshot_path=snapshot).load()
+    assert os.path.exists(snapshot)
+    
+    # A second process starts from the snapshot without parsing the file
+    validator = CarbonValidator()
+    store = BenchmarkStore(path, validator, snapshot_path=snapshot)
+    store.load()
+    assert store.snapshot_hits == 1
+    assert validator.rules.version == first.rules.version
+    assert validator.validate_carbon_claim(900, 'waste_diverted', 'Fashion', 'small', 3, sub_sector='Batik') \
+        == first.validate_carbon_claim(900, 'waste_diverted', 'Fashion', 'small', 3, sub_sector='Batik')
+    
+    # Changed file: the snapshot key no longer matches
+    write(path, CSV.replace('Kerajinan,,,small,50,1500,400', 'Kerajinan,,,small,60,1500,400'))
+    store = BenchmarkStore(path, CarbonValidator(), snapshot_path=snapshot)
+    store.load()
+    assert store.snapshot_hits == 0
+    
+    # Corrupt snapshot: ignored and rewritten
+    with open(snapshot, 'wb') as f:
+        f.write(b'not a snapshot')
+    store = BenchmarkStore(path, CarbonValidator(), snapshot_path=snapshot)
+    store.load()
+    assert store.snapshot_hits == 0
+    store = BenchmarkStore(path, CarbonValidator(), snapshot_path=snapshot)
+    store.load()
+    assert store.snapshot_hits == 1
+
+def test_workers_map_one_shared_snapshot(tmp_path):
+    path = str(tmp_path / 'benchmarks.csv')
+    snapshot = path + '.snapshot'
+    write(path, CSV)
+    stores = [BenchmarkStore(path, CarbonValidator(), snapshot_path=snapshot) for _ in range(4)]
+    threads = [threading.Thread(target=store.load) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # One worker compiled and published, the others waited for the lock and mapped it
+    assert sorted(store.snapshot_hits for store in stores) == [0, 1, 1, 1]
+    assert all(store.mapped for store in stores)
+    rules = stores[0].validator.rules
+    assert not rules.bench_arrays['max'].flags.writeable
+    assert rules.benchmark(rules.flat_index(rules.sector_index['Fashion'], rules.scale_index['small'])) == (100, 2000, 500)
+    
+    # A replaced snapshot stays readable for whoever still maps it
+    old_max = rules.bench_arrays['max'].copy()
+    write(path, CSV.replace('Fashion,,,small,100,2000,500', 'Fashion,,,small,100,2500,500'))
+    stores[1].load()
+    assert stores[1].validator.rules.version != rules.version
+    assert np.array_equal(rules.bench_arrays['max'], old_max)
+    hits = stores[0].snapshot_hits
+    assert stores[0].load() == True
+    assert stores[0].snapshot_hits == hits + 1
+    assert stores[0].validator.rules.version == stores[1].validator.rules.version
+
+def test_variants_without_base_profile_are_rejected():
+    with pytest.raises(ValueError):
+        parse_benchmark_file(
+            b"sector,sub_sector,region,scale,min,max,typical\nFashion,Batik,,small,1,3,2\n",
+            'benchmarks.csv'
+        )
+
+def test_malformed_json_is_a_value_error_and_reloads_do_not_freeze(tmp_path):
+    for document in ('{"benchmarks": [null]}', '{"benchmarks": ["Fashion"]}',
+                     '{"benchmarks": [], "scales": 5}', '{"benchmarks": [], "method_factors": [1]}',
+                     '{"benchmarks": [], "default_sector": ["Fashion"]}'):
+        with pytest.raises(ValueError):
+            parse_benchmark_file(document.encode(), 'benchmarks.json')
+    
+    path = str(tmp_path / 'benchmarks.json')
+    with open(DATA_FILE) as f:
+        write(path, f.read())
+    validator = CarbonValidator()
+    store = BenchmarkStore(path, validator, check_interval=0)
+    store.load()
+    frozen = gc.get_freeze_count()
+    rules = validator.rules
+    
+    write(path, '{"benchmarks": [null]}')
+    assert store.reload() == False and validator.rules is rules
+    assert store.last_error == 'Row 1: expected an object, got NoneType'
+    with open(DATA_FILE) as f:
+        write(path, f.read().replace('"typical": 400', '"typical": 450', 1))
+    assert store.reload() == True
+    assert gc.get_freeze_count() <= frozen  # frozen objects can still be freed, never added
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
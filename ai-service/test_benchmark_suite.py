@@ -0,0 +1,46 @@
+"""
+Test suite for the benchmark generator and baseline comparison
+"""
+
+import json
+import pytest
+from benchmarks.generator import SubmissionGenerator
+from benchmarks.suite import compare, main
+from validators.carbon_validator import CarbonValidator
+from validators.submission_validator import SubmissionData
+
+def test_generator_is_deterministic_and_follows_benchmarks():
+    claims = SubmissionGenerator(seed=5, noise=0).claims(2000)
+    assert claims == SubmissionGenerator(seed=5, noise=0).claims(2000)
+    
+    within = sum(
+        CarbonValidator.BENCHMARKS[c['sector']][c['business_scale']]['min'] <= c['carbon_reduction_kg']
+        <= CarbonValidator.BENCHMARKS[c['sector']][c['business_scale']]['max']
+        for c in claims
+    )
+    # Mostly realistic, with a tail that trips the range checks
+    assert 0.8 < within / len(claims) < 1.0
+    
+    submission = SubmissionGenerator(seed=5).submission()
+    assert SubmissionData(**submission).carbonReductionKg == submission['carbonReductionKg']
+
+def test_compare_flags_regressions(capsys):
+    baseline = {'claim.a': {'unit': 'us/call', 'median': 10.0}, 'claim.b': {'unit': 'us/call', 'median': 10.0}}
+    current = {
+        'claim.a': {'unit': 'us/call', 'median': 11.0},
+        'claim.b': {'unit': 'us/call', 'median': 14.0},
+        'claim.new': {'unit': 'us/call', 'median': 1.0},
+    }
+    assert compare(current, baseline, threshold=1.25) == ['claim.b']
+
+def test_suite_writes_and_compares_baseline(tmp_path):
+    output = tmp_path / 'baseline.json'
+    assert main(['--quick', '--filter', 'submission', '-o', str(output)]) == 0
+    
+    document = json.loads(output.read_text())
+    assert set(document['results']) == {'submission.rules'}
+    assert document['environment']['python']
+    assert main(['--quick', '--filter', 'submission', '--compare', str(output), '--threshold', '100']) == 0
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
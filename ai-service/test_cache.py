@@ -0,0 +1,52 @@
+"""
+Test suite for the result cache
+"""
+
+import pytest
+from cache import ResultCache, make_key
+from validators.carbon_validator import CarbonValidator
+
+def test_key_is_canonical():
+    assert make_key('validate', 'v1', {'a': 1, 'b': 2}) == make_key('validate', 'v1', {'b': 2, 'a': 1})
+    assert make_key('validate', 'v1', {'a': 1}) != make_key('validate', 'v2', {'a': 1})
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(max_entries=2)
+    
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' becomes most recently used
+    cache.set('c', 3)           # evicts 'b'
+    
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 1, 1)
+
+def test_ttl_expiry():
+    cache = ResultCache(max_entries=10, ttl_seconds=-1)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    cache = ResultCache(max_entries=10, path=path)
+    cache.set('a', {'isValid': True, 'flags': ['x']})
+    cache.close()
+    
+    reopened = ResultCache(max_entries=10, path=path)
+    assert reopened.get('a') == {'isValid': True, 'flags': ['x']}
+    assert reopened.stats()['diskHits'] == 1
+    reopened.close()
+
+def test_benchmark_change_changes_ruleset_version(monkeypatch):
+    before = CarbonValidator().rules.version
+    benchmarks = {**CarbonValidator.BENCHMARKS, 'Fashion': {
+        **CarbonValidator.BENCHMARKS['Fashion'], 'small': {'min': 100, 'max': 1500, 'typical': 500}
+    }}
+    monkeypatch.setattr(CarbonValidator, 'BENCHMARKS', benchmarks)
+    
+    assert CarbonValidator().rules.version != before
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -4,6 +4,7 @@ Test suite for Carbon Validator
 
 import pytest
 from validators.carbon_validator import CarbonValidator
+from validators.messages import MessageCatalog
 
 def test_realistic_claim():
     validator = CarbonValidator()
@@ -82,5 +83,86 @@ def test_method_consistency():
     
     assert result.confidence < 0.8
 
+def test_long_details_boost_saturates():
+    validator = CarbonValidator()
+    sentence = 'Pengukuran sampah dengan metode timbang setiap bulan sejak baseline tahun lalu. '
+    
+    results = [
+        validator.validate_carbon_claim(
+            carbon_reduction_kg=500,
+            calculation_method='waste_diverted',
+            sector='Fashion',
+            business_scale='small',
+            evidence_count=3,
+            details=sentence * repeats
+        )
+        for repeats in (14, 15, 200)  # 154, 165 and 2200 words
+    ]
+    
+    assert validator._analyze_details(sentence * 200)['word_count'] == 2200
+    assert results[0] == results[1] == results[2]
+
+def test_batch_matches_scalar():
+    validator = CarbonValidator()
+    
+    claims = [
+        dict(carbon_reduction_kg=500, calculation_method='waste_diverted', sector='Fashion',
+             business_scale='small', evidence_count=3,
+             details='Kami mendaur ulang 250kg sampah kain per tahun. Dengan faktor emisi 2kg CO2/kg sampah, total pengurangan adalah 500kg CO2.'),
+        dict(carbon_reduction_kg=10000, calculation_method='waste_diverted', sector='Fashion',
+             business_scale='small', evidence_count=1, details='Banyak sampah didaur ulang'),
+        dict(carbon_reduction_kg=30, calculation_method='manual', sector='Tekstil',
+             business_scale='huge', evidence_count=0, details=None),
+        dict(carbon_reduction_kg=2000, calculation_method='energy_saved', sector='F&B',
+             business_scale='medium', evidence_count=4,
+             details='Menghemat listrik 4000 kWh per tahun dengan panel surya. Faktor emisi 0.5 kg CO2/kWh = 2000 kg CO2.'),
+        dict(carbon_reduction_kg=5000, calculation_method='transport_reduced', sector='Manufaktur',
+             business_scale='medium', evidence_count=1, details=''),
+    ]
+    
+    batch = validator.validate_carbon_claims_batch(
+        {key: [claim[key] for claim in claims] for key in claims[0]}
+    )
+    
+    assert len(batch) == len(claims)
+    for i, claim in enumerate(claims):
+        assert batch.result_at(i) == validator.validate_carbon_claim(**claim)
+
+def test_flags_are_stored_as_codes():
+    validator = CarbonValidator()
+    claim = dict(carbon_reduction_kg=10000, calculation_method='energy_saved', sector='Fashion',
+                 business_scale='small', evidence_count=1, details='Banyak sampah didaur ulang')
+    
+    result = validator.validate_carbon_claim(**claim)
+    codes = [message.code for message in result.flag_codes]
+    assert codes and set(codes) <= set(CarbonValidator.FLAG_CODES)
+    assert result.to_dict()['flagCodes'] == codes
+    
+    structured = result.to_dict(structured=True)
+    assert [flag['code'] for flag in structured['flags']] == codes
+    assert [CarbonValidator.FLAG_MESSAGES.render(message) for message in result.flag_codes] == result.flags
+    assert result.to_dict()['flags'] == result.flags
+    assert structured['suggestions'][0]['code'] in CarbonValidator.SUGGESTION_MESSAGES
+    
+    batch = validator.validate_carbon_claims_batch({key: [value] for key, value in claim.items()})
+    assert batch.result_at(0).flag_codes == result.flag_codes
+    assert batch.flags_at(0) == result.flags
+
+def test_message_catalog_renders_without_code_and_returns_fresh_dicts():
+    catalog = MessageCatalog({
+        'claim': "Klaim {claim:.0f} kg ({method!r})",
+        'fixed': "Tanpa parameter",
+        'sneaky': "{__class__}",
+    })
+    assert catalog.render(catalog.message('claim', claim=499.6, method='x')) == "Klaim 500 kg ('x')"
+    assert catalog.render(catalog.fixed['fixed']) == "Tanpa parameter"
+    assert catalog.render(catalog.message('sneaky', __class__=1)) == "1"
+    with pytest.raises(ValueError):
+        MessageCatalog({'attr': "{claim.__class__}"})
+    
+    first = catalog.to_dict(catalog.fixed['fixed'])
+    first['params'] = {'changed': True}
+    assert catalog.to_dict(catalog.fixed['fixed']) == {'code': 'fixed'}
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
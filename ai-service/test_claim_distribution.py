@@ -0,0 +1,126 @@
+"""
+Test suite for the claim distribution model (statistical outliers)
+"""
+
+import json
+import numpy as np
+import pytest
+from validators.carbon_validator import CarbonValidator
+from validators.claim_distribution import (
+    ClaimDistributionModel, DistributionStore, main, observations_from_records
+)
+
+GROUP = ('Fashion', 'small', 'waste_diverted')
+
+def sample(n, seed=0):
+    return np.random.default_rng(seed).lognormal(mean=6.0, sigma=0.5, size=n)
+
+def test_merge_matches_single_fit():
+    claims = sample(5000)
+    whole = ClaimDistributionModel().updated((GROUP, c) for c in claims)
+    left = ClaimDistributionModel().updated((GROUP, c) for c in claims[:1234])
+    right = ClaimDistributionModel().updated((GROUP, c) for c in claims[1234:])
+    
+    merged = left.merged(right).groups[GROUP]
+    state = whole.groups[GROUP]
+    assert merged.count == state.count == 5000
+    assert merged.bins == state.bins
+    assert merged.mean == pytest.approx(state.mean)
+    assert merged.m2 == pytest.approx(state.m2)
+
+def test_quantiles_within_relative_error():
+    claims = sample(20000, seed=1)
+    model = ClaimDistributionModel().updated((GROUP, c) for c in claims)
+    state = model.groups[GROUP]
+    
+    for q in (0.5, 0.9, 0.99):
+        assert model.quantile(state, q) == pytest.approx(np.quantile(claims, q), rel=0.03)
+    
+    z, percentile = model.score(state, np.array([np.quantile(claims, 0.5), claims.max() * 2]))
+    assert percentile[0] == pytest.approx(0.5, abs=0.02)
+    assert percentile[1] == 1.0
+    assert z[1] > 3
+
+def test_validator_flags_statistical_outlier():
+    validator = CarbonValidator()
+    details = 'Kami mendaur ulang sampah kain 250kg per tahun, metode timbang periode bulanan dengan baseline'
+    typical = validator.validate_carbon_claim(450, 'waste_diverted', 'Fashion', 'small', 2, details)
+    assert typical.outlier is None  # no model yet
+    
+    validator.distribution = ClaimDistributionModel().updated(
+        (GROUP, c) for c in sample(500, seed=2) * 0.5
+    )
+    result = validator.validate_carbon_claim(1400, 'waste_diverted', 'Fashion', 'small', 4, details)
+    
+    assert result.outlier['percentile'] == 1.0
+    assert any('persentil' in flag for flag in result.flags)
+    assert result.confidence < typical.confidence
+    # Groups without enough history are never flagged
+    assert validator.validate_carbon_claim(1400, 'waste_diverted', 'F&B', 'small', 4, details).outlier is None
+
+def test_tied_top_value_is_not_an_outlier():
+    validator = CarbonValidator()
+    details = 'Kami mendaur ulang sampah kain 250kg per tahun, metode timbang periode bulanan dengan baseline'
+    validator.distribution = ClaimDistributionModel().updated([(GROUP, 500.0)] * 50 + [(GROUP, 800.0)] * 50)
+    state = validator.distribution.groups[GROUP]
+    
+    _, percentile = validator.distribution.score(state, np.array([500.0, 800.0, 5000.0]))
+    assert percentile.tolist() == [0.25, 0.75, 1.0]
+    result = validator.validate_carbon_claim(800, 'waste_diverted', 'Fashion', 'small', 4, details)
+    assert result.outlier['percentile'] == 0.75
+    assert not any('persentil' in flag for flag in result.flags)
+
+def test_batch_matches_scalar_with_model():
+    validator = CarbonValidator()
+    validator.distribution = ClaimDistributionModel().updated(
+        [(GROUP, c) for c in sample(300, seed=3)]
+        + [(('F&B', 'medium', 'energy_saved'), c) for c in sample(300, seed=4) * 4]
+    )
+    rng = np.random.default_rng(5)
+    claims = [
+        (float(rng.choice([200, 400, 900, 1500, 3000, 9000])), method, sector, scale, int(rng.integers(0, 6)), None)
+        for sector, scale, method in [GROUP, ('F&B', 'medium', 'energy_saved'), ('Kerajinan', 'small', 'other')]
+        for _ in range(20)
+    ]
+    columns = ['carbon_reduction_kg', 'calculation_method', 'sector', 'business_scale', 'evidence_count', 'details']
+    batch = validator.validate_carbon_claims_batch({
+        name: [claim[i] for claim in claims] for i, name in enumerate(columns)
+    })
+    
+    assert batch.masks['statistical_outlier'].any()
+    for i, claim in enumerate(claims):
+        assert batch.result_at(i) == validator.validate_carbon_claim(*claim)
+
+def test_stores_share_observations_through_file(tmp_path):
+    path = str(tmp_path / 'claim_model.json')
+    first = DistributionStore(CarbonValidator(), path, sync_interval=0)
+    second = DistributionStore(CarbonValidator(), path, sync_interval=0)
+    
+    first.observe((GROUP, c) for c in sample(40, seed=6))
+    assert first.sync()
+    assert second.sync()
+    assert second.model.groups[GROUP].count == 40
+    
+    second.observe((GROUP, c) for c in sample(10, seed=7))
+    second.sync()
+    first.sync()
+    assert first.model.groups[GROUP].count == second.model.groups[GROUP].count == 50
+    assert first.model.version == second.model.version
+    assert first.sync() == False  # nothing new
+
+def test_fit_cli_from_csv_export(tmp_path):
+    export = tmp_path / 'export.csv'
+    rows = ['sector,business_scale,carbon_calculation_method,carbon_reduction_kg,status']
+    rows += [f"Fashion,small,waste_diverted,{c:.2f},SCORED" for c in sample(50, seed=8)]
+    rows += ['Fashion,small,waste_diverted,999999,FLAGGED', 'Fashion,small,,100,SCORED']
+    export.write_text('\n'.join(rows) + '\n')
+    output = tmp_path / 'claim_model.json'
+    
+    main([str(export), '-o', str(output)])
+    
+    model = ClaimDistributionModel.from_dict(json.loads(output.read_text()))
+    assert model.groups[GROUP].count == 50
+    assert list(observations_from_records([{'sector': 'x'}])) == []
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,166 @@
+"""
+Test suite for the per-UMKM claim history and trend-consistency checks
+"""
+
+import math
+import pytest
+from fastapi.testclient import TestClient
+import main
+from validators.claim_history import ClaimHistory, flag_trend, main as build_history
+
+def codes(check):
+    return [message.code for message in check.flag_codes]
+
+def steady_history(history, umkm_id='umkm-a'):
+    for period, kg in ((2020, 100), (2021, 120), (2022, 150), (2023, 180)):
+        history.record(umkm_id, period, kg, local_employees=5, business_scale='small')
+
+def test_plausible_growth_passes_and_jump_is_flagged():
+    history = ClaimHistory()
+    assert history.check('umkm-a', 2020, 100).previous_period is None
+    steady_history(history)
+    
+    check = history.check('umkm-a', 2024, 220, local_employees=5, business_scale='small')
+    assert codes(check) == []
+    assert check.previous_period == 2023 and check.samples == 3
+    assert check.growth == pytest.approx(220 / 180)
+    
+    check = history.check('umkm-a', 2024, 1800, local_employees=5, business_scale='small')
+    assert codes(check) == ['trend_growth', 'trend_growth_outlier', 'trend_employees']
+    # Two years since the last claim: growth is annualized
+    check = history.check('umkm-a', 2025, 1500, local_employees=5, business_scale='small')
+    assert check.growth == pytest.approx(math.sqrt(1500 / 180))
+    assert 'trend_growth' not in codes(check)
+
+def test_scale_and_workforce_change_the_limits():
+    history = ClaimHistory()
+    history.record('umkm-a', 2022, 100, local_employees=4, business_scale='small')
+    
+    # Grew into a medium business and hired: 5x is plausible
+    assert codes(history.check('umkm-a', 2023, 500, local_employees=20, business_scale='medium')) == []
+    assert codes(history.check('umkm-a', 2023, 500, local_employees=4, business_scale='small')) == [
+        'trend_growth', 'trend_employees'
+    ]
+    history.record('umkm-b', 2022, 1000, business_scale='medium')
+    assert codes(history.check('umkm-b', 2023, 1800, business_scale='small')) == ['trend_scale']
+
+def test_corrections_and_backfill_keep_aggregates_consistent():
+    history = ClaimHistory()
+    steady_history(history)
+    # Correcting the latest period compares with the period before it
+    check = history.check('umkm-a', 2023, 1500)
+    assert check.previous_period == 2022 and check.samples == 2
+    history.record('umkm-a', 2023, 200)
+    # Backfilled older period relinks the chain
+    history.record('umkm-a', 2019, 80)
+    
+    rebuilt = ClaimHistory()
+    for period, kg in ((2019, 80), (2020, 100), (2021, 120), (2022, 150), (2023, 200)):
+        rebuilt.record('umkm-a', period, kg)
+    slot = history._slots['umkm-a']
+    assert history.history('umkm-a')['claims'][-1]['carbonReductionKg'] == 200
+    assert [claim['period'] for claim in history.history('umkm-a')['claims']] == list(range(2019, 2024))
+    assert history._growth_n[slot] == rebuilt._growth_n[0] == 4
+    assert history._growth_mean[slot] == pytest.approx(rebuilt._growth_mean[0])
+    assert history._growth_m2[slot] == pytest.approx(rebuilt._growth_m2[0])
+    assert history.stats()['claims'] == 5 and history.stats()['superseded'] == 1
+
+def test_repeated_and_corrected_periods_do_not_grow_rows_or_log(tmp_path):
+    path = str(tmp_path / 'history.jsonl')
+    history = ClaimHistory(path)
+    for _ in range(5):
+        history.check_and_record('umkm-a', 2023, 150, local_employees=5, business_scale='small')
+    assert history.stats()['claims'] == history.stats()['rows'] == 1
+    
+    steady_history(history)  # 2023 is corrected to 180 in place
+    history.record('umkm-a', 2021, 130)  # older period corrected: 2022's growth changes too
+    assert history.stats()['rows'] == 4 and history.stats()['superseded'] == 2
+    rebuilt = ClaimHistory()
+    for period, kg in ((2020, 100), (2021, 130), (2022, 150), (2023, 180)):
+        rebuilt.record('umkm-a', period, kg)
+    assert history._growth_mean[0] == pytest.approx(rebuilt._growth_mean[0])
+    assert history._growth_m2[0] == pytest.approx(rebuilt._growth_m2[0])
+    history.close()
+    
+    with open(path) as f:
+        assert len(f.readlines()) == 6
+    reloaded = ClaimHistory(path)
+    assert reloaded.history('umkm-a') == history.history('umkm-a')
+    reloaded.close()
+    with open(path) as f:
+        assert len(f.readlines()) == 4
+
+def test_log_replay_and_cli(tmp_path):
+    path = str(tmp_path / 'history.jsonl')
+    history = ClaimHistory(path)
+    steady_history(history)
+    history.check_and_record('umkm-a', 2024, 210, local_employees=5, business_scale='small')
+    history.close()
+    with open(path, 'a') as f:
+        f.write('{"umkm": "umkm-a", "per')  # torn line after a crash
+    
+    reloaded = ClaimHistory(path)
+    assert reloaded.history('umkm-a') == history.history('umkm-a')
+    reloaded.close()
+    
+    export = tmp_path / 'export.csv'
+    export.write_text('umkm_id,period,carbon_reduction_kg,local_employees,business_scale\n'
+                      'umkm-b,2022,50,3,small\numkm-b,2023,60,,small\numkm-c,,10,,\n')
+    log = str(tmp_path / 'built.jsonl')
+    build_history([str(export), '--log', log])
+    built = ClaimHistory(log)
+    assert len(built) == 1
+    assert built.history('umkm-b')['claims'][1] == {
+        'period': 2023, 'carbonReductionKg': 60.0, 'localEmployees': None, 'businessScale': 'small'
+    }
+
+def test_flag_trend_amends_cached_result():
+    history = ClaimHistory()
+    steady_history(history)
+    result = {'isValid': True, 'confidence': 0.8, 'flags': [], 'flagCodes': [], 'suggestions': [], 'estimatedCO2Kg': 1800}
+    
+    flagged = flag_trend(result, history.check('umkm-a', 2024, 1800, local_employees=5), structured=True)
+    assert result['flags'] == [] and 'trend' not in result
+    assert not flagged['isValid'] and flagged['confidence'] == 0.35
+    assert [flag['code'] for flag in flagged['flags']] == ['trend_growth', 'trend_growth_outlier', 'trend_employees']
+    assert flagged['flagCodes'] == [flag['code'] for flag in flagged['flags']]
+    assert flagged['suggestions'] == [{'code': 'trend'}]
+    assert flagged['trend']['previousPeriod'] == 2023
+    
+    plain = flag_trend(result, history.check('umkm-a', 2024, 200))
+    assert plain['isValid'] and plain['flags'] == [] and plain['trend']['samples'] == 3
+
+def test_history_endpoints():
+    params = {
+        'calculation_method': 'energy_saving', 'sector': 'Fashion', 'business_scale': 'small',
+        'evidence_count': 3, 'umkm_id': 'umkm-history-test', 'local_employees': 5,
+    }
+    with TestClient(main.app) as client:
+        response = client.post('/history/claims', json={'claims': [
+            {'umkm_id': 'umkm-history-test', 'period': 2022, 'carbon_reduction_kg': 100, 'local_employees': 5},
+        ]})
+        assert response.status_code == 200
+    
+        first = client.post('/estimate-carbon', params={**params, 'carbon_reduction_kg': 120, 'period': 2023}).json()
+        assert first['trend']['previousPeriod'] == 2022
+        assert not any('per tahun' in flag for flag in first['flags'])
+        jump = client.post('/estimate-carbon', params={**params, 'carbon_reduction_kg': 1500, 'period': 2024}).json()
+        assert any('dari periode 2023' in flag for flag in jump['flags']) and not jump['isValid']
+    
+        batch = client.post('/estimate-carbon/batch', json={'items': [
+            {'id': 'a', 'umkmId': 'umkm-history-test', 'data': {
+                **{key: value for key, value in params.items() if key != 'umkm_id'},
+                'carbon_reduction_kg': 1600, 'period': 2025,
+            }},
+            {'id': 'b', 'data': {**params, 'carbon_reduction_kg': 10, 'period': 'soon'}},
+        ]}).json()
+        assert batch['results']['a']['trend']['previousPeriod'] == 2024
+        assert list(batch['errors']) == ['b']
+    
+        claims = client.get('/history/umkm-history-test').json()['claims']
+        assert [claim['period'] for claim in claims] == [2022, 2023, 2024, 2025]
+        assert client.get('/history/unknown').status_code == 404
+        assert client.get('/history/stats').json()['umkms'] >= 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,112 @@
+"""
+Test suite for the evidence OCR pipeline
+"""
+
+import asyncio
+import time
+import pytest
+from PIL import Image
+from executor import ValidationExecutor
+from cache import ResultCache
+from validators.carbon_validator import CarbonValidator
+from validators.evidence_analyzer import EvidenceAnalyzer, extract_figures, parse_number
+
+# Stand-in for tesseract: the "text" of an image is chosen by its pixel value
+TEXTS = {
+    10: 'NOTA TIMBANGAN\nBerat netto: 1.250 kg\nSubtotal 600 kg',
+    20: 'PLN Stand meter 3.420,5 kWh',
+    30: '',
+}
+SEEN_SIZES = []
+
+def fake_ocr(image, languages, timeout):
+    SEEN_SIZES.append(image.size)
+    return TEXTS[image.getpixel((0, 0))]
+
+def slow_ocr(image, languages, timeout):
+    time.sleep(1.0)
+    return ''
+
+def write_image(path, value, size=(400, 300), format='PNG'):
+    Image.new('L', size, value).save(path, format=format)
+
+def make_analyzer(root, ocr=fake_ocr, mode='inline', **kwargs):
+    return EvidenceAnalyzer(str(root), ValidationExecutor(mode, workers=1), ResultCache(ttl_seconds=60), ocr, **kwargs)
+
+def test_parse_number_formats():
+    assert parse_number('1.250') == 1250
+    assert parse_number('1,250.5') == 1250.5
+    assert parse_number('1.250,5') == 1250.5
+    assert parse_number('12,5') == 12.5
+    assert parse_number('2.000.000') == 2000000
+    assert extract_figures('Total 2 ton sampah, jarak 35 km, 80kg') == {'kg': 2000.0, 'km': 35.0}
+
+def test_same_content_is_ocrd_once(tmp_path):
+    write_image(tmp_path / 'nota.png', 10)
+    write_image(tmp_path / 'copy-of-nota.png', 10)
+    write_image(tmp_path / 'meter.png', 20)
+    analyzer = make_analyzer(tmp_path)
+    
+    report = asyncio.run(analyzer.analyze(['nota.png', 'copy-of-nota.png', 'meter.png']))
+    
+    assert analyzer.ocr_runs == 2
+    assert [item.cached for item in report.files] == [False, True, False]
+    assert report.files[0].documents == ['invoice', 'weighing']
+    assert report.figures == {'kg': 2500.0, 'kWh': 3420.5}
+    assert report.to_dict()['confidence'] == 1.0
+    
+    again = asyncio.run(analyzer.analyze(['meter.png']))
+    assert again.files[0].cached and analyzer.ocr_runs == 2
+
+def test_images_are_downscaled_before_ocr(tmp_path):
+    write_image(tmp_path / 'photo.jpg', 10, size=(4000, 3000), format='JPEG')
+    SEEN_SIZES.clear()
+    
+    asyncio.run(make_analyzer(tmp_path, max_side=1000).analyze(['photo.jpg']))
+    
+    assert max(SEEN_SIZES[0]) <= 1000
+
+def test_rejects_files_outside_root(tmp_path):
+    write_image(tmp_path / 'outside.png', 10)
+    root = tmp_path / 'evidence'
+    root.mkdir()
+    (root / 'notes.txt').write_text('500 kg')
+    analyzer = make_analyzer(root)
+    
+    report = asyncio.run(analyzer.analyze(['../outside.png', 'notes.txt', 'missing.png', 'https://x/a.png']))
+    
+    assert [item.error is not None for item in report.files] == [True, True, True, True]
+    assert 'outside EVIDENCE_ROOT' in report.files[0].error
+    assert analyzer.ocr_runs == 0
+    assert report.to_dict()['confidence'] == 0.0
+
+def test_timeout_reported_per_file(tmp_path):
+    write_image(tmp_path / 'slow.png', 30)
+    analyzer = make_analyzer(tmp_path, ocr=slow_ocr, mode='thread', timeout=0.2)
+    
+    report = asyncio.run(analyzer.analyze(['slow.png']))
+    
+    assert 'timed out' in report.files[0].error
+    assert analyzer.timeouts == 1
+    # Failures are not cached
+    assert analyzer.cache.stats()['entries'] == 0
+
+def test_figures_feed_carbon_validator(tmp_path):
+    write_image(tmp_path / 'nota.png', 10)
+    report = asyncio.run(make_analyzer(tmp_path).analyze(['nota.png']))
+    validator = CarbonValidator()
+    details = 'Sampah kain 1250 kg per tahun ditimbang tiap bulan, metode timbang terhadap baseline periode lalu'
+    documented = report.quantity_for(validator.METHOD_UNITS['waste_diverted'])
+    
+    supported = validator.validate_carbon_claim(2400, 'waste_diverted', 'F&B', 'small', 4, details,
+                                                documented_quantity=documented)
+    overstated = validator.validate_carbon_claim(2900, 'waste_diverted', 'F&B', 'small', 4, details,
+                                                 documented_quantity=400)
+    plain = validator.validate_carbon_claim(2400, 'waste_diverted', 'F&B', 'small', 4, details)
+    
+    assert supported.confidence > plain.confidence
+    assert any('didukung bukti' in flag for flag in overstated.flags)
+    assert not any('didukung bukti' in flag for flag in supported.flags)
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,291 @@
+"""
+Test suite for async validation jobs (SQLite queue, batched workers, callbacks)
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import executor as tasks
+import main
+from benchmarks.generator import SubmissionGenerator
+from jobs import Job, JobQueue, JobRunner
+
+def make_rows(n, seed=3):
+    return SubmissionGenerator(seed=seed, noise=0.2).submissions(n)
+
+def test_queue_survives_restart_and_claims_in_order(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    queue = JobQueue(path)
+    ids = [queue.submit({'n': n}) for n in range(3)]
+    queue.close()
+    
+    queue = JobQueue(path)
+    claimed = queue.claim(2)
+    assert [job.id for job in claimed] == ids[:2]
+    assert [job.payload for job in claimed] == [{'n': 0}, {'n': 1}]
+    assert queue.counts() == {'queued': 1, 'running': 2, 'done': 0, 'failed': 0}
+    
+    queue.finish([(ids[0], {'ok': True}, None), (ids[1], None, ['bad'])])
+    assert queue.get(ids[0])['status'] == 'done' and queue.get(ids[0])['result'] == {'ok': True}
+    assert queue.get(ids[1])['status'] == 'failed' and queue.get(ids[1])['errors'] == ['bad']
+    assert queue.get('missing') is None
+    with pytest.raises(ValueError):
+        queue.submit({}, job_id=ids[2])
+    queue.close()
+
+def test_expired_lease_is_claimed_again_then_failed():
+    queue = JobQueue(lease_seconds=-1, max_attempts=2)  # every lease is already expired
+    job_id = queue.submit({'n': 1})
+    assert queue.claim(10)[0].attempts == 1
+    # Worker "died": the job comes back
+    assert queue.claim(10)[0].attempts == 2
+    assert queue.claim(10) == []
+    job = queue.get(job_id)
+    assert job['status'] == 'failed' and job['attempts'] == 2
+    assert 'did not finish' in job['errors'][0]
+
+def test_failed_finish_rolls_back_and_queue_keeps_working():
+    queue = JobQueue()
+    ids = [queue.submit({'n': n}) for n in range(2)]
+    queue.claim(2)
+    with pytest.raises(TypeError):
+        queue.finish([(ids[0], {'ok': True}, None), (ids[1], {'bad': object()}, None)])
+    assert queue.counts()['running'] == 2
+    
+    queue.finish([(ids[0], {'ok': True}, None), (ids[1], None, ['bad'])])
+    assert queue.counts() == {'queued': 0, 'running': 0, 'done': 1, 'failed': 1}
+
+def test_worker_survives_a_failed_finish(monkeypatch):
+    queue = JobQueue()
+    
+    async def process(jobs):
+        return [({'bad': object()} if job.payload['n'] == 1 else {'n': job.payload['n']}, None) for job in jobs]
+    
+    finish = queue.finish
+    calls = []
+    
+    def flaky_finish(outcomes):
+        calls.append(len(outcomes))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        finish(outcomes)
+    
+    monkeypatch.setattr(queue, 'finish', flaky_finish)
+    runner = JobRunner(queue, process, concurrency=1, poll_interval=0.01)
+    
+    async def run():
+        runner.start()
+        first = runner.submit({'n': 0})
+        for _ in range(50):
+            if runner.counts['finishErrors']:
+                break
+            await asyncio.sleep(0.01)
+        ids = [runner.submit({'n': n}) for n in (1, 2)]
+        for _ in range(200):
+            if runner.counts['done'] + runner.counts['failed'] == 2:
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        return first, ids
+    
+    first, ids = asyncio.run(run())
+    assert runner.counts['finishErrors'] == 1
+    assert queue.get(first)['status'] == 'running'  # claimed again once its lease expires
+    bad, good = (queue.get(job_id) for job_id in ids)
+    assert bad['status'] == 'failed' and bad['errors'][0].startswith('Job failed: result not storable: TypeError')
+    assert good['status'] == 'done' and good['result'] == {'n': 2}
+
+def test_callbacks_only_go_to_allowed_hosts():
+    runner = JobRunner(JobQueue(), None, callback_hosts=['backend', ' Hooks.Example.com '])
+    assert runner.callback_allowed('https://backend/jobs/done')
+    assert runner.callback_allowed('http://hooks.example.com:8080/x')
+    assert not runner.callback_allowed('http://169.254.169.254/latest/meta-data')
+    assert not runner.callback_allowed('http://backend.evil.com/')
+    assert not runner.callback_allowed('file:///etc/passwd')
+    assert not JobRunner(JobQueue(), None).callback_allowed('https://backend/jobs/done')
+
+def test_stopping_mid_batch_requeues_its_jobs():
+    started = []
+    
+    async def process(jobs):
+        started.append(len(jobs))
+        await asyncio.sleep(10)
+    
+    queue = JobQueue()
+    runner = JobRunner(queue, process, concurrency=1)
+    job_id = runner.submit({'n': 1})
+    
+    async def run():
+        runner.start()
+        while not started:
+            await asyncio.sleep(0.01)
+        await runner.stop()
+    
+    asyncio.run(run())
+    job = queue.get(job_id)
+    assert job['status'] == 'queued' and job['attempts'] == 0
+    assert queue.claim(1)[0].id == job_id
+
+def test_runner_batches_queued_jobs_and_posts_callbacks():
+    batches = []
+    callbacks = []
+    
+    async def process(jobs):
+        batches.append(len(jobs))
+        return [({'n': job.payload['n']}, None) if job.payload['n'] != 4 else (None, ['broken']) for job in jobs]
+    
+    def handler(request):
+        callbacks.append(json.loads(request.content))
+        return httpx.Response(200)
+    
+    queue = JobQueue()
+    runner = JobRunner(queue, process, concurrency=1, batch_size=3, callback_hosts=['backend'],
+                       transport=httpx.MockTransport(handler))
+    ids = [runner.submit({'n': n}, callback_url='http://backend/jobs/done') for n in range(5)]
+    
+    async def run():
+        runner.start()
+        for _ in range(100):
+            if runner.counts['done'] + runner.counts['failed'] == 5 and len(callbacks) == 5:
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+    
+    asyncio.run(run())
+    assert batches == [3, 2]
+    assert {item['jobId'] for item in callbacks} == set(ids)
+    assert [item['status'] for item in callbacks if item['jobId'] == ids[4]] == ['failed']
+    assert queue.get(ids[0])['callback'] == {'url': 'http://backend/jobs/done', 'status': 'sent'}
+    
+    stats = runner.stats()
+    assert stats['done'] == 4 and stats['failed'] == 1 and stats['callbacksSent'] == 5
+    assert stats['meanBatchJobs'] == 2.5
+    assert stats['queue']['done'] == 4
+
+def test_pipeline_checks_batch_claims_in_one_vectorized_call(monkeypatch):
+    calls = []
+    batch_task = tasks.estimate_carbon_batch_task
+    
+    def counting(columns):
+        calls.append(len(columns['carbon_reduction_kg']))
+        return batch_task(columns)
+    
+    monkeypatch.setattr(tasks, 'estimate_carbon_batch_task', counting)
+    rows = make_rows(3)
+    payloads = [
+        {'data': {**rows[0], 'sector': 'Fashion', 'businessScale': 'small'}},
+        {'data': {**rows[1], 'sector': 'Kuliner', 'businessScale': 'medium', 'evidenceCount': 6}},
+        {'data': rows[2]},  # no sector: rules only
+        {'data': {'carbonReductionKg': 'many'}},
+    ]
+    jobs = [Job(str(n), payload, 1, time.time(), time.time()) for n, payload in enumerate(payloads)]
+    
+    outcomes = asyncio.run(main._process_jobs(jobs))
+    assert calls == [2]
+    assert outcomes[0][0]['carbon']['methodology'] == rows[0]['carbonCalculationMethod']
+    assert outcomes[1][0]['carbon'] is not None
+    assert outcomes[2][0]['carbon'] is None and 'isValid' in outcomes[2][0]['validation']
+    assert outcomes[3][0] is None and outcomes[3][1][0].startswith('carbonReductionKg')
+
+def test_bad_job_fails_alone_in_its_batch():
+    rows = make_rows(3)
+    queue = JobQueue()
+    runner = JobRunner(queue, main._process_jobs, concurrency=1, batch_size=10)
+    claim = {'sector': 'Fashion', 'businessScale': 'small'}
+    ids = [
+        runner.submit({'data': {**rows[0], **claim}}),
+        runner.submit({'data': {**rows[1], **claim, 'evidenceCount': 'two'}}),
+        runner.submit({'data': {**rows[2], **claim, 'period': 'soon'}, 'umkmId': 'umkm-a'}),
+        runner.submit({'data': {**rows[2], **claim, 'evidenceCount': '2.0'}}),
+        runner.submit({'data': {**rows[0], **claim, 'sector': ['Fashion']}}),
+    ]
+    
+    async def run():
+        runner.start()
+        for _ in range(200):
+            if runner.counts['done'] + runner.counts['failed'] == len(ids):
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+    
+    asyncio.run(run())
+    jobs = [queue.get(job_id) for job_id in ids]
+    assert [job['status'] for job in jobs] == ['done', 'failed', 'failed', 'done', 'failed']
+    assert jobs[1]['errors'][0].startswith('evidenceCount:')
+    assert jobs[2]['errors'][0].startswith('period:')
+    assert jobs[4]['errors'] == ['sector: Input should be a valid string']
+    assert jobs[0]['result']['carbon'] is not None and jobs[3]['result']['carbon'] is not None
+
+def test_broken_vectorized_check_falls_back_to_per_job_scoring(monkeypatch):
+    def broken_batch(columns):
+        raise TypeError("unhashable type: 'list'")
+    
+    estimate = tasks.estimate_carbon_task
+    
+    def picky_claim(**claim):
+        if claim['evidence_count'] == 7:
+            raise TypeError("unhashable type: 'list'")
+        return estimate(**claim)
+    
+    monkeypatch.setattr(main.tasks, 'estimate_carbon_batch_task', broken_batch)
+    monkeypatch.setattr(main.tasks, 'estimate_carbon_task', picky_claim)
+    rows = make_rows(3)
+    claim = {'sector': 'Fashion', 'businessScale': 'small'}
+    jobs = JobQueue()
+    for n, row in enumerate(rows):
+        jobs.submit({'data': {**row, **claim, 'evidenceCount': 7 if n == 1 else 3}})
+    
+    outcomes = asyncio.run(main._process_jobs(jobs.claim(10)))
+    assert [errors for _, errors in outcomes] == [None, ["Job failed: TypeError: unhashable type: 'list'"], None]
+    assert outcomes[0][0]['carbon'] is not None and outcomes[2][0]['carbon'] is not None
+
+def test_failed_job_leaves_no_history_or_index_entry(monkeypatch):
+    check = main.claim_history.check
+    
+    def failing_check(umkm_id, *args):
+        if umkm_id == 'umkm-side-bad':
+            raise RuntimeError('history unavailable')
+        return check(umkm_id, *args)
+    
+    monkeypatch.setattr(main.claim_history, 'check', failing_check)
+    rows = make_rows(2, seed=8)
+    claim = {'sector': 'Fashion', 'businessScale': 'small', 'period': 2024}
+    queue = JobQueue()
+    queue.submit({'id': 'side-bad', 'umkmId': 'umkm-side-bad', 'data': {**rows[0], **claim}})
+    queue.submit({'id': 'side-good', 'umkmId': 'umkm-side-good', 'data': {**rows[1], **claim}})
+    
+    outcomes = asyncio.run(main._process_jobs(queue.claim(10)))
+    assert outcomes[0] == (None, ['Job failed: RuntimeError: history unavailable'])
+    assert 'side-bad' not in main.similarity_index and 'umkm-side-bad' not in main.claim_history
+    assert 'side-good' in main.similarity_index and 'umkm-side-good' in main.claim_history
+
+def test_job_endpoints():
+    row = make_rows(1)[0]
+    with TestClient(main.app) as client:
+        response = client.post('/jobs', json={'data': {**row, 'sector': 'Fashion', 'businessScale': 'small'}})
+        assert response.status_code == 202
+        job_id = response.json()['jobId']
+        bad = client.post('/jobs', json={'data': {**row, 'sector': ['Fashion'], 'businessScale': 'small'}})
+        assert bad.status_code == 422 and bad.json()['detail'] == ['sector: Input should be a valid string']
+        for _ in range(100):
+            job = client.get(f'/jobs/{job_id}').json()
+            if job['status'] == 'done':
+                break
+            time.sleep(0.02)
+        assert job['status'] == 'done'
+        assert job['result']['carbon']['estimatedCO2Kg'] == row['carbonReductionKg']
+    
+        assert client.post('/jobs', json={'data': {'carbonReductionKg': 'many'}}).status_code == 422
+        bad_count = client.post('/jobs', json={'data': {**row, 'sector': 'Fashion', 'businessScale': 'small',
+                                                       'evidenceCount': 'two'}})
+        assert bad_count.status_code == 422 and bad_count.json()['detail'][0].startswith('evidenceCount')
+        assert client.post('/jobs', json={'data': row, 'callbackUrl': 'file:///etc/passwd'}).status_code == 422
+        assert client.get('/jobs/unknown').status_code == 404
+        assert client.get('/jobs/stats').json()['queue']['done'] >= 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,134 @@
+"""
+Test suite for the LLM review stage (against the in-process stub server)
+"""
+
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import main
+from benchmarks.llm_stub import create_app
+from cache import ResultCache
+from metrics import Metrics
+from validators.llm_reviewer import LLMReviewer, build_prompt, parse_review
+from validators.submission_validator import SubmissionValidator
+
+client = TestClient(main.app)
+
+BORDERLINE = {'isValid': True, 'confidence': 0.6, 'flags': [], 'flagCodes': [], 'suggestions': [], 'adjustedScores': {}}
+SUBMISSION = {
+    'resourceReductionPercentage': 30,
+    'resourceReductionDetails': 'Mengurangi limbah kain dengan pola potong baru',
+    'carbonReductionKg': 500,
+    'carbonCalculationMethod': 'waste_diverted',
+    'evidenceFiles': ['https://storage/llm/nota.jpg'],
+}
+
+def make_reviewer(stub, **kwargs):
+    kwargs.setdefault('cache', ResultCache(ttl_seconds=60))
+    return LLMReviewer('http://stub/v1', transport=httpx.ASGITransport(app=stub), **kwargs)
+
+def test_only_borderline_results_are_reviewed():
+    stub = create_app()
+    reviewer = make_reviewer(stub)
+    
+    async def run():
+        return await reviewer.review_all([
+            (SUBMISSION, BORDERLINE),
+            (SUBMISSION, {**BORDERLINE, 'confidence': 0.95}),
+            (SUBMISSION, {**BORDERLINE, 'confidence': 0.2}),
+        ])
+    
+    reviews = asyncio.run(run())
+    assert reviews[0] == {'verdict': 'consistent', 'reason': 'Stub: no rule-based flags', 'model': reviewer.model, 'cached': False}
+    assert reviews[1:] == [None, None]
+    assert stub.state.requests == 1
+    assert LLMReviewer(None).should_review(BORDERLINE) == False
+
+def test_identical_prompts_share_one_request_and_the_cache():
+    stub = create_app(latency=0.05)
+    reviewer = make_reviewer(stub, concurrency=2)
+    others = [{**SUBMISSION, 'carbonReductionKg': kg} for kg in range(1000, 1500, 100)]
+    
+    async def run():
+        return await reviewer.review_all([(SUBMISSION, BORDERLINE)] * 10 + [(data, BORDERLINE) for data in others])
+    
+    reviews = asyncio.run(run())
+    assert all(review['verdict'] == 'consistent' for review in reviews)
+    assert stub.state.requests == 1 + len(others)
+    assert stub.state.max_active <= 2
+    assert reviewer.coalesced == 9
+    
+    # Answers outlive the event loop (and the process with a cache path)
+    again = asyncio.run(reviewer.review(SUBMISSION, BORDERLINE))
+    assert again['cached'] and stub.state.requests == 1 + len(others)
+
+def test_failures_keep_the_rule_based_result():
+    reviewer = make_reviewer(create_app(fail_rate=1.0))
+    assert asyncio.run(reviewer.review(SUBMISSION, BORDERLINE)) is None
+    assert reviewer.errors == 1
+    assert SubmissionValidator().flag_llm_review(BORDERLINE, None) is BORDERLINE
+    
+    with pytest.raises(ValueError):
+        parse_review('{"verdict": "maybe"}')
+    assert parse_review('```json\n{"verdict": "Inconsistent", "reason": " no records "}\n```') == {
+        'verdict': 'inconsistent', 'reason': 'no records'
+    }
+
+def test_inconsistent_verdict_flags_the_result():
+    validator = SubmissionValidator()
+    flagged = {**BORDERLINE, 'flags': ['Unusually high carbon reduction claim'], 'flagCodes': ['high_carbon_claim']}
+    assert '"Unusually high carbon reduction claim"' in build_prompt(SUBMISSION, flagged)
+    
+    review = asyncio.run(make_reviewer(create_app()).review(SUBMISSION, flagged))
+    result = validator.flag_llm_review(flagged, review)
+    assert result['flags'][-1] == 'LLM review: Stub: 1 rule-based flag(s)'
+    assert result['confidence'] == pytest.approx(0.6 - validator.LLM_INCONSISTENT_PENALTY)
+    assert result['llmReview']['verdict'] == 'inconsistent'
+    assert result['flagCodes'] == ['high_carbon_claim', 'llm_inconsistent']
+    
+    metrics = Metrics()
+    metrics.record_result('submission', result['isValid'], result['flagCodes'])
+    assert metrics.flags.value(('submission', 'llm_inconsistent')) == 1
+
+def test_consistent_verdict_keeps_an_earlier_rejection():
+    validator = SubmissionValidator()
+    duplicate = {**BORDERLINE, 'isValid': False, 'flags': ['Evidence files reused from submission s-1'],
+                 'flagCodes': ['reused_evidence']}
+    result = validator.flag_llm_review(duplicate, {'verdict': 'consistent', 'reason': ''})
+    assert not result['isValid']
+    assert result['confidence'] == pytest.approx(0.6 + validator.LLM_CONSISTENT_BONUS)
+    assert validator.flag_llm_review(BORDERLINE, {'verdict': 'consistent', 'reason': ''})['isValid']
+
+def test_new_event_loop_closes_the_old_clients():
+    reviewer = make_reviewer(create_app(), cache=None)
+    assert asyncio.run(reviewer.review(SUBMISSION, BORDERLINE))['verdict'] == 'consistent'
+    old = reviewer._clients
+    
+    assert asyncio.run(reviewer.review(SUBMISSION, BORDERLINE))['verdict'] == 'consistent'
+    assert all(client.is_closed for client in old)
+    assert not any(client.is_closed for client in reviewer._clients)
+    asyncio.run(reviewer.close())
+
+def test_validate_endpoint_runs_review(monkeypatch):
+    stub = create_app()
+    monkeypatch.setattr(main, 'llm_reviewer', make_reviewer(stub, band=(0.0, 1.0)))
+    
+    response = client.post('/validate', json=SUBMISSION)
+    assert response.json()['llmReview']['verdict'] == 'consistent'
+    
+    response = client.post('/validate/batch', json={'items': [
+        {'id': 'llm-a', 'data': SUBMISSION},
+        {'id': 'llm-b', 'data': {**SUBMISSION, 'carbonReductionKg': 999999, 'evidenceFiles': ['https://storage/llm/b.jpg']}},
+    ]})
+    results = response.json()['results']
+    assert results['llm-a']['llmReview']['cached'] == True
+    assert results['llm-b']['llmReview']['verdict'] == 'inconsistent'
+    assert stub.state.requests == 2
+    
+    # The rule-based result is cached without the review
+    assert main.result_cache.get(main._submission_key(main.SubmissionData(**SUBMISSION)))['llmReview'] is None
+    assert client.get('/llm-review/stats').json()['requests'] == 2
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,306 @@
+"""
+Test suite for the FastAPI endpoints
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+from executor import ValidationExecutor, estimate_carbon_batch_task
+from main import app
+import streaming
+from streaming import RecordReader, StreamValidator
+
+client = TestClient(app)
+
+def test_validate_batch_matches_single():
+    submission = {
+        'carbonReductionKg': 8000,
+        'resourceReductionPercentage': 60,
+        'evidenceFiles': ['a.jpg'],
+    }
+    
+    single = client.post('/validate', json=submission).json()
+    response = client.post('/validate/batch', json={
+        'items': [
+            {'id': 'sub-1', 'data': submission},
+            {'id': 'sub-2', 'data': {'carbonReductionKg': 'banyak'}},
+        ]
+    })
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert body['results']['sub-1'] == single
+    assert 'sub-2' in body['errors']
+    assert 'sub-2' not in body['results']
+
+def test_estimate_carbon_batch_matches_single():
+    claim = {
+        'carbon_reduction_kg': 10000,
+        'calculation_method': 'waste_diverted',
+        'sector': 'Fashion',
+        'business_scale': 'small',
+        'evidence_count': 1,
+        'details': 'Banyak sampah didaur ulang',
+    }
+    
+    single = client.post('/estimate-carbon', params=claim).json()
+    response = client.post('/estimate-carbon/batch', json={
+        'items': [
+            {'id': 'a', 'data': claim},
+            {'id': 'b', 'data': {'sector': 'Fashion'}},
+            {'id': 'a', 'data': claim},
+        ]
+    })
+    
+    body = response.json()
+    assert body['results'] == {}
+    assert body['errors']['a'] == ['Duplicate id in batch']
+    assert 'b' in body['errors']
+    
+    response = client.post('/estimate-carbon/batch', json={'items': [{'id': 'a', 'data': claim}]})
+    assert response.json()['results']['a'] == single
+
+def test_estimate_carbon_structured():
+    claim = {
+        'carbon_reduction_kg': 10000,
+        'calculation_method': 'waste_diverted',
+        'sector': 'Fashion',
+        'business_scale': 'small',
+        'evidence_count': 1,
+        'details': 'Banyak sampah didaur ulang',
+    }
+    
+    text = client.post('/estimate-carbon', params=claim).json()
+    structured = client.post('/estimate-carbon', params={**claim, 'structured': True}).json()
+    assert all(isinstance(flag, str) for flag in text['flags'])
+    assert len(structured['flags']) == len(text['flags'])
+    assert all(set(flag) <= {'code', 'params'} for flag in structured['flags'])
+    assert structured['confidence'] == text['confidence']
+    
+    response = client.post('/estimate-carbon/batch', params={'structured': True},
+                           json={'items': [{'id': 'a', 'data': claim}]})
+    assert response.json()['results']['a'] == structured
+
+def test_validate_accepts_msgpack():
+    submission = {'carbonReductionKg': 8000, 'resourceReductionPercentage': 60, 'evidenceFiles': ['a.jpg']}
+    expected = client.post('/validate', json=submission).json()
+    
+    response = client.post('/validate', content=msgpack.packb(submission), headers={
+        'content-type': 'application/x-msgpack', 'accept': 'application/x-msgpack'
+    })
+    assert response.headers['content-type'] == 'application/x-msgpack'
+    assert msgpack.unpackb(response.content) == expected
+    
+    batch = {'items': [{'id': 'm1', 'data': submission}, {'id': 'm2', 'data': {'carbonReductionKg': 'banyak'}}]}
+    response = client.post('/validate/batch', content=msgpack.packb(batch), headers={'content-type': 'application/x-msgpack'})
+    body = response.json()
+    assert body['results']['m1'] == expected
+    assert 'm2' in body['errors']
+    
+    # Body errors keep FastAPI's JSON error responses
+    response = client.post('/validate', content=b'\xc1', headers={'content-type': 'application/x-msgpack'})
+    assert response.status_code == 400
+    response = client.post('/validate', content=b'{"carbonReductionKg": ', headers={'content-type': 'application/json'})
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['type'] == 'json_invalid'
+    response = client.post('/validate', content=msgpack.packb({'localEmployees': 'x'}),
+                           headers={'content-type': 'application/x-msgpack'})
+    assert response.status_code == 422
+
+def test_validate_uses_result_cache():
+    submission = {'carbonReductionKg': 7000, 'evidenceFiles': ['a.jpg', 'b.jpg']}
+    before = client.get('/cache/stats').json()
+    
+    first = client.post('/validate', json=submission).json()
+    second = client.post('/validate', json=submission).json()
+    
+    after = client.get('/cache/stats').json()
+    assert first == second
+    assert after['hits'] == before['hits'] + 1
+    assert after['misses'] == before['misses'] + 1
+
+def test_benchmarks_info_without_file():
+    info = client.get('/benchmarks').json()
+    
+    assert info['path'] is None
+    assert info['profiles'] == 5
+    assert client.post('/benchmarks/reload').status_code == 400
+
+def test_observed_claims_feed_outlier_model():
+    claims = [
+        {'sector': 'Pertanian', 'business_scale': 'large', 'calculation_method': 'transport_reduced',
+         'carbon_reduction_kg': 8000 + 100 * i}
+        for i in range(40)
+    ]
+    params = {'carbon_reduction_kg': 30000, 'calculation_method': 'transport_reduced', 'sector': 'Pertanian',
+              'business_scale': 'large', 'evidence_count': 6, 'details': 'transport 10000 km'}
+    
+    assert client.post('/estimate-carbon', params=params).json()['outlier'] is None
+    assert client.post('/outliers/observe', json={'claims': claims}).json()['observed'] == 40
+    
+    result = client.post('/estimate-carbon', params=params).json()
+    assert result['outlier']['samples'] == 40
+    assert any('persentil' in flag for flag in result['flags'])
+    assert client.get('/outliers').json()['claims'] >= 40
+
+def test_validate_flags_copied_submission():
+    details = (
+        'Sisa kain perca dikumpulkan setiap minggu lalu dijual ke pengrajin tas di desa sebelah, '
+        'sekitar 30 kg per bulan berdasarkan catatan timbangan'
+    )
+    original = {'resourceReductionDetails': details, 'evidenceFiles': ['https://storage/a/nota.jpg']}
+    first = client.post('/validate?submission_id=copy-1&umkm_id=umkm-a', json=original).json()
+    assert first['duplicates'] == []
+    
+    copied = {'resourceReductionDetails': details.replace('setiap', 'tiap'), 'evidenceFiles': ['https://storage/a/nota.jpg']}
+    response = client.post('/validate/batch', json={
+        'items': [{'id': 'copy-2', 'umkmId': 'umkm-b', 'data': copied}]
+    }).json()
+    result = response['results']['copy-2']
+    
+    assert [match['submissionId'] for match in result['duplicates']] == ['copy-1']
+    assert any('similar to submission copy-1' in flag for flag in result['flags'])
+    assert any('Evidence files reused' in flag for flag in result['flags'])
+    assert result['confidence'] < first['confidence']
+
+def test_analyze_evidence_requires_root():
+    response = client.post('/analyze-evidence', json=['nota.png'])
+    assert response.status_code == 400
+
+def test_estimate_carbon_checks_documented_quantity():
+    params = {
+        'carbon_reduction_kg': 3000,
+        'calculation_method': 'energy_saved',
+        'sector': 'F&B',
+        'business_scale': 'medium',
+        'evidence_count': 3,
+        'details': 'Penghematan listrik 6000 kWh per tahun dari meteran PLN, metode baseline periode tahun lalu',
+    }
+    
+    supported = client.post('/estimate-carbon', params={**params, 'documented_quantity': 6000}).json()
+    overstated = client.post('/estimate-carbon', params={**params, 'documented_quantity': 1000}).json()
+    
+    assert not any('didukung bukti' in flag for flag in supported['flags'])
+    assert any('1000 kWh setara 500 kg CO2' in flag for flag in overstated['flags'])
+
+def test_validate_stream_ndjson():
+    lines = [
+        '{"id": "s1", "carbon_reduction_kg": 500, "carbon_calculation_method": "waste_diverted", '
+        '"sector": "Fashion", "business_scale": "small", "evidence_count": 3}',
+        'not json',
+        '{"id": "s2", "resourceReductionPercentage": 70}',
+    ]
+    
+    response = client.post(
+        '/validate/stream',
+        params={'chunk_size': 2},
+        content='\n'.join(lines).encode(),
+    )
+    
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r['id'] for r in results] == ['s1', None, 's2']
+    assert results[0]['carbon']['isValid'] is True
+    assert results[1]['errors']
+    assert results[2]['validation']['flags'] == ['Very high resource reduction percentage']
+
+def test_stream_bad_evidence_count_is_a_record_error():
+    text = (
+        'id,carbon_reduction_kg,carbon_calculation_method,sector,business_scale,evidence_count\n'
+        's1,500,waste_diverted,Fashion,small,two\n'
+        's2,500,waste_diverted,Fashion,small,3.0\n'
+        's3,500,waste_diverted,Fashion,small,3\n'
+    )
+    
+    results = [json.loads(line) for line in StreamValidator().iter_validate([text], 'csv', chunk_size=10)]
+    
+    assert [r['id'] for r in results] == ['s1', 's2', 's3']
+    assert results[0]['errors'] == ['evidenceCount: Input should be a valid integer, unable to parse string as an integer']
+    assert results[1]['carbon'] == results[2]['carbon'] and results[2]['carbon']['isValid'] is True
+    
+    claim = {'carbonReductionKg': 500, 'carbonCalculationMethod': 'waste_diverted', 'sector': 'Fashion', 'businessScale': 'small'}
+    lines = [
+        json.dumps({'id': 'n1', **claim, 'sector': ['Fashion']}),
+        json.dumps({'id': 'n2', **claim, 'carbonDetails': {'kg': 250}}),
+        json.dumps({'id': 'n3', **claim}),
+    ]
+    results = [json.loads(line) for line in StreamValidator().iter_validate(['\n'.join(lines)], chunk_size=10)]
+    
+    assert [r['id'] for r in results] == ['n1', 'n2', 'n3']
+    assert results[0]['errors'] == ['sector: Input should be a valid string']
+    assert results[1]['errors'] == ['carbonDetails: Input should be a valid string']
+    assert 'errors' not in results[2] and results[2]['carbon'] is not None
+
+def test_stream_reader_csv_multiline_field():
+    reader = RecordReader('csv')
+    text = 'id,process_details\n1,"baris satu\nbaris dua"\n2,\n'
+    
+    records = reader.feed(text[:20]) + reader.feed(text[20:]) + reader.close()
+    
+    assert records == [
+        {'id': '1', 'process_details': 'baris satu\nbaris dua'},
+        {'id': '2', 'process_details': None},
+    ]
+
+def test_stream_reader_caps_an_unterminated_csv_record(monkeypatch):
+    monkeypatch.setattr(streaming, 'MAX_RECORD_SIZE', 100)
+    reader = RecordReader('csv')
+    rows = ''.join(f'{n},baris\n' for n in range(2, 40))
+    text = 'id,process_details\n1,"tidak ditutup\n' + rows + '40,' + 'x' * 300 + '\n41,akhir\n'
+    
+    records = []
+    for start in range(0, len(text), 7):
+        records += reader.feed(text[start:start + 7])
+        assert len(reader._buffer) + reader._pending_size <= 100 + 7
+    records += reader.close()
+    
+    errors = [record['_error'] for record in records if '_error' in record]
+    assert errors == ['Record longer than 100 characters'] * 2
+    ids = [record['id'] for record in records if '_error' not in record]
+    assert '1' not in ids and ids[-1] == '41' and '40' not in ids
+    assert ids == [str(n) for n in range(int(ids[0]), 40)] + ['41']
+
+def test_process_executor_matches_inline():
+    columns = {
+        'carbon_reduction_kg': [500, 10000, 2000, 30, 4500],
+        'calculation_method': ['waste_diverted', 'energy_saved', 'other', 'manual', 'transport_reduced'],
+        'sector': ['Fashion', 'F&B', 'Kerajinan', 'Tekstil', 'Pertanian'],
+        'business_scale': ['small', 'medium', 'large', 'small', 'huge'],
+        'evidence_count': [3, 1, 4, 0, 2],
+        'details': ['Daur ulang 250 kg sampah per tahun', None, '', 'listrik', 'jarak 20 km'],
+    }
+    inline = ValidationExecutor('inline')
+    pool = ValidationExecutor('process', workers=2, chunk_size=2)
+    
+    async def run_both():
+        try:
+            await pool.start()
+            return (
+                await inline.map_columns(estimate_carbon_batch_task, columns),
+                await pool.map_columns(estimate_carbon_batch_task, columns),
+            )
+        finally:
+            pool.shutdown()
+    
+    expected, actual = asyncio.run(run_both())
+    assert actual == expected
+
+def test_startup_does_not_import_batch_or_ocr_dependencies():
+    # Fresh interpreter: this test process has long imported everything
+    code = (
+        "import sys, main, executor; executor.init_worker(); "
+        "print(sorted(name for name in ('pandas', 'PIL') if name in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout
+    assert output.strip().splitlines()[-1] == '[]'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,131 @@
+"""
+Test suite for metrics and rule instrumentation
+"""
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from benchmarks.generator import SubmissionGenerator
+from executor import ValidationExecutor, validate_submission_timed_task
+from main import app
+from metrics import Histogram, Metrics, SamplingProfiler
+from validators.carbon_validator import CarbonValidator
+from validators.submission_validator import SubmissionData, SubmissionValidator
+
+client = TestClient(app)
+
+def test_step_timing_matches_plain_call():
+    metrics = Metrics(step_sample=1)
+    metrics.add_validator('carbon')
+    sampler = metrics.sampler('carbon')
+    validator = CarbonValidator()
+    
+    claims = SubmissionGenerator(seed=5).claims(300, factor=2.0)
+    fired = 0
+    for claim in claims:
+        result = validator.validate_carbon_claim(**claim)
+        assert sampler.run(validator.validate_carbon_claim, **claim) == result
+        fired += len(result.flags)
+    
+    assert metrics.step_samples.value(('carbon',)) == len(claims)
+    step_flags = sum(metrics.step_flags._values.values())
+    assert step_flags == fired > 0
+    steps = ('setup', 'benchmark_lookup', 'anomaly_detection', 'unknown_method',
+             'evidence_consistency', 'cross_validation')
+    for step in steps:
+        assert metrics.step_seconds.count(('carbon', step)) == len(claims)
+    assert {labels[1] for labels in metrics.step_seconds._series} == set(steps)
+
+def test_sampled_calls_go_through_the_executor():
+    metrics = Metrics(step_sample=1)
+    metrics.add_validator('submission')
+    row = SubmissionGenerator(seed=7, noise=0.3).submissions(1)[0]
+    data = SubmissionData(**{**row, 'carbonReductionKg': 9000, 'resourceReductionPercentage': 80})
+    
+    executor = ValidationExecutor('process', workers=1)
+    try:
+        result, marks = asyncio.run(executor.run(validate_submission_timed_task, data))
+    finally:
+        executor.shutdown()
+    assert result == SubmissionValidator().validate_submission(data)
+    assert [mark[0] for mark in marks] == ['setup', 'anomaly_detection', 'evidence_consistency', 'cross_validation', None]
+    
+    metrics.sampler('submission').record(marks)
+    assert metrics.step_flags.value(('submission', 'anomaly_detection')) == 2
+    assert metrics.step_seconds.count(('submission', 'cross_validation')) == 1
+
+def test_every_flag_has_a_rule_code():
+    metrics = Metrics(enabled=False)
+    metrics.add_validator('carbon')
+    metrics.add_validator('submission')
+    assert metrics.sampler('carbon') is None  # nothing instrumented when disabled
+    
+    generator = SubmissionGenerator(seed=6, noise=0.2)
+    carbon = CarbonValidator()
+    for claim in generator.claims(300, factor=3.0):
+        result = carbon.validate_carbon_claim(**claim, documented_quantity=1.0).to_dict()
+        assert len(result['flagCodes']) == len(result['flags'])
+        metrics.record_result('carbon', result['isValid'], result['flagCodes'])
+    
+    submissions = SubmissionValidator()
+    for row in generator.submissions(300):
+        result = submissions.validate_submission(SubmissionData(**row))
+        assert len(result.flagCodes) == len(result.flags)
+        metrics.record_result('submission', result.isValid, result.flagCodes)
+    
+    # The code, not the text, picks the rule: a method name that looks like
+    # another rule's message stays unknown_method
+    claim = {'carbon_reduction_kg': 500, 'calculation_method': 'tidak ditemukan dalam database benchmark',
+             'sector': next(iter(carbon.BENCHMARKS)), 'business_scale': 'small', 'evidence_count': 3}
+    result = carbon.validate_carbon_claim(**claim).to_dict()
+    codes = dict(zip(result['flagCodes'], result['flags']))
+    assert 'unknown_sector' not in codes
+    assert 'tidak ditemukan dalam database benchmark' in codes['unknown_method']
+    
+    rules = {labels[1] for labels in metrics.flags._values}
+    assert rules and 'other' not in rules
+
+def test_histogram_render_and_quantile():
+    histogram = Histogram('latency_seconds', 'Latency', (0.1, 1.0), ('route',))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value, ('/a"b',))
+    
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/a\\"b"} 4' in lines
+    assert histogram.quantile(0.5, ('/a"b',)) == pytest.approx(0.1)
+
+def test_metrics_endpoint_counts_requests_and_flags():
+    before = client.get('/metrics').text
+    claim = {
+        'carbon_reduction_kg': 900000,
+        'calculation_method': 'waste_diverted',
+        'sector': 'Fashion & Tekstil',
+        'business_scale': 'mikro',
+        'evidence_count': 0,
+    }
+    assert client.post('/estimate-carbon', params=claim).status_code == 200
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    text = response.text
+    assert 'circularfund_request_duration_seconds_count{route="/estimate-carbon",method="POST",status="200"}' in text
+    
+    def count(body, line):
+        found = [row for row in body.splitlines() if row.startswith(line + ' ')]
+        return float(found[0].split()[-1]) if found else 0
+    
+    too_high = 'circularfund_validation_flags_total{validator="carbon",rule="too_high"}'
+    assert count(text, too_high) == count(before, too_high) + 1
+
+def test_profiler_disabled_by_default_and_folds_stacks():
+    assert client.post('/debug/profile', params={'seconds': 0.1}).status_code == 404
+    
+    folded, snapshots = SamplingProfiler(interval=0.01).profile(0.1)
+    assert snapshots > 0
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in folded.splitlines())
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,107 @@
+"""
+Test suite for the columnar portfolio store
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from portfolio import FLAG_NAMES, PortfolioStore, flag_bits, flag_names
+from rescoring import RescoringEngine
+from test_rescoring import make_records
+from validators.carbon_validator import CarbonValidator
+
+client = TestClient(app)
+
+def filled(n=300, seed=0):
+    store = PortfolioStore(capacity=16)
+    engine = RescoringEngine(on_change=store.on_change)
+    records = make_records(n, seed)
+    for key, record in records.items():
+        engine.upsert(key, record)
+    return store, engine, records
+
+def test_query_matches_row_by_row_filter():
+    store, engine, records = filled()
+    assert len(store) == len(records)
+    
+    results = {key: engine.result(key) for key in records}
+    expected = [
+        key for key, result in results.items()
+        if records[key]['sector'] in ('Fashion', 'Kuliner')
+        and result['validation']['confidence'] >= 0.6
+        and result['carbon'] is not None
+    ]
+    response = store.query(sectors=['Fashion', 'Kuliner', 'Unknown'], min_confidence=0.6, carbon_valid=None,
+                           flags_none=[], limit=len(records))
+    matched = [row['id'] for row in response['rows'] if row['carbonValid'] is not None]
+    assert sorted(matched) == sorted(expected)
+    
+    confidences = [row['confidence'] for row in response['rows']]
+    assert confidences == sorted(confidences)
+    assert response['summary']['carbonClaims'] == len(expected)
+    
+    # Flag bits follow the result flag codes
+    for row in store.query(flags_any=['too_high', 'high_carbon_claim'], limit=1000)['rows']:
+        assert {'too_high', 'high_carbon_claim'} & set(row['flags'])
+        result = results[row['id']]
+        carbon_codes = result['carbon']['flagCodes'] if result['carbon'] else []
+        assert {'too_high', 'high_carbon_claim'} & set(result['validation']['flagCodes'] + carbon_codes)
+
+def test_group_by_and_updates():
+    store, engine, records = filled()
+    groups = store.query(group_by='sector')['groups']
+    assert sum(group['count'] for group in groups.values()) == len(records)
+    assert groups['Kerajinan']['count'] == sum(record['sector'] == 'Kerajinan' for record in records.values())
+    
+    flags = store.query(group_by='flag')['groups']
+    assert set(flags) <= set(FLAG_NAMES)
+    
+    # Updates and removals are reflected in place
+    engine.update('s0', {'sector': 'Baru', 'carbonReductionKg': 10 ** 7})
+    rows = store.query(sectors=['Baru'], limit=10)['rows']
+    assert [row['id'] for row in rows] == ['s0']
+    assert 'high_carbon_claim' in rows[0]['flags']
+    engine.remove('s0')
+    assert store.query(sectors=['Baru'])['count'] == 0
+    assert store.query()['count'] == len(records) - 1
+    
+    with pytest.raises(ValueError):
+        store.query(flags_any=['nope'])
+
+def test_many_free_text_scales_and_no_half_written_rows():
+    store, engine, records = filled(50)
+    for n in range(300):
+        engine.upsert(f'free-{n}', {**records[f's{n % 50}'], 'businessScale': f'scale-{n}'})
+    assert [row['id'] for row in store.query(scales=['scale-299'], limit=10)['rows']] == ['free-299']
+    assert store.query()['count'] == len(records) + 300
+    
+    with pytest.raises(ValueError):
+        store.put('broken', records['s0'], {'validation': {'isValid': True, 'confidence': 'high', 'flagCodes': []},
+                                            'carbon': None})
+    assert 'broken' not in store.rows and store.query()['count'] == len(records) + 300
+
+def test_page_orders_missing_values_last():
+    store, _, _ = filled(100)
+    page = store.query(order_by='carbon_confidence', descending=True, limit=100)['rows']
+    values = [row['carbonConfidence'] for row in page]
+    present = [value for value in values if value is not None]
+    assert values[:len(present)] == present == sorted(present, reverse=True)
+    assert store.query(order_by='carbon_confidence', descending=True, limit=10, offset=5)['rows'] == page[5:15]
+    assert flag_names(0) == []
+    
+    # Codes come straight from the result; unknown ones (e.g. trend codes) go to *_other
+    bits = flag_bits(['too_high', 'trend_growth'], CarbonValidator.FLAG_CODES, 'carbon_other')
+    assert flag_names(bits) == ['too_high', 'carbon_other']
+
+def test_portfolio_endpoint():
+    record = make_records(1, seed=9)['s0']
+    client.put('/rescore/portfolio-1', json={**record, 'sector': 'Portofolio'})
+    response = client.post('/portfolio/query', json={'sectors': ['Portofolio'], 'limit': 5, 'group_by': 'scale'})
+    assert response.status_code == 200
+    body = response.json()
+    assert body['count'] == 1 and body['rows'][0]['id'] == 'portfolio-1'
+    assert client.post('/portfolio/query', json={'group_by': 'umkm'}).status_code == 422
+    client.delete('/rescore/portfolio-1')
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,192 @@
+"""
+Test suite for incremental re-scoring
+"""
+
+import json
+import os
+import random
+import pytest
+from fastapi.testclient import TestClient
+from benchmarks.generator import SubmissionGenerator
+from main import app
+from rescoring import RescoringEngine
+from streaming import StreamValidator
+from validators.benchmark_store import BenchmarkStore
+from validators.carbon_validator import CarbonValidator
+from validators.claim_distribution import DistributionStore
+from validators.submission_validator import SubmissionData, SubmissionValidator
+
+client = TestClient(app)
+
+CSV = """sector,sub_sector,region,scale,min,max,typical
+Fashion,,,small,100,2000,500
+Fashion,,,medium,500,5000,2000
+Fashion,Batik,,small,150,2500,700
+Fashion,Batik,,medium,600,6000,2500
+Fashion,Batik,Jawa Barat,small,200,2600,800
+Fashion,Batik,Jawa Barat,medium,700,7000,3000
+Kerajinan,,,small,50,1500,400
+Kerajinan,,,medium,300,4000,1500
+"""
+
+def write(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def make_records(n, seed=0):
+    generator = SubmissionGenerator(seed=seed, noise=0.2)
+    rng = random.Random(seed)
+    records = {}
+    for i, row in enumerate(generator.submissions(n)):
+        row.update(
+            sector=rng.choice(['Fashion', 'Kerajinan', 'Kuliner']),
+            subSector=rng.choice([None, 'Batik']),
+            region=rng.choice([None, 'Jawa Barat', 'Bali']),
+            businessScale=rng.choice(['small', 'medium', 'mikro']),
+            carbonDetails=row['resourceReductionDetails'],
+        )
+        records[f"s{i}"] = row
+    return records
+
+def full_results(carbon_validator, records):
+    """What a from-scratch /validate/stream run returns for the records"""
+    stream = StreamValidator(SubmissionValidator(), carbon_validator)
+    lines = stream.validate_chunk([{'id': key, **record} for key, record in records.items()])
+    return {output['id']: output for output in map(json.loads, lines)}
+
+def stored(engine, submission_id):
+    result = dict(engine.result(submission_id))
+    del result['sequence']
+    return json.loads(json.dumps(result))
+
+def test_field_change_reruns_only_dependent_rules():
+    engine = RescoringEngine()
+    records = make_records(50)
+    for key, record in records.items():
+        assert engine.upsert(key, record).changed
+    expected = full_results(engine.carbon_validator, records)
+    assert all(stored(engine, key) == expected[key] for key in records)
+    
+    rescore = engine.update('s0', {'documentationLevel': 'minimal', 'traceabilitySystem': True})
+    assert rescore.rules == ['traceability_without_documentation']
+    assert rescore.carbon == False
+    
+    rescore = engine.update('s1', {'evidenceFiles': ['a.jpg']})
+    assert rescore.rules == ['few_evidence']
+    assert rescore.carbon == (engine.result('s1')['carbon'] is not None)
+    
+    rescore = engine.update('s2', {'productDetails': 'new text'})
+    assert rescore.to_dict() == {'id': 's2', 'rules': [], 'carbon': False, 'changed': False}
+    
+    records['s0'].update(documentationLevel='minimal', traceabilitySystem=True)
+    records['s1'].update(evidenceFiles=['a.jpg'])
+    expected = full_results(engine.carbon_validator, records)
+    for key in ('s0', 's1', 's2'):
+        assert stored(engine, key) == expected[key]
+    
+    results, since = engine.changes(0)
+    assert [result['id'] for result in results][-2:] == ['s0', 's1']
+    assert engine.changes(since) == ([], since)
+
+def test_rule_outcome_only_depends_on_declared_fields():
+    validator = SubmissionValidator()
+    rows = SubmissionGenerator(seed=3, noise=0.3).submissions(400)
+    rng = random.Random(3)
+    for row, other in zip(rows, reversed(rows)):
+        for name, fields in validator.RULES:
+            # Keep the rule's fields, take everything else from another row
+            mixed = {**other, **{field: row[field] for field in fields}}
+            if rng.random() < 0.5:
+                mixed = {field: mixed[field] for field in fields}
+            rule = getattr(validator, name)
+            assert rule(SubmissionData(**mixed)) == rule(SubmissionData(**row)), name
+
+def test_benchmark_update_recomputes_affected_claims_only(tmp_path):
+    path = str(tmp_path / 'benchmarks.csv')
+    write(path, CSV)
+    validator = CarbonValidator()
+    store = BenchmarkStore(path, validator, check_interval=0)
+    store.load()
+    engine = RescoringEngine(carbon_validator=validator, batch_size=20)
+    records = make_records(200, seed=1)
+    for key, record in records.items():
+        engine.upsert(key, record)
+    
+    batik_small = {
+        key for key, record in records.items()
+        if record['sector'] == 'Fashion' and record['subSector'] == 'Batik'
+        and record['region'] != 'Jawa Barat' and record['businessScale'] != 'medium'  # mikro falls back to small
+        and engine.result(key)['carbon'] is not None
+    }
+    write(path, CSV.replace('Fashion,Batik,,small,150,2500,700', 'Fashion,Batik,,small,150,900,300'))
+    assert store.maybe_reload()
+    runs = engine.claim_runs
+    assert set(engine.sync()) == batik_small
+    assert engine.claim_runs - runs == len(batik_small)
+    
+    # Adding a region profile re-resolves every Fashion claim
+    write(path, CSV + 'Fashion,,Bali,small,10,100,50\nFashion,,Bali,medium,10,100,50\n')
+    assert store.maybe_reload()
+    rescored = set(engine.sync())
+    assert rescored and all(records[key]['sector'] == 'Fashion' for key in rescored)
+    
+    expected = full_results(validator, records)
+    assert all(stored(engine, key) == expected[key] for key in records)
+    assert engine.sync() == []
+
+def test_distribution_update_recomputes_changed_groups():
+    validator = CarbonValidator()
+    distribution = DistributionStore(validator)
+    engine = RescoringEngine(carbon_validator=validator)
+    records = make_records(100, seed=2)
+    for key, record in records.items():
+        engine.upsert(key, record)
+    
+    record = next(record for record in records.values() if record['sector'] == 'Kerajinan')
+    group = ('Kerajinan', record['businessScale'], record['carbonCalculationMethod'])
+    distribution.observe([(group, 100.0 + i) for i in range(40)])
+    
+    rescored = engine.sync()
+    assert rescored
+    for key in rescored:
+        assert (records[key]['sector'], records[key]['businessScale'], records[key]['carbonCalculationMethod']) == group
+    expected = full_results(validator, records)
+    assert all(stored(engine, key) == expected[key] for key in records)
+
+def test_rescore_endpoints():
+    record = make_records(1, seed=4)['s0']
+    response = client.put('/rescore/api-1', json=record)
+    assert response.status_code == 200
+    assert response.json()['rescored']['rules'] == [name for name, _ in SubmissionValidator.RULES]
+    
+    response = client.patch('/rescore/api-1', json={'carbonReductionKg': 999999})
+    body = response.json()
+    assert body['rescored']['rules'] == ['high_carbon_claim']
+    assert 'Unusually high carbon reduction claim' in body['validation']['flags']
+    
+    assert client.patch('/rescore/missing', json={}).status_code == 404
+    assert client.patch('/rescore/api-1', json={'localEmployees': 'many'}).status_code == 422
+    changes = client.get('/rescore/changes', params={'since': body['sequence'] - 1}).json()
+    assert [result['id'] for result in changes['results']] == ['api-1']
+    assert client.delete('/rescore/api-1').status_code == 200
+    assert client.get('/rescore/api-1').status_code == 404
+
+def test_bad_claim_fields_leave_stored_state_unchanged():
+    record = {**make_records(1, seed=5)['s0'], 'sector': 'Fashion', 'businessScale': 'small'}
+    response = client.put('/rescore/api-bad', json={**record, 'evidenceCount': 'two'})
+    assert response.status_code == 422 and response.json()['detail'][0].startswith('evidenceCount')
+    response = client.put('/rescore/api-bad', json={**record, 'sector': ['Fashion']})
+    assert response.status_code == 422 and response.json()['detail'] == ['sector: Input should be a valid string']
+    assert client.get('/rescore/api-bad').status_code == 404
+    assert client.delete('/rescore/api-bad').status_code == 404
+    
+    assert client.put('/rescore/api-bad', json=record).status_code == 200
+    before = client.get('/rescore/api-bad').json()
+    assert client.patch('/rescore/api-bad', json={'evidenceCount': 'two', 'carbonReductionKg': 1}).status_code == 422
+    assert client.get('/rescore/api-bad').json() == before
+    assert client.delete('/rescore/api-bad').status_code == 200
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
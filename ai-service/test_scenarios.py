@@ -0,0 +1,116 @@
+"""
+Test suite for the what-if scenario simulation
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+import main
+from benchmarks.generator import SubmissionGenerator
+from scenarios import ClaimCorpus, Scenario
+from validators.carbon_validator import CarbonValidator
+
+client = TestClient(main.app)
+
+def make_claims(n=3000, seed=4):
+    return pd.DataFrame(SubmissionGenerator(seed=seed, noise=0.3).claims(n))
+
+def full_run(validator, claims):
+    result = validator.validate_carbon_claims_batch(claims)
+    return result.is_valid, result.confidence
+
+def test_unchanged_scenario_matches_baseline():
+    claims = make_claims()
+    report = ClaimCorpus(CarbonValidator(), claims, chunk_size=1000).simulate([Scenario('same')])
+    is_valid, confidence = full_run(CarbonValidator(), claims)
+    
+    scenario = report['scenarios'][0]
+    assert report['claims'] == len(claims)
+    assert scenario['becameInvalid'] == scenario['becameValid'] == 0
+    assert scenario['valid'] == report['baseline']['valid'] == int(is_valid.sum())
+    assert scenario['meanConfidence'] == pytest.approx(float(np.mean(confidence)), abs=1e-4)
+    assert sum(scenario['histogram']) == len(claims)
+    assert sum(group['claims'] for group in scenario['groups']) == len(claims)
+
+def test_tightened_benchmarks_match_a_full_rerun():
+    claims = make_claims()
+    
+    class Tightened(CarbonValidator):
+        BENCHMARKS = {
+            sector: {
+                scale: {**entry, 'max': entry['max'] * 0.7} if sector == 'Fashion' or scale == 'large' else entry
+                for scale, entry in table.items()
+            }
+            for sector, table in CarbonValidator.BENCHMARKS.items()
+        }
+    
+    overrides = {
+        sector: {'large': {'max': table['large']['max'] * 0.7}}
+        for sector, table in CarbonValidator.BENCHMARKS.items() if sector != 'Fashion'
+    }
+    overrides['Fashion'] = {scale: {'max': entry['max'] * 0.7} for scale, entry in CarbonValidator.BENCHMARKS['Fashion'].items()}
+    report = ClaimCorpus(CarbonValidator(), claims).simulate([Scenario('tight', benchmarks=overrides)])
+    baseline, _ = full_run(CarbonValidator(), claims)
+    is_valid, confidence = full_run(Tightened(), claims)
+    
+    scenario = report['scenarios'][0]
+    assert scenario['valid'] == int(is_valid.sum())
+    assert scenario['becameInvalid'] == int((baseline & ~is_valid).sum()) > 0
+    assert scenario['becameValid'] == 0
+    assert scenario['meanConfidence'] == pytest.approx(float(np.mean(confidence)), abs=1e-4)
+    
+    fashion = [group for group in scenario['groups'] if group['sector'] == 'Fashion']
+    mask = (claims['sector'] == 'Fashion').to_numpy()
+    assert sum(group['valid'] for group in fashion) == int(is_valid[mask].sum())
+
+def test_evidence_buckets_and_several_scenarios_in_one_pass():
+    claims = make_claims(seed=5)
+    
+    class Lenient(CarbonValidator):
+        MIN_EVIDENCE_RATIOS = (1.0, 3.0)
+        MIN_EVIDENCE_COUNTS = (1, 2, 3)
+    
+    report = ClaimCorpus(CarbonValidator(), claims, chunk_size=700).simulate([
+        Scenario('wider', multipliers={'min': 0.5, 'max': 2.0}),
+        Scenario('lenient', min_evidence_ratios=(1.0, 3.0), min_evidence_counts=(1, 2, 3)),
+    ])
+    is_valid, _ = full_run(Lenient(), claims)
+    lenient = report['scenarios'][1]
+    assert lenient['valid'] == int(is_valid.sum())
+    assert lenient['flags']['insufficient_evidence'] < report['baseline']['flags']['insufficient_evidence']
+    assert report['scenarios'][0]['flags']['too_high'] < report['baseline']['flags']['too_high']
+
+def test_invalid_scenarios_are_rejected():
+    corpus = ClaimCorpus(CarbonValidator(), make_claims(100))
+    with pytest.raises(ValueError, match='unknown benchmark profile'):
+        corpus.simulate([Scenario('x', benchmarks={'Otomotif': {'small': {'max': 1}}})])
+    with pytest.raises(ValueError, match='min is above'):
+        corpus.simulate([Scenario('x', benchmarks={'Fashion': {'small': {'min': 1e9}}})])
+    with pytest.raises(ValueError, match='one entry more'):
+        corpus.simulate([Scenario('x', min_evidence_ratios=(1.0,), min_evidence_counts=(1,))])
+
+def test_simulate_endpoint():
+    claims = SubmissionGenerator(seed=6, noise=0.3).claims(50)
+    response = client.post('/scenarios/simulate', json={
+        'claims': claims,
+        'scenarios': [{'name': 'half', 'multipliers': {'max': 0.5}}],
+    })
+    assert response.status_code == 200
+    report = response.json()
+    assert report['claims'] == 50
+    assert report['scenarios'][0]['name'] == 'half'
+    assert report['scenarios'][0]['becameValid'] == 0
+    
+    response = client.post('/scenarios/simulate', json={
+        'claims': claims, 'scenarios': [{'name': 'bad', 'multipliers': {'median': 2}}],
+    })
+    assert response.status_code == 422
+    
+    # Without inline claims the stored /rescore corpus is used
+    response = client.post('/scenarios/simulate', json={'scenarios': [{'name': 'stored'}]})
+    assert response.status_code == 200
+    assert response.json()['claims'] == len(main.rescoring_engine.claims())
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
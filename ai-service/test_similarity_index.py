@@ -0,0 +1,91 @@
+"""
+Test suite for the near-duplicate similarity index
+"""
+
+import json
+import pytest
+from validators.similarity_index import SimilarityIndex, main, signature
+
+PROCESS = (
+    'Kami mengganti mesin jahit lama dengan mesin hemat energi dan memotong kain '
+    'memakai pola digital sehingga sisa potongan berkurang dari 40 kg menjadi 15 kg per bulan'
+)
+RESOURCE = 'Sisa kain perca dikumpulkan setiap minggu lalu dijual ke pengrajin tas di desa sebelah'
+
+def reworded(text):
+    return text.replace('setiap minggu', 'tiap minggu')
+
+def test_near_copy_found_and_fresh_text_not():
+    index = SimilarityIndex()
+    index.insert('sub-1', [RESOURCE, PROCESS], umkm_id='umkm-a')
+    index.insert('sub-2', ['Kami membuat kompos dari ampas kopi yang dikumpulkan dari tiga kedai di sekitar pasar'])
+    
+    matches = index.query([reworded(RESOURCE), PROCESS], umkm_id='umkm-b')
+    assert [match.submission_id for match in matches] == ['sub-1']
+    assert 0.6 <= matches[0].similarity < 1.0
+    
+    # Same UMKM re-submitting, or the submission itself, is not a duplicate
+    assert index.query([RESOURCE, PROCESS], umkm_id='umkm-a') == []
+    assert index.query([RESOURCE, PROCESS], submission_id='sub-1') == []
+    # Too little text to say anything
+    assert signature(['hemat energi']) is None
+
+def test_reused_evidence_matches_without_text():
+    index = SimilarityIndex()
+    index.insert('sub-1', [None], ['https://storage/umkm-a/nota-1.jpg', 'https://storage/umkm-a/foto.jpg'])
+    
+    matches = index.query([PROCESS], [' https://storage/umkm-a/nota-1.jpg', 'https://storage/umkm-b/x.jpg'])
+    assert len(matches) == 1
+    assert matches[0].similarity is None
+    assert matches[0].shared_evidence == 1
+
+def test_check_inserts_once_and_dedupes_ids():
+    index = SimilarityIndex()
+    assert index.check('sub-1', [PROCESS], umkm_id='umkm-a') == []
+    assert index.check('sub-1', [PROCESS], umkm_id='umkm-a') == []  # retry of the same submission
+    assert len(index) == 1
+    assert index.check('sub-2', [PROCESS], umkm_id='umkm-b')[0].submission_id == 'sub-1'
+    assert len(index) == 2
+
+def test_persists_across_compaction_and_restart(tmp_path):
+    path = str(tmp_path / 'similarity')
+    index = SimilarityIndex(path, compact_every=3)
+    for i in range(5):
+        index.insert(f'sub-{i}', [f'{PROCESS} batch {i} ' * 2], [f'nota-{i}.jpg'], umkm_id=f'umkm-{i}')
+    index.compact()
+    index.insert('sub-late', [RESOURCE], umkm_id='umkm-x')  # only in the log
+    stats = index.stats()
+    assert stats['compacted'] == 5 and stats['pending'] == 1
+    index.close()
+    
+    reopened = SimilarityIndex(path)
+    assert len(reopened) == 6
+    assert 'sub-late' in reopened
+    assert reopened.query([reworded(RESOURCE)])[0].submission_id == 'sub-late'
+    assert reopened.query([], ['nota-3.jpg'])[0].submission_id == 'sub-3'
+    # Inserts during a background compaction are neither lost nor duplicated
+    reopened.compact(wait=False)
+    reopened.insert('sub-new', [RESOURCE + ' lagi'], umkm_id='umkm-y')
+    reopened.compact()
+    assert reopened.stats()['compacted'] == 7
+    reopened.close()
+    assert len(SimilarityIndex(path)) == 7
+
+def test_build_cli_from_export(tmp_path):
+    export = tmp_path / 'export.ndjson'
+    export.write_text('\n'.join(json.dumps(row) for row in [
+        {'id': 1, 'umkm_id': 10, 'resource_reduction_details': RESOURCE, 'process_details': PROCESS,
+         'evidence_files': ['a.jpg']},
+        {'id': 2, 'umkm_id': 11, 'process_details': 'Kompos dari ampas kopi tiga kedai di sekitar pasar'},
+        {'umkm_id': 12, 'process_details': PROCESS},
+    ]) + '\n')
+    path = str(tmp_path / 'similarity')
+    
+    main([str(export), '--index', path])
+    
+    index = SimilarityIndex(path)
+    assert len(index) == 2
+    assert index.query([reworded(RESOURCE), PROCESS], umkm_id='99')[0].umkm_id == '10'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,493 @@
+"""
+Benchmark Store
+Memuat benchmark karbon dari file berversi (JSON/CSV/Parquet) dan hot-reload
+
+Every row describes one (sector, sub_sector, region, scale) benchmark. Rows
+without sub_sector/region are the sector's base profile, which every sector
+must have; sub-sector and regional rows refine it. A reload parses and
+compiles the new file off to the side (in the watcher thread, see
+`BenchmarkStore.watch`), then swaps `CarbonValidator.rules` in a single
+assignment: requests already running keep the snapshot they started with, and
+nobody waits on a lock.
+
+Building a large snapshot allocates hundreds of thousands of small objects.
+Cyclic GC is paused while it is built, and the snapshot loaded at startup is
+frozen afterwards (gc.freeze), otherwise gen-2 collections over those objects
+would stop every thread for tens of milliseconds. Hot reloads do not freeze
+again: gc.freeze moves every live object of the process, so repeated freezes
+would keep request state and garbage cycles forever. The tables contain no
+reference cycles, so replaced snapshots are still freed by reference counting.
+
+Parsing and compiling a large file takes most of a second, and every process
+(uvicorn workers, pool workers) would do it and keep its own copy. The
+compiled snapshot is therefore published next to the file
+(`<path>.snapshot`): a JSON header plus the flat float64 tables, which every
+process maps read-only (mmap) when the key (file hash, RULES_REVISION,
+SNAPSHOT_FORMAT) matches. The tables are then one set of page-cache pages
+shared by all workers; only the lookup dicts are built per process. Under a
+file lock one process compiles and publishes a changed file (write to a temp
+file, os.replace) while the others wait and map the result. A replaced
+snapshot stays valid for processes that still map it (the old inode lives
+until its last mapping is gone), and each process swaps to the new one in a
+single assignment as above.
+"""
+
+import csv
+import gc
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from validators.compiled_rules import CompiledRules
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent publishers may both compile
+    fcntl = None
+
+ProfileKey = Tuple[str, Optional[str], Optional[str]]
+Entry = Dict[str, float]
+
+# Bump when CompiledRules or the file layout changes (invalidates snapshots)
+SNAPSHOT_FORMAT = 2
+SNAPSHOT_MAGIC = b'CFRULES\n'
+SNAPSHOT_PREFIX = struct.Struct('<8sQ')  # magic, header length
+SNAPSHOT_ALIGN = 64
+
+COLUMNS = ('sector', 'sub_sector', 'region', 'scale', 'min', 'max', 'typical')
+FORMATS = ('.json', '.csv', '.parquet')
+
+# Floor for the watcher's poll interval (check_interval=0 would spin)
+MIN_WATCH_INTERVAL = 0.05
+
+
+@dataclass
+class BenchmarkSet:
+    """
+    Isi satu file benchmark, siap dikompilasi oleh CarbonValidator
+
+    `benchmarks` memakai bentuk yang sama dengan `CarbonValidator.BENCHMARKS`
+    (profil dasar per sektor); `variants` berisi profil sub-sektor/regional.
+    """
+    version: str
+    benchmarks: Dict[str, Dict[str, Entry]]
+    variants: Dict[ProfileKey, Dict[str, Entry]] = field(default_factory=dict)
+    scales: Tuple[str, ...] = ()
+    method_factors: Optional[Dict[str, float]] = None
+    default_sector: Optional[str] = None
+    source: Optional[str] = None
+
+
+def _number(value: Any, column: str, row: int) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Row {row}: '{column}' must be a number, got {value!r}")
+    if number != number or number < 0:
+        raise ValueError(f"Row {row}: '{column}' must be a non-negative number, got {value!r}")
+    # Integral values stay ints so messages read "100 kg", not "100.0 kg"
+    return int(number) if number.is_integer() else number
+
+
+def _label(value: Any) -> Optional[str]:
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def build_benchmark_set(
+    rows: Iterable[Dict[str, Any]],
+    version: str,
+    scales: Sequence[str] = (),
+    method_factors: Optional[Dict[str, float]] = None,
+    default_sector: Optional[str] = None,
+    source: Optional[str] = None
+) -> BenchmarkSet:
+    """Validasi baris benchmark dan kelompokkan per profil"""
+    profiles: Dict[ProfileKey, Dict[str, Entry]] = {}
+    seen_scales: List[str] = list(scales)
+
+    for row_number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            raise ValueError(f"Row {row_number}: expected an object, got {type(row).__name__}")
+        sector = _label(row.get('sector'))
+        scale = _label(row.get('scale'))
+        if sector is None or scale is None:
+            raise ValueError(f"Row {row_number}: 'sector' and 'scale' are required")
+        if scale not in seen_scales:
+            if scales:
+                raise ValueError(f"Row {row_number}: unknown scale '{scale}', expected one of {tuple(scales)}")
+            seen_scales.append(scale)
+
+        entry = {column: _number(row.get(column), column, row_number) for column in ('min', 'max', 'typical')}
+        if not entry['min'] <= entry['typical'] <= entry['max']:
+            raise ValueError(f"Row {row_number}: expected min <= typical <= max, got {entry}")
+
+        key = (sector, _label(row.get('sub_sector')), _label(row.get('region')))
+        entries = profiles.setdefault(key, {})
+        if scale in entries:
+            raise ValueError(f"Row {row_number}: duplicate benchmark for {key} scale '{scale}'")
+        entries[scale] = entry
+
+    benchmarks = {}
+    variants = {}
+    for key, entries in profiles.items():
+        missing = [scale for scale in seen_scales if scale not in entries]
+        if missing:
+            raise ValueError(f"Benchmark {key} is missing scales {missing}")
+        ordered = {scale: entries[scale] for scale in seen_scales}
+        if key[1] is None and key[2] is None:
+            benchmarks[key[0]] = ordered
+        else:
+            variants[key] = ordered
+
+    for sector, _, _ in variants:
+        if sector not in benchmarks:
+            raise ValueError(f"Sector '{sector}' has sub-sector/regional rows but no base rows")
+    if not benchmarks:
+        raise ValueError("Benchmark file contains no rows")
+    if default_sector is not None and default_sector not in benchmarks:
+        raise ValueError(f"default_sector '{default_sector}' has no benchmark rows")
+
+    return BenchmarkSet(
+        version=version,
+        benchmarks=benchmarks,
+        variants=variants,
+        scales=tuple(seen_scales),
+        method_factors=dict(method_factors) if method_factors else None,
+        default_sector=default_sector,
+        source=source
+    )
+
+
+def parse_benchmark_file(content: bytes, path: str) -> BenchmarkSet:
+    """
+    Parse isi file benchmark berdasarkan ekstensinya
+
+    - JSON: {"version", "scales", "default_sector", "method_factors", "benchmarks": [rows]}
+    - CSV/Parquet: satu baris per benchmark dengan kolom COLUMNS
+      (Parquet membutuhkan pyarrow)
+
+    Tanpa field version, versi diambil dari hash isi file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    content_hash = hashlib.sha256(content).hexdigest()[:12]
+
+    if extension == '.json':
+        try:
+            document = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid benchmark JSON: {e.msg} (line {e.lineno})")
+        if not isinstance(document, dict) or not isinstance(document.get('benchmarks'), list):
+            raise ValueError("Benchmark JSON must be an object with a 'benchmarks' list")
+        scales = document.get('scales') or []
+        if not isinstance(scales, list) or not all(isinstance(scale, str) for scale in scales):
+            raise ValueError("'scales' must be a list of strings")
+        method_factors = document.get('method_factors')
+        if method_factors is not None and not (
+            isinstance(method_factors, dict)
+            and all(isinstance(factor, (int, float)) and not isinstance(factor, bool)
+                    for factor in method_factors.values())
+        ):
+            raise ValueError("'method_factors' must be an object of numbers")
+        default_sector = document.get('default_sector')
+        if default_sector is not None and not isinstance(default_sector, str):
+            raise ValueError("'default_sector' must be a string")
+        return build_benchmark_set(
+            document['benchmarks'],
+            version=str(document.get('version') or content_hash),
+            scales=scales,
+            method_factors=method_factors,
+            default_sector=default_sector,
+            source=path
+        )
+
+    if extension == '.csv':
+        # csv.DictReader goes row by row, so a reload thread keeps yielding the
+        # GIL; pandas.read_csv holds it for the whole file
+        rows = list(csv.DictReader(io.StringIO(content.decode('utf-8-sig'))))
+        columns = rows[0].keys() if rows else ()
+    elif extension == '.parquet':
+        import pandas as pd  # only Parquet needs it
+        frame = pd.read_parquet(io.BytesIO(content))
+        columns = frame.columns
+        values = [frame[name].astype(object).where(frame[name].notna(), None).tolist() for name in columns]
+        rows = [dict(zip(columns, row)) for row in zip(*values)]
+    else:
+        raise ValueError(f"Unsupported benchmark file '{path}', expected one of {FORMATS}")
+
+    missing = [column for column in ('sector', 'scale', 'min', 'max', 'typical') if column not in columns]
+    if missing:
+        raise ValueError(f"Benchmark file is missing columns {missing}")
+    return build_benchmark_set(rows, version=content_hash, source=path)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+
+def write_snapshot(path: str, key: str, version: str, rules: CompiledRules):
+    """Tulis snapshot (header JSON + array datar) secara atomik ke `path`"""
+    meta, arrays = rules.snapshot_state()
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = [array.dtype.str, offset, len(array)]
+        offset += array.nbytes
+    header = json.dumps({'key': key, 'version': version, 'rules': meta, 'arrays': layout}).encode('utf-8')
+    start = _aligned(SNAPSHOT_PREFIX.size + len(header))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(SNAPSHOT_PREFIX.pack(SNAPSHOT_MAGIC, len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(start + layout[name][1])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def map_snapshot(path: str, key: Optional[str] = None) -> Optional[Tuple[str, CompiledRules]]:
+    """
+    (version, CompiledRules) dengan tabel sebagai view read-only atas mmap file
+
+    None when the file is not a snapshot or its key differs from `key`.
+    The mapping lives as long as the returned rules reference it.
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapped) < SNAPSHOT_PREFIX.size:
+        return None
+    magic, header_size = SNAPSHOT_PREFIX.unpack_from(mapped)
+    if magic != SNAPSHOT_MAGIC:
+        return None
+    header = json.loads(mapped[SNAPSHOT_PREFIX.size:SNAPSHOT_PREFIX.size + header_size])
+    if key is not None and header['key'] != key:
+        return None
+    start = _aligned(SNAPSHOT_PREFIX.size + header_size)
+    arrays = {
+        name: np.frombuffer(mapped, dtype=np.dtype(dtype), count=count, offset=start + offset)
+        for name, (dtype, offset, count) in header['arrays'].items()
+    }
+    return header['version'], CompiledRules.from_snapshot(header['rules'], arrays)
+
+
+class BenchmarkStore:
+    """
+    Sumber benchmark berbasis file untuk satu CarbonValidator
+
+    `watch()` menjalankan `maybe_reload()` di thread latar: file di-stat tiap
+    `check_interval` detik dan hanya dibaca ulang jika mtime/ukurannya berubah,
+    sehingga request hanya membaca `validator.rules`. File yang rusak tidak
+    pernah menggantikan snapshot yang sedang aktif; errornya disimpan di
+    `last_error`.
+
+    Args:
+        path: File benchmark (.json, .csv atau .parquet)
+        validator: CarbonValidator yang rules-nya di-swap saat reload
+        check_interval: Jeda minimum antar pengecekan file (detik)
+        snapshot_path: Snapshot bersama hasil kompilasi (None = tanpa snapshot, tiap proses kompilasi sendiri)
+    """
+
+    def __init__(self, path: str, validator, check_interval: float = 5.0, snapshot_path: Optional[str] = None):
+        self.path = path
+        self.validator = validator
+        self.check_interval = check_interval
+        self.snapshot_path = snapshot_path
+        self.snapshot_hits = 0
+        self.mapped = False
+        self.version: Optional[str] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._content_hash: Optional[str] = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls, validator) -> Optional['BenchmarkStore']:
+        path = os.getenv('BENCHMARKS_PATH')
+        if not path:
+            return None
+        return cls(
+            path,
+            validator,
+            float(os.getenv('BENCHMARKS_RELOAD_INTERVAL', '5')),
+            snapshot_path=os.getenv('BENCHMARKS_SNAPSHOT_PATH', f"{path}.snapshot") or None
+        )
+
+    def _stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> bool:
+        """
+        Baca file dan swap snapshot jika isinya berubah
+
+        Raises ValueError/OSError bila file tidak valid; snapshot lama tetap aktif.
+        """
+        with self._reload_lock:
+            signature = self._stat()
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            content_hash = hashlib.sha256(content).hexdigest()
+            self._signature = signature
+            if content_hash == self._content_hash:
+                return False
+
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                snapshot_key = f"{content_hash}:{self.validator.RULES_REVISION}:{SNAPSHOT_FORMAT}"
+                snapshot = self._read_snapshot(snapshot_key)
+                if snapshot is not None:
+                    self.snapshot_hits += 1
+                else:
+                    with self._publish_lock():
+                        # Another process may have published it while we waited
+                        snapshot = self._read_snapshot(snapshot_key)
+                        if snapshot is not None:
+                            self.snapshot_hits += 1
+                        else:
+                            snapshot = self._compile(content, snapshot_key)
+                version, rules, self.mapped = snapshot
+                self.validator.rules = rules
+                if self.reloads == 0:
+                    # Startup only: freezing on every reload would also move
+                    # request state and garbage cycles into the permanent generation
+                    gc.freeze()
+            finally:
+                if gc_enabled:
+                    gc.enable()
+
+            self.version = version
+            self._content_hash = content_hash
+            self.loaded_at = time.time()
+            self.reloads += 1
+            self.last_error = None
+            return True
+
+    def _compile(self, content: bytes, key: str) -> Tuple[str, CompiledRules, bool]:
+        """Parse + kompilasi, publikasikan snapshot, lalu pakai versi yang di-map"""
+        benchmark_set = parse_benchmark_file(content, self.path)
+        # Compiled before the swap; readers only ever see a finished snapshot
+        rules = self.validator.compile_rules(benchmark_set)
+        if self.snapshot_path is not None:
+            try:
+                write_snapshot(self.snapshot_path, key, benchmark_set.version, rules)
+            except OSError:
+                pass  # read-only directory: keep working without a snapshot
+            else:
+                # Map what was written, so this process shares the pages too
+                snapshot = self._read_snapshot(key)
+                if snapshot is not None:
+                    return snapshot
+        return benchmark_set.version, rules, False
+
+    @contextmanager
+    def _publish_lock(self) -> Iterator[None]:
+        """File lock agar hanya satu proses yang mengkompilasi snapshot baru"""
+        if self.snapshot_path is None or fcntl is None:
+            yield
+            return
+        try:
+            lock_file = open(f"{self.snapshot_path}.lock", 'a')
+        except OSError:
+            yield
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+        finally:
+            lock_file.close()
+
+    def _read_snapshot(self, key: str) -> Optional[Tuple[str, CompiledRules, bool]]:
+        """(version, CompiledRules, mapped) dari snapshot jika key-nya cocok"""
+        if self.snapshot_path is None:
+            return None
+        try:
+            snapshot = map_snapshot(self.snapshot_path, key)
+        except Exception:  # missing, truncated or from an incompatible version: rebuild
+            return None
+        return None if snapshot is None else (*snapshot, True)
+
+    def reload(self) -> bool:
+        """load() yang mencatat error alih-alih melemparnya"""
+        try:
+            return self.load()
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            return False
+
+    def maybe_reload(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_check or self._reload_lock.locked():
+            return False
+        self._next_check = now + self.check_interval
+        try:
+            if self._stat() == self._signature:
+                return False
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+        return self.reload()
+
+    def watch(self):
+        """Poll the file from a daemon thread; reloads never run on a request"""
+        if self._watcher is not None:
+            return
+        self._stopped.clear()
+        self._watcher = threading.Thread(target=self._watch, name='benchmark-watch', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        if self._watcher is not None:
+            self._stopped.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stopped.wait(max(self.check_interval, MIN_WATCH_INTERVAL)):
+            try:
+                self.maybe_reload()
+            except Exception as e:  # keep watching; the current snapshot stays active
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def info(self) -> Dict[str, Any]:
+        rules = self.validator.rules
+        return {
+            'path': self.path,
+            'version': self.version,
+            'rulesVersion': rules.version,
+            'sectors': len(rules.sectors),
+            'profiles': len(rules.profiles),
+            'entries': len(rules.bench_min),
+            'loadedAt': self.loaded_at,
+            'reloads': self.reloads,
+            'snapshotPath': self.snapshot_path,
+            'snapshotHits': self.snapshot_hits,
+            'snapshotMapped': self.mapped,
+            'lastError': self.last_error,
+        }
@@ -3,18 +3,187 @@ Carbon Claim Validator
 Validasi klaim pengurangan karbon dengan anomaly detection
 """
 
-import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, field
+
+from validators.claim_distribution import (
+    PERCENTILE_THRESHOLD, Z_THRESHOLD, ClaimDistributionModel
+)
+from validators.compiled_rules import CompiledRules, DetailAnalysis
+from validators.messages import Message, MessageCatalog
+
+if TYPE_CHECKING:
+    import pandas as pd  # batch path only, imported there (keeps startup lean)
+    from validators.benchmark_store import BenchmarkSet
 
 @dataclass
 class CarbonValidationResult:
+    """
+    Hasil validasi satu klaim
+
+    Flags and suggestions are kept as message codes (`flag_codes`,
+    `suggestion_codes`); `flags` and `suggestions` render the Indonesian texts
+    on access.
+    """
     is_valid: bool
     confidence: float
-    flags: List[str]
-    suggestions: List[str]
+    flag_codes: List[Message]
+    suggestion_codes: List[Message]
     adjusted_score: Optional[float] = None
+    outlier: Optional[Dict[str, float]] = None  # zScore/percentile vs klaim historis
+
+    @property
+    def flags(self) -> List[str]:
+        return CarbonValidator.FLAG_MESSAGES.render_all(self.flag_codes)
+
+    @property
+    def suggestions(self) -> List[str]:
+        return CarbonValidator.SUGGESTION_MESSAGES.render_all(self.suggestion_codes)
+
+    def to_dict(self, structured: bool = False) -> Dict:
+        """
+        Bentuk JSON yang dipakai API (camelCase)
+
+        With `structured`, flags and suggestions are {"code", "params"} objects
+        instead of rendered texts.
+        """
+        if structured:
+            flags = [CarbonValidator.FLAG_MESSAGES.to_dict(message) for message in self.flag_codes]
+            suggestions = [CarbonValidator.SUGGESTION_MESSAGES.to_dict(message) for message in self.suggestion_codes]
+        else:
+            flags = self.flags
+            suggestions = self.suggestions
+        return {
+            "isValid": self.is_valid,
+            "confidence": self.confidence,
+            "flags": flags,
+            "flagCodes": [message.code for message in self.flag_codes],
+            "suggestions": suggestions,
+            "adjustedScore": self.adjusted_score,
+            "outlier": self.outlier,
+        }
+
+
+@dataclass
+class CarbonBatchResult:
+    """
+    Hasil validasi batch dalam bentuk kolom (satu elemen per klaim)
+
+    Flags dan suggestions tidak langsung dibentuk sebagai string; setiap rule
+    disimpan sebagai mask boolean dan teksnya baru dirender saat diminta,
+    identik dengan hasil `validate_carbon_claim`.
+    """
+    is_valid: np.ndarray
+    confidence: np.ndarray
+    adjusted_score: np.ndarray  # NaN jika tidak ada penyesuaian
+    masks: Dict[str, np.ndarray]
+    inputs: 'pd.DataFrame'
+    sector_idx: np.ndarray  # index profil benchmark (rules.profiles) setelah fallback
+    scale_idx: np.ndarray   # index ke rules.scales setelah fallback
+    min_evidence: np.ndarray
+    supported_kg: np.ndarray        # CO2 yang didukung bukti, NaN jika tidak ada
+    outlier_z: np.ndarray           # NaN jika grup belum punya cukup data
+    outlier_percentile: np.ndarray
+    outlier_samples: np.ndarray     # 0 jika grup belum punya cukup data
+    validator: 'CarbonValidator'
+    rules: CompiledRules    # snapshot yang dipakai, juga untuk render teks
+    _columns: Dict[str, list] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.confidence)
+
+    def value(self, column: str, i: int):
+        """Nilai input baris ke-i (missing value dikembalikan sebagai None)"""
+        values = self._columns.get(column)
+        if values is None:
+            series = self.inputs[column]
+            values = series.astype(object).where(series.notna(), None).tolist()
+            self._columns[column] = values
+        return values[i]
+
+    def flag_codes_at(self, i: int) -> List[Message]:
+        """Kode flag untuk klaim ke-i"""
+        return self.validator._flag_codes(self, i)
+
+    def suggestion_codes_at(self, i: int) -> List[Message]:
+        """Kode suggestion untuk klaim ke-i"""
+        return self.validator._suggestion_codes(self, i)
+
+    def flags_at(self, i: int) -> List[str]:
+        """Render flags untuk klaim ke-i"""
+        return self.validator.FLAG_MESSAGES.render_all(self.flag_codes_at(i))
+
+    def suggestions_at(self, i: int) -> List[str]:
+        """Render suggestions untuk klaim ke-i"""
+        return self.validator.SUGGESTION_MESSAGES.render_all(self.suggestion_codes_at(i))
+
+    def result_at(self, i: int) -> CarbonValidationResult:
+        adjusted = self.adjusted_score[i]
+        return CarbonValidationResult(
+            is_valid=bool(self.is_valid[i]),
+            confidence=float(self.confidence[i]),
+            flag_codes=self.flag_codes_at(i),
+            suggestion_codes=self.suggestion_codes_at(i),
+            adjusted_score=None if np.isnan(adjusted) else int(adjusted),
+            outlier=self.validator._outlier_info(
+                float(self.outlier_z[i]), float(self.outlier_percentile[i]), int(self.outlier_samples[i])
+            ) if self.outlier_samples[i] else None
+        )
+
+    def to_results(self) -> List[CarbonValidationResult]:
+        return [self.result_at(i) for i in range(len(self))]
+
+
+@dataclass
+class CarbonBatchFeatures:
+    """
+    Bagian batch yang tidak bergantung pada angka benchmark
+
+    Lookup profil/skala, skor outlier, evidence figures dan analisis teks
+    dihitung sekali; `CarbonValidator.batch_outcome` lalu menerapkan tabel
+    min/max/typical dan bucket bukti minimum. Scenario simulation evaluates
+    several candidate tables against the same features.
+    """
+    inputs: 'pd.DataFrame'
+    claim: np.ndarray
+    evidence: np.ndarray
+    sector_idx: np.ndarray  # index profil benchmark (rules.profiles) setelah fallback
+    scale_idx: np.ndarray   # index ke rules.scales setelah fallback
+    unknown_sector: np.ndarray
+    invalid_scale: np.ndarray
+    outlier_z: np.ndarray
+    outlier_percentile: np.ndarray
+    outlier_samples: np.ndarray
+    statistical_outlier: np.ndarray
+    unknown_method: np.ndarray
+    supported_kg: np.ndarray
+    has_supported: np.ndarray
+    evidence_mismatch: np.ndarray
+    has_text: np.ndarray
+    vague: np.ndarray
+    boost: np.ndarray
+    inconsistent: np.ndarray
+    rules: CompiledRules
+
+    def __len__(self) -> int:
+        return len(self.claim)
+
+    @property
+    def flat_idx(self) -> np.ndarray:
+        return self.rules.flat_index(self.sector_idx, self.scale_idx)
+
+    def rows(self, start: int, stop: int) -> 'CarbonBatchFeatures':
+        """Potongan baris [start, stop) (view, tanpa salinan array)"""
+        values = {
+            name: value[start:stop] if isinstance(value, np.ndarray) else value
+            for name, value in vars(self).items()
+        }
+        values['inputs'] = self.inputs.iloc[start:stop]
+        return CarbonBatchFeatures(**values)
+
+
+BatchInput = Union['pd.DataFrame', Mapping[str, Sequence]]
 
 class CarbonValidator:
     """
@@ -59,6 +228,174 @@ class CarbonValidator:
         'other': 1.0,
     }
     
+    SCALES = ('small', 'medium', 'large')
+    
+    # Key terms untuk menilai kualitas penjelasan
+    KEY_TERMS = (
+        'baseline', 'pengukuran', 'kalkulasi', 'metode',
+        'periode', 'tahun', 'bulan', 'kg', 'ton'
+    )
+    
+    # Kata kunci yang harus muncul di penjelasan untuk tiap metode
+    METHOD_KEYWORDS = {
+        'waste_diverted': ('sampah', 'waste'),
+        'energy_saved': ('listrik', 'energy', 'kwh'),
+        'transport_reduced': ('transport', 'jarak', 'km'),
+    }
+    
+    OUTLIER_SUGGESTION = (
+        "Klaim Anda termasuk yang tertinggi dibanding klaim historis bisnis serupa. "
+        "Sertakan bukti pengukuran yang kuat (meteran, timbangan, invoice)"
+    )
+    
+    # Unit of the quantity each method converts to CO2 (for evidence figures)
+    METHOD_UNITS = {
+        'waste_diverted': 'kg',
+        'energy_saved': 'kWh',
+        'transport_reduced': 'km',
+    }
+    
+    # Claims up to this multiple of what the evidence documents are accepted
+    EVIDENCE_TOLERANCE = 1.5
+    
+    # Minimum evidence files by claim / typical ratio: below 0.5 (low claim),
+    # below 1.5 (normal), below 3 (high), otherwise very high
+    MIN_EVIDENCE_RATIOS = (0.5, 1.5, 3)
+    MIN_EVIDENCE_COUNTS = (1, 2, 4, 6)
+    
+    EVIDENCE_MISMATCH_SUGGESTION = (
+        "Angka pada bukti (invoice, meteran, timbangan) lebih kecil dari klaim. "
+        "Periksa perhitungan atau upload bukti untuk seluruh periode klaim"
+    )
+    
+    METHOD_SUGGESTIONS = {
+        'waste_diverted': 'Jelaskan berapa kg sampah yang didaur ulang dan bagaimana menghitung CO2',
+        'energy_saved': 'Jelaskan berapa kWh listrik yang dihemat dan bagaimana menghitung CO2',
+        'transport_reduced': 'Jelaskan berapa km transportasi yang dikurangi dan bagaimana menghitung CO2',
+    }
+    
+    # Every flag code in rule order (= batch mask names, portfolio flag bits)
+    FLAG_CODES = (
+        'unknown_sector',
+        'invalid_scale',
+        'too_low',
+        'too_high',
+        'above_typical',
+        'statistical_outlier',
+        'unknown_method',
+        'insufficient_evidence',
+        'evidence_mismatch',
+        'no_details',
+        'inconsistent_method',
+    )
+    
+    # Message templates per code (code = FLAG_CODES / batch mask name); the
+    # validator stores codes and parameters, texts are rendered on demand
+    FLAG_MESSAGES = MessageCatalog({
+        'unknown_sector': "Sektor '{sector}' tidak ditemukan dalam database benchmark",
+        'invalid_scale': "Skala bisnis tidak valid",
+        'too_low': (
+            "Klaim pengurangan karbon terlalu rendah untuk sektor {sector} "
+            "skala {scale}. Minimum realistis: {min} kg/tahun"
+        ),
+        'too_high': (
+            "⚠️ PERINGATAN: Klaim pengurangan karbon sangat tinggi! "
+            "Maksimum realistis untuk {sector} skala {scale}: {max} kg/tahun"
+        ),
+        'above_typical': "Klaim {claim:.0f} kg jauh di atas rata-rata ({typical:.0f} kg) untuk bisnis serupa",
+        'statistical_outlier': (
+            "Klaim {claim:.0f} kg berada di persentil {percent:.1f} klaim historis "
+            "{sector} skala {scale} metode {method} (z-score {z:.1f}, n={samples})"
+        ),
+        'unknown_method': "Metode kalkulasi '{method}' tidak dikenali",
+        'insufficient_evidence': "Bukti tidak cukup. Untuk klaim {claim:.0f} kg, minimal {required} file bukti diperlukan",
+        'evidence_mismatch': (
+            "Klaim {claim:.0f} kg CO2 melebihi yang didukung bukti: "
+            "{quantity:.0f} {unit} setara {supported:.0f} kg CO2"
+        ),
+        'no_details': "Tidak ada penjelasan detail",
+        'inconsistent_method': 'Metode "{method}" tidak konsisten dengan penjelasan',
+    })
+    
+    SUGGESTION_MESSAGES = MessageCatalog({
+        'too_high': (
+            "Verifikasi ulang perhitungan Anda. Jika benar, sertakan bukti "
+            "dokumentasi yang sangat detail (invoice, meteran, sertifikat)"
+        ),
+        'above_typical': (
+            "Klaim Anda 3x lebih tinggi dari rata-rata. Pastikan perhitungan "
+            "sudah benar dan sertakan bukti yang kuat"
+        ),
+        'statistical_outlier': OUTLIER_SUGGESTION,
+        'unknown_method': (
+            "Gunakan metode kalkulasi standar: waste_diverted, energy_saved, "
+            "atau transport_reduced"
+        ),
+        'insufficient_evidence': (
+            "Upload minimal {missing} bukti tambahan: "
+            "invoice pembelian, meteran listrik, timbangan sampah, atau sertifikat"
+        ),
+        'evidence_mismatch': EVIDENCE_MISMATCH_SUGGESTION,
+        'vague_details': (
+            "Penjelasan terlalu singkat. Tambahkan detail: metode pengukuran, "
+            "periode waktu, baseline sebelumnya, dan cara kalkulasi"
+        ),
+        'no_details': (
+            "Tambahkan penjelasan detail tentang bagaimana Anda menghitung "
+            "pengurangan karbon"
+        ),
+        'inconsistent_method': METHOD_SUGGESTIONS,
+        'low_confidence': (
+            "Tingkatkan kepercayaan dengan: (1) Upload lebih banyak bukti, "
+            "(2) Berikan penjelasan detail, (3) Sertakan baseline data"
+        ),
+    }, table_params={'inconsistent_method': 'method'})
+    
+    # Bump when the rule logic or messages change (invalidates cached results)
+    RULES_REVISION = 2
+    
+    def __init__(self, benchmark_set: Optional['BenchmarkSet'] = None):
+        # Replaced wholesale on reload; every call reads it once and keeps
+        # using that snapshot
+        self.rules = self.compile_rules(benchmark_set)
+        # Historical claim distribution (see DistributionStore); swapped the same way
+        self.distribution: Optional[ClaimDistributionModel] = None
+    
+    def compile_rules(self, benchmark_set: Optional['BenchmarkSet'] = None) -> CompiledRules:
+        """
+        Build flat benchmark tables and keyword matchers
+        
+        Tanpa benchmark_set, tabel class (BENCHMARKS, METHOD_FACTORS) yang dipakai.
+        """
+        if benchmark_set is None:
+            return CompiledRules(
+                benchmarks=self.BENCHMARKS,
+                method_factors=self.METHOD_FACTORS,
+                scales=self.SCALES,
+                key_terms=self.KEY_TERMS,
+                method_keywords=self.METHOD_KEYWORDS,
+                revision=self.RULES_REVISION
+            )
+        
+        # Files without default_sector keep the historical fallback when it exists
+        default_sector = benchmark_set.default_sector or (
+            'Kerajinan' if 'Kerajinan' in benchmark_set.benchmarks else next(iter(benchmark_set.benchmarks))
+        )
+        return CompiledRules(
+            benchmarks=benchmark_set.benchmarks,
+            method_factors=benchmark_set.method_factors or self.METHOD_FACTORS,
+            scales=benchmark_set.scales or self.SCALES,
+            key_terms=self.KEY_TERMS,
+            method_keywords=self.METHOD_KEYWORDS,
+            revision=self.RULES_REVISION,
+            variants=benchmark_set.variants,
+            default_sector=default_sector
+        )
+    
+    def load_benchmarks(self, benchmark_set: 'BenchmarkSet'):
+        """Compile lalu swap snapshot (satu assignment, tanpa lock)"""
+        self.rules = self.compile_rules(benchmark_set)
+    
     def validate_carbon_claim(
         self,
         carbon_reduction_kg: float,
@@ -66,7 +403,11 @@ class CarbonValidator:
         sector: str,
         business_scale: str,
         evidence_count: int,
-        details: Optional[str] = None
+        details: Optional[str] = None,
+        sub_sector: Optional[str] = None,
+        region: Optional[str] = None,
+        documented_quantity: Optional[float] = None,
+        steps: Optional[Callable[[str, int], None]] = None
     ) -> CarbonValidationResult:
         """
         Validasi klaim pengurangan karbon
@@ -78,120 +419,132 @@ class CarbonValidator:
             business_scale: Skala bisnis (small/medium/large)
             evidence_count: Jumlah bukti yang diupload
             details: Penjelasan detail (optional)
+            sub_sector: Sub-sektor untuk benchmark yang lebih spesifik (optional)
+            region: Region untuk benchmark regional (optional)
+            documented_quantity: Jumlah kg/kWh/km yang terbaca dari bukti (optional,
+                satuan sesuai METHOD_UNITS untuk metode kalkulasi)
+            steps: Hook timing per fase, dipanggil (label, jumlah flag) di
+                awal setiap fase (metrics.StepTimer; optional): benchmark_lookup,
+                anomaly_detection, unknown_method, evidence_consistency,
+                cross_validation
             
         Returns:
             CarbonValidationResult dengan validasi lengkap
         """
+        rules = self.rules
+        distribution = self.distribution
+        group = (sector, business_scale, calculation_method)
         flags = []
         suggestions = []
         confidence = 0.7  # Base confidence
         is_valid = True
         adjusted_score = None
+        outlier = None
         
-        # 1. Check if sector exists in benchmarks
-        if sector not in self.BENCHMARKS:
-            flags.append(f"Sektor '{sector}' tidak ditemukan dalam database benchmark")
+        # 1. Check if sector exists in benchmarks (most specific profile wins)
+        if steps is not None:
+            steps('benchmark_lookup', len(flags))
+        profile_idx = rules.profile_for(sector, sub_sector, region)
+        if profile_idx is None:
+            flags.append(Message(('unknown_sector', (sector,))))
             confidence -= 0.2
-            sector = 'Kerajinan'  # Default fallback
+            profile_idx = rules.sector_index[rules.default_sector]  # Default fallback
+        sector = rules.profile_labels[profile_idx]
         
         # 2. Check if scale is valid
-        if business_scale not in ['small', 'medium', 'large']:
-            flags.append("Skala bisnis tidak valid")
+        scale_idx = rules.scale_index.get(business_scale)
+        if scale_idx is None:
+            flags.append(Message(('invalid_scale', ())))
             confidence -= 0.1
-            business_scale = 'small'  # Default fallback
+            business_scale = rules.default_scale  # Default fallback
+            scale_idx = rules.scale_index[business_scale]
         
-        # 3. Get benchmark for sector and scale
-        benchmark = self.BENCHMARKS[sector][business_scale]
+        # 3. Get benchmark for profile and scale
+        bench_idx = rules.flat_index(profile_idx, scale_idx)
+        bench_min, bench_max, typical = rules.benchmark(bench_idx)
         
         # 4. Check if carbon reduction is within realistic range
-        if carbon_reduction_kg < benchmark['min']:
-            flags.append(
-                f"Klaim pengurangan karbon terlalu rendah untuk sektor {sector} "
-                f"skala {business_scale}. Minimum realistis: {benchmark['min']} kg/tahun"
-            )
+        if steps is not None:
+            steps('anomaly_detection', len(flags))
+        if carbon_reduction_kg < bench_min:
+            flags.append(Message(('too_low', (sector, business_scale, bench_min))))
             confidence -= 0.1
         
-        if carbon_reduction_kg > benchmark['max']:
-            flags.append(
-                f"⚠️ PERINGATAN: Klaim pengurangan karbon sangat tinggi! "
-                f"Maksimum realistis untuk {sector} skala {business_scale}: {benchmark['max']} kg/tahun"
-            )
+        if carbon_reduction_kg > bench_max:
+            flags.append(Message(('too_high', (sector, business_scale, bench_max))))
             confidence -= 0.3
             is_valid = False
-            suggestions.append(
-                "Verifikasi ulang perhitungan Anda. Jika benar, sertakan bukti "
-                "dokumentasi yang sangat detail (invoice, meteran, sertifikat)"
-            )
+            suggestions.append(Message(('too_high', ())))
         
-        # 5. Check if claim is unusually high (outlier detection using IQR)
-        typical = benchmark['typical']
+        # 5. Check if claim is unusually high vs the benchmark typical value
         if carbon_reduction_kg > typical * 3:
-            flags.append(
-                f"Klaim {carbon_reduction_kg:.0f} kg jauh di atas rata-rata "
-                f"({typical:.0f} kg) untuk bisnis serupa"
-            )
+            flags.append(Message(('above_typical', (carbon_reduction_kg, typical))))
             confidence -= 0.15
-            suggestions.append(
-                "Klaim Anda 3x lebih tinggi dari rata-rata. Pastikan perhitungan "
-                "sudah benar dan sertakan bukti yang kuat"
-            )
+            suggestions.append(Message(('above_typical', ())))
+        
+        # 5b. Statistical outlier vs historical claims of the same (sector, scale, method)
+        state = distribution.get(group) if distribution is not None else None
+        if state is not None:
+            z, percentile = distribution.score(state, np.array([carbon_reduction_kg], dtype=np.float64))
+            outlier = self._outlier_info(float(z[0]), float(percentile[0]), state.count)
+            if z[0] >= Z_THRESHOLD or percentile[0] >= PERCENTILE_THRESHOLD:
+                flags.append(self._outlier_flag(carbon_reduction_kg, group, float(z[0]), float(percentile[0]), state.count))
+                confidence -= 0.1
+                suggestions.append(Message(('statistical_outlier', ())))
         
         # 6. Validate calculation method
-        if calculation_method not in self.METHOD_FACTORS:
-            flags.append(f"Metode kalkulasi '{calculation_method}' tidak dikenali")
+        if steps is not None:
+            steps('unknown_method', len(flags))
+        if calculation_method not in rules.method_index:
+            flags.append(Message(('unknown_method', (calculation_method,))))
             confidence -= 0.1
-            suggestions.append(
-                "Gunakan metode kalkulasi standar: waste_diverted, energy_saved, "
-                "atau transport_reduced"
-            )
+            suggestions.append(Message(('unknown_method', ())))
         
         # 7. Check evidence sufficiency
+        if steps is not None:
+            steps('evidence_consistency', len(flags))
         min_evidence = self._calculate_min_evidence(carbon_reduction_kg, typical)
         
         if evidence_count < min_evidence:
-            flags.append(
-                f"Bukti tidak cukup. Untuk klaim {carbon_reduction_kg:.0f} kg, "
-                f"minimal {min_evidence} file bukti diperlukan"
-            )
+            flags.append(Message(('insufficient_evidence', (carbon_reduction_kg, min_evidence))))
             confidence -= 0.2
-            suggestions.append(
-                f"Upload minimal {min_evidence - evidence_count} bukti tambahan: "
-                "invoice pembelian, meteran listrik, timbangan sampah, atau sertifikat"
-            )
+            suggestions.append(Message(('insufficient_evidence', (min_evidence - evidence_count,))))
             
             # Adjust score if evidence insufficient
             if carbon_reduction_kg > typical * 2:
                 adjusted_score = -3  # Penalty for high claim with low evidence
         
-        # 8. Check details text quality
+        # 7b. Cross-check the claim with quantities read from the evidence
+        supported = self._supported_kg(rules, calculation_method, documented_quantity)
+        if supported is not None:
+            if carbon_reduction_kg > supported * self.EVIDENCE_TOLERANCE:
+                flags.append(self._evidence_mismatch_flag(
+                    carbon_reduction_kg, calculation_method, documented_quantity, supported
+                ))
+                confidence -= 0.15
+                suggestions.append(Message(('evidence_mismatch', ())))
+            else:
+                confidence += 0.05
+        
+        # 8. Check details text quality (text is lowercased and scanned once)
+        if steps is not None:
+            steps('cross_validation', len(flags))
+        analysis = rules.analyze(details)
         if details:
-            detail_quality = self._analyze_details(details)
-            confidence += detail_quality['confidence_boost']
+            confidence += analysis.confidence_boost
             
-            if detail_quality['is_vague']:
-                suggestions.append(
-                    "Penjelasan terlalu singkat. Tambahkan detail: metode pengukuran, "
-                    "periode waktu, baseline sebelumnya, dan cara kalkulasi"
-                )
+            if analysis.is_vague:
+                suggestions.append(Message(('vague_details', ())))
         else:
-            flags.append("Tidak ada penjelasan detail")
+            flags.append(Message(('no_details', ())))
             confidence -= 0.1
-            suggestions.append(
-                "Tambahkan penjelasan detail tentang bagaimana Anda menghitung "
-                "pengurangan karbon"
-            )
+            suggestions.append(Message(('no_details', ())))
         
         # 9. Cross-check method with claim
-        method_check = self._validate_method_consistency(
-            carbon_reduction_kg,
-            calculation_method,
-            details
-        )
-        
-        if not method_check['is_consistent']:
-            flags.append(method_check['message'])
+        if not self._is_consistent(calculation_method, details, analysis, rules):
+            flags.append(Message(('inconsistent_method', (calculation_method,))))
             confidence -= 0.15
-            suggestions.append(method_check['suggestion'])
+            suggestions.append(Message(('inconsistent_method', (calculation_method,))))
         
         # 10. Final confidence adjustment
         confidence = max(0.0, min(1.0, confidence))
@@ -202,52 +555,59 @@ class CarbonValidator:
         
         # 12. Generate final suggestions if valid but low confidence
         if is_valid and confidence < 0.7:
-            suggestions.append(
-                "Tingkatkan kepercayaan dengan: (1) Upload lebih banyak bukti, "
-                "(2) Berikan penjelasan detail, (3) Sertakan baseline data"
-            )
+            suggestions.append(Message(('low_confidence', ())))
         
         return CarbonValidationResult(
             is_valid=is_valid,
             confidence=round(confidence, 2),
-            flags=flags,
-            suggestions=suggestions,
-            adjusted_score=adjusted_score
+            flag_codes=flags,
+            suggestion_codes=suggestions,
+            adjusted_score=adjusted_score,
+            outlier=outlier
         )
     
+    @staticmethod
+    def _outlier_info(z: float, percentile: float, samples: int) -> Dict[str, float]:
+        return {'zScore': round(z, 2), 'percentile': round(percentile, 4), 'samples': samples}
+    
+    @staticmethod
+    def _outlier_flag(claim: float, group: Tuple, z: float, percentile: float, samples: int) -> Message:
+        sector, scale, method = group
+        return Message(('statistical_outlier', (claim, percentile * 100, sector, scale, method, z, samples)))
+    
+    def _supported_kg(
+        self,
+        rules: CompiledRules,
+        method: str,
+        documented_quantity: Optional[float]
+    ) -> Optional[float]:
+        """CO2 (kg) yang didukung jumlah terdokumentasi, None jika tidak bisa dihitung"""
+        factor = rules.method_factors.get(method) if method in self.METHOD_UNITS else None
+        if documented_quantity is None or factor is None:
+            return None
+        return documented_quantity * factor
+    
+    def _evidence_mismatch_flag(self, claim: float, method: str, quantity: float, supported: float) -> Message:
+        return Message(('evidence_mismatch', (claim, quantity, self.METHOD_UNITS[method], supported)))
+    
     def _calculate_min_evidence(self, claim: float, typical: float) -> int:
-        """Calculate minimum evidence required based on claim size"""
+        """Calculate minimum evidence required based on claim size (MIN_EVIDENCE_RATIOS)"""
         ratio = claim / typical
         
-        if ratio < 0.5:
-            return 1  # Low claim, minimal evidence
-        elif ratio < 1.5:
-            return 2  # Normal claim
-        elif ratio < 3:
-            return 4  # High claim
-        else:
-            return 6  # Very high claim, need strong evidence
+        for threshold, count in zip(self.MIN_EVIDENCE_RATIOS, self.MIN_EVIDENCE_COUNTS):
+            if ratio < threshold:
+                return count
+        return self.MIN_EVIDENCE_COUNTS[-1]
     
     def _analyze_details(self, details: str) -> Dict:
         """Analyze quality of details text"""
-        word_count = len(details.split())
-        
-        # Check for key terms
-        key_terms = [
-            'baseline', 'pengukuran', 'kalkulasi', 'metode', 
-            'periode', 'tahun', 'bulan', 'kg', 'ton'
-        ]
-        
-        key_term_count = sum(1 for term in key_terms if term.lower() in details.lower())
-        
-        is_vague = word_count < 20 or key_term_count < 2
-        confidence_boost = min(0.15, (word_count / 100) * 0.1 + (key_term_count / len(key_terms)) * 0.05)
+        analysis = self.rules.analyze(details)
         
         return {
-            'is_vague': is_vague,
-            'confidence_boost': confidence_boost,
-            'word_count': word_count,
-            'key_term_count': key_term_count
+            'is_vague': analysis.is_vague,
+            'confidence_boost': analysis.confidence_boost,
+            'word_count': len(details.split()),  # analysis.word_count is capped
+            'key_term_count': analysis.key_term_count
         }
     
     def _validate_method_consistency(
@@ -257,57 +617,417 @@ class CarbonValidator:
         details: Optional[str]
     ) -> Dict:
         """Validate if calculation method is consistent with claim"""
+        return self._method_consistency(method, details, self.rules.analyze(details))
+    
+    def _method_consistency(
+        self,
+        method: str,
+        details: Optional[str],
+        analysis: DetailAnalysis,
+        rules: Optional[CompiledRules] = None
+    ) -> Dict:
+        if self._is_consistent(method, details, analysis, rules or self.rules):
+            return {
+                'is_consistent': True,
+                'message': '',
+                'suggestion': ''
+            }
         
-        if method == 'waste_diverted':
-            # Check if details mention waste/sampah
-            if details and ('sampah' in details.lower() or 'waste' in details.lower()):
-                return {
-                    'is_consistent': True,
-                    'message': '',
-                    'suggestion': ''
-                }
-            else:
-                return {
-                    'is_consistent': False,
-                    'message': 'Metode "waste_diverted" tidak konsisten dengan penjelasan',
-                    'suggestion': 'Jelaskan berapa kg sampah yang didaur ulang dan bagaimana menghitung CO2'
-                }
-        
-        elif method == 'energy_saved':
-            # Check if details mention energy/listrik
-            if details and ('listrik' in details.lower() or 'energy' in details.lower() or 'kwh' in details.lower()):
-                return {
-                    'is_consistent': True,
-                    'message': '',
-                    'suggestion': ''
-                }
-            else:
-                return {
-                    'is_consistent': False,
-                    'message': 'Metode "energy_saved" tidak konsisten dengan penjelasan',
-                    'suggestion': 'Jelaskan berapa kWh listrik yang dihemat dan bagaimana menghitung CO2'
-                }
-        
-        elif method == 'transport_reduced':
-            # Check if details mention transport/transportasi
-            if details and ('transport' in details.lower() or 'jarak' in details.lower() or 'km' in details.lower()):
-                return {
-                    'is_consistent': True,
-                    'message': '',
-                    'suggestion': ''
-                }
-            else:
-                return {
-                    'is_consistent': False,
-                    'message': 'Metode "transport_reduced" tidak konsisten dengan penjelasan',
-                    'suggestion': 'Jelaskan berapa km transportasi yang dikurangi dan bagaimana menghitung CO2'
-                }
+        return {
+            'is_consistent': False,
+            'message': f'Metode "{method}" tidak konsisten dengan penjelasan',
+            'suggestion': self.METHOD_SUGGESTIONS[method]
+        }
+    
+    @staticmethod
+    def _is_consistent(method: str, details: Optional[str], analysis: DetailAnalysis, rules: CompiledRules) -> bool:
+        method_idx = rules.consistency_index.get(method)
+        # Details must mention the method's unit/object
+        return method_idx is None or bool(details and rules.mentions(analysis, method_idx))
+    
+    def validate_carbon_claims_batch(self, claims: BatchInput) -> CarbonBatchResult:
+        """
+        Validasi banyak klaim sekaligus dengan operasi array
+        
+        Menghasilkan flags, suggestions dan confidence yang identik dengan
+        memanggil `validate_carbon_claim` per baris, tetapi lookup benchmark,
+        cek min/max/typical, bucket bukti minimum dan aritmetika confidence
+        dihitung sebagai operasi NumPy. Analisis teks `details` hanya
+        dijalankan sekali per teks unik.
+        
+        Args:
+            claims: DataFrame atau mapping kolom dengan kolom
+                carbon_reduction_kg, calculation_method, sector,
+                business_scale, evidence_count dan (opsional) details,
+                sub_sector, region, documented_quantity
+                
+        Returns:
+            CarbonBatchResult berbentuk kolom
+        """
+        features = self.batch_features(claims)
+        outcome = self.batch_outcome(features)
+        
+        return CarbonBatchResult(
+            is_valid=outcome['is_valid'],
+            confidence=self._round2(outcome['confidence']),
+            adjusted_score=outcome['adjusted_score'],
+            masks={
+                'unknown_sector': features.unknown_sector,
+                'invalid_scale': features.invalid_scale,
+                'too_low': outcome['too_low'],
+                'too_high': outcome['too_high'],
+                'above_typical': outcome['above_typical'],
+                'statistical_outlier': features.statistical_outlier,
+                'unknown_method': features.unknown_method,
+                'insufficient_evidence': outcome['insufficient_evidence'],
+                'evidence_mismatch': features.evidence_mismatch,
+                'no_details': ~features.has_text,
+                'vague_details': features.vague,
+                'inconsistent_method': features.inconsistent,
+                'low_confidence': outcome['low_confidence'],
+            },
+            inputs=features.inputs,
+            sector_idx=features.sector_idx,
+            scale_idx=features.scale_idx,
+            min_evidence=outcome['min_evidence'],
+            supported_kg=features.supported_kg,
+            outlier_z=features.outlier_z,
+            outlier_percentile=features.outlier_percentile,
+            outlier_samples=features.outlier_samples,
+            validator=self,
+            rules=features.rules
+        )
+    
+    def batch_features(self, claims: BatchInput) -> CarbonBatchFeatures:
+        """Langkah batch yang tidak membaca angka benchmark (lihat CarbonBatchFeatures)"""
+        import pandas as pd
+        
+        df = claims if isinstance(claims, pd.DataFrame) else pd.DataFrame(dict(claims))
+        if 'details' not in df.columns:
+            df = df.assign(details=None)
+        if 'documented_quantity' not in df.columns:
+            df = df.assign(documented_quantity=None)
+        df = df.reset_index(drop=True)
+        
+        claim = df['carbon_reduction_kg'].to_numpy(dtype=np.float64)
+        evidence = df['evidence_count'].to_numpy(dtype=np.int64)
+        
+        # 1-2. Benchmark profile and scale, with the same fallbacks
+        rules = self.rules
+        has_variants = any(
+            column in df.columns and df[column].notna().any() for column in ('sub_sector', 'region')
+        )
+        if has_variants:
+            sector_idx = self._lookup_profiles(rules, df['sector'], df.get('sub_sector'), df.get('region'))
+        else:
+            sector_idx = self._lookup_codes(df['sector'], rules.sector_index)
+        unknown_sector = sector_idx < 0
+        sector_idx[unknown_sector] = rules.sector_index[rules.default_sector]
+        
+        scale_idx = self._lookup_codes(df['business_scale'], rules.scale_index)
+        invalid_scale = scale_idx < 0
+        scale_idx[invalid_scale] = rules.scale_index[rules.default_scale]
+        
+        # 5b. Statistical outliers, scored once per (sector, scale, method) group
+        outlier_z = np.full(len(df), np.nan)
+        outlier_percentile = np.full(len(df), np.nan)
+        outlier_samples = np.zeros(len(df), dtype=np.int64)
+        distribution = self.distribution
+        if distribution is not None and len(distribution):
+            group_codes, groups = self._group_keys(
+                [df['sector'], df['business_scale'], df['calculation_method']], len(df)
+            )
+            order = np.argsort(group_codes, kind='stable')
+            bounds = np.searchsorted(group_codes.take(order), np.arange(len(groups) + 1))
+            for g, group in enumerate(groups):
+                state = distribution.get(group)
+                if state is None:
+                    continue
+                rows = order[bounds[g]:bounds[g + 1]]
+                outlier_z[rows], outlier_percentile[rows] = distribution.score(state, claim.take(rows))
+                outlier_samples[rows] = state.count
+        statistical_outlier = (outlier_z >= Z_THRESHOLD) | (outlier_percentile >= PERCENTILE_THRESHOLD)
+        
+        # 6. Calculation method
+        method_codes, method_uniques = self._factorize(df['calculation_method'])
+        method_idx = self._map_codes(method_codes, method_uniques, rules.method_index)
+        unknown_method = method_idx < 0
+        
+        # 7b. Evidence figures (NaN factor for methods without a unit)
+        factors = [
+            rules.method_factors[method] if method in self.METHOD_UNITS and method in rules.method_factors else np.nan
+            for method in method_uniques
+        ]
+        factors.append(np.nan)  # code -1 (missing method)
+        supported = df['documented_quantity'].to_numpy(dtype=np.float64) * np.asarray(factors).take(method_codes)
+        has_supported = ~np.isnan(supported)
+        evidence_mismatch = has_supported & (claim > supported * self.EVIDENCE_TOLERANCE)
+        
+        # 8. Details quality, evaluated once per unique text
+        detail_codes, detail_uniques = self._factorize(df['details'])
+        features = [rules.analyze(text) for text in detail_uniques]
+        # Pad so that code -1 (missing details) maps to an empty entry
+        features.append(rules.analyze(None))
+        has_text = np.array([f.has_text for f in features]).take(detail_codes)
+        vague = np.array([f.is_vague for f in features]).take(detail_codes)
+        boost = np.array([f.confidence_boost for f in features], dtype=np.float64).take(detail_codes)
+        
+        # 9. Method consistency
+        keyword_idx = self._map_codes(method_codes, method_uniques, rules.consistency_index)
+        mentions = np.array(
+            [[rules.mentions(f, m) for m in range(len(rules.consistency_methods))] for f in features],
+            dtype=bool
+        )
+        mentioned = mentions.ravel().take(
+            np.where(detail_codes < 0, len(features) - 1, detail_codes) * len(rules.consistency_methods)
+            + np.maximum(keyword_idx, 0)
+        )
+        inconsistent = (keyword_idx >= 0) & ~mentioned
+        
+        return CarbonBatchFeatures(
+            inputs=df,
+            claim=claim,
+            evidence=evidence,
+            sector_idx=sector_idx,
+            scale_idx=scale_idx,
+            unknown_sector=unknown_sector,
+            invalid_scale=invalid_scale,
+            outlier_z=outlier_z,
+            outlier_percentile=outlier_percentile,
+            outlier_samples=outlier_samples,
+            statistical_outlier=statistical_outlier,
+            unknown_method=unknown_method,
+            supported_kg=supported,
+            has_supported=has_supported,
+            evidence_mismatch=evidence_mismatch,
+            has_text=has_text,
+            vague=vague,
+            boost=boost,
+            inconsistent=inconsistent,
+            rules=rules
+        )
+    
+    def batch_outcome(
+        self,
+        features: CarbonBatchFeatures,
+        bench_min: Optional[np.ndarray] = None,
+        bench_max: Optional[np.ndarray] = None,
+        typical: Optional[np.ndarray] = None,
+        min_evidence_ratios: Optional[Sequence[float]] = None,
+        min_evidence_counts: Optional[Sequence[int]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Terapkan tabel benchmark ke features: confidence (belum dibulatkan), validitas dan mask
+        
+        Without overrides the tables of `features.rules` and the class
+        min-evidence buckets are used. Overrides are per-row arrays (the
+        benchmark of each claim) and bucket lists, as built by scenarios.
+        """
+        rules = features.rules
+        if bench_min is None or bench_max is None or typical is None:
+            flat_idx = features.flat_idx
+            bench_min, bench_max, typical = (
+                rules.bench_arrays[key].take(flat_idx) if override is None else override
+                for key, override in (('min', bench_min), ('max', bench_max), ('typical', typical))
+            )
+        ratios = self.MIN_EVIDENCE_RATIOS if min_evidence_ratios is None else min_evidence_ratios
+        counts = self.MIN_EVIDENCE_COUNTS if min_evidence_counts is None else min_evidence_counts
+        claim = features.claim
+        
+        # Rules are applied as `confidence -= delta * mask` in the order of the
+        # scalar path: subtracting 0.0 is exact, so the float result matches
+        # validate_carbon_claim bit for bit.
+        confidence = np.full(len(claim), 0.7)
+        confidence -= 0.2 * features.unknown_sector
+        confidence -= 0.1 * features.invalid_scale
+        
+        # 4. Realistic range
+        too_low = claim < bench_min
+        confidence -= 0.1 * too_low
+        too_high = claim > bench_max
+        confidence -= 0.3 * too_high
+        
+        # 5. Far above typical
+        above_typical = claim > typical * 3
+        confidence -= 0.15 * above_typical
+        
+        confidence -= 0.1 * features.statistical_outlier
+        confidence -= 0.1 * features.unknown_method
+        
+        # 7. Evidence sufficiency (same buckets as _calculate_min_evidence)
+        ratio = claim / typical
+        bucket = np.zeros(len(claim), dtype=np.intp)
+        for threshold in ratios:
+            bucket += ~(ratio < threshold)
+        min_evidence = np.asarray(counts).take(bucket)
+        insufficient = features.evidence < min_evidence
+        confidence -= 0.2 * insufficient
+        adjusted_score = np.where(insufficient & (claim > typical * 2), -3.0, np.nan)
+        
+        confidence -= 0.15 * features.evidence_mismatch
+        confidence += 0.05 * (features.has_supported & ~features.evidence_mismatch)
+        confidence += features.boost * features.has_text
+        confidence -= 0.1 * ~features.has_text
+        confidence -= 0.15 * features.inconsistent
+        
+        # 10-12. Clamp, validity and low-confidence hint
+        np.clip(confidence, 0.0, 1.0, out=confidence)
+        is_valid = ~too_high & ~(confidence < 0.4)
         
         return {
-            'is_consistent': True,
-            'message': '',
-            'suggestion': ''
+            'confidence': confidence,
+            'is_valid': is_valid,
+            'low_confidence': is_valid & (confidence < 0.7),
+            'too_low': too_low,
+            'too_high': too_high,
+            'above_typical': above_typical,
+            'insufficient_evidence': insufficient,
+            'min_evidence': min_evidence,
+            'adjusted_score': adjusted_score,
         }
+    
+    @classmethod
+    def _lookup_codes(cls, column: 'pd.Series', positions: Dict[str, int]) -> np.ndarray:
+        """Map column values to their position (-1 if unknown)"""
+        codes, uniques = cls._factorize(column)
+        return cls._map_codes(codes, uniques, positions)
+    
+    @classmethod
+    def _lookup_profiles(
+        cls,
+        rules: CompiledRules,
+        sector: 'pd.Series',
+        sub_sector: Optional['pd.Series'],
+        region: Optional['pd.Series']
+    ) -> np.ndarray:
+        """Resolve each unique (sector, sub_sector, region) once (-1 if unknown)"""
+        codes, keys = cls._group_keys([sector, sub_sector, region], len(sector))
+        resolved = []
+        for sector_value, sub_value, region_value in keys:
+            profile_idx = rules.profile_for(sector_value, sub_value, region_value) if sector_value is not None else None
+            resolved.append(-1 if profile_idx is None else profile_idx)
+        return np.asarray(resolved, dtype=np.int64).take(codes)
+    
+    @classmethod
+    def _group_keys(cls, columns: Sequence[Optional['pd.Series']], length: int) -> Tuple[np.ndarray, List[tuple]]:
+        """Group code per row plus one key tuple per group (None for missing values)"""
+        factorized = [
+            cls._factorize(column) if column is not None else (np.full(length, -1, dtype=np.intp), [])
+            for column in columns
+        ]
+        # Mixed-radix key over the code columns (code -1 -> digit 0)
+        combined = np.zeros(length, dtype=np.int64)
+        for codes, uniques in factorized:
+            combined = combined * (len(uniques) + 1) + (codes + 1)
+        keys, inverse = np.unique(combined, return_inverse=True)
+        
+        decoded = []
+        for key in keys.tolist():
+            parts = []
+            for codes, uniques in reversed(factorized):
+                key, digit = divmod(key, len(uniques) + 1)
+                parts.append(uniques[digit - 1] if digit else None)
+            decoded.append(tuple(reversed(parts)))
+        return inverse, decoded
+    
+    @staticmethod
+    def _factorize(column: 'pd.Series'):
+        """Integer codes + unique values; categorical columns reuse their codes"""
+        import pandas as pd
+        
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.cat.codes.to_numpy().astype(np.intp), column.cat.categories
+        return pd.factorize(column)
+    
+    @staticmethod
+    def _map_codes(codes: np.ndarray, uniques, positions: Dict[str, int]) -> np.ndarray:
+        """Translate factorized codes into positions (-1 if unknown)"""
+        mapped = [positions.get(value, -1) for value in uniques]
+        mapped.append(-1)  # code -1 (missing value) indexes the last slot
+        return np.asarray(mapped, dtype=np.int64).take(codes)
+    
+    @staticmethod
+    def _round2(values: np.ndarray) -> np.ndarray:
+        """Vectorized round(x, 2) matching Python's correctly rounded result"""
+        rounded = np.round(values, 2)
+        scaled = values * 100
+        # np.round differs from round() only near .5 ties; fix those in Python
+        ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+        for i in ties:
+            rounded[i] = round(float(values[i]), 2)
+        return rounded
+    
+    def _flag_codes(self, batch: CarbonBatchResult, i: int) -> List[Message]:
+        """Flag codes for row i of a batch, identical to the scalar path"""
+        masks = batch.masks
+        claim = float(batch.value('carbon_reduction_kg', i))
+        rules = batch.rules
+        sector = rules.profile_labels[batch.sector_idx[i]]
+        scale = rules.scales[batch.scale_idx[i]]
+        bench_min, bench_max, typical = rules.benchmark(rules.flat_index(batch.sector_idx[i], batch.scale_idx[i]))
+        flags = []
+        
+        if masks['unknown_sector'][i]:
+            flags.append(Message(('unknown_sector', (batch.value('sector', i),))))
+        if masks['invalid_scale'][i]:
+            flags.append(self.FLAG_MESSAGES.fixed['invalid_scale'])
+        if masks['too_low'][i]:
+            flags.append(Message(('too_low', (sector, scale, bench_min))))
+        if masks['too_high'][i]:
+            flags.append(Message(('too_high', (sector, scale, bench_max))))
+        if masks['above_typical'][i]:
+            flags.append(Message(('above_typical', (claim, typical))))
+        if masks['statistical_outlier'][i]:
+            group = tuple(batch.value(column, i) for column in ('sector', 'business_scale', 'calculation_method'))
+            flags.append(self._outlier_flag(
+                claim, group, float(batch.outlier_z[i]), float(batch.outlier_percentile[i]),
+                int(batch.outlier_samples[i])
+            ))
+        if masks['unknown_method'][i]:
+            flags.append(Message(('unknown_method', (batch.value('calculation_method', i),))))
+        if masks['insufficient_evidence'][i]:
+            flags.append(Message(('insufficient_evidence', (claim, int(batch.min_evidence[i])))))
+        if masks['evidence_mismatch'][i]:
+            flags.append(self._evidence_mismatch_flag(
+                claim, batch.value('calculation_method', i), float(batch.value('documented_quantity', i)),
+                float(batch.supported_kg[i])
+            ))
+        if masks['no_details'][i]:
+            flags.append(self.FLAG_MESSAGES.fixed['no_details'])
+        if masks['inconsistent_method'][i]:
+            flags.append(Message(('inconsistent_method', (batch.value('calculation_method', i),))))
+        
+        return flags
+    
+    def _suggestion_codes(self, batch: CarbonBatchResult, i: int) -> List[Message]:
+        """Suggestion codes for row i of a batch, identical to the scalar path"""
+        masks = batch.masks
+        fixed = self.SUGGESTION_MESSAGES.fixed
+        suggestions = []
+        
+        if masks['too_high'][i]:
+            suggestions.append(fixed['too_high'])
+        if masks['above_typical'][i]:
+            suggestions.append(fixed['above_typical'])
+        if masks['statistical_outlier'][i]:
+            suggestions.append(fixed['statistical_outlier'])
+        if masks['unknown_method'][i]:
+            suggestions.append(fixed['unknown_method'])
+        if masks['insufficient_evidence'][i]:
+            missing = int(batch.min_evidence[i]) - int(batch.value('evidence_count', i))
+            suggestions.append(Message(('insufficient_evidence', (missing,))))
+        if masks['evidence_mismatch'][i]:
+            suggestions.append(fixed['evidence_mismatch'])
+        if masks['vague_details'][i]:
+            suggestions.append(fixed['vague_details'])
+        if masks['no_details'][i]:
+            suggestions.append(fixed['no_details'])
+        if masks['inconsistent_method'][i]:
+            suggestions.append(Message(('inconsistent_method', (batch.value('calculation_method', i),))))
+        if masks['low_confidence'][i]:
+            suggestions.append(fixed['low_confidence'])
+        
+        return suggestions
 
 
 # Example usage
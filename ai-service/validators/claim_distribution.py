@@ -0,0 +1,446 @@
+"""
+Claim Distribution Model
+Distribusi klaim karbon historis per (sector, scale, method) untuk outlier detection
+
+Each group keeps two mergeable summaries:
+  - running count/mean/M2 of log1p(claim) (Welford, merged with Chan's formula),
+    giving a z-score on the log scale where claim sizes are roughly normal
+  - a DDSketch-style histogram with logarithmic buckets (relative accuracy
+    `alpha`), giving percentiles with bounded error in O(buckets) memory
+
+Both merge by addition, so workers can fold their updates into a shared
+model without a full refit. Models are immutable once published: updates
+and merges return a new model and the validator swaps it in, like
+CompiledRules.
+
+Fit from a submissions export (CSV/NDJSON, same reader as streaming.py):
+    python -m validators.claim_distribution export.csv -o data/claim_model.json
+
+    \\copy (SELECT u.sector,
+                  CASE WHEN u.employee_count < 20 THEN 'small'
+                       WHEN u.employee_count < 100 THEN 'medium' ELSE 'large' END AS business_scale,
+                  s.carbon_calculation_method, s.carbon_reduction_kg, s.status
+           FROM submissions s JOIN umkm_profiles u ON u.id = s.umkm_id) TO STDOUT CSV HEADER
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import secrets
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: syncs are not serialized across processes
+    fcntl = None
+
+GroupKey = Tuple[str, str, str]  # (sector, business_scale, calculation_method)
+
+DEFAULT_ALPHA = 0.01  # 1% relative error on quantiles
+MIN_SAMPLES = 30      # groups with fewer claims are never flagged
+Z_THRESHOLD = 3.0
+PERCENTILE_THRESHOLD = 0.99
+
+
+@dataclass
+class GroupState:
+    """
+    Ringkasan satu grup (tidak diubah setelah dipublikasikan)
+
+    `bins` memetakan index bucket -> jumlah klaim; bucket i mencakup
+    (gamma^(i-1), gamma^i]. Klaim <= 0 dihitung di `zero`.
+    """
+    count: int = 0
+    mean: float = 0.0  # of log1p(claim)
+    m2: float = 0.0
+    zero: int = 0
+    bins: Dict[int, int] = field(default_factory=dict)
+    _cdf: Optional[Tuple[np.ndarray, np.ndarray]] = field(default=None, repr=False, compare=False)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def cdf(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted bucket indexes and cumulative counts (cached)"""
+        if self._cdf is None:
+            keys = np.array(sorted(self.bins), dtype=np.int64)
+            counts = np.array([self.bins[k] for k in keys.tolist()], dtype=np.int64)
+            self._cdf = (keys, self.zero + np.cumsum(counts))
+        return self._cdf
+
+
+def _chan(a: GroupState, count: int, mean: float, m2: float) -> Tuple[int, float, float]:
+    """Combine (count, mean, M2) of two disjoint samples"""
+    if count == 0:
+        return a.count, a.mean, a.m2
+    if a.count == 0:
+        return count, mean, m2
+    total = a.count + count
+    delta = mean - a.mean
+    return (
+        total,
+        a.mean + delta * count / total,
+        a.m2 + m2 + delta * delta * a.count * count / total,
+    )
+
+
+class ClaimDistributionModel:
+    """
+    Model distribusi klaim historis, satu GroupState per (sector, scale, method)
+
+    Args:
+        groups: State per grup
+        alpha: Akurasi relatif sketch (harus sama untuk model yang di-merge)
+        version: Identitas snapshot, dipakai di cache key hasil validasi
+    """
+
+    def __init__(
+        self,
+        groups: Optional[Dict[GroupKey, GroupState]] = None,
+        alpha: float = DEFAULT_ALPHA,
+        version: Optional[str] = None
+    ):
+        self.groups = groups or {}
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.version = version or (secrets.token_hex(8) if self.groups else 'empty')
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def get(self, key: GroupKey) -> Optional[GroupState]:
+        state = self.groups.get(key)
+        if state is None or state.count < MIN_SAMPLES:
+            return None
+        return state
+
+    def bucket(self, claims: np.ndarray) -> np.ndarray:
+        """Bucket index per claim (claims must be > 0)"""
+        return np.ceil(np.log(claims) / self._log_gamma).astype(np.int64)
+
+    def score(self, state: GroupState, claims: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        z-score (log scale) dan persentil untuk klaim-klaim dalam satu grup
+
+        The percentile is a mid-rank: claims below plus half of those in the
+        same bucket, so a claim that ties the most common top value is not
+        scored as the maximum.
+        """
+        claims = np.asarray(claims, dtype=np.float64)
+        std = state.std
+        z = (np.log1p(np.maximum(claims, 0.0)) - state.mean) / std if std > 0 else np.zeros(len(claims))
+
+        keys, cumulative = state.cdf()
+        positive = claims > 0
+        ranks = np.where(positive, 0.0, 0.5 * state.zero)
+        if positive.any() and len(keys):
+            buckets = self.bucket(np.where(positive, claims, 1.0))
+            counts = np.concatenate(([state.zero], cumulative))
+            below = counts[np.searchsorted(keys, buckets, side='left')]
+            through = counts[np.searchsorted(keys, buckets, side='right')]
+            ranks = np.where(positive, 0.5 * (below + through), ranks)
+        return z, ranks / state.count
+
+    def quantile(self, state: GroupState, q: float) -> float:
+        keys, cumulative = state.cdf()
+        rank = q * (state.count - 1)
+        if rank < state.zero or not len(keys):
+            return 0.0
+        i = int(np.searchsorted(cumulative, rank, side='right'))
+        i = min(i, len(keys) - 1)
+        return 2 * self.gamma ** int(keys[i]) / (self.gamma + 1)
+
+    def updated(self, observations: Iterable[Tuple[GroupKey, float]]) -> 'ClaimDistributionModel':
+        """Model baru dengan observasi tambahan; model ini tidak berubah"""
+        grouped: Dict[GroupKey, List[float]] = {}
+        for key, claim in observations:
+            grouped.setdefault(key, []).append(claim)
+
+        deltas = {}
+        for key, claims in grouped.items():
+            values = np.asarray(claims, dtype=np.float64)
+            positive = values[values > 0]
+            logs = np.log1p(np.maximum(values, 0.0))
+            buckets, counts = np.unique(self.bucket(positive), return_counts=True)
+            deltas[key] = GroupState(
+                count=len(values),
+                mean=float(logs.mean()),
+                m2=float(((logs - logs.mean()) ** 2).sum()),
+                zero=int(len(values) - len(positive)),
+                bins=dict(zip(buckets.tolist(), counts.tolist()))
+            )
+        return self.merged(ClaimDistributionModel(deltas, self.alpha))
+
+    def merged(self, other: 'ClaimDistributionModel', version: Optional[str] = None) -> 'ClaimDistributionModel':
+        """Gabungkan dua model (komutatif dan asosiatif); hasilnya model baru"""
+        if not math.isclose(other.alpha, self.alpha):
+            raise ValueError(f"Cannot merge sketches with alpha {self.alpha} and {other.alpha}")
+        groups = dict(self.groups)
+        for key, state in other.groups.items():
+            mine = groups.get(key)
+            if mine is None:
+                groups[key] = replace(state, bins=dict(state.bins), _cdf=None)
+                continue
+            count, mean, m2 = _chan(mine, state.count, state.mean, state.m2)
+            bins = dict(mine.bins)
+            for bucket, n in state.bins.items():
+                bins[bucket] = bins.get(bucket, 0) + n
+            groups[key] = GroupState(count=count, mean=mean, m2=m2, zero=mine.zero + state.zero, bins=bins)
+        return ClaimDistributionModel(groups, self.alpha, version)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'alpha': self.alpha,
+            'groups': [
+                {
+                    'sector': sector,
+                    'scale': scale,
+                    'method': method,
+                    'count': state.count,
+                    'mean': state.mean,
+                    'm2': state.m2,
+                    'zero': state.zero,
+                    'bins': {str(bucket): n for bucket, n in sorted(state.bins.items())},
+                }
+                for (sector, scale, method), state in self.groups.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, document: Dict[str, Any], version: Optional[str] = None) -> 'ClaimDistributionModel':
+        try:
+            groups = {
+                (group['sector'], group['scale'], group['method']): GroupState(
+                    count=int(group['count']),
+                    mean=float(group['mean']),
+                    m2=float(group['m2']),
+                    zero=int(group.get('zero', 0)),
+                    bins={int(bucket): int(n) for bucket, n in group['bins'].items()}
+                )
+                for group in document['groups']
+            }
+            return cls(groups, float(document['alpha']), version)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Invalid claim distribution state: {e!r}")
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                'sector': sector,
+                'scale': scale,
+                'method': method,
+                'count': state.count,
+                'p50': self.quantile(state, 0.5),
+                'p90': self.quantile(state, 0.9),
+                'p99': self.quantile(state, 0.99),
+                'active': state.count >= MIN_SAMPLES,
+            }
+            for (sector, scale, method), state in sorted(self.groups.items())
+        ]
+
+
+def observations_from_records(
+    records: Iterable[Dict[str, Any]],
+    exclude_status: Tuple[str, ...] = ()
+) -> Iterator[Tuple[GroupKey, float]]:
+    """(group, claim) dari record export/API; record tidak lengkap dilewati"""
+    for record in records:
+        if record.get('status') in exclude_status:
+            continue
+        sector = record.get('sector')
+        scale = record.get('business_scale')
+        method = record.get('calculation_method') or record.get('carbon_calculation_method')
+        claim = record.get('carbon_reduction_kg')
+        if not sector or not scale or not method or claim is None:
+            continue
+        try:
+            claim = float(claim)
+        except (TypeError, ValueError):
+            continue
+        if math.isfinite(claim):
+            yield (str(sector), str(scale), str(method)), claim
+
+
+class DistributionStore:
+    """
+    Pemilik model distribusi untuk satu CarbonValidator
+
+    Observasi langsung masuk ke model aktif (copy-on-write) dan dicatat
+    sebagai delta. Dengan `path`, `maybe_sync()` menggabungkan delta ke file
+    bersama (di bawah file lock) lalu memuat hasilnya, sehingga setiap proses
+    hanya mengirim observasinya sendiri dan membaca observasi proses lain.
+
+    Args:
+        validator: CarbonValidator yang atribut `distribution`-nya di-swap
+        path: File JSON state bersama (None = hanya di memori)
+        sync_interval: Jeda minimum antar sinkronisasi (detik)
+    """
+
+    def __init__(self, validator, path: Optional[str] = None, sync_interval: float = 10.0):
+        self.validator = validator
+        self.path = path
+        self.sync_interval = sync_interval
+        self.last_error: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self._pending = ClaimDistributionModel()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+        validator.distribution = ClaimDistributionModel()
+
+    @classmethod
+    def from_env(cls, validator) -> 'DistributionStore':
+        return cls(
+            validator,
+            path=os.getenv('OUTLIER_MODEL_PATH') or None,
+            sync_interval=float(os.getenv('OUTLIER_SYNC_INTERVAL', '10'))
+        )
+
+    @property
+    def model(self) -> ClaimDistributionModel:
+        return self.validator.distribution
+
+    def observe(self, observations: Iterable[Tuple[GroupKey, float]]) -> int:
+        observations = list(observations)
+        with self._lock:
+            self.validator.distribution = self.model.updated(observations)
+            if self.path:
+                self._pending = self._pending.updated(observations)
+        return len(observations)
+
+    def merge(self, other: ClaimDistributionModel):
+        """Gabungkan state dari worker/host lain"""
+        with self._lock:
+            self.validator.distribution = self.model.merged(other)
+            if self.path:
+                self._pending = self._pending.merged(other)
+
+    def _read(self) -> Tuple[Optional[ClaimDistributionModel], Optional[Tuple[int, int]]]:
+        try:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                content = f.read()
+        except FileNotFoundError:
+            return None, None
+        version = hashlib.sha256(content).hexdigest()[:16]
+        return ClaimDistributionModel.from_dict(json.loads(content), version), (stat.st_mtime_ns, stat.st_size)
+
+    def sync(self) -> bool:
+        """Merge delta lokal ke file dan muat state gabungan; True jika model berubah"""
+        if not self.path:
+            return False
+        with self._lock:
+            pending, self._pending = self._pending, ClaimDistributionModel()
+        lock_file = open(f"{self.path}.lock", 'a')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            shared, signature = self._read()
+            if not len(pending):
+                if shared is None or signature == self._signature:
+                    return False
+                merged = shared
+            else:
+                merged = (shared or ClaimDistributionModel(alpha=pending.alpha)).merged(pending)
+                content = json.dumps(merged.to_dict(), separators=(',', ':')).encode('utf-8')
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp, self.path)
+                stat = os.stat(self.path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                merged = ClaimDistributionModel(merged.groups, merged.alpha, hashlib.sha256(content).hexdigest()[:16])
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._pending = pending.merged(self._pending)  # retry on the next sync
+            self.last_error = str(e)
+            return False
+        finally:
+            lock_file.close()
+
+        with self._lock:
+            # Observations that arrived during the sync are not in the file yet
+            self.validator.distribution = merged.merged(self._pending) if len(self._pending) else merged
+        self._signature = signature
+        self.synced_at = time.time()
+        self.last_error = None
+        return True
+
+    def maybe_sync(self) -> bool:
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if now < self._next_sync:
+            return False
+        self._next_sync = now + self.sync_interval
+        return self.sync()
+
+    def info(self) -> Dict[str, Any]:
+        model = self.model
+        return {
+            'path': self.path,
+            'version': model.version,
+            'groups': len(model),
+            'claims': sum(state.count for state in model.groups.values()),
+            'pendingClaims': sum(state.count for state in self._pending.groups.values()),
+            'syncedAt': self.synced_at,
+            'lastError': self.last_error,
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Fit the claim distribution model from a submissions export")
+    parser.add_argument('input', help="NDJSON/CSV export, or '-' for stdin")
+    parser.add_argument('-o', '--output', required=True, help="Model JSON (merged into it if it exists)")
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default=None)
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA)
+    parser.add_argument('--exclude-status', nargs='*', default=['FLAGGED'],
+                        help="Skip submissions with these statuses (default: FLAGGED)")
+    args = parser.parse_args(argv)
+
+    from streaming import READ_SIZE, RecordReader
+
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'ndjson')
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', newline='')
+    reader = RecordReader(fmt)
+    model = ClaimDistributionModel(alpha=args.alpha)
+    batch: List[Tuple[GroupKey, float]] = []
+    try:
+        while True:
+            text = source.read(READ_SIZE)
+            records = reader.feed(text) if text else reader.close()
+            batch.extend(observations_from_records(records, tuple(args.exclude_status)))
+            if len(batch) >= 100_000 or not text:
+                model = model.updated(batch)
+                batch = []
+            if not text:
+                break
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    store = DistributionStore(_Holder(), args.output, sync_interval=0)
+    store.merge(model)
+    store.sync()
+    if store.last_error:
+        raise SystemExit(f"Could not write {args.output}: {store.last_error}")
+    print(f"{len(store.model)} groups, {store.info()['claims']} claims -> {args.output}", file=sys.stderr)
+
+
+class _Holder:
+    """Stand-in validator for the CLI (only holds `distribution`)"""
+    distribution: Optional[ClaimDistributionModel] = None
+
+
+if __name__ == '__main__':
+    main()
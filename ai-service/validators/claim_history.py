@@ -0,0 +1,595 @@
+"""
+Claim History
+Riwayat klaim karbon per UMKM lintas periode dan aturan konsistensi tren
+
+CarbonValidator judges each claim against static benchmarks only: a UMKM that
+claims 500 kg one year and 15,000 kg the next passes as long as 15,000 kg is
+under the sector maximum. This store keeps every UMKM's claims by period
+(year) and checks a new claim against the previous one:
+
+  - trend_growth: annualized growth above MAX_ANNUAL_GROWTH (more allowed per
+    step up in business scale)
+  - trend_growth_outlier: growth far outside the UMKM's own past growth
+    (z-score of log growth, once it has MIN_GROWTH_SAMPLES)
+  - trend_employees: claim per employee (localEmployees) growing faster than
+    MAX_INTENSITY_GROWTH while the workforce did not grow
+  - trend_scale: business scale went down while the claim went up
+
+Storage is columnar: one row per (UMKM, period) in growable numpy arrays
+(UMKM slot, period, kg, employees, scale, previous row), and per UMKM only the
+latest and previous rows plus running Welford aggregates of log growth. A
+correction overwrites its period's row in place, and re-recording an identical
+claim (a retry, a re-estimate) changes nothing, so memory grows with UMKM
+periods, not with traffic. Checking or recording a claim for a new latest
+period, or a correction of the latest period, is O(1). A claim for an older
+period (backfill out of order, or its correction) relinks or re-aggregates
+that UMKM's rows, O(its claims).
+
+With `path`, changed claims are appended to a JSONL log and replayed on
+start; a log holding superseded corrections is rewritten with one line per
+(UMKM, period) on start. Single writer: one process per log file. Build from
+an export:
+    python -m validators.claim_history export.csv --log data/claim_history.jsonl
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from validators.messages import Message, MessageCatalog
+
+SCALES = ('small', 'medium', 'large')
+_SCALE_CODES = {scale: code for code, scale in enumerate(SCALES)}
+
+MAX_ANNUAL_GROWTH = 3.0      # claim may triple per year at the same scale
+SCALE_STEP_GROWTH = 4.0      # extra allowance per step up (~typical medium/small)
+MAX_INTENSITY_GROWTH = 2.0   # kg per employee may double per year
+SCALE_DROP_GROWTH = 1.5      # claim growth that contradicts a smaller scale
+GROWTH_Z_THRESHOLD = 3.0
+MIN_GROWTH_SAMPLES = 3
+MIN_GROWTH_STD = 0.1         # log-scale floor, steady histories are not over-sensitive
+
+TREND_MESSAGES = MessageCatalog({
+    'trend_growth': (
+        "Klaim naik {growth:.1f}x per tahun dari periode {previous_period} ({previous:.0f} kg) "
+        "ke {period} ({claim:.0f} kg); maksimum wajar {limit:.1f}x per tahun"
+    ),
+    'trend_growth_outlier': (
+        "Pertumbuhan klaim {growth:.2f}x per tahun tidak konsisten dengan riwayat UMKM ini "
+        "(rata-rata {typical:.2f}x, z-score {z:.1f}, n={samples})"
+    ),
+    'trend_employees': (
+        "Klaim per karyawan naik {growth:.1f}x per tahun ({previous:.0f} -> {current:.0f} kg/karyawan) "
+        "sementara karyawan {previous_employees} -> {employees}"
+    ),
+    'trend_scale': "Skala usaha turun dari {previous_scale} ke {scale} tetapi klaim naik {growth:.1f}x",
+})
+
+TREND_SUGGESTIONS = MessageCatalog({
+    'trend': (
+        "Jelaskan perubahan besar dibanding klaim periode sebelumnya (mis. ekspansi usaha, "
+        "mesin atau proses baru) dan sertakan bukti pendukung"
+    ),
+})
+
+# Confidence penalties per trend flag (see flag_trend)
+TREND_PENALTIES = {
+    'trend_growth': 0.2,
+    'trend_growth_outlier': 0.1,
+    'trend_employees': 0.15,
+    'trend_scale': 0.1,
+}
+
+
+@dataclass
+class TrendCheck:
+    """Hasil cek satu klaim terhadap klaim periode sebelumnya"""
+    previous_period: Optional[int] = None
+    previous_kg: Optional[float] = None
+    growth: Optional[float] = None            # annualized claim ratio
+    intensity_growth: Optional[float] = None  # annualized kg-per-employee ratio
+    samples: int = 0                          # past growth observations of this UMKM
+    flag_codes: List[Message] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'previousPeriod': self.previous_period,
+            'previousKg': self.previous_kg,
+            'growth': round(self.growth, 4) if self.growth is not None else None,
+            'intensityGrowth': round(self.intensity_growth, 4) if self.intensity_growth is not None else None,
+            'samples': self.samples,
+        }
+
+
+def flag_trend(result: Dict[str, Any], check: TrendCheck, structured: bool = False) -> Dict[str, Any]:
+    """
+    Tambahkan flag tren ke hasil /estimate-carbon (dict, bisa dari cache)
+
+    Like duplicate flags, trend flags are not cached with the rule-based
+    result: they depend on the UMKM's history at the time of the check.
+    """
+    result = {**result, 'trend': check.to_dict()}
+    if not check.flag_codes:
+        return result
+    if structured:
+        flags = [TREND_MESSAGES.to_dict(message) for message in check.flag_codes]
+        suggestion = TREND_SUGGESTIONS.to_dict(TREND_SUGGESTIONS.fixed['trend'])
+    else:
+        flags = TREND_MESSAGES.render_all(check.flag_codes)
+        suggestion = TREND_SUGGESTIONS.render(TREND_SUGGESTIONS.fixed['trend'])
+    confidence = result['confidence'] - sum(TREND_PENALTIES[message.code] for message in check.flag_codes)
+    confidence = round(max(0.0, min(1.0, confidence)), 2)
+    return {
+        **result,
+        'isValid': result['isValid'] and confidence >= 0.4
+                   and all(message.code != 'trend_growth' for message in check.flag_codes),
+        'confidence': confidence,
+        'flags': list(result['flags']) + flags,
+        'flagCodes': list(result['flagCodes']) + [message.code for message in check.flag_codes],
+        'suggestions': list(result['suggestions']) + [suggestion],
+    }
+
+
+def _log_growth(kg: float, previous_kg: float, years: int) -> Optional[float]:
+    if kg <= 0 or previous_kg <= 0 or years <= 0:
+        return None
+    return math.log(kg / previous_kg) / years
+
+
+class ClaimHistory:
+    """
+    Riwayat klaim per UMKM (kolom numpy, append-only) dengan agregat bergulir
+
+    Args:
+        path: File log JSONL (None = hanya di memori)
+        capacity: Kapasitas awal baris dan UMKM (tumbuh 2x saat penuh)
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 1024):
+        self.path = path
+        # Rows: one per recorded claim; `prev` links a UMKM's claims by period
+        self._umkm = np.empty(capacity, dtype=np.int32)
+        self._period = np.empty(capacity, dtype=np.int32)
+        self._kg = np.empty(capacity, dtype=np.float64)
+        self._employees = np.empty(capacity, dtype=np.int32)  # -1 = unknown
+        self._scale = np.empty(capacity, dtype=np.int8)       # -1 = unknown
+        self._prev = np.empty(capacity, dtype=np.int64)
+        self.rows = 0
+        self.superseded = 0  # corrections written over an existing period's row
+        # Slots: one per UMKM
+        self.ids: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._last = np.empty(capacity, dtype=np.int64)
+        self._count = np.empty(capacity, dtype=np.int32)
+        self._growth_n = np.empty(capacity, dtype=np.int32)
+        self._growth_mean = np.empty(capacity, dtype=np.float64)
+        self._growth_m2 = np.empty(capacity, dtype=np.float64)
+        self._lock = threading.Lock()
+        self._log = None
+        if path:
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> 'ClaimHistory':
+        return cls(path=os.getenv('CLAIM_HISTORY_PATH') or None)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, umkm_id: str) -> bool:
+        return umkm_id in self._slots
+
+    # Checks ------------------------------------------------------------------
+
+    def check(
+        self,
+        umkm_id: str,
+        period: int,
+        carbon_reduction_kg: float,
+        local_employees: Optional[int] = None,
+        business_scale: Optional[str] = None
+    ) -> TrendCheck:
+        """Bandingkan klaim dengan klaim UMKM periode sebelumnya (tanpa menyimpan)"""
+        slot = self._slots.get(umkm_id)
+        if slot is None:
+            return TrendCheck()
+        previous, (n, mean, m2) = self._reference(slot, period)
+        if previous < 0:
+            return TrendCheck(samples=n)
+
+        previous_period = int(self._period[previous])
+        previous_kg = float(self._kg[previous])
+        years = period - previous_period
+        check = TrendCheck(previous_period=previous_period, previous_kg=previous_kg, samples=n)
+        log_growth = _log_growth(carbon_reduction_kg, previous_kg, years)
+        if log_growth is None:
+            return check
+        growth = math.exp(log_growth)
+        check.growth = growth
+
+        # Growth limit, with more room for each step up in business scale
+        scale = _SCALE_CODES.get(business_scale, -1)
+        previous_scale = int(self._scale[previous])
+        steps = scale - previous_scale if scale >= 0 and previous_scale >= 0 else 0
+        limit = MAX_ANNUAL_GROWTH * SCALE_STEP_GROWTH ** max(steps, 0)
+        if growth > limit:
+            check.flag_codes.append(Message((
+                'trend_growth', (growth, previous_period, previous_kg, period, carbon_reduction_kg, limit)
+            )))
+
+        # Growth vs this UMKM's own past growth
+        if n >= MIN_GROWTH_SAMPLES:
+            std = max(math.sqrt(m2 / (n - 1)), MIN_GROWTH_STD)
+            z = (log_growth - mean) / std
+            if z >= GROWTH_Z_THRESHOLD:
+                check.flag_codes.append(Message((
+                    'trend_growth_outlier', (growth, math.exp(mean), z, n)
+                )))
+
+        # Claim per employee vs workforce change
+        previous_employees = int(self._employees[previous])
+        if local_employees and local_employees > 0 and previous_employees > 0:
+            intensity = carbon_reduction_kg / local_employees
+            previous_intensity = previous_kg / previous_employees
+            intensity_growth = (intensity / previous_intensity) ** (1 / years)
+            check.intensity_growth = intensity_growth
+            if intensity_growth > MAX_INTENSITY_GROWTH and local_employees <= previous_employees:
+                check.flag_codes.append(Message((
+                    'trend_employees',
+                    (intensity_growth, previous_intensity, intensity, previous_employees, local_employees)
+                )))
+
+        if steps < 0 and carbon_reduction_kg / previous_kg > SCALE_DROP_GROWTH:
+            check.flag_codes.append(Message((
+                'trend_scale', (SCALES[previous_scale], SCALES[scale], carbon_reduction_kg / previous_kg)
+            )))
+        return check
+
+    def _reference(self, slot: int, period: int) -> Tuple[int, Tuple[int, float, float]]:
+        """(baris klaim terakhir sebelum `period`, agregat pertumbuhan sampai baris itu)"""
+        last = int(self._last[slot])
+        stats = (int(self._growth_n[slot]), float(self._growth_mean[slot]), float(self._growth_m2[slot]))
+        if period > self._period[last]:
+            return last, stats
+        before = int(self._prev[last])
+        if period == self._period[last]:
+            # Correction of the latest period: compare with the one before it,
+            # without the growth observation it is about to replace
+            if before >= 0:
+                observation = self._observation(last)
+                if observation is not None:
+                    stats = _welford_remove(stats, observation)
+            return before, stats
+        # Older period: walk back (rare, backfills); no own-history statistics
+        row = before
+        while row >= 0 and self._period[row] >= period:
+            row = int(self._prev[row])
+        return row, (0, 0.0, 0.0)
+
+    def _observation(self, row: int) -> Optional[float]:
+        previous = int(self._prev[row])
+        if previous < 0:
+            return None
+        return _log_growth(float(self._kg[row]), float(self._kg[previous]),
+                           int(self._period[row]) - int(self._period[previous]))
+
+    # Recording ---------------------------------------------------------------
+
+    def record(
+        self,
+        umkm_id: str,
+        period: int,
+        carbon_reduction_kg: float,
+        local_employees: Optional[int] = None,
+        business_scale: Optional[str] = None,
+        log: bool = True
+    ):
+        """Simpan klaim; klaim untuk periode yang sudah ada menggantikan yang lama di tempat"""
+        with self._lock:
+            changed = self._record(umkm_id, period, carbon_reduction_kg, local_employees, business_scale)
+            if log and changed:
+                self._write(umkm_id, period, carbon_reduction_kg, local_employees, business_scale)
+
+    def check_and_record(
+        self,
+        umkm_id: str,
+        period: int,
+        carbon_reduction_kg: float,
+        local_employees: Optional[int] = None,
+        business_scale: Optional[str] = None
+    ) -> TrendCheck:
+        """check() lalu record() untuk klaim yang sama"""
+        with self._lock:
+            check = self.check(umkm_id, period, carbon_reduction_kg, local_employees, business_scale)
+            if self._record(umkm_id, period, carbon_reduction_kg, local_employees, business_scale):
+                self._write(umkm_id, period, carbon_reduction_kg, local_employees, business_scale)
+        return check
+
+    def _write(self, umkm_id, period, kg, employees, scale):
+        if self._log is not None:
+            self._log.write(json.dumps({
+                'umkm': umkm_id, 'period': period, 'kg': kg, 'employees': employees, 'scale': scale,
+            }) + '\n')
+            self._log.flush()
+
+    def _record(self, umkm_id, period, kg, employees, scale) -> bool:
+        """Simpan satu klaim; False jika klaim yang sama persis sudah tersimpan"""
+        slot = self._slots.get(umkm_id)
+        if slot is None:
+            slot = self._new_slot(umkm_id)
+        last = int(self._last[slot])
+        if last >= 0 and period <= self._period[last]:
+            row = self._find(slot, period)
+            if row >= 0:
+                return self._overwrite(slot, row, kg, employees, scale)
+        row = self._append(slot, period, kg, employees, scale)
+        self._count[slot] += 1
+        if last < 0:
+            self._prev[row] = -1
+            self._last[slot] = row
+        elif period > self._period[last]:
+            self._prev[row] = last
+            self._last[slot] = row
+            self._add_observation(slot, self._observation(row))
+        else:
+            self._relink(slot, row)
+        return True
+
+    def _find(self, slot: int, period: int) -> int:
+        """Baris UMKM ini untuk `period` (-1 jika belum ada); O(1) untuk periode terakhir"""
+        row = int(self._last[slot])
+        while row >= 0 and self._period[row] > period:
+            row = int(self._prev[row])
+        return row if row >= 0 and self._period[row] == period else -1
+
+    def _overwrite(self, slot: int, row: int, kg, employees, scale) -> bool:
+        """Koreksi periode yang sudah ada: tulis ulang barisnya, bukan baris baru"""
+        employees = employees if employees is not None else -1
+        scale = _SCALE_CODES.get(scale, -1)
+        if (self._kg[row], self._employees[row], self._scale[row]) == (kg, employees, scale):
+            return False  # retry or re-estimate of the same claim
+        latest = row == self._last[slot]
+        if latest:
+            self._remove_observation(slot, self._observation(row))
+        self._kg[row] = kg
+        self._employees[row] = employees
+        self._scale[row] = scale
+        if latest:
+            self._add_observation(slot, self._observation(row))
+        else:
+            self._reaggregate(slot)  # the next period's growth changed too
+        self.superseded += 1
+        return True
+
+    def _relink(self, slot: int, row: int):
+        """Klaim periode lama: susun ulang rantai UMKM ini dan hitung ulang agregatnya"""
+        rows = [row]
+        current = int(self._last[slot])
+        while current >= 0:
+            rows.append(current)
+            current = int(self._prev[current])
+        ordered = sorted(rows, key=lambda candidate: int(self._period[candidate]))
+        previous = -1
+        for current in ordered:
+            self._prev[current] = previous
+            previous = current
+        self._last[slot] = ordered[-1]
+        self._reaggregate(slot)
+
+    def _reaggregate(self, slot: int):
+        """Hitung ulang agregat pertumbuhan dari seluruh rantai UMKM ini"""
+        self._growth_n[slot], self._growth_mean[slot], self._growth_m2[slot] = 0, 0.0, 0.0
+        rows = []
+        current = int(self._last[slot])
+        while current >= 0:
+            rows.append(current)
+            current = int(self._prev[current])
+        for current in reversed(rows):
+            self._add_observation(slot, self._observation(current))
+
+    def _add_observation(self, slot: int, value: Optional[float]):
+        if value is None:
+            return
+        n = int(self._growth_n[slot]) + 1
+        delta = value - self._growth_mean[slot]
+        self._growth_mean[slot] += delta / n
+        self._growth_m2[slot] += delta * (value - self._growth_mean[slot])
+        self._growth_n[slot] = n
+
+    def _remove_observation(self, slot: int, value: Optional[float]):
+        if value is None:
+            return
+        stats = (int(self._growth_n[slot]), float(self._growth_mean[slot]), float(self._growth_m2[slot]))
+        self._growth_n[slot], self._growth_mean[slot], self._growth_m2[slot] = _welford_remove(stats, value)
+
+    def _new_slot(self, umkm_id: str) -> int:
+        slot = len(self.ids)
+        if slot == len(self._last):
+            size = 2 * slot
+            self._last, self._count, self._growth_n, self._growth_mean, self._growth_m2 = (
+                _grown(array, size)
+                for array in (self._last, self._count, self._growth_n, self._growth_mean, self._growth_m2)
+            )
+        self.ids.append(umkm_id)
+        self._slots[umkm_id] = slot
+        self._last[slot] = -1
+        self._count[slot] = 0
+        self._growth_n[slot] = 0
+        self._growth_mean[slot] = 0.0
+        self._growth_m2[slot] = 0.0
+        return slot
+
+    def _append(self, slot, period, kg, employees, scale) -> int:
+        row = self.rows
+        if row == len(self._kg):
+            size = 2 * row
+            self._umkm, self._period, self._kg, self._employees, self._scale, self._prev = (
+                _grown(array, size)
+                for array in (self._umkm, self._period, self._kg, self._employees, self._scale, self._prev)
+            )
+        self._umkm[row] = slot
+        self._period[row] = period
+        self._kg[row] = kg
+        self._employees[row] = employees if employees is not None else -1
+        self._scale[row] = _SCALE_CODES.get(scale, -1)
+        self.rows += 1
+        return row
+
+    # Reading -----------------------------------------------------------------
+
+    def history(self, umkm_id: str) -> Optional[Dict[str, Any]]:
+        """Klaim UMKM urut periode beserta agregat pertumbuhannya (None jika tidak ada)"""
+        slot = self._slots.get(umkm_id)
+        if slot is None:
+            return None
+        rows = []
+        row = int(self._last[slot])
+        while row >= 0:
+            rows.append(row)
+            row = int(self._prev[row])
+        rows.reverse()
+        n = int(self._growth_n[slot])
+        return {
+            'umkmId': umkm_id,
+            'claims': [
+                {
+                    'period': int(self._period[row]),
+                    'carbonReductionKg': float(self._kg[row]),
+                    'localEmployees': int(self._employees[row]) if self._employees[row] >= 0 else None,
+                    'businessScale': SCALES[self._scale[row]] if self._scale[row] >= 0 else None,
+                }
+                for row in rows
+            ],
+            'meanGrowth': round(math.exp(self._growth_mean[slot]), 4) if n else None,
+            'growthSamples': n,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'umkms': len(self.ids),
+            'claims': int(self._count[:len(self.ids)].sum()),
+            'rows': self.rows,
+            'superseded': self.superseded,
+            'bytes': sum(array.nbytes for array in (
+                self._umkm, self._period, self._kg, self._employees, self._scale, self._prev,
+                self._last, self._count, self._growth_n, self._growth_mean, self._growth_m2,
+            )),
+        }
+
+    # Persistence -------------------------------------------------------------
+
+    def _load(self):
+        lines = 0
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line after a crash
+                    self._record(record['umkm'], record['period'], record['kg'],
+                                 record.get('employees'), record.get('scale'))
+        if lines > self.rows:
+            self._compact_log()  # corrections left superseded lines behind
+        self._log = open(self.path, 'a', encoding='utf-8')
+
+    def _compact_log(self):
+        """Tulis ulang log dengan satu baris per (UMKM, periode)"""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for umkm_id in self.ids:
+                for claim in self.history(umkm_id)['claims']:
+                    f.write(json.dumps({
+                        'umkm': umkm_id, 'period': claim['period'], 'kg': claim['carbonReductionKg'],
+                        'employees': claim['localEmployees'], 'scale': claim['businessScale'],
+                    }) + '\n')
+        os.replace(tmp, self.path)
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def _welford_remove(stats: Tuple[int, float, float], value: float) -> Tuple[int, float, float]:
+    """Kebalikan satu langkah Welford: agregat tanpa `value`"""
+    n, mean, m2 = stats
+    if n <= 1:
+        return 0, 0.0, 0.0
+    previous_mean = (n * mean - value) / (n - 1)
+    return n - 1, previous_mean, max(m2 - (value - previous_mean) * (value - mean), 0.0)
+
+
+def _grown(array: np.ndarray, size: int) -> np.ndarray:
+    grown = np.empty(size, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def claims_from_records(records: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, int, float, Optional[int], Optional[str]]]:
+    """(umkm, period, kg, employees, scale) dari record export/API; record tidak lengkap dilewati"""
+    for record in records:
+        umkm_id = record.get('umkm_id') or record.get('umkmId')
+        period = record.get('period')
+        claim = record.get('carbon_reduction_kg', record.get('carbonReductionKg'))
+        if umkm_id is None or period in (None, '') or claim in (None, ''):
+            continue
+        try:
+            period = int(period)
+            claim = float(claim)
+        except (TypeError, ValueError):
+            continue
+        if not math.isfinite(claim):
+            continue
+        employees = record.get('local_employees', record.get('localEmployees'))
+        try:
+            employees = int(employees) if employees not in (None, '') else None
+        except (TypeError, ValueError):
+            employees = None
+        scale = record.get('business_scale') or record.get('businessScale') or None
+        yield str(umkm_id), period, claim, employees, scale
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the claim history log from a submissions export")
+    parser.add_argument('input', help="NDJSON/CSV export (umkm_id, period, carbon_reduction_kg, "
+                                      "local_employees, business_scale), or '-' for stdin")
+    parser.add_argument('--log', required=True, help="Claim history log (created or extended)")
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default=None)
+    args = parser.parse_args(argv)
+
+    from streaming import READ_SIZE, RecordReader
+
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'ndjson')
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', newline='')
+    history = ClaimHistory(args.log)
+    reader = RecordReader(fmt)
+    recorded = 0
+    try:
+        while True:
+            text = source.read(READ_SIZE)
+            for claim in claims_from_records(reader.feed(text) if text else reader.close()):
+                history.record(*claim)
+                recorded += 1
+            if not text:
+                break
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        history.close()
+    stats = history.stats()
+    print(f"{recorded} claims recorded, {stats['umkms']} UMKMs, {stats['claims']} claims -> {args.log}",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Compiled Rule Tables
+Tabel benchmark datar dan analisis teks yang dibangun sekali per ruleset
+"""
+
+import hashlib
+import itertools
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# (sector, sub_sector, region); None means "any"
+ProfileKey = Tuple[str, Optional[str], Optional[str]]
+
+# Numeric tables of a snapshot (flat, one float64 per (profile, scale))
+SNAPSHOT_ARRAYS = ('min', 'max', 'typical')
+
+# Confidence boost from details is capped at this value
+MAX_DETAIL_BOOST = 0.15
+
+
+def detail_boost(word_count: int, key_term_count: int, key_term_total: int) -> float:
+    """Confidence boost dari kualitas penjelasan (rumus asli _analyze_details)"""
+    return min(MAX_DETAIL_BOOST, (word_count / 100) * 0.1 + (key_term_count / key_term_total) * 0.05)
+
+
+@dataclass
+class DetailAnalysis:
+    """
+    Hasil analisis teks `details` (dihitung sekali per klaim)
+
+    `word_count` berhenti di `CompiledRules.word_cap`: di atas batas itu boost
+    sudah maksimal, jadi teks panjang tidak perlu di-split seluruhnya.
+    """
+    has_text: bool
+    word_count: int
+    key_term_count: int
+    is_vague: bool
+    confidence_boost: float
+    lowered: str = ''
+
+
+class CompiledRules:
+    """
+    Snapshot read-only dari ruleset CarbonValidator
+
+    Benchmark disimpan sebagai array datar yang diindeks oleh (profile, scale),
+    sehingga lookup cukup satu dict access dan batch path bisa memakai array
+    NumPy yang sama. Profil adalah sektor dasar atau varian sub-sektor/region.
+    """
+
+    def __init__(
+        self,
+        benchmarks: Mapping[str, Mapping[str, Mapping[str, float]]],
+        method_factors: Mapping[str, float],
+        scales: Sequence[str],
+        key_terms: Sequence[str],
+        method_keywords: Mapping[str, Sequence[str]],
+        revision: int = 1,
+        variants: Optional[Mapping[ProfileKey, Mapping[str, Mapping[str, float]]]] = None,
+        default_sector: str = 'Kerajinan',
+        default_scale: str = 'small'
+    ):
+        variants = variants or {}
+        self.sectors = tuple(benchmarks)
+        self.scales = tuple(scales)
+        self.method_factors = dict(method_factors)
+        self.key_terms = tuple(key_terms)
+        self.method_keywords = {method: tuple(words) for method, words in method_keywords.items()}
+        self.consistency_methods = tuple(self.method_keywords)
+        self.default_sector = default_sector
+        self.default_scale = default_scale
+
+        # Profiles: base sectors first (so profile i == sector i), then the
+        # sub-sector/regional variants
+        self.profiles = tuple([(sector, None, None) for sector in self.sectors] + list(variants))
+        tables = [benchmarks[sector] for sector in self.sectors] + list(variants.values())
+
+        # Content hash of every table plus the rule-logic revision; changes
+        # whenever a benchmark, factor or keyword changes. Hashed per profile:
+        # one json.dumps over thousands of profiles holds the GIL long enough
+        # to stall requests during a hot reload.
+        digest = hashlib.sha256(json.dumps({
+            'revision': revision,
+            'defaults': [default_sector, default_scale],
+            'method_factors': self.method_factors,
+            'scales': self.scales,
+            'key_terms': self.key_terms,
+            'method_keywords': self.method_keywords,
+        }, sort_keys=True).encode('utf-8'))
+        for key, table in zip(self.profiles, tables):
+            digest.update(json.dumps([key, table], sort_keys=True).encode('utf-8'))
+        self.version = digest.hexdigest()[:16]
+
+        if default_sector not in self.sectors or default_scale not in self.scales:
+            raise ValueError(f"Default benchmark ({default_sector}, {default_scale}) is not in the tables")
+
+        # Flat tables: entry (profile, scale) lives at profile * len(scales) + scale
+        entries = [table[scale] for table in tables for scale in self.scales]
+        self.bench_arrays = {
+            key: np.asarray([entry[key] for entry in entries], dtype=np.float64)
+            for key in SNAPSHOT_ARRAYS
+        }
+        self._index()
+
+    def _index(self):
+        """Lookup dicts dan turunan lain dari field dasar (juga dipakai from_snapshot)"""
+        self.profile_index = {key: i for i, key in enumerate(self.profiles)}
+        self.profile_labels = tuple(
+            sector if sub_sector is None and region is None
+            else f"{sector} ({', '.join(part for part in (sub_sector, region) if part)})"
+            for sector, sub_sector, region in self.profiles
+        )
+        self.sector_index = {sector: i for i, sector in enumerate(self.sectors)}
+        self.scale_index = {scale: i for i, scale in enumerate(self.scales)}
+        self.method_index = {method: i for i, method in enumerate(self.method_factors)}
+        self.consistency_index = {method: i for i, method in enumerate(self.consistency_methods)}
+        self.bench_min = self.bench_arrays['min']
+        self.bench_max = self.bench_arrays['max']
+        self.bench_typical = self.bench_arrays['typical']
+        self._entries: Dict[int, Tuple[float, float, float]] = {}
+
+        # Smallest word count at which the boost saturates, whatever the key terms
+        self.word_cap = next(
+            n for n in itertools.count(1)
+            if detail_boost(n, 0, len(self.key_terms)) >= MAX_DETAIL_BOOST
+        )
+        self._no_text = DetailAnalysis(
+            has_text=False,
+            word_count=0,
+            key_term_count=0,
+            is_vague=False,
+            confidence_boost=0.0
+        )
+
+    def snapshot_state(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """(metadata JSON-able, array numerik) untuk snapshot file yang di-mmap"""
+        meta = {
+            'version': self.version,
+            'sectors': list(self.sectors),
+            'scales': list(self.scales),
+            'method_factors': self.method_factors,
+            'key_terms': list(self.key_terms),
+            'method_keywords': {method: list(words) for method, words in self.method_keywords.items()},
+            'default_sector': self.default_sector,
+            'default_scale': self.default_scale,
+            'variants': [list(key) for key in self.profiles[len(self.sectors):]],
+        }
+        return meta, dict(self.bench_arrays)
+
+    @classmethod
+    def from_snapshot(cls, meta: Mapping[str, Any], arrays: Mapping[str, np.ndarray]) -> 'CompiledRules':
+        """
+        Kebalikan snapshot_state tanpa kompilasi ulang
+
+        The arrays are used as they are, so read-only views over a shared
+        mapping stay shared; only the lookup dicts are built per process.
+        """
+        rules = cls.__new__(cls)
+        rules.version = meta['version']
+        rules.sectors = tuple(meta['sectors'])
+        rules.scales = tuple(meta['scales'])
+        rules.method_factors = dict(meta['method_factors'])
+        rules.key_terms = tuple(meta['key_terms'])
+        rules.method_keywords = {method: tuple(words) for method, words in meta['method_keywords'].items()}
+        rules.consistency_methods = tuple(rules.method_keywords)
+        rules.default_sector = meta['default_sector']
+        rules.default_scale = meta['default_scale']
+        rules.profiles = tuple(
+            [(sector, None, None) for sector in rules.sectors] + [tuple(key) for key in meta['variants']]
+        )
+        entries = len(rules.profiles) * len(rules.scales)
+        if any(len(arrays[key]) != entries for key in SNAPSHOT_ARRAYS):
+            raise ValueError("Snapshot arrays do not match its profiles")
+        rules.bench_arrays = {key: arrays[key] for key in SNAPSHOT_ARRAYS}
+        rules._index()
+        return rules
+
+    def flat_index(self, profile_idx: int, scale_idx: int) -> int:
+        return profile_idx * len(self.scales) + scale_idx
+
+    def benchmark(self, flat_idx: int) -> Tuple[float, float, float]:
+        """
+        (min, max, typical) sebagai angka Python; nilai bulat tetap int ("100 kg", bukan "100.0 kg")
+
+        Entries are converted once and kept per process, so only the entries
+        this process actually reads become Python objects.
+        """
+        entry = self._entries.get(flat_idx)
+        if entry is None:
+            entry = tuple(
+                int(value) if value.is_integer() else value
+                for value in (
+                    self.bench_min.item(flat_idx),
+                    self.bench_max.item(flat_idx),
+                    self.bench_typical.item(flat_idx),
+                )
+            )
+            self._entries[flat_idx] = entry
+        return entry
+
+    def profile_for(
+        self,
+        sector: str,
+        sub_sector: Optional[str] = None,
+        region: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Profil benchmark paling spesifik untuk klaim (None jika sektor tidak dikenal)
+
+        Urutan: sub-sektor + region, sub-sektor, region, lalu profil dasar sektor.
+        Maksimal empat dict lookup, berapa pun jumlah profilnya.
+        """
+        if sub_sector is None and region is None:
+            return self.sector_index.get(sector)
+        index = self.profile_index
+        for key in (
+            (sector, sub_sector, region),
+            (sector, sub_sector, None),
+            (sector, None, region),
+        ):
+            profile_idx = index.get(key)
+            if profile_idx is not None:
+                return profile_idx
+        return self.sector_index.get(sector)
+
+    def analyze(self, details: Optional[str]) -> DetailAnalysis:
+        """Lowercase dan tokenisasi teks sekali saja, lalu cocokkan key terms"""
+        if not isinstance(details, str) or not details:
+            return self._no_text
+
+        # split() stops after word_cap words; len() is then min(words, word_cap + 1)
+        word_count = len(details.split(maxsplit=self.word_cap))
+        lowered = details.lower()
+        key_term_count = sum(1 for term in self.key_terms if term in lowered)
+
+        return DetailAnalysis(
+            has_text=True,
+            word_count=word_count,
+            key_term_count=key_term_count,
+            is_vague=word_count < 20 or key_term_count < 2,
+            confidence_boost=detail_boost(word_count, key_term_count, len(self.key_terms)),
+            lowered=lowered
+        )
+
+    def mentions(self, analysis: DetailAnalysis, method_idx: int) -> bool:
+        """Apakah penjelasan menyebut unit/objek dari metode ke-method_idx"""
+        keywords = self.method_keywords[self.consistency_methods[method_idx]]
+        return any(keyword in analysis.lowered for keyword in keywords)
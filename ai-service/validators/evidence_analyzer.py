@@ -0,0 +1,338 @@
+"""
+Evidence Analyzer
+OCR untuk file bukti (invoice, foto meteran, sertifikat) dan ekstraksi angka kg/kWh/km
+
+Images are decoded at reduced size (JPEG draft mode), grayscaled and
+downscaled to `max_side` before OCR, which is what dominates OCR time on
+phone photos. OCR runs on its own ValidationExecutor (process pool by
+default) with a per-file timeout; tesseract itself is killed when it runs
+past the timeout. Results are cached by SHA-256 of the file content, so an
+evidence file that is re-used across submissions is OCR'd once, and
+concurrent requests for the same content share one OCR job.
+
+Only files below EVIDENCE_ROOT are read.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from PIL import Image  # imported where images are decoded (OCR workers)
+
+# Bump when preprocessing or the OCR call changes (invalidates cached text)
+OCR_REVISION = 1
+
+IMAGE_FORMATS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff')
+
+# Refuse to decode anything larger (decompression bombs); photos are ~12-50 MP
+MAX_IMAGE_PIXELS = 80_000_000
+
+# Unit as written -> (canonical unit, multiplier)
+UNITS = {
+    'kg': ('kg', 1.0),
+    'ton': ('kg', 1000.0),
+    'kwh': ('kWh', 1.0),
+    'mwh': ('kWh', 1000.0),
+    'km': ('km', 1.0),
+}
+_FIGURE = re.compile(r'(?<![\w.,])(\d[\d.,]*\d|\d)\s*(kg|ton|kwh|mwh|km)\b', re.IGNORECASE)
+
+DOCUMENT_KEYWORDS = {
+    'invoice': ('invoice', 'faktur', 'nota', 'kwitansi', 'total'),
+    'meter': ('kwh', 'meteran', 'meter', 'stand', 'pln'),
+    'weighing': ('timbangan', 'berat', 'bruto', 'netto'),
+    'certificate': ('sertifikat', 'certificate', 'bersertifikat'),
+}
+
+
+def parse_number(token: str) -> Optional[float]:
+    """
+    Angka dengan format Indonesia atau Inggris ("1.250,5", "1,250.5", "12,5")
+
+    A separator followed by exactly three digits is a thousands separator;
+    with both separators present the last one is the decimal point.
+    """
+    if '.' in token and ',' in token:
+        decimal = '.' if token.rfind('.') > token.rfind(',') else ','
+        thousands = ',' if decimal == '.' else '.'
+        token = token.replace(thousands, '').replace(decimal, '.')
+    else:
+        for separator in '.,':
+            parts = token.split(separator)
+            if len(parts) == 1:
+                continue
+            if len(parts) > 2 or len(parts[1]) == 3:
+                token = token.replace(separator, '')
+            else:
+                token = token.replace(separator, '.')
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def extract_figures(text: str) -> Dict[str, float]:
+    """
+    Angka terbesar per satuan (kg, kWh, km) dalam satu dokumen
+
+    The largest figure rather than the sum: invoices repeat quantities in
+    line items, subtotals and totals.
+    """
+    figures: Dict[str, float] = {}
+    for token, unit in _FIGURE.findall(text or ''):
+        value = parse_number(token)
+        if value is None:
+            continue
+        unit, multiplier = UNITS[unit.lower()]
+        figures[unit] = max(figures.get(unit, 0.0), value * multiplier)
+    return figures
+
+
+def detect_documents(text: str) -> List[str]:
+    lowered = (text or '').lower()
+    return [kind for kind, words in DOCUMENT_KEYWORDS.items() if any(word in lowered for word in words)]
+
+
+def prepare_image(content: bytes, max_side: int = 2000) -> 'Image.Image':
+    """Decode, rotate by EXIF, grayscale dan downscale sebelum OCR"""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    image = Image.open(io.BytesIO(content))
+    # JPEG decodes straight to a 1/2, 1/4 or 1/8 scale, skipping most IDCT work
+    image.draft('L', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('L')
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return image
+
+
+def tesseract_ocr(image: 'Image.Image', languages: str, timeout: float) -> str:
+    import pytesseract  # imported in the OCR worker only
+    return pytesseract.image_to_string(image, lang=languages, timeout=timeout)
+
+
+def ocr_file_task(
+    content: bytes,
+    ocr: Callable[['Image.Image', str, float], str],
+    max_side: int,
+    languages: str,
+    timeout: float
+) -> Dict[str, Any]:
+    """Task untuk executor (module level supaya bisa di-pickle ke worker)"""
+    try:
+        image = prepare_image(content, max_side)
+        text = ocr(image, languages, timeout)
+    except Exception as e:
+        # Some library exceptions cannot be unpickled in the parent, which
+        # would mark the whole process pool as broken
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    return {'text': text, 'width': image.width, 'height': image.height}
+
+
+@dataclass
+class EvidenceFile:
+    file: str
+    text: str = ''
+    documents: List[str] = field(default_factory=list)
+    figures: Dict[str, float] = field(default_factory=dict)
+    sha256: Optional[str] = None
+    cached: bool = False
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'file': self.file,
+            'documents': self.documents,
+            'figures': self.figures,
+            'sha256': self.sha256,
+            'cached': self.cached,
+            'error': self.error,
+        }
+
+
+@dataclass
+class EvidenceReport:
+    files: List[EvidenceFile]
+
+    @property
+    def figures(self) -> Dict[str, float]:
+        """Total per satuan atas semua file (maksimum per file, lihat extract_figures)"""
+        totals: Dict[str, float] = {}
+        for item in self.files:
+            for unit, value in item.figures.items():
+                totals[unit] = totals.get(unit, 0.0) + value
+        return totals
+
+    def quantity_for(self, unit: Optional[str]) -> Optional[float]:
+        """Jumlah terdokumentasi dalam satuan metode kalkulasi (None jika tidak ada)"""
+        return self.figures.get(unit) if unit else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        read = [item for item in self.files if item.error is None and item.text.strip()]
+        return {
+            'extractedText': [item.text for item in self.files],
+            'detectedDocuments': [item.to_dict() for item in self.files],
+            'figures': self.figures,
+            'confidence': round(len(read) / len(self.files), 2) if self.files else 0.0,
+        }
+
+
+class EvidenceAnalyzer:
+    """
+    Pipeline OCR untuk file bukti lokal
+
+    Args:
+        root: Direktori evidence; path di luar direktori ini ditolak
+        executor: ValidationExecutor khusus OCR (inline/thread/process)
+        cache: ResultCache untuk teks OCR (kunci = hash isi file)
+        ocr: Fungsi OCR module-level (image, languages, timeout) -> text
+        timeout: Batas waktu per file (detik)
+        max_side: Sisi terpanjang gambar setelah downscale (pixel)
+        max_bytes: Ukuran file maksimum
+        languages: Bahasa tesseract
+    """
+
+    def __init__(
+        self,
+        root: Optional[str],
+        executor,
+        cache=None,
+        ocr: Callable[['Image.Image', str, float], str] = tesseract_ocr,
+        timeout: float = 30.0,
+        max_side: int = 2000,
+        max_bytes: int = 10 * 1024 * 1024,
+        languages: str = 'ind+eng'
+    ):
+        self.root = os.path.realpath(root) if root else None
+        self.executor = executor
+        self.cache = cache
+        self.ocr = ocr
+        self.timeout = timeout
+        self.max_side = max_side
+        self.max_bytes = max_bytes
+        self.languages = languages
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.ocr_runs = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_env(cls, executor, cache=None) -> 'EvidenceAnalyzer':
+        return cls(
+            root=os.getenv('EVIDENCE_ROOT') or None,
+            executor=executor,
+            cache=cache,
+            timeout=float(os.getenv('OCR_TIMEOUT', '30')),
+            max_side=int(os.getenv('OCR_MAX_SIDE', '2000')),
+            languages=os.getenv('OCR_LANGUAGES', 'ind+eng')
+        )
+
+    @property
+    def version(self) -> str:
+        return f"ocr-{OCR_REVISION}:{self.languages}:{self.max_side}"
+
+    def resolve(self, name: str) -> str:
+        """Path absolut di bawah root; ValueError untuk path lain"""
+        if self.root is None:
+            raise ValueError("EVIDENCE_ROOT is not configured")
+        if '://' in name:
+            raise ValueError("Only local evidence files are supported")
+        path = os.path.realpath(os.path.join(self.root, name))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError("File is outside EVIDENCE_ROOT")
+        if os.path.splitext(path)[1].lower() not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported evidence format, expected one of {IMAGE_FORMATS}")
+        return path
+
+    def _read(self, path: str) -> bytes:
+        if os.path.getsize(path) > self.max_bytes:
+            raise ValueError(f"File is larger than {self.max_bytes} bytes")
+        with open(path, 'rb') as f:
+            return f.read()
+
+    async def analyze(self, names: Sequence[str]) -> EvidenceReport:
+        return EvidenceReport(list(await asyncio.gather(*(self.analyze_file(name) for name in names))))
+
+    async def analyze_file(self, name: str) -> EvidenceFile:
+        item = EvidenceFile(file=name)
+        try:
+            content = await asyncio.to_thread(self._read, self.resolve(name))
+        except (OSError, ValueError) as e:
+            item.error = str(e)
+            return item
+        item.sha256 = hashlib.sha256(content).hexdigest()
+
+        try:
+            text, item.cached = await self._text(item.sha256, content)
+        except asyncio.TimeoutError:
+            item.error = f"OCR timed out after {self.timeout:.0f}s"
+            return item
+        except Exception as e:  # decode errors, tesseract failures, broken pool
+            item.error = f"OCR failed: {e}"
+            return item
+
+        item.text = text
+        item.documents = detect_documents(text)
+        item.figures = extract_figures(text)
+        return item
+
+    async def _text(self, sha256: str, content: bytes):
+        """Teks OCR untuk satu isi file: cache, lalu job yang sedang berjalan, lalu OCR baru"""
+        key = f"{self.version}:{sha256}"
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return cached['text'], True
+
+        pending = self._inflight.get(sha256)
+        if pending is not None:
+            try:
+                return (await asyncio.shield(pending))['text'], True
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                raise RuntimeError("shared OCR job was cancelled")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[sha256] = future
+        try:
+            # At most one job per worker is submitted, so the timeout measures
+            # decoding + OCR and not time spent queued behind other files
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.executor.workers)
+            async with self._slots:
+                self.ocr_runs += 1
+                result = await asyncio.wait_for(
+                    self.executor.run(ocr_file_task, content, self.ocr, self.max_side, self.languages, self.timeout),
+                    self.timeout
+                )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters re-raise it
+            raise
+        finally:
+            del self._inflight[sha256]
+
+        future.set_result(result)
+        if self.cache is not None:
+            self.cache.set(key, result)
+        return result['text'], False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'root': self.root,
+            'mode': self.executor.mode,
+            'ocrRuns': self.ocr_runs,
+            'timeouts': self.timeouts,
+            'inflight': len(self._inflight),
+        }
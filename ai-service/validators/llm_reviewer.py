@@ -0,0 +1,270 @@
+"""
+LLM Reviewer
+Cross-check klaim borderline terhadap detail dan bukti dengan LLM (opsional)
+
+Only submissions whose rule-based confidence falls inside `band` are sent to
+the model; clear passes and clear failures never cost a request. Calls go to
+an OpenAI-compatible /chat/completions endpoint over one pooled httpx client,
+at most `concurrency` at a time. Identical prompts share one in-flight
+request, and answers are kept in a ResultCache (SQLite tier survives
+restarts), keyed by model + prompt so a prompt change re-reviews everything.
+
+Failures (timeouts, HTTP errors, unparseable answers) are counted and the
+submission keeps its rule-based result; the review never blocks validation.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# Bump when the prompt or answer parsing changes (invalidates cached reviews)
+REVIEW_REVISION = 1
+
+VERDICTS = ('consistent', 'inconsistent', 'uncertain')
+
+SYSTEM_PROMPT = (
+    "You review circular economy claims from Indonesian small businesses (UMKM). "
+    "Decide whether the claimed figures are supported by the business's own "
+    "description and evidence list. Answer with JSON only: "
+    '{"verdict": "consistent" | "inconsistent" | "uncertain", "reason": "<one sentence>"}'
+)
+
+# Fields sent to the model; free text is truncated so one long submission
+# cannot dominate the token budget
+PROMPT_FIELDS = (
+    'resourceReductionPercentage', 'resourceReductionDetails', 'reuseFrequency', 'reuseDetails',
+    'recycleType', 'recycleDetails', 'productLifespanYears', 'productDetails',
+    'processEfficiencyImprovement', 'processDetails', 'documentationLevel', 'traceabilitySystem',
+    'carbonReductionKg', 'carbonCalculationMethod', 'evidenceFiles',
+)
+MAX_TEXT_CHARS = 1500
+
+# Connections per httpx pool (see LLMReviewer._bind)
+POOL_CONNECTIONS = 8
+
+
+def build_prompt(data: Dict[str, Any], result: Dict[str, Any]) -> str:
+    """Prompt deterministik (kunci cache dan coalescing) dari submission + hasil rule-based"""
+    claim = {}
+    for name in PROMPT_FIELDS:
+        value = data.get(name)
+        if value is None or value == [] or value == '':
+            continue
+        if isinstance(value, str):
+            value = value[:MAX_TEXT_CHARS]
+        elif name == 'evidenceFiles':
+            value = [os.path.basename(str(item)) for item in value]
+        claim[name] = value
+    return (
+        f"Claim:\n{json.dumps(claim, sort_keys=True, ensure_ascii=False)}\n"
+        f"Rule-based flags:\n{json.dumps(result.get('flags', []), ensure_ascii=False)}"
+    )
+
+
+def parse_review(content: str) -> Dict[str, str]:
+    """Jawaban model -> {"verdict", "reason"}; ValueError jika formatnya salah"""
+    content = content.strip()
+    if content.startswith('```'):
+        content = content.strip('`').removeprefix('json').strip()
+    answer = json.loads(content)
+    if not isinstance(answer, dict):
+        raise ValueError("LLM answer is not a JSON object")
+    verdict = str(answer.get('verdict', '')).lower()
+    if verdict not in VERDICTS:
+        raise ValueError(f"Unknown verdict {verdict!r}")
+    return {'verdict': verdict, 'reason': str(answer.get('reason', '')).strip()}
+
+
+class LLMReviewer:
+    """
+    Review LLM untuk hasil /validate yang confidence-nya borderline
+
+    Args:
+        url: Base URL API OpenAI-compatible (None = review dimatikan)
+        model: Nama model
+        api_key: Bearer token (opsional untuk server lokal)
+        band: (min, max) confidence yang dikirim ke LLM, inklusif
+        concurrency: Batas request bersamaan ke API
+        timeout: Batas waktu per request (detik)
+        cache: ResultCache untuk jawaban (kunci = model + prompt)
+        transport: httpx transport kustom (tes memakai stub in-process)
+    """
+
+    def __init__(
+        self,
+        url: Optional[str],
+        model: str = 'gpt-4o-mini',
+        api_key: Optional[str] = None,
+        band: Tuple[float, float] = (0.4, 0.7),
+        concurrency: int = 8,
+        timeout: float = 20.0,
+        cache=None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        if band[0] > band[1]:
+            raise ValueError(f"Invalid confidence band {band}")
+        self.url = url.rstrip('/') if url else None
+        self.model = model
+        self.api_key = api_key
+        self.band = band
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cache = cache
+        self.transport = transport
+        # Client, semaphore and in-flight futures belong to one event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._clients: List[httpx.AsyncClient] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, cache=None) -> 'LLMReviewer':
+        low, high = os.getenv('LLM_REVIEW_BAND', '0.4,0.7').split(',')
+        return cls(
+            url=os.getenv('LLM_REVIEW_URL') or None,
+            model=os.getenv('LLM_REVIEW_MODEL', 'gpt-4o-mini'),
+            api_key=os.getenv('LLM_REVIEW_API_KEY') or os.getenv('OPENAI_API_KEY') or None,
+            band=(float(low), float(high)),
+            concurrency=int(os.getenv('LLM_REVIEW_CONCURRENCY', '8')),
+            timeout=float(os.getenv('LLM_REVIEW_TIMEOUT', '20')),
+            cache=cache
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.url is not None
+
+    @property
+    def version(self) -> str:
+        return f"llm-review-{REVIEW_REVISION}:{self.model}"
+
+    def should_review(self, result: Dict[str, Any]) -> bool:
+        return self.enabled and self.band[0] <= result['confidence'] <= self.band[1]
+
+    async def review(self, data: Dict[str, Any], result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """{"verdict", "reason", "model", "cached"} untuk submission borderline, selain itu None"""
+        if not self.should_review(result):
+            return None
+        try:
+            answer, cached = await self._answer(build_prompt(data, result))
+        except Exception:
+            # Timeouts, HTTP and parse errors: keep the rule-based result
+            self.errors += 1
+            return None
+        return {**answer, 'model': self.model, 'cached': cached}
+
+    async def review_all(self, items: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
+        """Review banyak (data, result) sekaligus; semaphore membatasi request bersamaan"""
+        return list(await asyncio.gather(*(self.review(data, result) for data, result in items)))
+
+    async def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        # New loop (e.g. a test client per request): old connections are unusable
+        stale = self._clients
+        self._loop = loop
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._inflight = {}
+        headers = {'Authorization': f"Bearer {self.api_key}"} if self.api_key else {}
+        # httpcore scans every pooled connection per request, so one large pool
+        # gets slower as concurrency grows; small pools used round-robin do not
+        pools = -(-self.concurrency // POOL_CONNECTIONS)
+        size = -(-self.concurrency // pools)
+        self._clients = [
+            httpx.AsyncClient(
+                base_url=self.url,
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+                transport=self.transport
+            )
+            for _ in range(pools)
+        ]
+        for client in stale:
+            try:
+                await client.aclose()
+            except Exception:
+                # Its sockets belong to the old loop, which may already be closed
+                pass
+
+    async def _answer(self, prompt: str):
+        """Jawaban untuk satu prompt: cache, lalu request yang sedang berjalan, lalu request baru"""
+        key = f"{self.version}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}"
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            self.cache_hits += 1
+            return cached, True
+
+        await self._bind()
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending), True
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                raise RuntimeError("shared LLM request was cancelled")
+
+        future = self._loop.create_future()
+        self._inflight[key] = future
+        try:
+            async with self._slots:
+                self.requests += 1
+                answer = await asyncio.wait_for(self._complete(prompt), self.timeout)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters re-raise it
+            raise
+        finally:
+            del self._inflight[key]
+
+        future.set_result(answer)
+        if self.cache is not None:
+            self.cache.set(key, answer)
+        return answer, False
+
+    async def _complete(self, prompt: str) -> Dict[str, str]:
+        client = self._clients[self.requests % len(self._clients)]
+        response = await client.post('/chat/completions', json={
+            'model': self.model,
+            'temperature': 0,
+            'response_format': {'type': 'json_object'},
+            'messages': [
+                {'role': 'system', 'content': SYSTEM_PROMPT},
+                {'role': 'user', 'content': prompt},
+            ],
+        })
+        response.raise_for_status()
+        return parse_review(response.json()['choices'][0]['message']['content'])
+
+    async def close(self):
+        for client in self._clients:
+            await client.aclose()
+        self._clients = []
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'model': self.model,
+            'band': list(self.band),
+            'concurrency': self.concurrency,
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'cacheHits': self.cache_hits,
+            'errors': self.errors,
+            'inflight': len(self._inflight),
+        }
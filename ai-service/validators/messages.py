@@ -0,0 +1,116 @@
+"""
+Interned validator messages
+
+A flag or suggestion is stored as a code plus its parameters instead of a
+formatted sentence. Text is rendered only when someone asks for it, from a
+catalog of `str.format` templates, so structured consumers (batch jobs,
+aggregation by flag type, clients with their own translations) never pay for
+it and the rendered text stays identical to the original f-strings.
+"""
+
+from operator import itemgetter
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+# code -> template, or a {value of the single parameter: text} table
+Template = Union[str, Mapping[str, str]]
+
+
+class Message(tuple):
+    """
+    Kode pesan + argumen (urutan sesuai parameter di template, nilai Python biasa)
+
+    Built from one (code, args) tuple, e.g. Message(('too_low', ('Fashion', 'small', 100))),
+    which keeps construction in C on the validator hot path.
+    """
+    __slots__ = ()
+
+    code = property(itemgetter(0))
+    args = property(itemgetter(1))
+
+    def __repr__(self) -> str:
+        return f"Message({self.code!r}, {self.args!r})"
+
+
+def _compile(template: str) -> Tuple[Callable[..., str], Tuple[str, ...]]:
+    """
+    'Klaim {claim:.0f} kg' -> (renderer(claim) -> 'Klaim 500 kg', ('claim',))
+
+    The template is parsed once into literal text and (argument index, format
+    spec, conversion) fields; rendering is a join of format() calls, which
+    gives the same text as the f-strings the templates replaced. No template
+    is ever evaluated as code.
+    """
+    names: List[str] = []
+    parts: List[Tuple[str, int, str, Optional[str]]] = []
+    for literal, name, spec, conversion in Formatter().parse(template):
+        if name is None:
+            parts.append((literal, -1, '', None))
+            continue
+        if not name.isidentifier() or '{' in spec:
+            raise ValueError(f"Template fields must be plain names: {template!r}")
+        if name not in names:
+            names.append(name)
+        parts.append((literal, names.index(name), spec, conversion))
+
+    if len(parts) == 1 and parts[0][1] == -1:
+        text = parts[0][0]
+        return (lambda: text), ()
+    converters = {None: None, 's': str, 'r': repr, 'a': ascii}
+
+    def render(*args) -> str:
+        out = []
+        for literal, index, spec, conversion in parts:
+            out.append(literal)
+            if index >= 0:
+                value = args[index]
+                if conversion is not None:
+                    value = converters[conversion](value)
+                out.append(format(value, spec))
+        return ''.join(out)
+
+    return render, tuple(names)
+
+
+class MessageCatalog:
+    """
+    Template per kode; parameter diambil dari nama field di template
+
+    Args:
+        templates: code -> str.format template, or a table keyed by the value
+            of the code's single parameter (named in `table_params`)
+    """
+
+    def __init__(self, templates: Mapping[str, Template], table_params: Mapping[str, str] = ()):
+        self.templates = dict(templates)
+        self.params: Dict[str, Tuple[str, ...]] = {}
+        # code -> callable(*args) returning the text
+        self._renderers: Dict[str, Callable[..., str]] = {}
+        table_params = dict(table_params)
+        for code, template in self.templates.items():
+            if isinstance(template, str):
+                self._renderers[code], self.params[code] = _compile(template)
+            else:
+                self._renderers[code] = dict(template).__getitem__
+                self.params[code] = (table_params[code],)
+        # Parameterless messages are shared instances
+        self.fixed: Dict[str, Message] = {code: Message((code, ())) for code, names in self.params.items() if not names}
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.templates
+
+    def message(self, code: str, **params) -> Message:
+        return Message((code, tuple(params[name] for name in self.params[code])))
+
+    def render(self, message: Message) -> str:
+        return self._renderers[message[0]](*message[1])
+
+    def render_all(self, messages: Iterable[Message]) -> List[str]:
+        renderers = self._renderers
+        return [renderers[code](*args) for code, args in messages]
+
+    def to_dict(self, message: Message) -> Dict[str, Any]:
+        """Bentuk JSON: {"code": ..., "params": {...}} (params dihilangkan jika kosong)"""
+        if not message.args:
+            return {'code': message.code}
+        return {'code': message.code, 'params': dict(zip(self.params[message.code], message.args))}
@@ -0,0 +1,522 @@
+"""
+Similarity Index
+Deteksi submission duplikat / hampir duplikat (MinHash + LSH) antar UMKM
+
+Each submission gets one MinHash signature over the word 3-grams of its free
+text fields (NUM_PERM x uint32), split into BANDS LSH bands. Band keys and
+evidence file keys share one 64-bit key space; evidence keys have the top bit
+set. A query looks its keys up, then verifies text candidates by comparing
+signatures (estimated Jaccard similarity).
+
+Storage is log-structured so inserts stay cheap at millions of documents:
+  - segment: sorted key array + doc array + signature matrix as .npy files,
+    memory-mapped read-only (one searchsorted per query)
+  - deltas: recent inserts in dicts, also appended to `log.jsonl`
+  - compaction folds the deltas into a new segment in a background thread;
+    queries keep using the old view until the new one is swapped in
+
+Single writer: only one process should insert into a given index directory.
+
+Build from a submissions export (same reader as streaming.py):
+    python -m validators.similarity_index export.ndjson --index data/similarity
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 5          # shorter texts match too easily to be evidence of copying
+MAX_BUCKET = 1000         # docs read per key; boilerplate buckets can get huge
+PRIME = 4294967291        # 2^32 - 5
+
+# Fixed seed: signatures are persisted, so the permutations must never change
+_rng = np.random.default_rng(1_000_003)
+_PERM_A = _rng.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_BAND_SEED = (np.arange(1, BANDS + 1, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15))
+_FNV_PRIME = np.uint64(0x100000001B3)
+_SHINGLE_BASE = np.uint64(1_000_003)
+_MASK32 = np.uint64(0xFFFFFFFF)
+EVIDENCE_BIT = np.uint64(1 << 63)
+
+_TOKEN = re.compile(r'\w+')
+
+# SubmissionData fields that carry free text
+TEXT_FIELDS = ('resourceReductionDetails', 'processDetails', 'carbonCalculationMethod', 'carbonDetails')
+
+
+def shingle_hashes(texts: Iterable[Optional[str]]) -> np.ndarray:
+    """Distinct 32-bit hashes of the word 3-grams (lowercased, punctuation dropped)"""
+    parts = []
+    for text in texts:
+        if not text:
+            continue
+        words = np.fromiter(
+            (zlib.crc32(word.encode('utf-8')) for word in _TOKEN.findall(text.lower())), dtype=np.uint64
+        )
+        if len(words) < SHINGLE_SIZE:
+            parts.append(words)
+            continue
+        # Polynomial hash of each window; stable across processes, unlike hash()
+        hashes = np.zeros(len(words) - SHINGLE_SIZE + 1, dtype=np.uint64)
+        for i in range(SHINGLE_SIZE):
+            hashes = (hashes * _SHINGLE_BASE + words[i:len(words) - SHINGLE_SIZE + 1 + i]) & _MASK32
+        parts.append(hashes)
+    if not parts:
+        return np.zeros(0, dtype=np.uint64)
+    return np.unique(np.concatenate(parts))
+
+
+def signature(texts: Iterable[Optional[str]]) -> Optional[np.ndarray]:
+    """MinHash signature, or None when there is too little text"""
+    hashes = shingle_hashes(texts)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    # hashes < 2^32 and a < 2^31, so a*h + b never overflows uint64
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % np.uint64(PRIME)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(sig: np.ndarray) -> np.ndarray:
+    rows = sig.reshape(BANDS, ROWS).astype(np.uint64)
+    keys = _BAND_SEED.copy()
+    for j in range(ROWS):
+        keys = (keys ^ rows[:, j]) * _FNV_PRIME  # wraps modulo 2^64
+    return keys & ~EVIDENCE_BIT
+
+
+def evidence_keys(files: Optional[Sequence[str]]) -> np.ndarray:
+    """One key per distinct evidence file (URL, storage path or content hash)"""
+    keys = {
+        int.from_bytes(hashlib.blake2b(name.strip().encode('utf-8'), digest_size=8).digest(), 'little')
+        for name in files or () if name and name.strip()
+    }
+    return np.fromiter(keys, dtype=np.uint64, count=len(keys)) | EVIDENCE_BIT
+
+
+@dataclass
+class SimilarityMatch:
+    submission_id: str
+    umkm_id: Optional[str]
+    similarity: Optional[float]  # estimated Jaccard of the text, None if only evidence matched
+    shared_evidence: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'submissionId': self.submission_id,
+            'umkmId': self.umkm_id,
+            'similarity': self.similarity,
+            'sharedEvidence': self.shared_evidence,
+        }
+
+
+@dataclass
+class _Segment:
+    """Immutable compacted part of the index (possibly memory-mapped)"""
+    keys: np.ndarray        # sorted uint64
+    docs: np.ndarray        # uint32, doc of keys[i]
+    signatures: np.ndarray  # (count, NUM_PERM) uint32
+    count: int = 0
+    name: Optional[str] = None
+
+
+@dataclass
+class _Delta:
+    buckets: Dict[int, List[int]] = field(default_factory=dict)
+    # The same postings as flat lists, so compaction needs no per-key work
+    keys: List[int] = field(default_factory=list)
+    key_docs: List[int] = field(default_factory=list)
+    docs: int = 0
+
+
+@dataclass
+class _View:
+    """Everything a query reads, swapped as one object"""
+    segment: _Segment
+    deltas: List[_Delta]
+    recent: List[np.ndarray]  # signatures of docs >= segment.count
+
+
+def _empty_segment() -> _Segment:
+    return _Segment(
+        keys=np.zeros(0, dtype=np.uint64),
+        docs=np.zeros(0, dtype=np.uint32),
+        signatures=np.zeros((0, NUM_PERM), dtype=np.uint32)
+    )
+
+
+class SimilarityIndex:
+    """
+    Index MinHash/LSH untuk submission, dengan insert inkremental
+
+    Args:
+        path: Direktori penyimpanan (None = hanya di memori)
+        threshold: Similarity teks minimum untuk dilaporkan
+        compact_every: Jumlah insert sebelum delta dipadatkan ke segment
+        max_results: Jumlah match maksimum per query
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.6,
+        compact_every: int = 100_000,
+        max_results: int = 5
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.compact_every = compact_every
+        self.max_results = max_results
+        self.ids: List[str] = []
+        self.umkm_ids: List[Optional[str]] = []
+        self._positions: Dict[str, int] = {}
+        self._view = _View(_empty_segment(), [_Delta()], [])
+        self._lock = threading.Lock()
+        self._compacting: Optional[threading.Thread] = None
+        self._log = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> 'SimilarityIndex':
+        return cls(
+            path=os.getenv('SIMILARITY_INDEX_PATH') or None,
+            threshold=float(os.getenv('SIMILARITY_THRESHOLD', '0.6')),
+            compact_every=int(os.getenv('SIMILARITY_COMPACT_EVERY', '100000'))
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, submission_id: str) -> bool:
+        return submission_id in self._positions
+
+    # Queries -----------------------------------------------------------------
+
+    def query(
+        self,
+        texts: Iterable[Optional[str]],
+        evidence: Optional[Sequence[str]] = None,
+        submission_id: Optional[str] = None,
+        umkm_id: Optional[str] = None
+    ) -> List[SimilarityMatch]:
+        """Submission lain (dari UMKM lain) yang teksnya mirip atau berbagi file bukti"""
+        sig = signature(texts)
+        return self._query(sig, evidence_keys(evidence), submission_id, umkm_id)
+
+    def _query(self, sig, ev_keys, submission_id, umkm_id) -> List[SimilarityMatch]:
+        view = self._view
+        text_keys = band_keys(sig) if sig is not None else np.zeros(0, dtype=np.uint64)
+        keys = np.concatenate((text_keys, ev_keys))
+        if not len(keys):
+            return []
+
+        text_candidates = set()
+        shared: Dict[int, int] = {}
+
+        def collect(i: int, docs: Iterable[int]):
+            if i < len(text_keys):
+                text_candidates.update(docs)
+            else:
+                for doc in docs:
+                    shared[doc] = shared.get(doc, 0) + 1
+
+        segment = view.segment
+        if len(segment.keys):
+            starts = np.searchsorted(segment.keys, keys, side='left')
+            ends = np.searchsorted(segment.keys, keys, side='right')
+            for i in np.flatnonzero(ends > starts).tolist():
+                collect(i, segment.docs[starts[i]:min(ends[i], starts[i] + MAX_BUCKET)].tolist())
+        for delta in view.deltas:
+            for i, key in enumerate(keys.tolist()):
+                docs = delta.buckets.get(key)
+                if docs:
+                    collect(i, docs[:MAX_BUCKET])
+
+        own = self._positions.get(submission_id) if submission_id is not None else None
+        ids, umkm_ids = self.ids, self.umkm_ids
+
+        def eligible(doc: int) -> bool:
+            return doc != own and (umkm_id is None or umkm_ids[doc] != umkm_id)
+
+        similarities = {}
+        candidates = [doc for doc in text_candidates if eligible(doc)]
+        if candidates:
+            rows = np.stack([self._signature(view, doc) for doc in candidates])
+            scores = (rows == sig).mean(axis=1)
+            similarities = {
+                doc: round(float(score), 2)
+                for doc, score in zip(candidates, scores.tolist()) if score >= self.threshold
+            }
+
+        matches = [
+            SimilarityMatch(ids[doc], umkm_ids[doc], similarities.get(doc), shared.get(doc, 0))
+            for doc in set(similarities) | {doc for doc in shared if eligible(doc)}
+        ]
+        matches.sort(key=lambda match: (-(match.similarity or 0.0), -match.shared_evidence, match.submission_id))
+        return matches[:self.max_results]
+
+    @staticmethod
+    def _signature(view: _View, doc: int) -> np.ndarray:
+        if doc < view.segment.count:
+            return view.segment.signatures[doc]
+        return view.recent[doc - view.segment.count]
+
+    # Inserts -----------------------------------------------------------------
+
+    def insert(
+        self,
+        submission_id: str,
+        texts: Iterable[Optional[str]],
+        evidence: Optional[Sequence[str]] = None,
+        umkm_id: Optional[str] = None
+    ) -> bool:
+        """Tambahkan submission; False jika id sudah ada di index"""
+        return self._insert(submission_id, umkm_id, signature(texts), evidence_keys(evidence))
+
+    def check(
+        self,
+        submission_id: Optional[str],
+        texts: Sequence[Optional[str]],
+        evidence: Optional[Sequence[str]] = None,
+        umkm_id: Optional[str] = None
+    ) -> List[SimilarityMatch]:
+        """Query lalu insert (jika ada submission_id) dengan satu perhitungan signature"""
+        sig = signature(texts)
+        ev_keys = evidence_keys(evidence)
+        matches = self._query(sig, ev_keys, submission_id, umkm_id)
+        if submission_id is not None:
+            self._insert(submission_id, umkm_id, sig, ev_keys)
+        return matches
+
+    def _insert(self, submission_id, umkm_id, sig, ev_keys, log: bool = True) -> bool:
+        with self._lock:
+            if submission_id in self._positions:
+                return False
+            view = self._view
+            doc = len(self.ids)
+            self.ids.append(submission_id)
+            self.umkm_ids.append(umkm_id)
+            self._positions[submission_id] = doc
+            view.recent.append(sig if sig is not None else np.zeros(NUM_PERM, dtype=np.uint32))
+
+            delta = view.deltas[-1]
+            keys = (ev_keys if sig is None else np.concatenate((band_keys(sig), ev_keys))).tolist()
+            for key in keys:
+                delta.buckets.setdefault(key, []).append(doc)
+            delta.keys.extend(keys)
+            delta.key_docs.extend([doc] * len(keys))
+            delta.docs += 1
+
+            if log and self._log is not None:
+                self._log.write(json.dumps({
+                    'id': submission_id,
+                    'umkm': umkm_id,
+                    'sig': sig.tolist() if sig is not None else None,
+                    'evidence': ev_keys.tolist(),
+                }) + '\n')
+                self._log.flush()
+
+            pending = sum(d.docs for d in view.deltas)
+        if pending >= self.compact_every:
+            self.compact(wait=False)
+        return True
+
+    # Compaction and persistence ------------------------------------------------
+
+    def compact(self, wait: bool = True):
+        """Fold all deltas into a new segment (background thread unless wait)"""
+        while True:
+            with self._lock:
+                running = self._compacting
+                if running is None or not running.is_alive():
+                    view = self._view
+                    frozen = view.deltas
+                    if not sum(delta.docs for delta in frozen):
+                        return
+                    # New inserts go to a fresh delta (and log) while we build
+                    self._view = _View(view.segment, frozen + [_Delta()], view.recent)
+                    self._rotate_log()
+                    thread = threading.Thread(target=self._build_segment, args=(frozen,), daemon=True)
+                    self._compacting = thread
+                    thread.start()
+                    break
+            if not wait:
+                return
+            # Another compaction is running; it may not cover the latest inserts
+            running.join()
+        if wait:
+            thread.join()
+
+    def _build_segment(self, frozen: List[_Delta]):
+        view = self._view
+        old = view.segment
+        added = sum(delta.docs for delta in frozen)
+        count = old.count + added
+
+        keys = np.concatenate([old.keys] + [np.asarray(delta.keys, dtype=np.uint64) for delta in frozen])
+        docs = np.concatenate([old.docs] + [np.asarray(delta.key_docs, dtype=np.uint32) for delta in frozen])
+        order = np.argsort(keys, kind='stable')
+        signatures = np.concatenate((old.signatures, np.asarray(view.recent[:added], dtype=np.uint32)
+                                     .reshape(added, NUM_PERM)))
+        segment = _Segment(keys.take(order), docs.take(order), signatures, count)
+
+        if self.path:
+            segment = self._write_segment(segment)
+
+        with self._lock:
+            current = self._view
+            self._view = _View(segment, current.deltas[len(frozen):], current.recent[added:])
+        if self.path:
+            frozen_log = os.path.join(self.path, 'log.frozen.jsonl')
+            if os.path.exists(frozen_log):
+                os.remove(frozen_log)
+            if old.name:
+                # Open memory maps keep the old files readable on POSIX
+                shutil.rmtree(os.path.join(self.path, old.name), ignore_errors=True)
+
+    def _write_segment(self, segment: _Segment) -> _Segment:
+        name = f"segment-{segment.count:012d}"
+        directory = os.path.join(self.path, name)
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'keys.npy'), segment.keys)
+        np.save(os.path.join(directory, 'docs.npy'), segment.docs)
+        np.save(os.path.join(directory, 'signatures.npy'), segment.signatures)
+        with open(os.path.join(directory, 'ids.jsonl'), 'w', encoding='utf-8') as f:
+            for submission_id, umkm_id in zip(self.ids[:segment.count], self.umkm_ids[:segment.count]):
+                f.write(json.dumps([submission_id, umkm_id]) + '\n')
+
+        current = os.path.join(self.path, 'CURRENT')
+        with open(f"{current}.tmp", 'w') as f:
+            f.write(name)
+        os.replace(f"{current}.tmp", current)
+        return self._open_segment(name, segment.count)
+
+    def _open_segment(self, name: str, count: int) -> _Segment:
+        directory = os.path.join(self.path, name)
+        return _Segment(
+            keys=np.load(os.path.join(directory, 'keys.npy'), mmap_mode='r'),
+            docs=np.load(os.path.join(directory, 'docs.npy'), mmap_mode='r'),
+            signatures=np.load(os.path.join(directory, 'signatures.npy'), mmap_mode='r'),
+            count=count,
+            name=name
+        )
+
+    def _rotate_log(self):
+        if self._log is None:
+            return
+        self._log.close()
+        log = os.path.join(self.path, 'log.jsonl')
+        frozen_log = os.path.join(self.path, 'log.frozen.jsonl')
+        if os.path.exists(frozen_log):
+            # Left over from an interrupted compaction: keep both in one file
+            with open(frozen_log, 'a', encoding='utf-8') as target, open(log, encoding='utf-8') as source:
+                shutil.copyfileobj(source, target)
+            os.remove(log)
+        else:
+            os.replace(log, frozen_log)
+        self._log = open(log, 'a', encoding='utf-8')
+
+    def _load(self):
+        current = os.path.join(self.path, 'CURRENT')
+        if os.path.exists(current):
+            with open(current) as f:
+                name = f.read().strip()
+            with open(os.path.join(self.path, name, 'ids.jsonl'), encoding='utf-8') as f:
+                for line in f:
+                    submission_id, umkm_id = json.loads(line)
+                    self._positions[submission_id] = len(self.ids)
+                    self.ids.append(submission_id)
+                    self.umkm_ids.append(umkm_id)
+            self._view = _View(self._open_segment(name, len(self.ids)), [_Delta()], [])
+
+        # Replay inserts that were not compacted yet; ids already in the
+        # segment (compaction finished but the log was not removed) are skipped
+        for log_name in ('log.frozen.jsonl', 'log.jsonl'):
+            log = os.path.join(self.path, log_name)
+            if not os.path.exists(log):
+                continue
+            with open(log, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line after a crash
+                    sig = np.asarray(record['sig'], dtype=np.uint32) if record['sig'] is not None else None
+                    self._insert(record['id'], record['umkm'], sig,
+                                 np.asarray(record['evidence'], dtype=np.uint64), log=False)
+        self._log = open(os.path.join(self.path, 'log.jsonl'), 'a', encoding='utf-8')
+
+    def close(self):
+        thread = self._compacting
+        if thread is not None:
+            thread.join()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def stats(self) -> Dict[str, Any]:
+        view = self._view
+        return {
+            'path': self.path,
+            'submissions': len(self.ids),
+            'compacted': view.segment.count,
+            'pending': sum(delta.docs for delta in view.deltas),
+            'keys': int(len(view.segment.keys)),
+            'threshold': self.threshold,
+            'compacting': self._compacting is not None and self._compacting.is_alive(),
+        }
+
+
+def submission_texts(record: Dict[str, Any]) -> List[Optional[str]]:
+    return [record.get(name) if isinstance(record.get(name), str) else None for name in TEXT_FIELDS]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the similarity index from a submissions export")
+    parser.add_argument('input', help="NDJSON/CSV export (id, umkm_id, text fields, evidence_files)")
+    parser.add_argument('--index', required=True, help="Index directory (created or extended)")
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default=None)
+    args = parser.parse_args(argv)
+
+    from streaming import READ_SIZE, RecordReader, _to_camel
+
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'ndjson')
+    index = SimilarityIndex(args.index, compact_every=10 ** 12)
+    reader = RecordReader(fmt)
+    inserted = 0
+    with open(args.input, encoding='utf-8', newline='') as source:
+        while True:
+            text = source.read(READ_SIZE)
+            for raw in reader.feed(text) if text else reader.close():
+                record = {_to_camel(key): value for key, value in raw.items()}
+                if record.get('id') is None:
+                    continue
+                inserted += index.insert(
+                    str(record['id']), submission_texts(record), record.get('evidenceFiles'),
+                    str(record['umkmId']) if record.get('umkmId') is not None else None
+                )
+            if not text:
+                break
+    index.compact()
+    index.close()
+    print(f"{inserted} submissions added, {len(index)} indexed -> {args.index}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Submission Validator
+Rule-based cross-checks for complete submissions (dipakai oleh /validate)
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from pydantic import BaseModel
+
+
+class SubmissionData(BaseModel):
+    resourceReductionPercentage: Optional[float] = None
+    resourceReductionDetails: Optional[str] = None
+    reuseFrequency: Optional[str] = None
+    reuseDetails: Optional[str] = None
+    recycleType: Optional[str] = None
+    recycleDetails: Optional[str] = None
+    productLifespanYears: Optional[float] = None
+    productRepairability: Optional[bool] = None
+    productDetails: Optional[str] = None
+    processEfficiencyImprovement: Optional[float] = None
+    processDetails: Optional[str] = None
+    documentationLevel: Optional[str] = None
+    traceabilitySystem: Optional[bool] = None
+    carbonReductionKg: Optional[float] = None
+    carbonCalculationMethod: Optional[str] = None
+    localEmployees: Optional[int] = None
+    incomeStability: Optional[str] = None
+    evidenceFiles: Optional[List[str]] = []
+
+
+class AIValidationResult(BaseModel):
+    isValid: bool
+    confidence: float
+    flags: List[str]
+    flagCodes: List[str] = []  # rule code per flag, same order as flags
+    suggestions: List[str]
+    adjustedScores: Dict[str, float]
+    duplicates: List[Dict[str, Any]] = []
+    llmReview: Optional[Dict[str, Any]] = None
+
+
+class RuleOutcome(NamedTuple):
+    """Kontribusi satu rule ke AIValidationResult (immutable, bisa disimpan)"""
+    flags: Tuple[str, ...] = ()
+    suggestions: Tuple[str, ...] = ()
+    confidence_delta: float = 0.0
+    adjusted_scores: Tuple[Tuple[str, float], ...] = ()
+    flag_codes: Tuple[str, ...] = ()
+
+
+PASS = RuleOutcome()
+
+
+class SubmissionValidator:
+    """
+    Validator untuk data submission lengkap
+    Anomaly detection dan cross-validation antar field
+    """
+    
+    # Bump when the thresholds or messages change (invalidates cached results)
+    RULES_REVISION = 2
+    
+    BASE_CONFIDENCE = 0.85
+    
+    # Rules in evaluation order with the SubmissionData fields each one reads;
+    # RescoringEngine re-runs a rule only when one of its fields changes
+    RULES = (
+        ('high_carbon_claim', ('carbonReductionKg', 'carbonCalculationMethod')),
+        ('high_resource_reduction', ('resourceReductionPercentage', 'resourceReductionDetails')),
+        ('few_evidence', ('evidenceFiles',)),
+        ('traceability_without_documentation', ('traceabilitySystem', 'documentationLevel')),
+        ('efficiency_without_details', ('processEfficiencyImprovement', 'processDetails')),
+    )
+    
+    # Every code that can appear in flagCodes (portfolio flag bits)
+    FLAG_CODES = (
+        'high_carbon_claim',
+        'high_resource_reduction',
+        'traceability_without_documentation',
+        'duplicate_text',
+        'reused_evidence',
+        'llm_inconsistent',
+    )
+    
+    # Confidence penalties for copied submissions (see flag_duplicates)
+    DUPLICATE_TEXT_PENALTY = 0.2
+    REUSED_EVIDENCE_PENALTY = 0.25
+    
+    # Confidence change from the optional LLM cross-check (see flag_llm_review)
+    LLM_INCONSISTENT_PENALTY = 0.15
+    LLM_CONSISTENT_BONUS = 0.05
+    
+    @property
+    def version(self) -> str:
+        return f"submission-{self.RULES_REVISION}"
+    
+    def validate_submission(
+        self,
+        data: SubmissionData,
+        steps: Optional[Callable[[str, int], None]] = None
+    ) -> AIValidationResult:
+        """
+        Rule-based checks behind /validate
+        
+        `steps` is an optional timing hook, called (label, flags so far) at the
+        start of each step (metrics.StepTimer)
+        """
+        outcomes = {}
+        
+        # Anomaly detection
+        if steps is not None:
+            steps('anomaly_detection', 0)
+        outcomes['high_carbon_claim'] = self.high_carbon_claim(data)
+        outcomes['high_resource_reduction'] = self.high_resource_reduction(data)
+        
+        # Evidence consistency check
+        if steps is not None:
+            steps('evidence_consistency', sum(len(outcome.flags) for outcome in outcomes.values()))
+        outcomes['few_evidence'] = self.few_evidence(data)
+        
+        # Cross-validation
+        if steps is not None:
+            steps('cross_validation', sum(len(outcome.flags) for outcome in outcomes.values()))
+        outcomes['traceability_without_documentation'] = self.traceability_without_documentation(data)
+        outcomes['efficiency_without_details'] = self.efficiency_without_details(data)
+        
+        return self.combine(outcomes.values())
+    
+    def combine(self, outcomes: Iterable[RuleOutcome]) -> AIValidationResult:
+        """Gabungkan hasil rule (urutan RULES) menjadi AIValidationResult"""
+        flags = []
+        flag_codes = []
+        suggestions = []
+        adjusted_scores = {}
+        confidence = self.BASE_CONFIDENCE
+        for outcome in outcomes:
+            if outcome is PASS:
+                continue
+            flags.extend(outcome.flags)
+            flag_codes.extend(outcome.flag_codes)
+            suggestions.extend(outcome.suggestions)
+            confidence += outcome.confidence_delta
+            adjusted_scores.update(outcome.adjusted_scores)
+        
+        is_valid = len(flags) < 3 and confidence > 0.5
+        
+        return AIValidationResult(
+            isValid=is_valid,
+            confidence=max(0.0, min(1.0, confidence)),
+            flags=flags,
+            flagCodes=flag_codes,
+            suggestions=suggestions,
+            adjustedScores=adjusted_scores
+        )
+    
+    def high_carbon_claim(self, data: SubmissionData) -> RuleOutcome:
+        if data.carbonReductionKg and data.carbonReductionKg > 5000:
+            return RuleOutcome(
+                flags=("Unusually high carbon reduction claim",),
+                flag_codes=('high_carbon_claim',),
+                suggestions=() if data.carbonCalculationMethod
+                else ("Provide detailed calculation method for carbon reduction",),
+                confidence_delta=-0.15
+            )
+        return PASS
+    
+    def high_resource_reduction(self, data: SubmissionData) -> RuleOutcome:
+        if data.resourceReductionPercentage and data.resourceReductionPercentage > 50:
+            return RuleOutcome(
+                flags=("Very high resource reduction percentage",),
+                flag_codes=('high_resource_reduction',),
+                suggestions=() if data.resourceReductionDetails
+                else ("Add baseline data and measurement methodology",),
+                confidence_delta=-0.1
+            )
+        return PASS
+    
+    def few_evidence(self, data: SubmissionData) -> RuleOutcome:
+        if data.evidenceFiles and len(data.evidenceFiles) < 3:
+            return RuleOutcome(
+                suggestions=("More evidence files recommended for higher confidence",),
+                confidence_delta=-0.05
+            )
+        return PASS
+    
+    def traceability_without_documentation(self, data: SubmissionData) -> RuleOutcome:
+        if data.traceabilitySystem and data.documentationLevel == "minimal":
+            return RuleOutcome(
+                flags=("Traceability system claimed but minimal documentation",),
+                flag_codes=('traceability_without_documentation',),
+                adjusted_scores=(("transparency", -2),)
+            )
+        return PASS
+    
+    def efficiency_without_details(self, data: SubmissionData) -> RuleOutcome:
+        if data.processEfficiencyImprovement and data.processEfficiencyImprovement > 30:
+            if not data.processDetails:
+                return RuleOutcome(
+                    suggestions=("High efficiency improvement needs detailed explanation",),
+                    adjusted_scores=(("processEfficiency", -3),)
+                )
+        return PASS
+    
+    def flag_duplicates(self, result: Dict[str, Any], matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Tambahkan flag duplikat ke hasil /validate (dict, bisa dari cache)
+        
+        `matches` berasal dari SimilarityIndex dan hanya berisi submission UMKM
+        lain. Hasil rule-based tetap di-cache tanpa bagian ini karena isi
+        index terus berubah.
+        """
+        if not matches:
+            return result
+        
+        flags = list(result['flags'])
+        flag_codes = list(result['flagCodes'])
+        suggestions = list(result['suggestions'])
+        confidence = result['confidence']
+        
+        similar = [match for match in matches if match['similarity'] is not None]
+        if similar:
+            top = max(similar, key=lambda match: match['similarity'])
+            more = f" (+{len(similar) - 1} more)" if len(similar) > 1 else ""
+            flags.append(
+                f"Details {round(top['similarity'] * 100)}% similar to submission "
+                f"{top['submissionId']} from another UMKM{more}"
+            )
+            flag_codes.append('duplicate_text')
+            suggestions.append("Describe your own baseline and process instead of reusing another submission's text")
+            confidence -= self.DUPLICATE_TEXT_PENALTY
+        
+        reused = [match for match in matches if match['sharedEvidence']]
+        if reused:
+            more = f" (+{len(reused) - 1} more)" if len(reused) > 1 else ""
+            flags.append(f"Evidence files reused from submission {reused[0]['submissionId']}{more}")
+            flag_codes.append('reused_evidence')
+            suggestions.append("Upload original evidence for this submission")
+            confidence -= self.REUSED_EVIDENCE_PENALTY
+        
+        return {
+            **result,
+            'isValid': result['isValid'] and len(flags) < 3 and confidence > 0.5,
+            'confidence': max(0.0, min(1.0, confidence)),
+            'flags': flags,
+            'flagCodes': flag_codes,
+            'suggestions': suggestions,
+            'duplicates': matches,
+        }
+    
+    def flag_llm_review(self, result: Dict[str, Any], review: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Terapkan jawaban LLMReviewer ke hasil /validate (dict, bisa dari cache)
+        
+        Only borderline results are reviewed, so a verdict nudges confidence
+        instead of overriding the rules; 'uncertain' is recorded but changes
+        nothing.
+        """
+        if review is None:
+            return result
+        
+        flags = list(result['flags'])
+        flag_codes = list(result['flagCodes'])
+        suggestions = list(result['suggestions'])
+        confidence = result['confidence']
+        
+        if review['verdict'] == 'inconsistent':
+            flags.append(f"LLM review: {review['reason'] or 'claim not supported by details'}")
+            flag_codes.append('llm_inconsistent')
+            suggestions.append("Explain how the claimed figures follow from your records and evidence")
+            confidence -= self.LLM_INCONSISTENT_PENALTY
+        elif review['verdict'] == 'consistent':
+            confidence += self.LLM_CONSISTENT_BONUS
+        
+        return {
+            **result,
+            # Same rule as validate_submission; never clears an isValid=False set
+            # earlier (e.g. by flag_duplicates)
+            'isValid': result['isValid'] and len(flags) < 3 and confidence > 0.5,
+            'confidence': max(0.0, min(1.0, confidence)),
+            'flags': flags,
+            'flagCodes': flag_codes,
+            'suggestions': suggestions,
+            'llmReview': review,
+        }
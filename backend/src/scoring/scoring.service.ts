@@ -297,10 +297,32 @@ export class ScoringService {
     });
   }
 
+  /**
+   * Validate many submissions with one call to the AI service (used for backfills).
+   * Results and per-item errors are keyed by the supplied ids.
+   */
+  async validateBatchWithAI(
+    items: { id: string; data: SubmissionData }[],
+  ): Promise<{ results: Record<string, any>; errors: Record<string, string[]> }> {
+    try {
+      // The AI service queues backfills behind interactive submissions and
+      // drops work we have stopped waiting for
+      const response = await axios.post(`${this.aiServiceUrl}/validate/batch`, { items }, {
+        timeout: 60000,
+        headers: { 'X-Request-Deadline-Ms': '60000', 'X-Request-Priority': 'batch' },
+      });
+      return response.data;
+    } catch (error) {
+      this.logger.error('Failed to call AI service batch endpoint', error);
+      throw error;
+    }
+  }
+
   private async validateWithAI(data: SubmissionData): Promise<any> {
     try {
       const response = await axios.post(`${this.aiServiceUrl}/validate`, data, {
         timeout: 5000,
+        headers: { 'X-Request-Deadline-Ms': '5000', 'X-Request-Priority': 'interactive' },
       });
       return response.data;
     } catch (error) {